@@ -288,6 +288,44 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TIMEZONE = 'Asia/Bangkok'
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 
+# CACHE — shared by every gunicorn worker / celery process (storeApp/services/cache_backend.py).
+# CACHE_REDIS_URL → Redis; CACHE_FILE_DIR → file-based stand-in (one host, tests); else LocMem.
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', '').strip()
+CACHE_FILE_DIR = os.getenv('CACHE_FILE_DIR', '').strip()
+if CACHE_REDIS_URL:
+    _shared_cache = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_REDIS_URL,
+        'KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', 'oupharmacy'),
+    }
+elif CACHE_FILE_DIR:
+    _shared_cache = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_FILE_DIR,
+    }
+else:
+    _shared_cache = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+CACHES = {
+    'default': _shared_cache,
+    # Per-process L1 for STORE_CACHE_TWO_TIER.
+    'local': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'store-l1'},
+}
+STORE_CACHE_TWO_TIER = os.getenv('STORE_CACHE_TWO_TIER', 'False') == 'True'
+STORE_CACHE_L1_TTL = int(os.getenv('STORE_CACHE_L1_TTL', '5'))
+# GET /carts/current payload cache: shared | local (single worker) | none.
+STORE_CART_CACHE = os.getenv('STORE_CART_CACHE', 'shared')
+STORE_CART_CACHE_TTL = int(os.getenv('STORE_CART_CACHE_TTL', '60'))
+# Stock holds taken at POST /carts/checkout-start (seconds).
+STORE_STOCK_RESERVATION_TTL_SECONDS = int(os.getenv('STORE_STOCK_RESERVATION_TTL_SECONDS', '600'))
+# Order numbers reserved per worker round trip (1 = strictly increasing ORD{date}{NNNN}).
+STORE_ORDER_NUMBER_BLOCK = int(os.getenv('STORE_ORDER_NUMBER_BLOCK', '1'))
+# LOW_STOCK notification when a variant's live batch total is at or below this (base units).
+STORE_LOW_STOCK_THRESHOLD = int(os.getenv('STORE_LOW_STOCK_THRESHOLD', '10'))
+# Campaign snapshot: queue a Celery recompile at the next campaign start/end (needs a broker).
+CAMPAIGN_SNAPSHOT_SCHEDULE_RECOMPILE = os.getenv(
+    'CAMPAIGN_SNAPSHOT_SCHEDULE_RECOMPILE', 'True' if CELERY_BROKER_URL else 'False'
+) == 'True'
+
 # FIREBASE
 if not os.environ.get('FIREBASE_SKIP_INIT'):
     initialize_firebase()
@@ -44,3 +44,27 @@ PASSWORD_HASHERS = [
 ]
 
 EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
+
+# Suggest index: no background rebuild threads in tests (they would not see test transactions).
+SEARCH_SUGGEST_INDEX_BACKGROUND_BUILD = False
+
+# SearchKeyword hit buffer: flush only when tests ask for it (no timer / atexit thread).
+SEARCH_KEYWORD_BUFFER_BACKGROUND_FLUSH = False
+
+# Menu snapshot: rebuild inline on the next read instead of a background thread.
+MENU_SNAPSHOT_BACKGROUND_BUILD = False
+
+# Store path routing table: rebuild inline when the version token changed.
+STORE_PATH_ROUTES_BACKGROUND_BUILD = False
+
+# Facet postings: off by default (TestCase never runs on_commit, so the change log would not
+# see test data); test_facet_index enables it explicitly.
+SEARCH_FACET_INDEX_ENABLED = False
+SEARCH_FACET_INDEX_BACKGROUND_BUILD = False
+
+# Cart payload cache: SQLite reuses rolled-back cart ids, so a cached (id, version) from one test
+# could match the next; test_cart_cache swaps in a real gateway.
+STORE_CART_CACHE = "none"
+
+# Campaign snapshot: no Celery broker in tests; readers recompile inline past the boundary.
+CAMPAIGN_SNAPSHOT_SCHEDULE_RECOMPILE = False
@@ -12,6 +12,12 @@ python manage.py migrate --database=default
 echo "Running migrations for store database..."
 python manage.py migrate storeApp --database=store
 
+echo "Backfilling store search documents..."
+python manage.py rebuild_search_documents --missing-only
+
+echo "Backfilling store category product counts..."
+python manage.py rebuild_category_product_counts --missing-only
+
 # Collect static files
 echo "Collecting static files..."
 python manage.py collectstatic --noinput
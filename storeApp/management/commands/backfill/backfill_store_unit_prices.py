@@ -20,7 +20,7 @@ from statistics import median
 from django.core.management.base import BaseCommand
 
 from storeApp.constants import STORE_DATABASE_ALIAS
-from storeApp.models import ProductVariantUnit
+from storeApp.models import ProductVariant, ProductVariantUnit
 
 
 def _parse_price_display(raw):
@@ -225,6 +225,7 @@ class Command(BaseCommand):
             ProductVariantUnit.objects.using(db).bulk_update(
                 changed, ["price_value", "price_display", "is_published"], batch_size=500
             )
+            ProductVariant.sync_price_columns({unit.variant_id for unit in changed}, using=db)
 
         self.stdout.write(
             self.style.NOTICE(
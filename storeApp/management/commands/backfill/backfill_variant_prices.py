@@ -0,0 +1,79 @@
+"""
+Recompute ProductVariant price cache columns (default_unit_price, default_compare_at_price,
+min_unit_price) from published ProductVariantUnit rows.
+
+Usage:
+  python manage.py store_backfill variant-prices --dry-run
+  python manage.py store_backfill variant-prices
+  python manage.py store_backfill variant-prices --database=store --chunk-size=2000
+"""
+
+from django.core.management.base import BaseCommand
+
+from storeApp.constants import STORE_DATABASE_ALIAS
+from storeApp.models import ProductVariant
+
+
+def drifted_variant_ids(using):
+    """Variant ids whose cached price columns differ from the unit-derived values."""
+    expected = {
+        f"expected_{name}": expression
+        for name, expression in ProductVariant.price_column_expressions(using=using).items()
+    }
+    fields = list(ProductVariant.PRICE_COLUMNS)
+    rows = (
+        ProductVariant.objects.using(using)
+        .annotate(**expected)
+        .order_by("id")
+        .values_list("id", *fields, *expected)
+    )
+    width = len(fields)
+    return [
+        row[0]
+        for row in rows.iterator(chunk_size=2000)
+        if any(_differs(row[1 + i], row[1 + width + i]) for i in range(width))
+    ]
+
+
+def _differs(cached, expected):
+    if cached is None or expected is None:
+        return cached is not expected
+    # SQLite hands subquery decimals back as float/str.
+    return round(float(cached), 2) != round(float(expected), 2)
+
+
+class Command(BaseCommand):
+    help = "Recompute ProductVariant default/min unit price columns from published units."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            default=STORE_DATABASE_ALIAS,
+            help=f"Django DB alias (default: {STORE_DATABASE_ALIAS})",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Report drifted variants without writing.")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Variants per UPDATE statement (default: 2000).",
+        )
+
+    def handle(self, *args, **options):
+        db = options.get("database") or STORE_DATABASE_ALIAS
+        dry_run = options.get("dry_run", False)
+        chunk_size = max(1, int(options.get("chunk_size") or 2000))
+
+        drifted = drifted_variant_ids(db)
+        self.stdout.write(f"Drifted variants on '{db}': {len(drifted)}")
+        for variant_id in drifted[:20]:
+            self.stdout.write(f"  - variant_id={variant_id}")
+
+        if dry_run or not drifted:
+            self.stdout.write(self.style.NOTICE("[DRY-RUN] No rows written." if dry_run else "Nothing to do."))
+            return
+
+        updated = 0
+        for start in range(0, len(drifted), chunk_size):
+            updated += ProductVariant.sync_price_columns(drifted[start : start + chunk_size], using=db)
+        self.stdout.write(self.style.SUCCESS(f"Updated price columns on {updated} variant(s)."))
@@ -0,0 +1,166 @@
+"""
+Benchmark search facets: SQL aggregates (SearchFacetsService.build_facets) vs the in-memory
+postings (services/facet_index.py).
+
+    python manage.py benchmark_search_facets                       # current catalog
+    python manage.py benchmark_search_facets --synthetic 100000    # throwaway 100k-variant catalog
+
+--synthetic inserts the catalog inside a transaction that is rolled back at the end.
+"""
+import math
+import random
+import time
+from statistics import mean, median
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from storeApp.models import (
+    Brand,
+    CatalogAttribute,
+    CatalogAttributeOption,
+    Category,
+    Product,
+    ProductAttributeValue,
+    ProductCategory,
+    ProductVariant,
+)
+from storeApp.services.facet_index import FacetIndex, result_rows
+from storeApp.services.search_facets_service import SearchFacetsService
+from storeApp.services.search_documents import search_match_q
+from storeApp.viewsets.product import annotate_variant_unit_price
+
+COUNTRIES = ("Việt Nam", "Pháp", "Đức", "Mỹ", "Nhật Bản", "Hàn Quốc", "Ấn Độ", "Úc")
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    help = "Benchmark facet latency: SQL aggregates vs in-memory facet postings."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=10)
+        parser.add_argument("--synthetic", type=int, default=0, help="Variants in a throwaway catalog (0 = use current data).")
+        parser.add_argument("--query", type=str, default="", help="Also benchmark a keyword search (q=).")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--database", default="store" if "store" in settings.DATABASES else "default")
+
+    def handle(self, *args, **options):
+        db = options["database"]
+        if not options["synthetic"]:
+            self._benchmark(db, options)
+            return
+        with transaction.atomic(using=db):
+            started = time.perf_counter()
+            self._create_synthetic_catalog(db, options["synthetic"], random.Random(options["seed"]))
+            self.stdout.write(f"Synthetic catalog: {options['synthetic']} variants in {time.perf_counter() - started:.1f}s")
+            self._benchmark(db, options)
+            transaction.set_rollback(True, using=db)
+        self.stdout.write("Synthetic catalog rolled back.")
+
+    def _benchmark(self, db, options):
+        iterations = max(1, options["iterations"])
+        base = annotate_variant_unit_price(
+            ProductVariant.objects.using(db).filter(active=True, is_published=True, product__active=True)
+        )
+        brand_id = Brand.objects.using(db).order_by("id").values_list("id", flat=True).first()
+        scenarios = [
+            ("all", base, {}),
+            ("in_stock", base.filter(in_stock__gt=0), {"in_stock": True}),
+            ("price_100k_300k", base.filter(price_value__gte=100000, price_value__lt=300000), {"price_range": "100k_300k"}),
+        ]
+        if brand_id:
+            scenarios.append(("brand", base.filter(product__brand_id=brand_id), {"brand": str(brand_id)}))
+        if options["query"]:
+            scenarios.append(("query", base.filter(search_match_q(options["query"], using=db)), {"q": options["query"]}))
+
+        started = time.perf_counter()
+        index = FacetIndex.build("benchmark", 0, using=db)
+        self.stdout.write(f"Index build: {(time.perf_counter() - started) * 1000:.1f} ms {index.stats()}")
+
+        for name, queryset, params in scenarios:
+            include_category = True
+            sql_ms = self._time(lambda: SearchFacetsService.build_facets(queryset, include_category=include_category), iterations)
+            index_ms = self._time(
+                lambda: index.facets(result_rows(queryset, params), include_category=include_category), iterations
+            )
+            parity = SearchFacetsService.build_facets(queryset, include_category=include_category) == index.facets(
+                result_rows(queryset, params), include_category=include_category
+            )
+            self.stdout.write(
+                f"- {name}: sql {self._summary(sql_ms)} | index {self._summary(index_ms)} | "
+                f"speedup x{median(sql_ms) / max(median(index_ms), 0.001):.1f} | parity {'ok' if parity else 'MISMATCH'}"
+            )
+
+    @staticmethod
+    def _time(fn, iterations):
+        samples = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - started) * 1000)
+        return samples
+
+    @staticmethod
+    def _summary(samples):
+        ordered = sorted(samples)
+        p95 = ordered[max(0, math.ceil(0.95 * len(ordered)) - 1)]
+        return f"median {median(samples):.1f} / mean {mean(samples):.1f} / p95 {p95:.1f} ms"
+
+    def _create_synthetic_catalog(self, db, variant_total, rng):
+        """~2 variants per product, 200 brands, 120 categories, 4 attributes x 8 options."""
+        tag = f"bench{rng.randrange(10**6):06d}"
+        brands = Brand.objects.using(db).bulk_create(
+            [Brand(name=f"{tag} brand {i}", country=COUNTRIES[i % len(COUNTRIES)]) for i in range(200)]
+        )
+        categories = Category.objects.using(db).bulk_create(
+            [Category(name=f"{tag} cat {i}", slug=f"{tag}-cat-{i}", path_slug=f"{tag}-cat-{i}") for i in range(120)]
+        )
+        attributes = CatalogAttribute.objects.using(db).bulk_create(
+            [CatalogAttribute(code=f"{tag}_attr_{i}", label=f"Attr {i}", sort_order=i) for i in range(4)]
+        )
+        options = CatalogAttributeOption.objects.using(db).bulk_create(
+            [
+                CatalogAttributeOption(attribute=attribute, slug=f"opt-{j}", label=f"Option {j}")
+                for attribute in attributes
+                for j in range(8)
+            ]
+        )
+
+        product_total = max(1, variant_total // 2)
+        products = Product.objects.using(db).bulk_create(
+            [
+                Product(name=f"{tag} product {i}", slug=f"{tag}-product-{i}", mid=f"{tag}-{i}", brand=rng.choice(brands))
+                for i in range(product_total)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        ProductCategory.objects.using(db).bulk_create(
+            [
+                ProductCategory(product=product, category=category, is_primary=index == 0)
+                for product in products
+                for index, category in enumerate(rng.sample(categories, rng.randint(1, 2)))
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        ProductAttributeValue.objects.using(db).bulk_create(
+            [
+                ProductAttributeValue(product=product, option=option)
+                for product in products
+                for option in rng.sample(options, rng.randint(0, 3))
+            ],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        ProductVariant.objects.using(db).bulk_create(
+            [
+                ProductVariant(
+                    product=products[i % product_total],
+                    packing=f"Hộp {i}",
+                    in_stock=rng.choice((0, 0, 5, 20, 100)),
+                    default_unit_price=rng.randrange(5000, 900000, 500),
+                )
+                for i in range(variant_total)
+            ],
+            batch_size=BATCH_SIZE,
+        )
@@ -0,0 +1,94 @@
+import math
+import time
+from statistics import mean, median
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from storeApp.views import search_products
+
+
+class Command(BaseCommand):
+    help = "Benchmark /api/store/search page 1 vs deep page latency for OFFSET and cursor pagination."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--query", type=str, default="")
+        parser.add_argument("--page-size", type=int, default=12)
+        parser.add_argument("--sort", type=str, default="relevance")
+        parser.add_argument("--deep-page", type=int, default=200)
+
+    def handle(self, *args, **options):
+        self.iterations = max(1, int(options["iterations"]))
+        self.base_params = {
+            "q": options["query"],
+            "page_size": max(1, int(options["page_size"])),
+            "sort": options["sort"],
+            "include_facets": "false",
+        }
+        deep_page = max(2, int(options["deep_page"]))
+        self.factory = APIRequestFactory()
+        db_alias = "store" if "store" in settings.DATABASES else "default"
+        self.db_connection = connections[db_alias]
+
+        self.stdout.write(
+            f"Benchmarking GET /api/store/search pagination (iterations={self.iterations}, "
+            f"q='{self.base_params['q']}', page_size={self.base_params['page_size']}, "
+            f"sort={self.base_params['sort']}, deep_page={deep_page})"
+        )
+
+        deep_cursor, reached_page = self._walk_cursor(deep_page)
+        if reached_page < deep_page:
+            self.stdout.write(self.style.WARNING(f"Catalog only has {reached_page} page(s); deep page = {reached_page}."))
+
+        self.stdout.write("")
+        self.stdout.write("Results (latency ms min/median/mean/p95/max | sql queries mean):")
+        self._report("offset page 1", {"page": 1})
+        self._report(f"offset page {reached_page}", {"page": reached_page})
+        self._report("cursor page 1", {"pagination": "cursor"})
+        self._report(
+            f"cursor page {reached_page}",
+            {"pagination": "cursor", **({"cursor": deep_cursor} if deep_cursor else {})},
+        )
+
+    def _get(self, extra):
+        request = self.factory.get("/api/store/search/", {**self.base_params, **extra})
+        return search_products(request)
+
+    def _walk_cursor(self, target_page):
+        """Follow next_cursor up to target_page (untimed); returns (cursor for that page, page reached)."""
+        cursor = None
+        page = 1
+        while page < target_page:
+            extra = {"pagination": "cursor", **({"cursor": cursor} if cursor else {})}
+            next_cursor = self._get(extra).data["meta"].get("next_cursor")
+            if not next_cursor:
+                break
+            cursor = next_cursor
+            page += 1
+        return cursor, page
+
+    def _report(self, label, extra):
+        latencies_ms = []
+        query_counts = []
+        for _ in range(self.iterations):
+            started = time.perf_counter()
+            original_force_debug = self.db_connection.force_debug_cursor
+            self.db_connection.force_debug_cursor = True
+            try:
+                with CaptureQueriesContext(self.db_connection) as captured:
+                    self._get(extra)
+            finally:
+                self.db_connection.force_debug_cursor = original_force_debug
+            latencies_ms.append((time.perf_counter() - started) * 1000)
+            query_counts.append(len(captured))
+
+        sorted_latencies = sorted(latencies_ms)
+        p95 = sorted_latencies[max(0, math.ceil(0.95 * len(sorted_latencies)) - 1)]
+        self.stdout.write(
+            f"- {label}: {min(latencies_ms):.2f} / {median(latencies_ms):.2f} / {mean(latencies_ms):.2f} / "
+            f"{p95:.2f} / {max(latencies_ms):.2f} | {mean(query_counts):.2f}"
+        )
@@ -31,6 +31,9 @@ from django.core.management.base import BaseCommand
 from django.db import transaction
 
 from storeApp.constants import STORE_DATABASE_ALIAS
+from storeApp.services.category_counts import defer_category_count_refresh
+from storeApp.services.search_documents import defer_search_document_refresh
+from storeApp.services.stock import defer_in_stock_sync
 
 from .store_import_categories import parse_category_array_from_row, resolve_leaf_category
 from .store_import_attributes import upsert_product_attributes_from_row
@@ -220,22 +223,26 @@ class Command(BaseCommand):
         brand_cache: dict = {}
         total_stats = self._empty_stats()
 
-        for data_file in data_files:
-            self.stdout.write(f"\n📄 {os.path.relpath(data_file, os.getcwd())}")
-            file_stats = self._import_file(
-                data_file=data_file,
-                dry_run=dry_run,
-                update_existing=update_existing,
-                no_batches=no_batches,
-                limit=limit,
-                category_cache=category_cache,
-                brand_cache=brand_cache,
-            )
-            total_stats["files"] += 1
-            for k in file_stats:
-                if k in total_stats:
-                    total_stats[k] += file_stats.get(k, 0)
-            self._print_file_stats(file_stats)
+        # Search documents / category counts / in_stock are refreshed once after all files, not per saved row.
+        with defer_search_document_refresh(using=STORE_DATABASE_ALIAS), defer_category_count_refresh(
+            using=STORE_DATABASE_ALIAS
+        ), defer_in_stock_sync(using=STORE_DATABASE_ALIAS):
+            for data_file in data_files:
+                self.stdout.write(f"\n📄 {os.path.relpath(data_file, os.getcwd())}")
+                file_stats = self._import_file(
+                    data_file=data_file,
+                    dry_run=dry_run,
+                    update_existing=update_existing,
+                    no_batches=no_batches,
+                    limit=limit,
+                    category_cache=category_cache,
+                    brand_cache=brand_cache,
+                )
+                total_stats["files"] += 1
+                for k in file_stats:
+                    if k in total_stats:
+                        total_stats[k] += file_stats.get(k, 0)
+                self._print_file_stats(file_stats)
 
         self._print_summary(total_stats, dry_run, no_batches)
         self._finalize_no_price_reports(options)
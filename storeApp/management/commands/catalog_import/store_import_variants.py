@@ -10,7 +10,7 @@ from django.utils import timezone
 
 from storeApp.constants import STORE_DATABASE_ALIAS
 from storeApp.models import MedicineBatch, Product, ProductVariant, ProductVariantStats, ProductVariantUnit
-from storeApp.services.stock import sync_in_stock_cache
+from storeApp.services.stock import defer_in_stock_sync
 
 from .store_import_packaging import (
     _normalize_unit_name,
@@ -150,6 +150,8 @@ def upsert_variant_units(
             stats["deactivated"] = len(orphans)
 
     reconcile_single_default_variant_units_in_db(variant, using=using)
+    # Queryset/bulk updates above bypass ProductVariantUnit.save.
+    ProductVariant.sync_price_columns([variant.pk], using=using)
     return stats
 
 
@@ -261,50 +263,50 @@ def create_batches_for_variants(
         MedicineBatch.objects.using(using).values_list("batch_number", flat=True)
     )
 
-    for variant in variants:
-        MedicineBatch.objects.using(using).filter(product_variant=variant).delete()
-
-        default_unit = resolve_variant_default_unit(variant, using=using)
-        qib = max(default_unit.quantity_in_base, 1) if default_unit else 1
-        import_price_per_base = None
-        if default_unit and default_unit.price_value:
-            import_price_per_base = compute_import_price_per_base_unit(
-                default_unit.price_value,
-                qib,
-            )
-
-        for _ in range(settings.batch_count):
-            import_date = random_import_date(today)
-            expiry_months = random.choice([6, 12, 18, 24, 36])
-            expiry_date = add_months(import_date, expiry_months)
-            quantity = compute_synthetic_batch_quantity(
-                qib,
-                settings.batch_pack_mult_min,
-                settings.batch_pack_mult_max,
-            )
-
-            for _ in range(50):
-                suffix = random.randint(1000, 9999)
-                batch_num = f"BATCH{import_date.strftime('%Y%m%d')}{variant.id}{suffix}"
-                if batch_num not in used_numbers:
+    # Batch signals only collect variant ids here; in_stock is re-aggregated once for the whole set.
+    with defer_in_stock_sync(using=using):
+        for variant in variants:
+            MedicineBatch.objects.using(using).filter(product_variant=variant).delete()
+
+            default_unit = resolve_variant_default_unit(variant, using=using)
+            qib = max(default_unit.quantity_in_base, 1) if default_unit else 1
+            import_price_per_base = None
+            if default_unit and default_unit.price_value:
+                import_price_per_base = compute_import_price_per_base_unit(
+                    default_unit.price_value,
+                    qib,
+                )
+
+            for _ in range(settings.batch_count):
+                import_date = random_import_date(today)
+                expiry_months = random.choice([6, 12, 18, 24, 36])
+                expiry_date = add_months(import_date, expiry_months)
+                quantity = compute_synthetic_batch_quantity(
+                    qib,
+                    settings.batch_pack_mult_min,
+                    settings.batch_pack_mult_max,
+                )
+
+                for _ in range(50):
+                    suffix = random.randint(1000, 9999)
+                    batch_num = f"BATCH{import_date.strftime('%Y%m%d')}{variant.id}{suffix}"
+                    if batch_num not in used_numbers:
+                        used_numbers.add(batch_num)
+                        break
+                else:
+                    batch_num = f"BATCH{import_date.strftime('%Y%m%d')}{variant.id}{random.randint(10000, 99999)}"
                     used_numbers.add(batch_num)
-                    break
-            else:
-                batch_num = f"BATCH{import_date.strftime('%Y%m%d')}{variant.id}{random.randint(10000, 99999)}"
-                used_numbers.add(batch_num)
-
-            MedicineBatch.objects.using(using).create(
-                batch_number=batch_num,
-                product_variant=variant,
-                import_date=import_date,
-                expiry_date=expiry_date,
-                quantity=quantity,
-                remaining_quantity=quantity,
-                import_price_per_base_unit=import_price_per_base,
-                active=True,
-            )
-            created += 1
 
-        sync_in_stock_cache(variant.id)
+                MedicineBatch.objects.using(using).create(
+                    batch_number=batch_num,
+                    product_variant=variant,
+                    import_date=import_date,
+                    expiry_date=expiry_date,
+                    quantity=quantity,
+                    remaining_quantity=quantity,
+                    import_price_per_base_unit=import_price_per_base,
+                    active=True,
+                )
+                created += 1
 
     return created
@@ -0,0 +1,60 @@
+"""
+Management command: dựng lại / kiểm tra CategoryClosure (store) từ chuỗi Category.parent.
+
+  python manage.py rebuild_category_closure
+  python manage.py rebuild_category_closure --check
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from storeApp.constants import STORE_DATABASE_ALIAS
+from storeApp.services.category_closure import (
+    DEFAULT_CHUNK_SIZE,
+    check_category_closure,
+    rebuild_category_closure,
+)
+
+SAMPLE_SIZE = 20
+
+
+class Command(BaseCommand):
+    help = 'Rebuild (or --check) the CategoryClosure table from the Category parent chain.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only compare closure rows with the parent chain; exit with an error on drift.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f'Rows per insert batch (default: {DEFAULT_CHUNK_SIZE}).',
+        )
+        parser.add_argument(
+            '--database',
+            default=STORE_DATABASE_ALIAS,
+            help=f'Database alias (default: {STORE_DATABASE_ALIAS}).',
+        )
+
+    def handle(self, *args, **options):
+        db = options['database']
+        if not options['check']:
+            result = rebuild_category_closure(using=db, chunk_size=max(1, options['chunk_size']))
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Category closure: {result['rows']} row(s) for {result['categories']} categor(y/ies)."
+                )
+            )
+            return
+
+        report = check_category_closure(using=db)
+        self.stdout.write(f"Expected rows: {report['expected']} | stored rows: {report['stored']}")
+        for label in ('missing', 'unexpected'):
+            rows = report[label]
+            self.stdout.write(f"- {label}: {len(rows)}")
+            for ancestor_id, descendant_id, depth in rows[:SAMPLE_SIZE]:
+                self.stdout.write(f"    ancestor={ancestor_id} descendant={descendant_id} depth={depth}")
+        if report['missing'] or report['unexpected']:
+            raise CommandError("Category closure drift detected; run rebuild_category_closure to repair.")
+        self.stdout.write(self.style.SUCCESS("Category closure is consistent."))
@@ -0,0 +1,71 @@
+"""
+Management command: tính lại CategoryProductCount (store) hoặc báo cáo lệch so với query live.
+
+  python manage.py rebuild_category_product_counts
+  python manage.py rebuild_category_product_counts --missing-only
+  python manage.py rebuild_category_product_counts --check [--fix]
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from storeApp.constants import STORE_DATABASE_ALIAS
+from storeApp.models import Category
+from storeApp.services.category_counts import category_count_drift, refresh_category_counts
+
+SAMPLE_SIZE = 20
+
+
+class Command(BaseCommand):
+    help = 'Rebuild CategoryProductCount rollups, or --check them against live count queries.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Report categories whose stored counts differ from live queries; exit with an error on drift.',
+        )
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='With --check: refresh only the drifted categories.',
+        )
+        parser.add_argument(
+            '--missing-only',
+            action='store_true',
+            help='Only create rows for categories that have none (safe on every deploy).',
+        )
+        parser.add_argument(
+            '--database',
+            default=STORE_DATABASE_ALIAS,
+            help=f'Database alias (default: {STORE_DATABASE_ALIAS}).',
+        )
+
+    def handle(self, *args, **options):
+        db = options['database']
+        if options['check']:
+            self._check(db, fix=options['fix'])
+            return
+
+        category_ids = None
+        if options['missing_only']:
+            category_ids = set(
+                Category.objects.using(db).filter(product_counts__isnull=True).values_list('id', flat=True)
+            )
+        written = refresh_category_counts(category_ids, using=db)
+        self.stdout.write(self.style.SUCCESS(f"Category product counts: {written} row(s) written."))
+
+    def _check(self, db, *, fix):
+        drift = category_count_drift(using=db)
+        self.stdout.write(f"Drifted categories: {len(drift)}")
+        for row in drift[:SAMPLE_SIZE]:
+            self.stdout.write(
+                f"  - category_id={row['category_id']} path={row['path_slug']} "
+                f"stored={row['stored']} live={row['live']}"
+            )
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Category product counts match live queries."))
+            return
+        if fix:
+            written = refresh_category_counts({row['category_id'] for row in drift}, using=db)
+            self.stdout.write(self.style.SUCCESS(f"Refreshed {written} drifted categor(y/ies)."))
+            return
+        raise CommandError("Category product count drift detected; run with --fix or rebuild.")
@@ -0,0 +1,46 @@
+"""
+Management command: dựng lại ProductSearchDocument (store) cho /search/ và /search/suggest/.
+
+Chạy sau migrate 0018, sau khi sửa DB tay, hoặc khi nghi ngờ document lệch với catalog.
+
+  python manage.py rebuild_search_documents
+  python manage.py rebuild_search_documents --missing-only
+"""
+from django.core.management.base import BaseCommand
+
+from storeApp.constants import STORE_DATABASE_ALIAS
+from storeApp.services.search_documents import DEFAULT_CHUNK_SIZE, rebuild_search_documents
+
+
+class Command(BaseCommand):
+    help = 'Rebuild ProductSearchDocument rows (one per ProductVariant) in the store DB.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--missing-only',
+            action='store_true',
+            help='Only create documents for variants that have none (safe on every deploy).',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f'Variants per upsert batch (default: {DEFAULT_CHUNK_SIZE}).',
+        )
+        parser.add_argument(
+            '--database',
+            default=STORE_DATABASE_ALIAS,
+            help=f'Database alias (default: {STORE_DATABASE_ALIAS}).',
+        )
+
+    def handle(self, *args, **options):
+        result = rebuild_search_documents(
+            missing_only=options['missing_only'],
+            using=options['database'],
+            chunk_size=max(1, options['chunk_size']),
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Search documents: {result['written']} written for {result['variants']} variant(s)."
+            )
+        )
@@ -0,0 +1,55 @@
+"""
+Management command: báo cáo / sửa lệch giữa ProductVariant.in_stock (counter theo delta) và tổng lô còn hạn.
+
+Counter chỉ đổi khi lô được ghi; lô hết hạn không tạo write nên cần chạy định kỳ (cron hằng ngày).
+
+  python manage.py reconcile_in_stock
+  python manage.py reconcile_in_stock --fix
+  python manage.py reconcile_in_stock --variant 123 --fix
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from storeApp.constants import STORE_DATABASE_ALIAS
+from storeApp.services.in_stock_sync import sync_in_stock_totals
+
+SAMPLE_SIZE = 20
+
+
+class Command(BaseCommand):
+    help = 'Report ProductVariant.in_stock drift against the live batch sum; --fix rewrites drifted variants.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Rewrite in_stock for drifted variants (set-based).',
+        )
+        parser.add_argument(
+            '--variant',
+            type=int,
+            action='append',
+            default=None,
+            help='Only check this product_variant id (repeatable).',
+        )
+        parser.add_argument(
+            '--database',
+            default=STORE_DATABASE_ALIAS,
+            help=f'Database alias (default: {STORE_DATABASE_ALIAS}).',
+        )
+
+    def handle(self, *args, **options):
+        db = options['database']
+        drift = sync_in_stock_totals(options['variant'], dry_run=True, using=db).drift
+        self.stdout.write(f"Drifted variants: {len(drift)}")
+        for row in drift[:SAMPLE_SIZE]:
+            self.stdout.write(
+                f"  - product_variant_id={row['variant_id']} stored={row['stored']} live={row['live']}"
+            )
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("in_stock matches batch totals."))
+            return
+        if options['fix']:
+            sync_in_stock_totals([row['variant_id'] for row in drift], only_drifted=True, using=db)
+            self.stdout.write(self.style.SUCCESS(f"Re-aggregated in_stock for {len(drift)} variant(s)."))
+            return
+        raise CommandError("in_stock drift detected; run with --fix.")
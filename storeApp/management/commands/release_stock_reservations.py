@@ -0,0 +1,26 @@
+"""
+Release expired StockReservation holds (store DB) in id batches.
+
+  python manage.py release_stock_reservations
+
+Celery beat (DatabaseScheduler): schedule `storeApp.tasks.release_expired_stock_reservations`
+every minute in Django admin → Periodic tasks. Cron works too:
+
+  * * * * * cd /path/to/Clinic-Oupharmacy-BE && ./venv/bin/python manage.py release_stock_reservations
+
+Availability already ignores expired holds; this only keeps the table small.
+"""
+from django.core.management.base import BaseCommand
+
+from storeApp.services.stock_reservations import RELEASE_BATCH_SIZE, release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = "Delete expired stock reservations (TTL holds) in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=RELEASE_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        released = release_expired_reservations(batch_size=max(1, options["batch_size"]))
+        self.stdout.write(self.style.SUCCESS(f"stock reservations released={released}"))
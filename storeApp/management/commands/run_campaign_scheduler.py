@@ -3,11 +3,13 @@ Converge Campaign statuses by wall clock (scheduled→active, *→ended).
 
   python manage.py run_campaign_scheduler
 
-Cron (example every 5 minutes):
+Cron (example every 5 minutes), or Celery beat `storeApp.tasks.run_campaign_scheduler_tick`:
 
   */5 * * * * cd /path/to/Clinic-Oupharmacy-BE && \\
     ./venv/bin/python manage.py run_campaign_scheduler >> /var/log/campaign_scheduler.log 2>&1
 
+Each tick is set-based (guarded bulk UPDATE) and writes one CampaignSchedulerRun audit row.
+
 Public list/detail/placements still filter by time window if this job is late (D-14).
 """
 
@@ -41,12 +43,16 @@ class Command(BaseCommand):
                 parsed = timezone.make_aware(parsed, timezone.get_current_timezone())
             now = parsed
 
-        stats = run_campaign_scheduler(now=now)
+        stats = run_campaign_scheduler(now=now, source="cli")
+        if stats.get("skipped"):
+            self.stdout.write(self.style.WARNING("campaign scheduler skipped: another tick is running"))
+            return
         self.stdout.write(
             self.style.SUCCESS(
                 "campaign scheduler ok "
                 f"activated={stats['activated']} ended={stats['ended']} "
                 f"scanned_activate={stats['scanned_activate']} scanned_end={stats['scanned_end']} "
+                f"conflicts={stats['conflicts']} duration_ms={stats['duration_ms']} "
                 f"now={now.isoformat()}"
             )
         )
@@ -5,6 +5,7 @@ Usage:
   python manage.py store_backfill unit-prices [--dry-run] ...
   python manage.py store_backfill medicine-unit-stats [--dry-run]
   python manage.py store_backfill brand-country [--dry-run] ...
+  python manage.py store_backfill variant-prices [--dry-run]
 """
 
 from storeApp.management.commands._command_group import build_group_command
@@ -17,12 +18,16 @@ from storeApp.management.commands.backfill.backfill_medicine_unit_stats import (
 from storeApp.management.commands.backfill.backfill_store_unit_prices import (
     Command as StoreUnitPricesCommand,
 )
+from storeApp.management.commands.backfill.backfill_variant_prices import (
+    Command as VariantPricesCommand,
+)
 
 Command = build_group_command(
-    help_text="Store backfills (unit-prices | medicine-unit-stats | brand-country).",
+    help_text="Store backfills (unit-prices | medicine-unit-stats | brand-country | variant-prices).",
     subcommands={
         "unit-prices": StoreUnitPricesCommand,
         "medicine-unit-stats": MedicineUnitStatsCommand,
         "brand-country": BrandCountryCommand,
+        "variant-prices": VariantPricesCommand,
     },
 )
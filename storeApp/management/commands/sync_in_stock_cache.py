@@ -1,16 +1,20 @@
 """
 Management command: đồng bộ ProductVariant.in_stock từ tổng remaining_quantity của MedicineBatch (store).
 
-Duyệt tất cả product_variant_id có trong MedicineBatch (store), gọi sync_in_stock_cache(variant_id).
-Có thể chạy sau khi sửa DB tay hoặc để đảm bảo cache khớp với Batches.
+Set-based (services/in_stock_sync.py): 1 aggregate GROUP BY cho mọi variant có lô, ghi theo chunk
+bằng `UPDATE ... FROM (VALUES ...)`. Có thể chạy sau khi sửa DB tay hoặc để đảm bảo cache khớp với Batches.
 
   python manage.py sync_in_stock_cache
+  python manage.py sync_in_stock_cache --only-drifted
+  python manage.py sync_in_stock_cache --dry-run
   docker compose exec backend python manage.py sync_in_stock_cache
 """
 from django.core.management.base import BaseCommand
 
-from storeApp.models import MedicineBatch
-from storeApp.services.stock import sync_in_stock_cache
+from storeApp.constants import STORE_DATABASE_ALIAS
+from storeApp.services.in_stock_sync import SYNC_CHUNK_SIZE, sync_in_stock_totals
+
+SAMPLE_SIZE = 20
 
 
 class Command(BaseCommand):
@@ -29,33 +33,54 @@ class Command(BaseCommand):
             default=None,
             help='Deprecated alias for --variant (same as product_variant id).',
         )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drifted variants without writing.',
+        )
+        parser.add_argument(
+            '--only-drifted',
+            action='store_true',
+            help='Write only variants whose in_stock differs from the batch sum.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=SYNC_CHUNK_SIZE,
+            help=f'Rows per UPDATE statement (default: {SYNC_CHUNK_SIZE}).',
+        )
+        parser.add_argument(
+            '--database',
+            default=STORE_DATABASE_ALIAS,
+            help=f'Database alias (default: {STORE_DATABASE_ALIAS}).',
+        )
 
     def handle(self, *args, **options):
         variant_id = options.get('variant')
         if variant_id is None and options.get('unit') is not None:
             variant_id = options['unit']
 
-        if variant_id is not None:
-            sync_in_stock_cache(variant_id)
-            self.stdout.write(
-                self.style.SUCCESS(f'Synced in_stock cache for product_variant_id={variant_id}')
-            )
-            return
-
-        variant_ids = list(
-            MedicineBatch.objects.using('store')
-            .exclude(product_variant_id__isnull=True)
-            .values_list('product_variant_id', flat=True)
-            .distinct()
+        result = sync_in_stock_totals(
+            None if variant_id is None else [variant_id],
+            only_drifted=options['only_drifted'],
+            dry_run=options['dry_run'],
+            chunk_size=max(1, options['chunk_size']),
+            using=options['database'],
         )
-        if not variant_ids:
+        if not result.checked:
             self.stdout.write(
                 self.style.WARNING('No product_variant_id found in MedicineBatch (store).')
             )
             return
 
-        for vid in variant_ids:
-            sync_in_stock_cache(vid)
+        for row in result.drift[:SAMPLE_SIZE]:
+            self.stdout.write(
+                f"  - product_variant_id={row['variant_id']} stored={row['stored']} live={row['live']}"
+            )
+        prefix = '[DRY-RUN] ' if result.dry_run else ''
         self.stdout.write(
-            self.style.SUCCESS(f'Synced in_stock cache for {len(variant_ids)} product variant(s).')
+            self.style.SUCCESS(
+                f'{prefix}Synced in_stock cache: checked={result.checked} drifted={result.drifted} '
+                f'written={result.written} in {result.elapsed_ms:.1f} ms ({result.rows_per_second} rows/s).'
+            )
         )
@@ -33,6 +33,9 @@ from storeApp.models import (
     ProductVariantUnit as StoreProductVariantUnit,
     ProductVariantStats as StoreProductVariantStats,
 )
+from storeApp.services.category_closure import rebuild_category_closure
+from storeApp.services.category_counts import defer_category_count_refresh, refresh_category_counts
+from storeApp.services.store_path_routes import store_path_router
 
 logger = logging.getLogger(__name__)
 
@@ -74,7 +77,7 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING("--- DRY-RUN MODE: mọi thay đổi sẽ bị rollback ---"))
 
         try:
-            with transaction.atomic(using="store"):
+            with transaction.atomic(using="store"), defer_category_count_refresh(using="store"):
                 # --- Optional clear (không xóa Brand vì không được quản lý ở đây) ---
                 if clear_data:
                     self._clear_store_data()
@@ -88,6 +91,8 @@ class Command(BaseCommand):
                 self.sync_variants()
                 self.sync_variant_units()
                 self.sync_stats()
+                # bulk ops bypass signals → rollup tính lại toàn bộ.
+                refresh_category_counts(using="store")
 
                 if dry_run:
                     self.stdout.write(self.style.WARNING("--- DRY-RUN COMPLETE: rolling back ---"))
@@ -183,6 +188,10 @@ class Command(BaseCommand):
             StoreCategory.objects.using("store").bulk_create(chunk, ignore_conflicts=False)
         for chunk in self._chunked(to_update, BATCH_SIZE):
             StoreCategory.objects.using("store").bulk_update(chunk, update_fields)
+        if to_create or to_update:
+            # bulk ops bypass Category.save → closure maintenance, routing table bump.
+            rebuild_category_closure(using="store")
+            store_path_router.bump()
 
         self._log("Categories", len(to_create), len(to_update))
 
@@ -249,6 +258,8 @@ class Command(BaseCommand):
             StoreProduct.objects.using("store").bulk_create(chunk, ignore_conflicts=False)
         for chunk in self._chunked(to_update, BATCH_SIZE):
             StoreProduct.objects.using("store").bulk_update(chunk, update_fields)
+        if to_create or to_update:
+            store_path_router.bump()
 
         self._log("Products", len(to_create), len(to_update))
 
@@ -382,6 +393,9 @@ class Command(BaseCommand):
             StoreProductVariantUnit.objects.using("store").bulk_create(chunk, ignore_conflicts=False)
         for chunk in self._chunked(to_update, BATCH_SIZE):
             StoreProductVariantUnit.objects.using("store").bulk_update(chunk, update_fields)
+        StoreProductVariant.sync_price_columns(
+            {unit.variant_id for unit in to_create} | {unit.variant_id for unit in to_update}, using="store"
+        )
 
         self._log("ProductVariantUnits", len(to_create), len(to_update))
 
@@ -0,0 +1,84 @@
+# Generated manually: denormalized search documents + PostgreSQL GIN indexes.
+
+import django.db.models.deletion
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+import storeApp.models.search
+
+
+GIN_INDEXES = (
+    ("store_psd_search_trgm_gin", "search_text gin_trgm_ops"),
+    ("store_psd_search_vector_gin", "search_vector"),
+)
+
+
+def create_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, expression in GIN_INDEXES:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON store_product_search_document USING gin ({expression})"
+        )
+
+
+def drop_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _ in GIN_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("storeApp", "0017_campaign_placement_slot_taxonomy_p9"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name="ProductSearchDocument",
+            fields=[
+                (
+                    "variant",
+                    models.OneToOneField(
+                        db_column="product_variant_id",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_document",
+                        serialize=False,
+                        to="storeApp.productvariant",
+                    ),
+                ),
+                ("sku_text", models.TextField(blank=True, default="")),
+                ("mid_text", models.TextField(blank=True, default="")),
+                ("name_text", models.TextField(blank=True, default="")),
+                ("web_name_text", models.TextField(blank=True, default="")),
+                ("category_text", models.TextField(blank=True, default="")),
+                ("brand_text", models.TextField(blank=True, default="")),
+                ("ingredients_text", models.TextField(blank=True, default="")),
+                ("search_text", models.TextField(blank=True, default="")),
+                (
+                    "search_vector",
+                    storeApp.models.search.PortableSearchVectorField(blank=True, null=True),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        db_column="product_id",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_documents",
+                        to="storeApp.product",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Product search document",
+                "verbose_name_plural": "Product search documents",
+                "db_table": "store_product_search_document",
+            },
+        ),
+        migrations.RunPython(create_gin_indexes, drop_gin_indexes),
+    ]
@@ -0,0 +1,65 @@
+# Generated manually: denormalized default/min unit price on ProductVariant.
+
+from django.db import migrations, models
+from django.db.models import Min, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_price_columns(apps, schema_editor):
+    ProductVariant = apps.get_model("storeApp", "ProductVariant")
+    ProductVariantUnit = apps.get_model("storeApp", "ProductVariantUnit")
+    db = schema_editor.connection.alias
+    price_field = models.DecimalField(max_digits=12, decimal_places=2)
+    published_units = ProductVariantUnit.objects.using(db).filter(variant_id=OuterRef("pk"), is_published=True)
+    default_unit = published_units.order_by("-is_default", "unit_order", "id")
+    ProductVariant.objects.using(db).update(
+        default_unit_price=Coalesce(
+            Subquery(default_unit.values("price_value")[:1], output_field=price_field),
+            Value(0),
+            output_field=price_field,
+        ),
+        default_compare_at_price=Subquery(default_unit.values("compare_at_price")[:1], output_field=price_field),
+        min_unit_price=Subquery(
+            published_units.order_by().values("variant_id").annotate(p=Min("price_value")).values("p")[:1],
+            output_field=price_field,
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("storeApp", "0018_product_search_document"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="productvariant",
+            name="default_unit_price",
+            field=models.DecimalField(
+                db_index=True,
+                decimal_places=2,
+                default=0,
+                help_text="Giá unit mặc định published (fallback: unit published đầu tiên), 0 nếu không có",
+                max_digits=12,
+            ),
+        ),
+        migrations.AddField(
+            model_name="productvariant",
+            name="default_compare_at_price",
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name="productvariant",
+            name="min_unit_price",
+            field=models.DecimalField(
+                blank=True,
+                db_index=True,
+                decimal_places=2,
+                help_text="Giá thấp nhất trong các unit published",
+                max_digits=12,
+                null=True,
+            ),
+        ),
+        migrations.RunPython(backfill_price_columns, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated manually: CategoryClosure (ancestor, descendant, depth) for the store category tree.
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_closure(apps, schema_editor):
+    Category = apps.get_model("storeApp", "Category")
+    CategoryClosure = apps.get_model("storeApp", "CategoryClosure")
+    db = schema_editor.connection.alias
+    parent_by_id = dict(Category.objects.using(db).values_list("id", "parent_id"))
+    rows = []
+    for category_id in parent_by_id:
+        seen = set()
+        current, depth = category_id, 0
+        while current is not None and current not in seen and current in parent_by_id:
+            seen.add(current)
+            rows.append(CategoryClosure(ancestor_id=current, descendant_id=category_id, depth=depth))
+            current = parent_by_id[current]
+            depth += 1
+    CategoryClosure.objects.using(db).bulk_create(rows, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("storeApp", "0019_productvariant_price_columns"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CategoryClosure",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("depth", models.PositiveSmallIntegerField(default=0)),
+                (
+                    "ancestor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="descendant_links",
+                        to="storeApp.category",
+                    ),
+                ),
+                (
+                    "descendant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ancestor_links",
+                        to="storeApp.category",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "store_category_closure",
+                "indexes": [models.Index(fields=["descendant", "depth"], name="store_catclosure_desc_idx")],
+                "unique_together": {("ancestor", "descendant")},
+            },
+        ),
+        migrations.RunPython(populate_closure, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated manually: CategoryProductCount rollup (filled by rebuild_category_product_counts).
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("storeApp", "0020_category_closure"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CategoryProductCount",
+            fields=[
+                (
+                    "category",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="product_counts",
+                        serialize=False,
+                        to="storeApp.category",
+                    ),
+                ),
+                ("direct_count", models.PositiveIntegerField(default=0)),
+                ("direct_published_count", models.PositiveIntegerField(default=0)),
+                ("subtree_count", models.PositiveIntegerField(default=0)),
+                ("subtree_published_count", models.PositiveIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "db_table": "store_category_product_count",
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated manually: lower(slug) functional indexes for store path routing misses.
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("storeApp", "0021_category_product_count"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="category",
+            index=models.Index(django.db.models.functions.text.Lower("path_slug"), name="store_cat_pathslug_lower_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="category",
+            index=models.Index(django.db.models.functions.text.Lower("slug"), name="store_cat_slug_lower_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(django.db.models.functions.text.Lower("slug"), name="store_product_slug_lower_idx"),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated manually: FIFO allocation ledger (order item -> batch -> quantity) for exact restores.
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("storeApp", "0022_store_path_lower_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderItemBatchAllocation",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "quantity",
+                    models.PositiveIntegerField(
+                        db_column="quantity", validators=[django.core.validators.MinValueValidator(1)]
+                    ),
+                ),
+                ("created_date", models.DateTimeField(auto_now_add=True)),
+                (
+                    "batch",
+                    models.ForeignKey(
+                        db_column="batch_id",
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="allocations",
+                        to="storeApp.medicinebatch",
+                    ),
+                ),
+                (
+                    "order_item",
+                    models.ForeignKey(
+                        db_column="order_item_id",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="batch_allocations",
+                        to="storeApp.orderitem",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Order Item Batch Allocation",
+                "verbose_name_plural": "Order Item Batch Allocations",
+                "db_table": "store_order_item_batch_allocation",
+            },
+        ),
+    ]
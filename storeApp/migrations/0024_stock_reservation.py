@@ -0,0 +1,54 @@
+# Generated manually: TTL stock holds for carts entering checkout.
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("storeApp", "0023_order_item_batch_allocation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockReservation",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("quantity", models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1)])),
+                ("expires_at", models.DateTimeField()),
+                ("created_date", models.DateTimeField(auto_now_add=True)),
+                (
+                    "cart",
+                    models.ForeignKey(
+                        db_column="cart_id",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stock_reservations",
+                        to="storeApp.cart",
+                    ),
+                ),
+                (
+                    "product_variant",
+                    models.ForeignKey(
+                        db_column="product_variant_id",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="reservations",
+                        to="storeApp.productvariant",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "store_stock_reservation",
+                "indexes": [
+                    models.Index(fields=["product_variant", "expires_at"], name="store_stock_product_ca98ab_idx"),
+                    models.Index(fields=["expires_at"], name="store_stock_expires_2243b5_idx"),
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("cart", "product_variant"), name="store_stock_reservation_cart_variant"
+                    )
+                ],
+            },
+        ),
+    ]
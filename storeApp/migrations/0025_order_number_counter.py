@@ -0,0 +1,23 @@
+# Generated manually: per-day order number counter (non-PostgreSQL backends use it instead of sequences).
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("storeApp", "0024_stock_reservation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderNumberCounter",
+            fields=[
+                ("day", models.DateField(primary_key=True, serialize=False)),
+                ("last_value", models.BigIntegerField(default=0)),
+            ],
+            options={
+                "db_table": "store_order_number_counter",
+            },
+        ),
+    ]
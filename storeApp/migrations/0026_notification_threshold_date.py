@@ -0,0 +1,38 @@
+# Generated manually: de-duplication key for generated stock notifications.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("storeApp", "0025_order_number_counter"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="threshold_date",
+            field=models.DateField(
+                blank=True,
+                db_column="threshold_date",
+                help_text="Khóa chống trùng: HSD của lô (EXPIRY_* / EXPIRED) hoặc ngày quét (LOW_STOCK)",
+                null=True,
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="notification",
+            constraint=models.UniqueConstraint(
+                fields=("notification_type", "batch", "threshold_date"),
+                name="store_notification_batch_threshold_uniq",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="notification",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("batch__isnull", True)),
+                fields=("notification_type", "product_variant", "threshold_date"),
+                name="store_notification_variant_threshold_uniq",
+            ),
+        ),
+    ]
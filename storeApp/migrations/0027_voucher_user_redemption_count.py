@@ -0,0 +1,60 @@
+# Generated manually: per-user voucher redemption rollup, backfilled from store_voucher_redemption.
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_counts(apps, schema_editor):
+    VoucherRedemption = apps.get_model("storeApp", "VoucherRedemption")
+    VoucherUserRedemptionCount = apps.get_model("storeApp", "VoucherUserRedemptionCount")
+    db = schema_editor.connection.alias
+    rows = (
+        VoucherRedemption.objects.using(db)
+        .order_by()
+        .values("voucher_id", "user_id")
+        .annotate(total=models.Count("id"))
+    )
+    VoucherUserRedemptionCount.objects.using(db).bulk_create(
+        [
+            VoucherUserRedemptionCount(voucher_id=row["voucher_id"], user_id=row["user_id"], redeem_count=row["total"])
+            for row in rows.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("storeApp", "0026_notification_threshold_date"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VoucherUserRedemptionCount",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("user_id", models.BigIntegerField(db_column="user_id")),
+                ("redeem_count", models.PositiveIntegerField(default=0)),
+                (
+                    "voucher",
+                    models.ForeignKey(
+                        db_column="voucher_id",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="user_redemption_counts",
+                        to="storeApp.voucher",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Voucher User Redemption Count",
+                "verbose_name_plural": "Voucher User Redemption Counts",
+                "db_table": "store_voucher_user_redemption_count",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="voucheruserredemptioncount",
+            constraint=models.UniqueConstraint(fields=("voucher", "user_id"), name="store_voucher_user_redeem_uniq"),
+        ),
+        migrations.RunPython(backfill_counts, migrations.RunPython.noop),
+    ]
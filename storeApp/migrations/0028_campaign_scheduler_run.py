@@ -0,0 +1,33 @@
+# Generated manually: per-tick audit rows for the set-based campaign scheduler.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("storeApp", "0027_voucher_user_redemption_count"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CampaignSchedulerRun",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("tick_at", models.DateTimeField(db_column="tick_at")),
+                ("started_at", models.DateTimeField(db_column="started_at")),
+                ("duration_ms", models.FloatField(db_column="duration_ms", default=0)),
+                ("activated", models.PositiveIntegerField(db_column="activated", default=0)),
+                ("ended", models.PositiveIntegerField(db_column="ended", default=0)),
+                ("scanned_activate", models.PositiveIntegerField(db_column="scanned_activate", default=0)),
+                ("scanned_end", models.PositiveIntegerField(db_column="scanned_end", default=0)),
+                ("conflicts", models.PositiveIntegerField(db_column="conflicts", default=0)),
+                ("source", models.CharField(db_column="source", default="cli", max_length=20)),
+            ],
+            options={
+                "db_table": "store_campaign_scheduler_run",
+                "ordering": ["-started_at", "-id"],
+                "indexes": [models.Index(fields=["-started_at"], name="campaign_sched_run_idx")],
+            },
+        ),
+    ]
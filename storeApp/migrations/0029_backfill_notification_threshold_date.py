@@ -0,0 +1,43 @@
+# Generated manually: key notifications written before 0026 so the set-based generator skips them.
+
+from django.db import migrations, models
+
+EXPIRY_TYPES = ("EXPIRY_WARNING", "EXPIRY_URGENT", "EXPIRED")
+UPDATE_BATCH_SIZE = 1000
+
+
+def backfill_threshold_dates(apps, schema_editor):
+    """threshold_date = batch expiry on one legacy row per (type, batch); older duplicates stay NULL."""
+    Notification = apps.get_model("storeApp", "Notification")
+    MedicineBatch = apps.get_model("storeApp", "MedicineBatch")
+    db = schema_editor.connection.alias
+    keyed = Notification.objects.using(db).filter(
+        notification_type=models.OuterRef("notification_type"),
+        batch_id=models.OuterRef("batch_id"),
+        threshold_date__isnull=False,
+    )
+    keep_ids = list(
+        Notification.objects.using(db)
+        .filter(notification_type__in=EXPIRY_TYPES, batch__isnull=False, threshold_date__isnull=True)
+        .filter(~models.Exists(keyed))
+        .order_by()
+        .values("notification_type", "batch_id")
+        .annotate(keep=models.Max("id"))
+        .values_list("keep", flat=True)
+    )
+    expiry = MedicineBatch.objects.using(db).filter(pk=models.OuterRef("batch_id")).values("expiry_date")[:1]
+    for start in range(0, len(keep_ids), UPDATE_BATCH_SIZE):
+        Notification.objects.using(db).filter(id__in=keep_ids[start : start + UPDATE_BATCH_SIZE]).update(
+            threshold_date=models.Subquery(expiry)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("storeApp", "0028_campaign_scheduler_run"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_threshold_dates, migrations.RunPython.noop),
+    ]
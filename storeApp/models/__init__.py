@@ -3,4 +3,5 @@ from .cart import *  # noqa: F401,F403
 from .catalog_attributes import *  # noqa: F401,F403
 from .order import *  # noqa: F401,F403
 from .product import *  # noqa: F401,F403
+from .search import *  # noqa: F401,F403
 from .voucher import *  # noqa: F401,F403
@@ -231,3 +231,27 @@ class CampaignVoucher(BaseModel):
 
     def __str__(self):
         return f"{self.campaign_id}:voucher:{self.voucher_id}"
+
+
+class CampaignSchedulerRun(models.Model):
+    """Audit one campaign scheduler tick (services/campaign_service.run_campaign_scheduler)."""
+
+    tick_at = models.DateTimeField(db_column="tick_at")
+    started_at = models.DateTimeField(db_column="started_at")
+    duration_ms = models.FloatField(default=0, db_column="duration_ms")
+    activated = models.PositiveIntegerField(default=0, db_column="activated")
+    ended = models.PositiveIntegerField(default=0, db_column="ended")
+    scanned_activate = models.PositiveIntegerField(default=0, db_column="scanned_activate")
+    scanned_end = models.PositiveIntegerField(default=0, db_column="scanned_end")
+    conflicts = models.PositiveIntegerField(default=0, db_column="conflicts")
+    source = models.CharField(max_length=20, default="cli", db_column="source")
+
+    class Meta:
+        db_table = "store_campaign_scheduler_run"
+        ordering = ["-started_at", "-id"]
+        indexes = [
+            models.Index(fields=["-started_at"], name="campaign_sched_run_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.tick_at:%Y-%m-%d %H:%M:%S} +{self.activated} -{self.ended}"
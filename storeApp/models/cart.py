@@ -122,3 +122,36 @@ class CartItem(BaseModel):
                 name="store_cart_item_unique_variant_unit",
             )
         ]
+
+
+class StockReservation(models.Model):
+    """
+    Hold stock (base units) for a cart while it checks out; expires at `expires_at`.
+
+    Availability (services/stock.py) subtracts live holds of other carts; checkout converts the
+    cart's holds into the batch deduction; `release_stock_reservations` sweeps expired rows.
+    """
+
+    product_variant = models.ForeignKey(
+        "ProductVariant",
+        on_delete=models.CASCADE,
+        related_name="reservations",
+        db_column="product_variant_id",
+    )
+    cart = models.ForeignKey("Cart", on_delete=models.CASCADE, related_name="stock_reservations", db_column="cart_id")
+    quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    expires_at = models.DateTimeField()
+    created_date = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "store_stock_reservation"
+        indexes = [
+            models.Index(fields=["product_variant", "expires_at"]),
+            models.Index(fields=["expires_at"]),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["cart", "product_variant"], name="store_stock_reservation_cart_variant"),
+        ]
+
+    def __str__(self):
+        return f"Cart {self.cart_id} holds {self.quantity} of variant {self.product_variant_id} until {self.expires_at}"
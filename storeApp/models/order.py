@@ -170,28 +170,26 @@ class Order(BaseModel):
         if self.order_number:
             return super().save(*args, **kwargs)
 
+        from storeApp.services.order_numbers import order_number_allocator
+
+        using = kwargs.get("using") or self._state.db or "store"
         for attempt in range(5):
-            self.order_number = self.generate_order_number()
+            self.order_number = order_number_allocator.allocate(using=using)
             try:
                 return super().save(*args, **kwargs)
             except IntegrityError as exc:
+                # Allocator numbers are unique; a clash means a hand-entered number took the slot.
                 if "order_number" in str(exc) and attempt < 4:
+                    order_number_allocator.retries += 1
                     continue
                 raise
 
     @staticmethod
     def generate_order_number():
-        from django.utils import timezone as tz
-
-        today = tz.localtime(tz.now())
-        date_str = today.strftime("%Y%m%d")
-        last_order = Order.objects.filter(order_number__startswith=f"ORD{date_str}").order_by("-order_number").first()
-        if last_order:
-            last_num = int(last_order.order_number[-4:])
-            new_num = last_num + 1
-        else:
-            new_num = 1
-        return f"ORD{date_str}{new_num:04d}"
+        """ORD{YYYYMMDD}{NNNN} from services/order_numbers.py (per-day sequence / counter row)."""
+        from storeApp.services.order_numbers import order_number_allocator
+
+        return order_number_allocator.allocate()
 
     def __str__(self):
         return f"Đơn hàng {self.order_number} - {self.get_status_display()}"
@@ -203,6 +201,19 @@ class Order(BaseModel):
         ordering = ["-created_date"]
 
 
+class OrderNumberCounter(models.Model):
+    """Bộ đếm số đơn theo ngày (backend không phải PostgreSQL); xem services/order_numbers.py."""
+
+    day = models.DateField(primary_key=True)
+    last_value = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = "store_order_number_counter"
+
+    def __str__(self):
+        return f"{self.day}: {self.last_value}"
+
+
 class OrderItem(BaseModel):
     """Chi tiết đơn hàng"""
 
@@ -246,3 +257,33 @@ class OrderItem(BaseModel):
         verbose_name = "Order Item"
         verbose_name_plural = "Order Items"
         ordering = ["created_date"]
+
+
+class OrderItemBatchAllocation(models.Model):
+    """
+    Sổ phân bổ tồn kho: dòng đơn → lô → số lượng (đơn vị cơ sở) đã trừ lúc checkout.
+    Ghi bởi services/stock.py::deduct_stock_bulk; hủy đơn hoàn đúng về các lô này (restore_order_stock).
+    """
+
+    order_item = models.ForeignKey(
+        OrderItem,
+        on_delete=models.CASCADE,
+        related_name="batch_allocations",
+        db_column="order_item_id",
+    )
+    batch = models.ForeignKey(
+        "MedicineBatch",
+        on_delete=models.PROTECT,
+        related_name="allocations",
+        db_column="batch_id",
+    )
+    quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)], db_column="quantity")
+    created_date = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"OrderItem {self.order_item_id} ← Batch {self.batch_id} x{self.quantity}"
+
+    class Meta:
+        db_table = "store_order_item_batch_allocation"
+        verbose_name = "Order Item Batch Allocation"
+        verbose_name_plural = "Order Item Batch Allocations"
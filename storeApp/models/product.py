@@ -3,8 +3,9 @@ from typing import Optional
 
 from cloudinary.models import CloudinaryField
 from django.core.validators import MinValueValidator
-from django.db import IntegrityError, models, transaction
-from django.db.models import F
+from django.db import IntegrityError, models, router, transaction
+from django.db.models import Case, F, Min, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Concat, Lower, Substr
 from django.utils import timezone
 
 from mainApp.models import BaseModel
@@ -77,6 +78,19 @@ class MedicineBatch(BaseModel):
         validators=[MinValueValidator(0)],
     )
 
+    STOCK_FIELDS = ("product_variant_id", "active", "remaining_quantity", "expiry_date")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Stock fields as loaded: the in_stock signal diffs against them instead of re-reading the row.
+        if not instance.get_deferred_fields().intersection(cls.STOCK_FIELDS):
+            instance._loaded_stock = instance.stock_state()
+        return instance
+
+    def stock_state(self):
+        return tuple(getattr(self, name) for name in self.STOCK_FIELDS)
+
     def __str__(self):
         return f"Batch {self.batch_number} - Exp: {self.expiry_date}"
 
@@ -147,6 +161,12 @@ class Notification(BaseModel):
     message = models.TextField(null=False, blank=False, db_column="message")
     is_read = models.BooleanField(default=False, db_column="is_read")
     read_at = models.DateTimeField(null=True, blank=True, db_column="read_at")
+    threshold_date = models.DateField(
+        null=True,
+        blank=True,
+        db_column="threshold_date",
+        help_text="Khóa chống trùng: HSD của lô (EXPIRY_* / EXPIRED) hoặc ngày quét (LOW_STOCK)",
+    )
 
     def mark_as_read(self):
         if not self.is_read:
@@ -166,6 +186,17 @@ class Notification(BaseModel):
             models.Index(fields=["is_read", "-created_date"]),
             models.Index(fields=["product_variant", "notification_type"]),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["notification_type", "batch", "threshold_date"],
+                name="store_notification_batch_threshold_uniq",
+            ),
+            models.UniqueConstraint(
+                fields=["notification_type", "product_variant", "threshold_date"],
+                condition=models.Q(batch__isnull=True),
+                name="store_notification_variant_threshold_uniq",
+            ),
+        ]
 
 
 class SearchKeyword(BaseModel):
@@ -272,17 +303,15 @@ class Category(BaseModel):
         return self.slug
 
     def save(self, *args, **kwargs):
-        old_path_slug = None
-        hierarchy_changed = False
+        using = kwargs.get("using") or self._state.db or router.db_for_write(Category, instance=self)
+        previous = None
         if self.pk:
-            previous = Category.objects.filter(pk=self.pk).values("name", "slug", "parent_id", "path_slug").first()
-            if previous:
-                old_path_slug = previous["path_slug"]
-                hierarchy_changed = (
-                    previous["name"] != self.name
-                    or previous["slug"] != self.slug
-                    or previous["parent_id"] != self.parent_id
-                )
+            previous = (
+                Category.objects.using(using)
+                .filter(pk=self.pk)
+                .values("name", "slug", "parent_id", "path", "path_slug", "level")
+                .first()
+            )
 
         self._generate_slug_from_name()
         if self.parent:
@@ -293,31 +322,58 @@ class Category(BaseModel):
             self.level = 0
             self.path = self.name
             self.path_slug = self.slug
-        super().save(*args, **kwargs)
 
-        if hierarchy_changed and old_path_slug and old_path_slug != self.path_slug:
-            self._refresh_descendant_paths(old_path_slug)
+        rewritten = None
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+            if previous is None:
+                CategoryClosure.link_node(self, using=using)
+            elif previous["parent_id"] != self.parent_id:
+                CategoryClosure.move_subtree(self, using=using)
+
+            if previous and previous["path_slug"] and (
+                previous["path_slug"] != self.path_slug or previous["path"] != self.path
+            ):
+                rewritten = self._refresh_descendant_paths(previous, using=using)
+
+        if rewritten is not None:
+            from storeApp.signals.category_tree import category_tree_changed
+
+            category_tree_changed.send(
+                sender=Category,
+                category=self,
+                old_path_slug=previous["path_slug"],
+                descendants=rewritten,
+                using=using,
+            )
+
+    def _refresh_descendant_paths(self, previous, *, using=None) -> int:
+        """
+        Rewrite path / path_slug / level of the whole subtree in one UPDATE.
 
-    def _refresh_descendant_paths(self, old_path_slug):
-        prefix = f"{old_path_slug}/"
-        descendants = (
-            Category.objects.select_related("parent")
-            .filter(path_slug__startswith=prefix)
+        Descendants are selected by the old path_slug prefix and get that prefix swapped for
+        the new one (same for path when it starts with the old display path). Returns rows updated.
+        """
+        slug_prefix = f"{previous['path_slug']}/"
+        updates = {
+            "path_slug": Concat(Value(f"{self.path_slug}/"), Substr("path_slug", len(slug_prefix) + 1)),
+            "level": F("level") + (self.level - (previous["level"] or 0)),
+        }
+        if previous["path"]:
+            path_prefix = f"{previous['path']} > "
+            updates["path"] = Case(
+                When(
+                    path__startswith=path_prefix,
+                    then=Concat(Value(f"{self.path} > "), Substr("path", len(path_prefix) + 1)),
+                ),
+                default=F("path"),
+            )
+        return (
+            Category.objects.using(using)
+            .filter(path_slug__startswith=slug_prefix)
             .exclude(pk=self.pk)
-            .order_by("level", "id")
+            .update(**updates)
         )
-        for node in descendants:
-            parent = node.parent
-            if not parent:
-                continue
-            new_level = parent.level + 1
-            new_path = f"{parent.path} > {node.name}" if parent.path else f"{parent.name} > {node.name}"
-            new_path_slug = f"{parent.path_slug}/{node.slug}" if parent.path_slug else node.slug
-            Category.objects.filter(pk=node.pk).update(
-                level=new_level,
-                path=new_path,
-                path_slug=new_path_slug,
-            )
 
     def get_category_array(self):
         current = self
@@ -368,9 +424,116 @@ class Category(BaseModel):
             models.Index(fields=["slug"]),
             models.Index(fields=["parent", "level"]),
             models.Index(fields=["path_slug"]),
+            models.Index(Lower("path_slug"), name="store_cat_pathslug_lower_idx"),
+            models.Index(Lower("slug"), name="store_cat_slug_lower_idx"),
         ]
 
 
+class CategoryClosure(models.Model):
+    """
+    Closure table của cây Category: một dòng (ancestor, descendant, depth) cho mỗi cặp tổ tiên–con cháu,
+    kể cả chính nó (depth=0). Descendants của một category = một lookup theo ancestor.
+
+    Duy trì trong Category.save() (tạo mới / đổi parent); xóa theo CASCADE.
+    Dựng lại / kiểm tra: `python manage.py rebuild_category_closure [--check]`.
+    """
+
+    ancestor = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="descendant_links")
+    descendant = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="ancestor_links")
+    depth = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        db_table = "store_category_closure"
+        unique_together = [("ancestor", "descendant")]
+        indexes = [
+            models.Index(fields=["descendant", "depth"], name="store_catclosure_desc_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
+
+    @classmethod
+    def _ancestor_depths(cls, category_id, *, using=None) -> list[tuple[int, int]]:
+        """(ancestor_id, depth) of category_id incl. itself; walks parent_id if its rows are missing."""
+        rows = list(
+            cls.objects.using(using).filter(descendant_id=category_id).values_list("ancestor_id", "depth")
+        )
+        if rows:
+            return rows
+        chain, seen, current = [], set(), category_id
+        while current and current not in seen:
+            seen.add(current)
+            chain.append((current, len(chain)))
+            current = Category.objects.using(using).filter(pk=current).values_list("parent_id", flat=True).first()
+        return chain
+
+    @classmethod
+    def link_node(cls, category, *, using=None) -> None:
+        """Rows for a newly created (leaf) category: itself + every ancestor of its parent."""
+        rows = [cls(ancestor_id=category.pk, descendant_id=category.pk, depth=0)]
+        if category.parent_id:
+            rows.extend(
+                cls(ancestor_id=ancestor_id, descendant_id=category.pk, depth=depth + 1)
+                for ancestor_id, depth in cls._ancestor_depths(category.parent_id, using=using)
+            )
+        cls.objects.using(using).bulk_create(rows, ignore_conflicts=True)
+
+    @classmethod
+    def move_subtree(cls, category, *, using=None) -> None:
+        """Re-hang the subtree of `category` under its current parent (3 statements)."""
+        subtree = list(
+            cls.objects.using(using).filter(ancestor_id=category.pk).values_list("descendant_id", "depth")
+        ) or [(category.pk, 0)]
+        subtree_ids = [descendant_id for descendant_id, _ in subtree]
+        new_ancestors = (
+            cls._ancestor_depths(category.parent_id, using=using) if category.parent_id else []
+        )
+        if any(ancestor_id in subtree_ids for ancestor_id, _ in new_ancestors):
+            raise ValueError("Category cannot be moved under itself or one of its descendants.")
+
+        cls.objects.using(using).filter(descendant_id__in=subtree_ids).exclude(
+            ancestor_id__in=subtree_ids
+        ).delete()
+        rows = [cls(ancestor_id=category.pk, descendant_id=category.pk, depth=0)]
+        rows.extend(
+            cls(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=ancestor_depth + 1 + depth)
+            for ancestor_id, ancestor_depth in new_ancestors
+            for descendant_id, depth in subtree
+        )
+        cls.objects.using(using).bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+class CategoryProductCount(models.Model):
+    """
+    Rollup số product theo category (distinct product_id, M2M + FK primary).
+
+    - direct_*: product gắn trực tiếp vào category; subtree_*: category + descendants active (closure).
+    - *_published_count: product active có ít nhất một variant active + published (= productCount UI).
+    Refresh theo signal (services/category_counts.py); full rebuild / drift report:
+    `python manage.py rebuild_category_product_counts [--check]`.
+    """
+
+    category = models.OneToOneField(
+        Category,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="product_counts",
+    )
+    direct_count = models.PositiveIntegerField(default=0)
+    direct_published_count = models.PositiveIntegerField(default=0)
+    subtree_count = models.PositiveIntegerField(default=0)
+    subtree_published_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    COUNT_FIELDS = ("direct_count", "direct_published_count", "subtree_count", "subtree_published_count")
+
+    class Meta:
+        db_table = "store_category_product_count"
+
+    def __str__(self):
+        return f"{self.category_id}: {self.subtree_published_count}/{self.subtree_count}"
+
+
 class Product(BaseModel):
     """Product model (migrated from Medicine)."""
 
@@ -471,6 +634,7 @@ class Product(BaseModel):
             models.Index(fields=["mid"]),
             models.Index(fields=["slug"]),
             models.Index(fields=["name"]),
+            models.Index(Lower("slug"), name="store_product_slug_lower_idx"),
         ]
 
 
@@ -544,10 +708,85 @@ class ProductVariant(BaseModel):
     product_ranking = models.IntegerField(default=0, db_index=True)
     is_published = models.BooleanField(default=True, db_index=True)
     is_hot = models.BooleanField(default=False, db_index=True)
+    # Cache từ ProductVariantUnit (sync_price_columns) — listing sort / price filter / facets.
+    default_unit_price = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        db_index=True,
+        help_text="Giá unit mặc định published (fallback: unit published đầu tiên), 0 nếu không có",
+    )
+    default_compare_at_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    min_unit_price = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text="Giá thấp nhất trong các unit published",
+    )
+
+    PRICE_COLUMNS = ("default_unit_price", "default_compare_at_price", "min_unit_price")
 
     def __str__(self):
         return f"{self.product.name} - {self.packing}"
 
+    @staticmethod
+    def price_column_expressions(using=None) -> dict:
+        """Subqueries that compute the price cache columns from published units (OuterRef pk)."""
+        published_units = ProductVariantUnit.objects.using(using).filter(variant_id=OuterRef("pk"), is_published=True)
+        default_unit = published_units.order_by("-is_default", "unit_order", "id")
+        price_field = models.DecimalField(max_digits=12, decimal_places=2)
+        return {
+            "default_unit_price": Coalesce(
+                Subquery(default_unit.values("price_value")[:1], output_field=price_field),
+                Value(0),
+                output_field=price_field,
+            ),
+            "default_compare_at_price": Subquery(
+                default_unit.values("compare_at_price")[:1], output_field=price_field
+            ),
+            "min_unit_price": Subquery(
+                published_units.order_by().values("variant_id").annotate(p=Min("price_value")).values("p")[:1],
+                output_field=price_field,
+            ),
+        }
+
+    @classmethod
+    def sync_price_columns(cls, variant_ids=None, using=None) -> int:
+        """
+        Recompute price cache columns with one UPDATE (all variants when variant_ids is None).
+
+        Gọi từ signal ProductVariantUnit post_save/post_delete (signals/variant_prices.py)
+        và các luồng bulk (import, backfill).
+        """
+        queryset = cls.objects.using(using)
+        if variant_ids is not None:
+            variant_ids = [vid for vid in set(variant_ids) if vid]
+            if not variant_ids:
+                return 0
+            queryset = queryset.filter(id__in=variant_ids)
+        updated = queryset.update(**cls.price_column_expressions(using=using))
+        # Queryset UPDATE sends no signals: tell the search facet index which prices moved.
+        from storeApp.services.facet_index import facet_index
+
+        if variant_ids is None:
+            facet_index.invalidate()
+        else:
+            facet_index.variants_changed(variant_ids, using=using)
+        return updated
+
+    def save(self, *args, **kwargs):
+        if not (self._state.adding or args or kwargs.get("force_insert")) and kwargs.get("update_fields") is None:
+            # Price cache columns belong to sync_price_columns: a full save must not write back the
+            # in-memory copy (stale once a unit changed after this instance was loaded).
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.PRICE_COLUMNS
+            ]
+        super().save(*args, **kwargs)
+
     def get_category_info(self):
         """
         Breadcrumb + slugs from primary FK (backward compatible).
@@ -0,0 +1,59 @@
+"""Denormalized search documents for /search/ and /search/suggest/ (one row per ProductVariant)."""
+
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models
+
+
+class PortableSearchVectorField(SearchVectorField):
+    """tsvector on PostgreSQL; plain text column elsewhere (SQLite test DB never fills it)."""
+
+    def db_type(self, connection):
+        if connection.vendor == "postgresql":
+            return "tsvector"
+        return "text"
+
+
+class ProductSearchDocument(models.Model):
+    """
+    Accent-folded, lower-cased copy of every searchable column for a variant.
+
+    `*_text` columns mirror the legacy `relevance_score` tiers; `search_text` is the
+    concatenation used for trigram / substring matching; `search_vector` is the weighted
+    tsvector (A: sku/mid/name, B: web_name, C: category/brand, D: ingredients).
+
+    GIN indexes (gin_trgm_ops on search_text, plain GIN on search_vector) are created by
+    migration on PostgreSQL only. Maintained by `storeApp.signals.search_document`;
+    full rebuild: `python manage.py rebuild_search_documents`.
+    """
+
+    variant = models.OneToOneField(
+        "ProductVariant",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_document",
+        db_column="product_variant_id",
+    )
+    product = models.ForeignKey(
+        "Product",
+        on_delete=models.CASCADE,
+        related_name="search_documents",
+        db_column="product_id",
+    )
+    sku_text = models.TextField(blank=True, default="")
+    mid_text = models.TextField(blank=True, default="")
+    name_text = models.TextField(blank=True, default="")
+    web_name_text = models.TextField(blank=True, default="")
+    category_text = models.TextField(blank=True, default="")
+    brand_text = models.TextField(blank=True, default="")
+    ingredients_text = models.TextField(blank=True, default="")
+    search_text = models.TextField(blank=True, default="")
+    search_vector = PortableSearchVectorField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "store_product_search_document"
+        verbose_name = "Product search document"
+        verbose_name_plural = "Product search documents"
+
+    def __str__(self):
+        return f"search_document:{self.variant_id}"
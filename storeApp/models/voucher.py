@@ -163,10 +163,12 @@ class Voucher(BaseModel):
             return True
         if current_count is None:
             db = using or getattr(self._state, "db", None) or "default"
-            current_count = VoucherRedemption.objects.using(db).filter(
-                voucher_id=self.id,
-                user_id=user_id,
-            ).count()
+            current_count = (
+                VoucherUserRedemptionCount.objects.using(db)
+                .filter(voucher_id=self.id, user_id=user_id)
+                .values_list("redeem_count", flat=True)
+                .first()
+            ) or 0
         return current_count < self.per_user_limit
 
     def calculate_discount(self, original_price):
@@ -249,3 +251,22 @@ class VoucherRedemption(BaseModel):
             models.Index(fields=["order"]),
             models.Index(fields=["user_id", "created_date"]),
         ]
+
+
+class VoucherUserRedemptionCount(models.Model):
+    """Số lần mỗi user đã dùng voucher (rollup của VoucherRedemption, cập nhật trong consume_vouchers)."""
+
+    voucher = models.ForeignKey("Voucher", on_delete=models.CASCADE, related_name="user_redemption_counts", db_column="voucher_id")
+    user_id = models.BigIntegerField(null=False, db_column="user_id")
+    redeem_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = "store_voucher_user_redemption_count"
+        verbose_name = "Voucher User Redemption Count"
+        verbose_name_plural = "Voucher User Redemption Counts"
+        constraints = [
+            models.UniqueConstraint(fields=["voucher", "user_id"], name="store_voucher_user_redeem_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.voucher_id}/{self.user_id}: {self.redeem_count}"
@@ -629,15 +629,7 @@ class MinimalProductVariantSerializer(serializers.ModelSerializer):
         return 0
 
     def get_price_value(self, obj):
-        units_manager = getattr(obj, 'units', None)
-        if units_manager is None:
-            return 0
-        unit = units_manager.filter(is_default=True, is_published=True).first() or units_manager.filter(
-            is_published=True
-        ).order_by('unit_order', 'id').first()
-        if unit is not None and unit.price_value is not None:
-            return unit.price_value
-        return 0
+        return obj.default_unit_price
 
     def get_is_out_of_stock(self, obj):
         return obj.in_stock <= 0
@@ -0,0 +1,229 @@
+"""
+Cache layer for storeApp services (search facets, campaigns, menu snapshot, path routing,
+facet index).
+
+Backends come from settings.CACHES (OUPharmacyManagementApp/settings.py): Redis when
+CACHE_REDIS_URL is set, a file-based stand-in (CACHE_FILE_DIR, shared by processes on one
+host — tests), otherwise per-process LocMem.
+
+- `store_cache()` — what services read/write. With STORE_CACHE_TWO_TIER it is a `TwoTierCache`:
+  a per-process L1 (CACHES["local"], STORE_CACHE_L1_TTL seconds) in front of the shared L2.
+- `VersionedNamespace` — `<prefix>:v<version>:<suffix>` keys. Versions are read from L2 (or
+  from L1 when a Redis pub/sub listener keeps it current), so `bump()` in one worker retires
+  the namespace in every worker; stale L1 entries are simply never asked for again.
+- `incr_counter()` — atomic counter on the shared backend (404 counters, change-log seq).
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+logger = logging.getLogger("storeApp.cache")
+
+SHARED_ALIAS = "default"
+LOCAL_ALIAS = "local"
+INVALIDATION_CHANNEL = "store_cache:invalidate"
+
+
+def shared_cache():
+    """L2: the backend every process sees."""
+    return caches[SHARED_ALIAS]
+
+
+def two_tier_enabled() -> bool:
+    return getattr(settings, "STORE_CACHE_TWO_TIER", False) and LOCAL_ALIAS in settings.CACHES
+
+
+def store_cache():
+    if two_tier_enabled():
+        return TwoTierCache(caches[LOCAL_ALIAS], shared_cache(), getattr(settings, "STORE_CACHE_L1_TTL", 5))
+    return shared_cache()
+
+
+class TwoTierCache:
+    """Read-through L1 with a short TTL; writes go to L2 first, then refresh L1."""
+
+    def __init__(self, l1, l2, l1_ttl: int):
+        self.l1 = l1
+        self.l2 = l2
+        self.l1_ttl = l1_ttl
+
+    def _l1_timeout(self, timeout):
+        if timeout is DEFAULT_TIMEOUT or timeout is None:
+            return self.l1_ttl
+        return min(timeout, self.l1_ttl)
+
+    def get(self, key, default=None):
+        value = self.l1.get(key)
+        if value is not None:
+            return value
+        value = self.l2.get(key)
+        if value is None:
+            return default
+        self.l1.set(key, value, timeout=self.l1_ttl)
+        return value
+
+    def get_many(self, keys):
+        found = self.l1.get_many(keys)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            from_l2 = self.l2.get_many(missing)
+            if from_l2:
+                self.l1.set_many(from_l2, timeout=self.l1_ttl)
+            found.update(from_l2)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        self.l2.set(key, value, timeout=timeout)
+        self.l1.set(key, value, timeout=self._l1_timeout(timeout))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT):
+        added = self.l2.add(key, value, timeout=timeout)
+        self.l1.delete(key)
+        return added
+
+    def delete(self, key):
+        self.l1.delete(key)
+        return self.l2.delete(key)
+
+    def delete_many(self, keys):
+        self.l1.delete_many(keys)
+        self.l2.delete_many(keys)
+
+    def incr(self, key, delta=1):
+        self.l1.delete(key)
+        return self.l2.incr(key, delta)
+
+    def clear(self):
+        self.l1.clear()
+        self.l2.clear()
+
+
+def incr_counter(key: str, *, timeout=None) -> int:
+    """Atomic increment on the shared backend (Redis INCR); creates the key at 0 first."""
+    backend = shared_cache()
+    backend.add(key, 0, timeout=timeout)
+    try:
+        value = backend.incr(key)
+    except ValueError:
+        # Evicted between add and incr.
+        backend.set(key, 1, timeout=timeout)
+        value = 1
+    if two_tier_enabled():
+        caches[LOCAL_ALIAS].delete(key)
+    return value
+
+
+class VersionedNamespace:
+    """
+    Versioned key space. Integer versions by default; `token=True` uses random tokens so a
+    flushed/evicted cache can never hand an old version number back to an in-memory index.
+    """
+
+    def __init__(self, prefix: str, *, token: bool = False):
+        self.prefix = prefix
+        self.version_key = f"{prefix}:version"
+        self.token = token
+
+    def version(self):
+        version = read_version(self.version_key)
+        if version is None:
+            if not self.token:
+                return 1
+            shared_cache().add(self.version_key, uuid.uuid4().hex, timeout=None)
+            version = shared_cache().get(self.version_key)
+        return version
+
+    def bump(self):
+        backend = shared_cache()
+        if self.token:
+            version = uuid.uuid4().hex
+            backend.set(self.version_key, version, timeout=None)
+        else:
+            backend.add(self.version_key, 1, timeout=None)
+            try:
+                version = backend.incr(self.version_key)
+            except ValueError:
+                version = 2
+                backend.set(self.version_key, version, timeout=None)
+        publish_invalidation(self.version_key)
+        return version
+
+    def key(self, suffix: str) -> str:
+        return f"{self.prefix}:v{self.version()}:{suffix}"
+
+    def get(self, suffix: str, default=None):
+        return store_cache().get(self.key(suffix), default)
+
+    def set(self, suffix: str, value, timeout=DEFAULT_TIMEOUT):
+        store_cache().set(self.key(suffix), value, timeout=timeout)
+        return value
+
+
+# --- version reads + pub/sub invalidation (two-tier mode) ---------------------------------------
+
+_listener_lock = threading.Lock()
+_listener = None
+
+
+def read_version(key: str):
+    """Version keys bypass L1 unless a pub/sub listener evicts them on every bump."""
+    if two_tier_enabled() and _ensure_listener():
+        return store_cache().get(key)
+    return shared_cache().get(key)
+
+
+def publish_invalidation(key: str) -> None:
+    if not two_tier_enabled():
+        return
+    caches[LOCAL_ALIAS].delete(key)
+    client = _redis_client()
+    if client is None:
+        return
+    try:
+        client.publish(INVALIDATION_CHANNEL, key)
+    except Exception:
+        logger.exception("cache_invalidation_publish_failed key=%s", key)
+
+
+def _redis_client():
+    backend = shared_cache()
+    get_client = getattr(getattr(backend, "_cache", None), "get_client", None)
+    if get_client is None or "redis" not in type(backend).__module__:
+        return None
+    return get_client(write=True)
+
+
+def _ensure_listener() -> bool:
+    """Start (once per process) the Redis subscriber that evicts bumped versions from L1."""
+    global _listener
+    if _listener is not None:
+        return _listener is not False
+    with _listener_lock:
+        if _listener is not None:
+            return _listener is not False
+        client = _redis_client()
+        if client is None:
+            _listener = False
+            return False
+        local = caches[LOCAL_ALIAS]
+
+        def evict(message):
+            key = message.get("data")
+            if isinstance(key, bytes):
+                key = key.decode()
+            local.delete(key)
+
+        try:
+            pubsub = client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{INVALIDATION_CHANNEL: evict})
+            _listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+        except Exception:
+            logger.exception("cache_invalidation_listener_failed")
+            _listener = False
+        return _listener is not False
@@ -72,55 +72,56 @@ def _subject_payload(campaign, placement):
     }
 
 
-def select_placement_winners(*, now=None, slots=None, using="store"):
-    """
-    Return dict slot -> payload.
-
-    D-22: HOME_HERO / HOME_SECONDARY → Subject[] | null (slides of winning campaign).
-    Other slots → Subject | null.
-    """
-    now = now or timezone.now()
-    raw_slots = list(slots) if slots else list(PUBLIC_SLOT_KEYS)
-    # Preserve request order; emit only canonical keys (D-21).
+def canonical_slots(slots=None):
+    """Requested slots → canonical keys (D-21), request order kept, duplicates dropped."""
     slot_list = []
     seen = set()
-    for raw in raw_slots:
+    for raw in list(slots) if slots else list(PUBLIC_SLOT_KEYS):
         key = normalize_placement_slot(raw)
         if key in seen:
             continue
         seen.add(key)
         slot_list.append(key)
-    slot_set = set(slot_list)
+    return slot_list
+
 
+def rank_placement_candidates(campaigns, slot_list):
+    """slot -> [(campaign, placement), ...] best first (same order the winner is picked by)."""
+    slot_set = set(slot_list)
     candidates = {slot: [] for slot in slot_list}
-    campaigns = public_visible_queryset(now=now, using=using)
     for campaign in campaigns:
         for placement in campaign.placements.all():
             if placement.slot not in slot_set:
                 continue
             candidates[placement.slot].append((campaign, placement))
+    for rows in candidates.values():
+        rows.sort(key=lambda pair: _placement_rank_key(pair[0], pair[1]))
+    return candidates
 
-    winners = {}
-    for slot in slot_list:
-        rows = candidates.get(slot) or []
-        if not rows:
-            winners[slot] = None
-            continue
-        campaign, _placement = min(rows, key=lambda pair: _placement_rank_key(pair[0], pair[1]))
-        if slot in CampaignPlacement.CAROUSEL_SLOTS:
-            slides = [p for p in campaign.placements.all() if p.slot == slot]
-            cap = CampaignPlacement.SLOT_SLIDE_CAPS.get(slot, 5)
-            payloads = [_subject_payload(campaign, p) for p in slides[:cap]]
-            winners[slot] = payloads if payloads else None
-        else:
-            # Single notice / banner: best-ranked placement of winning campaign for this slot.
-            same = [p for p in campaign.placements.all() if p.slot == slot]
-            if not same:
-                winners[slot] = None
-                continue
-            best = min(same, key=lambda p: (p.sort_order, p.id))
-            winners[slot] = _subject_payload(campaign, best)
-    return winners
+
+def winner_payload(slot, campaign):
+    """
+    D-22: HOME_HERO / HOME_SECONDARY → Subject[] | null (slides of winning campaign).
+    Other slots → Subject | null.
+    """
+    same = [p for p in campaign.placements.all() if p.slot == slot]
+    if slot in CampaignPlacement.CAROUSEL_SLOTS:
+        cap = CampaignPlacement.SLOT_SLIDE_CAPS.get(slot, 5)
+        payloads = [_subject_payload(campaign, p) for p in same[:cap]]
+        return payloads if payloads else None
+    # Single notice / banner: best-ranked placement of winning campaign for this slot.
+    if not same:
+        return None
+    best = min(same, key=lambda p: (p.sort_order, p.id))
+    return _subject_payload(campaign, best)
+
+
+def select_placement_winners(*, now=None, slots=None, using="store"):
+    """Return dict slot -> payload (see winner_payload); ranks visible campaigns at `now`."""
+    now = now or timezone.now()
+    slot_list = canonical_slots(slots)
+    ranked = rank_placement_candidates(public_visible_queryset(now=now, using=using), slot_list)
+    return {slot: winner_payload(slot, ranked[slot][0][0]) if ranked[slot] else None for slot in slot_list}
 
 
 def pick_primary_placement(campaign):
@@ -1,15 +1,23 @@
 """Campaign lifecycle service: status transitions + optimistic version lock."""
 
-from django.db import transaction
+import logging
+import time
+import uuid
+
+from django.conf import settings
+from django.db import connections, transaction
 from django.db.models import F
 from django.utils import timezone
 
-from storeApp.models import Campaign
+from storeApp.models import Campaign, CampaignSchedulerRun
+from storeApp.services.cache_backend import shared_cache
 from storeApp.services.campaign_cache import (
     invalidate_public_campaign_cache,
     log_campaign_transition,
 )
 
+logger = logging.getLogger("storeApp.campaign")
+
 class CampaignServiceError(Exception):
     """Base error for campaign lifecycle operations."""
 
@@ -353,57 +361,122 @@ def activate_scheduled_campaign(*, campaign_id, using="store", now=None):
         )
 
 
-def run_campaign_scheduler(*, now=None, using="store"):
+SCHEDULER_LOCK_KEY = "store_campaign_scheduler:lock"
+SCHEDULER_LOCK_TIMEOUT = getattr(settings, "CAMPAIGN_SCHEDULER_LOCK_TIMEOUT", 120)
+SCHEDULER_CHUNK_SIZE = 300
+
+_GUARDED_TRANSITION_SQL = (
+    "UPDATE store_campaign SET status = %s, version = version + 1, updated_date = %s "
+    "WHERE {guards} RETURNING id"
+)
+
+
+def _guarded_transition(rows, *, to_status, now, using):
+    """
+    One UPDATE per chunk: each row only moves if its (id, status, version) is still what the
+    scan saw, so admin edits / overlapping ticks in between are left alone. Returns moved ids.
+    """
+    moved = []
+    connection = connections[using]
+    updated_date = connection.ops.adapt_datetimefield_value(now)
+    for offset in range(0, len(rows), SCHEDULER_CHUNK_SIZE):
+        chunk = rows[offset : offset + SCHEDULER_CHUNK_SIZE]
+        guards = " OR ".join(["(id = %s AND status = %s AND version = %s)"] * len(chunk))
+        params = [to_status, updated_date] + [value for row in chunk for value in row]
+        with connection.cursor() as cursor:
+            cursor.execute(_GUARDED_TRANSITION_SQL.format(guards=guards), params)
+            moved += [row[0] for row in cursor.fetchall()]
+    return moved
+
+
+def run_campaign_scheduler(*, now=None, using="store", source="cli"):
     """
-    Converge statuses by clock (D-14):
+    Converge statuses by clock (D-14), set-based:
     1) end scheduled|active|paused when now >= end_at
     2) activate scheduled when start_at <= now < end_at
-    Idempotent. Public APIs still filter by window if cron is late.
+    Two scans + guarded bulk UPDATE ... RETURNING in one transaction, one cache invalidation per
+    tick, one CampaignSchedulerRun audit row. Idempotent; overlapping ticks skip on a shared-cache
+    lock (and the version guards make a tick that slips past it harmless).
+    Public APIs still filter by window if the tick is late.
     """
     now = now or timezone.now()
-    stats = {"activated": 0, "ended": 0, "scanned_end": 0, "scanned_activate": 0}
-
-    end_ids = list(
-        Campaign.objects.using(using)
-        .filter(
-            status__in=[
-                Campaign.STATUS_SCHEDULED,
-                Campaign.STATUS_ACTIVE,
-                Campaign.STATUS_PAUSED,
-            ],
-            end_at__isnull=False,
-            end_at__lte=now,
+    stats = {"activated": 0, "ended": 0, "scanned_end": 0, "scanned_activate": 0, "conflicts": 0}
+    lock_token = uuid.uuid4().hex
+    if not shared_cache().add(SCHEDULER_LOCK_KEY, lock_token, timeout=SCHEDULER_LOCK_TIMEOUT):
+        logger.info("campaign_scheduler_skipped reason=locked now=%s", now.isoformat())
+        return {**stats, "skipped": True}
+
+    started_at = timezone.now()
+    started = time.perf_counter()
+    try:
+        campaigns = Campaign.objects.using(using)
+        end_rows = list(
+            campaigns.filter(
+                status__in=[
+                    Campaign.STATUS_SCHEDULED,
+                    Campaign.STATUS_ACTIVE,
+                    Campaign.STATUS_PAUSED,
+                ],
+                end_at__isnull=False,
+                end_at__lte=now,
+            )
+            .order_by("id")
+            .values_list("id", "status", "version")
         )
-        .values_list("id", flat=True)
-    )
-    stats["scanned_end"] = len(end_ids)
-    for campaign_id in end_ids:
-        before = Campaign.objects.using(using).get(id=campaign_id).status
-        after = apply_time_expiry(campaign_id=campaign_id, using=using, now=now)
-        if before != Campaign.STATUS_ENDED and after.status == Campaign.STATUS_ENDED:
-            stats["ended"] += 1
-
-    activate_ids = list(
-        Campaign.objects.using(using)
-        .filter(
-            status=Campaign.STATUS_SCHEDULED,
-            start_at__isnull=False,
-            end_at__isnull=False,
-            start_at__lte=now,
-            end_at__gt=now,
+        activate_rows = list(
+            campaigns.filter(
+                status=Campaign.STATUS_SCHEDULED,
+                start_at__isnull=False,
+                end_at__isnull=False,
+                start_at__lte=now,
+                end_at__gt=now,
+            )
+            .order_by("id")
+            .values_list("id", "status", "version")
         )
-        .values_list("id", flat=True)
-    )
-    stats["scanned_activate"] = len(activate_ids)
-    for campaign_id in activate_ids:
-        before = Campaign.objects.using(using).get(id=campaign_id).status
-        after = activate_scheduled_campaign(campaign_id=campaign_id, using=using, now=now)
-        if before == Campaign.STATUS_SCHEDULED and after.status == Campaign.STATUS_ACTIVE:
-            stats["activated"] += 1
-
-    if stats["activated"] or stats["ended"]:
-        invalidate_public_campaign_cache()
-    return stats
+        stats["scanned_end"] = len(end_rows)
+        stats["scanned_activate"] = len(activate_rows)
+
+        with transaction.atomic(using=using):
+            ended = _guarded_transition(end_rows, to_status=Campaign.STATUS_ENDED, now=now, using=using) if end_rows else []
+            activated = (
+                _guarded_transition(activate_rows, to_status=Campaign.STATUS_ACTIVE, now=now, using=using)
+                if activate_rows
+                else []
+            )
+        stats["ended"] = len(ended)
+        stats["activated"] = len(activated)
+        stats["conflicts"] = len(end_rows) + len(activate_rows) - len(ended) - len(activated)
+
+        from_status = {row[0]: row[1] for row in end_rows + activate_rows}
+        for to_status, moved in ((Campaign.STATUS_ENDED, ended), (Campaign.STATUS_ACTIVE, activated)):
+            for campaign_id in moved:
+                log_campaign_transition(
+                    campaign_id=campaign_id,
+                    from_status=from_status[campaign_id],
+                    to_status=to_status,
+                    source="scheduler",
+                )
+        if ended or activated:
+            invalidate_public_campaign_cache()
+
+        stats["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        run = CampaignSchedulerRun.objects.using(using).create(
+            tick_at=now,
+            started_at=started_at,
+            duration_ms=stats["duration_ms"],
+            activated=stats["activated"],
+            ended=stats["ended"],
+            scanned_activate=stats["scanned_activate"],
+            scanned_end=stats["scanned_end"],
+            conflicts=stats["conflicts"],
+            source=source,
+        )
+        stats["run_id"] = run.id
+        return stats
+    finally:
+        if shared_cache().get(SCHEDULER_LOCK_KEY) == lock_token:
+            shared_cache().delete(SCHEDULER_LOCK_KEY)
 
 
 def resolve_attribution_campaign_id(raw_campaign_id, *, using="store"):
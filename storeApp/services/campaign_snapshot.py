@@ -0,0 +1,150 @@
+"""
+Compiled public campaign snapshot for GET /campaigns/ and GET /campaigns/placements/.
+
+One compile ranks every visible campaign once: per slot the ordered candidate campaign ids and the
+winner payload (campaign_public.winner_payload), plus the list endpoint rows. The snapshot also
+records `next_boundary` — the earliest future start_at / end_at of a scheduled or active campaign,
+i.e. the next instant visibility can change without anyone writing.
+
+Validity is therefore exact instead of TTL-polled:
+- writes go through invalidate_public_campaign_cache() → namespace version bump → new key;
+- time: a snapshot is current while now < next_boundary. The compiler queues the Celery task
+  `recompile_campaign_snapshot` with ETA = next_boundary (once per boundary across workers, when
+  CAMPAIGN_SNAPSHOT_SCHEDULE_RECOMPILE is on); a reader past the boundary recompiles inline anyway.
+
+Payloads are shared between requests: treat them as read-only.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from storeApp.models import Campaign
+from storeApp.services.campaign_cache import CACHE_PREFIX, CAMPAIGN_NAMESPACE, cache_version
+from storeApp.services.cache_backend import shared_cache, store_cache
+from storeApp.services.campaign_public import (
+    PUBLIC_SLOT_KEYS,
+    public_visible_queryset,
+    rank_placement_candidates,
+    winner_payload,
+)
+
+logger = logging.getLogger("storeApp.campaign")
+
+SNAPSHOT_SUFFIX = "placement_snapshot"
+SNAPSHOT_TIMEOUT = getattr(settings, "CAMPAIGN_SNAPSHOT_TIMEOUT", 86400)
+SCHEDULE_RECOMPILE = getattr(settings, "CAMPAIGN_SNAPSHOT_SCHEDULE_RECOMPILE", False)
+BOUNDARY_STATUSES = (Campaign.STATUS_SCHEDULED, Campaign.STATUS_ACTIVE)
+
+
+@dataclass(frozen=True)
+class PlacementSnapshot:
+    version: int
+    compiled_at: datetime
+    next_boundary: datetime | None
+    placements: dict
+    ranking: dict
+    campaigns: list
+    build_ms: float
+
+    def is_current(self, now) -> bool:
+        return self.next_boundary is None or now < self.next_boundary
+
+    def age_seconds(self, now=None) -> float:
+        return round(((now or timezone.now()) - self.compiled_at).total_seconds(), 3)
+
+    def placements_for(self, slots=None) -> dict:
+        return {slot: self.placements.get(slot) for slot in (slots or PUBLIC_SLOT_KEYS)}
+
+    def meta(self, now=None) -> dict:
+        return {
+            "version": self.version,
+            "compiled_at": _iso(self.compiled_at),
+            "next_boundary": _iso(self.next_boundary),
+            "age_seconds": self.age_seconds(now),
+        }
+
+
+def _iso(value):
+    return value.isoformat().replace("+00:00", "Z") if value else None
+
+
+def next_campaign_boundary(*, now, using="store"):
+    """Earliest start_at / end_at after `now` among scheduled + active campaigns (one aggregate)."""
+    bounds = (
+        Campaign.objects.using(using)
+        .filter(status__in=BOUNDARY_STATUSES, start_at__isnull=False, end_at__isnull=False, end_at__gt=now)
+        .aggregate(next_start=Min("start_at", filter=Q(start_at__gt=now)), next_end=Min("end_at"))
+    )
+    candidates = [value for value in bounds.values() if value is not None]
+    return min(candidates) if candidates else None
+
+
+def compile_placement_snapshot(version, *, now=None, using="store") -> PlacementSnapshot:
+    from storeApp.serializers_campaign import PublicCampaignListSerializer
+
+    started = time.perf_counter()
+    now = now or timezone.now()
+    campaigns = list(public_visible_queryset(now=now, using=using).order_by("-priority", "start_at", "id"))
+    ranked = rank_placement_candidates(campaigns, list(PUBLIC_SLOT_KEYS))
+    placements = {slot: winner_payload(slot, rows[0][0]) if rows else None for slot, rows in ranked.items()}
+    ranking = {slot: tuple(dict.fromkeys(campaign.id for campaign, _placement in rows)) for slot, rows in ranked.items()}
+    return PlacementSnapshot(
+        version=version,
+        compiled_at=now,
+        next_boundary=next_campaign_boundary(now=now, using=using),
+        placements=placements,
+        ranking=ranking,
+        campaigns=[dict(row) for row in PublicCampaignListSerializer(campaigns, many=True).data],
+        build_ms=(time.perf_counter() - started) * 1000,
+    )
+
+
+def _snapshot_key(version) -> str:
+    return f"{CAMPAIGN_NAMESPACE.prefix}:v{version}:{SNAPSHOT_SUFFIX}"
+
+
+def get_placement_snapshot(*, now=None, using="store") -> PlacementSnapshot:
+    """Current snapshot from the store cache; compiled (and its boundary recompile queued) on miss."""
+    now = now or timezone.now()
+    version = cache_version()
+    snapshot = store_cache().get(_snapshot_key(version))
+    if snapshot is not None and snapshot.version == version and snapshot.is_current(now):
+        return snapshot
+    snapshot = compile_placement_snapshot(version, now=now, using=using)
+    store_cache().set(_snapshot_key(version), snapshot, timeout=SNAPSHOT_TIMEOUT)
+    logger.info(
+        "campaign_snapshot_compiled version=%s campaigns=%s next_boundary=%s build_ms=%.2f",
+        version,
+        len(snapshot.campaigns),
+        _iso(snapshot.next_boundary),
+        snapshot.build_ms,
+    )
+    schedule_recompile(snapshot)
+    return snapshot
+
+
+def schedule_recompile(snapshot) -> bool:
+    """Queue one recompile at `snapshot.next_boundary` (first worker to claim the boundary wins)."""
+    if not SCHEDULE_RECOMPILE or snapshot.next_boundary is None:
+        return False
+    boundary_ts = snapshot.next_boundary.timestamp()
+    marker = f"{CACHE_PREFIX}:recompile_at:{int(boundary_ts)}"
+    ttl = max(60, int(boundary_ts - time.time()) + 300)
+    if not shared_cache().add(marker, snapshot.version, timeout=ttl):
+        return False
+    from storeApp.tasks import recompile_campaign_snapshot
+
+    try:
+        recompile_campaign_snapshot.apply_async(args=[_iso(snapshot.next_boundary)], eta=snapshot.next_boundary)
+    except Exception:
+        shared_cache().delete(marker)
+        logger.exception("campaign_snapshot_schedule_failed boundary=%s", _iso(snapshot.next_boundary))
+        return False
+    return True
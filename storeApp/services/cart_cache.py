@@ -1,10 +1,37 @@
+"""
+Cart payload cache for `GET /carts/current/`.
+
+One entry per cart (`store_cart:<cart_id>`) holding `{"version", "summary"}`; a hit must match
+`Cart.version` of the cart the request already loaded, so entries from before a version bump
+are never served (and are dropped, so the read path's add() can store the current payload). Mutation endpoints write the fresh payload through; cart_service deletes the
+entry on every change that may not bump the version (items, shipping method, checkout).
+
+settings.STORE_CART_CACHE:
+- "shared" (default): the shared cache (services/cache_backend.py) — correct across workers.
+- "local": per-process LocMem (CACHES["local"]) — single-worker / dev only, since deletes in
+  one worker do not reach the others.
+- "none": NoopCartCacheGateway.
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+
+from storeApp.services.cache_backend import LOCAL_ALIAS, shared_cache
+
+logger = logging.getLogger(__name__)
+
+CACHE_PREFIX = "store_cart"
+DEFAULT_TTL_SECONDS = getattr(settings, "STORE_CART_CACHE_TTL", 60)
+
+
 class CartCacheGateway:
     """Cache abstraction for cart and voucher derived data."""
 
-    def get_cart_summary(self, *, cart_id):
+    def get_cart_summary(self, *, cart_id, version=None):
         raise NotImplementedError
 
-    def set_cart_summary(self, *, cart_id, summary, ttl_seconds=None):
+    def set_cart_summary(self, *, cart_id, summary, version=None, ttl_seconds=None, overwrite=True):
         raise NotImplementedError
 
     def invalidate_cart_summary(self, *, cart_id):
@@ -18,10 +45,10 @@ class CartCacheGateway:
 
 
 class NoopCartCacheGateway(CartCacheGateway):
-    def get_cart_summary(self, *, cart_id):
+    def get_cart_summary(self, *, cart_id, version=None):
         return None
 
-    def set_cart_summary(self, *, cart_id, summary, ttl_seconds=None):
+    def set_cart_summary(self, *, cart_id, summary, version=None, ttl_seconds=None, overwrite=True):
         return None
 
     def invalidate_cart_summary(self, *, cart_id):
@@ -33,10 +60,93 @@ class NoopCartCacheGateway(CartCacheGateway):
     def invalidate_voucher_light(self, *, voucher_code):
         return None
 
+    def stats(self):
+        return {"backend": "none"}
+
+
+class CacheCartCacheGateway(CartCacheGateway):
+    """Serialized cart payloads in a Django cache backend, validated against `Cart.version`."""
+
+    def __init__(self, backend=None, *, name="shared"):
+        # None = resolve the shared backend per call (follows CACHES overrides).
+        self._backend = backend
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.writes = 0
+
+    @property
+    def backend(self):
+        return self._backend if self._backend is not None else shared_cache()
+
+    @staticmethod
+    def _key(cart_id):
+        return f"{CACHE_PREFIX}:{cart_id}"
+
+    def get_cart_summary(self, *, cart_id, version=None):
+        entry = self.backend.get(self._key(cart_id))
+        if entry is None:
+            self.misses += 1
+            return None
+        if version is not None and entry["version"] != version:
+            self.stale += 1
+            self.misses += 1
+            if entry["version"] is None or entry["version"] < version:
+                # Older than the cart: drop it, add() on the read path never replaces an entry.
+                self.backend.delete(self._key(cart_id))
+            return None
+        self.hits += 1
+        return entry["summary"]
+
+    def set_cart_summary(self, *, cart_id, summary, version=None, ttl_seconds=None, overwrite=True):
+        """
+        overwrite=False (read path) never replaces an entry: a write-through from a concurrent
+        mutation may already hold a newer payload at the same version.
+        """
+        entry = {"version": summary.get("version") if version is None else version, "summary": summary}
+        timeout = DEFAULT_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        if overwrite:
+            self.backend.set(self._key(cart_id), entry, timeout=timeout)
+        else:
+            self.backend.add(self._key(cart_id), entry, timeout=timeout)
+        self.writes += 1
 
-_gateway = NoopCartCacheGateway()
+    def invalidate_cart_summary(self, *, cart_id):
+        self.backend.delete(self._key(cart_id))
+
+    def invalidate_user_active_cart(self, *, user_id):
+        # The active cart is looked up by user on every request (one query); nothing cached here.
+        return None
+
+    def invalidate_voucher_light(self, *, voucher_code):
+        return None
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "writes": self.writes,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
+
+
+def build_cart_cache_gateway(kind=None):
+    kind = kind or getattr(settings, "STORE_CART_CACHE", "shared")
+    if kind == "none":
+        return NoopCartCacheGateway()
+    if kind == "local":
+        return CacheCartCacheGateway(caches[LOCAL_ALIAS], name="local")
+    if kind != "shared":
+        logger.warning("unknown STORE_CART_CACHE=%r; using the shared cache", kind)
+    return CacheCartCacheGateway(name="shared")
+
+
+_gateway = build_cart_cache_gateway()
 
 
 def get_cart_cache_gateway():
     return _gateway
-
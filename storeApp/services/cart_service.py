@@ -1,14 +1,22 @@
+import logging
+import time
+from dataclasses import dataclass, field
 from decimal import Decimal, InvalidOperation
 
 from django.db import IntegrityError, transaction
-from django.db.models import F
+from django.db.models import F, Prefetch, Q
+from django.utils import timezone
 
 from storeApp.services.guest_session import guest_session_uuid
 
-from storeApp.models import Cart, CartItem, ProductVariant, ProductVariantUnit
+from storeApp.models import Cart, CartItem, ProductCategory, ProductVariant, ProductVariantUnit, Voucher
 from storeApp.services.cart_cache import get_cart_cache_gateway
-from storeApp.services.stock import get_available_stock, deduct_stock
+from storeApp.services.stock import deduct_stock_bulk, get_available_stock, get_available_stock_bulk
+from storeApp.services.stock_reservations import lock_variants, release_cart_reservations
 from storeApp.services.voucher_engine import VoucherEngineError, resolve_voucher_discounts, consume_vouchers
+from storeApp.services.voucher_rules import evaluate_vouchers
+
+logger = logging.getLogger(__name__)
 
 
 class CartServiceError(Exception):
@@ -77,40 +85,164 @@ def get_or_create_active_cart(*, user_id=None, guest_session_id=None, using="sto
         raise
 
 
+@dataclass
+class GuestMergeReport:
+    """Outcome of a guest → user cart merge (attached to the returned cart as `merge_report`)."""
+
+    guest_lines: int = 0
+    created: int = 0
+    updated: int = 0
+    clamped: list = field(default_factory=list)
+    dropped: list = field(default_factory=list)
+
+    def as_dict(self):
+        return {
+            "guest_lines": self.guest_lines,
+            "created": self.created,
+            "updated": self.updated,
+            "clamped": self.clamped,
+            "dropped": self.dropped,
+        }
+
+
+def _lock_merge_carts(*, guest_uuid, user_id, using):
+    """Both ACTIVE carts in one locking read (id order); the user cart is created when missing."""
+    carts = list(
+        Cart.objects.using(using)
+        .select_for_update()
+        .select_related("shipping_method", "order_voucher", "shipping_voucher")
+        .filter(status=Cart.ACTIVE)
+        .filter(Q(guest_session_id=guest_uuid) | Q(user_id=user_id))
+        .order_by("id")
+    )
+    guest_cart = next((cart for cart in carts if cart.guest_session_id == guest_uuid), None)
+    user_cart = next((cart for cart in carts if cart.user_id == user_id), None)
+    if guest_cart is not None and user_cart is None:
+        user_cart = get_or_create_active_cart(user_id=user_id, using=using)
+        user_cart = (
+            Cart.objects.using(using)
+            .select_for_update()
+            .select_related("shipping_method", "order_voucher", "shipping_voucher")
+            .get(id=user_cart.id)
+        )
+    return guest_cart, user_cart
+
+
+def _default_units(variant_ids, *, using):
+    """Default (else first published) unit per variant, one query — same pick as _resolve_unit."""
+    units = {}
+    for unit in (
+        ProductVariantUnit.objects.using(using)
+        .filter(variant_id__in=variant_ids, is_published=True)
+        .order_by("variant_id", "-is_default", "unit_order", "id")
+    ):
+        units.setdefault(unit.variant_id, unit)
+    return units
+
+
 def merge_guest_cart_into_user(*, guest_session_id, user_id, using="store"):
-    """Move guest ACTIVE cart lines into user ACTIVE cart (login handoff)."""
+    """
+    Move guest ACTIVE cart lines into the user ACTIVE cart (login handoff).
+
+    Constant statement count: lock both carts, read both line sets, one stock lookup, then
+    bulk_create (new lines) / bulk_update (same variant + unit: quantities add up) / one delete of
+    the guest lines, and one recalculation. Guest quantities are clamped to the stock left after
+    the user's own lines; lines with nothing left, inactive variants or unpublished units are dropped.
+    `cart.merge_report` (GuestMergeReport) lists what was clamped / dropped.
+    """
     try:
         guest_uuid = guest_session_uuid(guest_session_id)
     except ValueError as exc:
         raise CartServiceError("Invalid guest session id") from exc
 
+    report = GuestMergeReport()
     with transaction.atomic(using=using):
-        guest_cart = (
-            Cart.objects.using(using)
-            .select_for_update()
-            .filter(guest_session_id=guest_uuid, status=Cart.ACTIVE)
-            .first()
-        )
-        if not guest_cart:
-            return get_or_create_active_cart(user_id=user_id, using=using)
-
-        user_cart = get_or_create_active_cart(user_id=user_id, using=using)
-        user_cart = Cart.objects.using(using).select_for_update().get(id=user_cart.id)
+        guest_cart, user_cart = _lock_merge_carts(guest_uuid=guest_uuid, user_id=user_id, using=using)
+        if guest_cart is None:
+            cart = user_cart or get_or_create_active_cart(user_id=user_id, using=using)
+            cart.merge_report = report
+            return cart
 
-        for guest_item in CartItem.objects.using(using).filter(cart_id=guest_cart.id).select_related(
-            "product_variant_unit"
-        ):
-            add_or_update_item(
-                cart=user_cart,
-                product_variant_id=guest_item.product_variant_id,
-                product_variant_unit_id=guest_item.product_variant_unit_id,
-                quantity=guest_item.quantity,
-                using=using,
+        lines = list(
+            CartItem.objects.using(using)
+            .filter(cart_id__in=[guest_cart.id, user_cart.id])
+            .select_related("product_variant", "product_variant_unit")
+            .order_by("id")
+        )
+        guest_items = [item for item in lines if item.cart_id == guest_cart.id]
+        user_items = {(item.product_variant_id, item.product_variant_unit_id): item for item in lines if item.cart_id == user_cart.id}
+        report.guest_lines = len(guest_items)
+
+        # The guest cart is being retired: its holds must not count against the user cart.
+        release_cart_reservations(cart_id=guest_cart.id, using=using)
+        unitless = {item.product_variant_id for item in guest_items if item.product_variant_unit_id is None}
+        default_units = _default_units(unitless, using=using) if unitless else {}
+        available = get_available_stock_bulk(
+            {item.product_variant_id for item in guest_items}, exclude_cart_id=user_cart.id, use_memo=False
+        )
+        remaining = dict(available)
+        for item in user_items.values():
+            if item.product_variant_id in remaining:
+                unit = item.product_variant_unit
+                remaining[item.product_variant_id] -= int(item.quantity) * (int(unit.quantity_in_base) if unit else 1)
+
+        to_create = []
+        to_update = {}
+        now = timezone.now()
+        for guest_item in guest_items:
+            variant = guest_item.product_variant
+            unit = guest_item.product_variant_unit or default_units.get(guest_item.product_variant_id)
+            line = {
+                "product_variant_id": guest_item.product_variant_id,
+                "product_variant_unit_id": unit.id if unit else guest_item.product_variant_unit_id,
+                "requested": guest_item.quantity,
+            }
+            if not variant.active or unit is None or not unit.is_published:
+                report.dropped.append({**line, "reason": "unavailable"})
+                continue
+            quantity_in_base = max(1, int(unit.quantity_in_base))
+            fits = max(0, remaining[variant.id]) // quantity_in_base
+            quantity = min(int(guest_item.quantity), fits)
+            remaining[variant.id] -= quantity * quantity_in_base
+            if quantity < guest_item.quantity:
+                entry = {**line, "merged": quantity, "available": available[variant.id]}
+                if quantity == 0:
+                    report.dropped.append({**entry, "reason": "out_of_stock"})
+                    continue
+                report.clamped.append(entry)
+
+            unit_price = _to_decimal(unit.price_value)
+            existing = user_items.get((variant.id, unit.id))
+            if existing is not None:
+                existing.quantity = int(existing.quantity) + quantity
+                existing.unit_price_snapshot = unit_price
+                existing.updated_date = now
+                to_update[existing.id] = existing
+            else:
+                created = CartItem(
+                    cart_id=user_cart.id,
+                    product_variant_id=variant.id,
+                    product_variant_unit_id=unit.id,
+                    quantity=quantity,
+                    unit_price_snapshot=unit_price,
+                )
+                user_items[(variant.id, unit.id)] = created
+                to_create.append(created)
+
+        if to_create:
+            CartItem.objects.using(using).bulk_create(to_create)
+        if to_update:
+            CartItem.objects.using(using).bulk_update(
+                list(to_update.values()), ["quantity", "unit_price_snapshot", "updated_date"]
             )
+        report.created = len(to_create)
+        report.updated = len(to_update)
+        CartItem.objects.using(using).filter(cart_id=guest_cart.id).delete()
+        Cart.objects.using(using).filter(id=guest_cart.id).update(status=Cart.ABANDONED, updated_date=now)
 
-        guest_cart.status = Cart.ABANDONED
-        guest_cart.save(update_fields=["status"])
+        _invalidate_cart_related_cache(cart=user_cart)
         user_cart = recalculate_cart(cart=user_cart, using=using, expected_version=user_cart.version)
+        user_cart.merge_report = report
         return user_cart
 
 
@@ -173,7 +305,7 @@ def add_or_update_item(
 
     unit_price = _to_decimal(unit.price_value)
     required_base_quantity = int(quantity) * int(unit.quantity_in_base)
-    total_available = get_available_stock(product_variant.id)
+    total_available = get_available_stock(product_variant.id, exclude_cart_id=cart.id)
     if total_available < required_base_quantity:
         raise CartServiceError(
             f"Insufficient stock in base unit. Available: {total_available}, Requested: {required_base_quantity}"
@@ -254,7 +386,7 @@ def update_item(
     )
     final_quantity = next_quantity + int(existing_same_unit.quantity) if existing_same_unit else next_quantity
     required_base_quantity = final_quantity * int(next_unit.quantity_in_base)
-    total_available = get_available_stock(item.product_variant_id)
+    total_available = get_available_stock(item.product_variant_id, exclude_cart_id=cart.id)
     if total_available < required_base_quantity:
         raise CartServiceError(
             f"Insufficient stock in base unit. Available: {total_available}, Requested: {required_base_quantity}"
@@ -301,7 +433,12 @@ def _build_context(*, cart, using="store", item_ids=None):
     qs = cart.items.using(using).select_related(
         "product_variant__product__category",
         "product_variant_unit",
-    ).prefetch_related("product_variant__product__product_categories__category")
+    ).prefetch_related(
+        Prefetch(
+            "product_variant__product__product_categories",
+            queryset=ProductCategory.objects.using(using).select_related("category"),
+        )
+    )
     if item_ids is not None:
         unique_ids = []
         seen_ids = set()
@@ -354,15 +491,19 @@ def _item_required_base_quantity(item) -> int:
     return int(item.quantity) * int(unit.quantity_in_base)
 
 
-def _assert_checkout_stock(*, items, using="store"):
-    """Ensure batch stock (base unit) covers all checkout lines; aggregate per variant."""
+def _assert_checkout_stock(*, items, using="store", cart_id=None):
+    """
+    Ensure batch stock (base unit) covers all checkout lines; aggregate per variant.
+    Holds of other carts are unavailable; the checking-out cart's own holds are not.
+    """
     required_by_variant: dict[int, int] = {}
     for item in items:
         variant_id = int(item.product_variant_id)
         required_by_variant[variant_id] = required_by_variant.get(variant_id, 0) + _item_required_base_quantity(item)
 
+    available = get_available_stock_bulk(required_by_variant, exclude_cart_id=cart_id, use_memo=False)
     for variant_id, required_base_quantity in required_by_variant.items():
-        total_available = get_available_stock(variant_id)
+        total_available = available[variant_id]
         if total_available < required_base_quantity:
             raise CartServiceError(
                 f"Insufficient stock in base unit. Available: {total_available}, "
@@ -452,6 +593,39 @@ def recalculate_cart(*, cart, using="store", expected_version=None, check_versio
     return cart
 
 
+def list_available_vouchers(*, cart, using="store"):
+    """Vouchers for the cart's current lines, evaluated in one pass over the compiled rule index."""
+    _items, subtotal, shipping_fee_base, product_mids, category_slugs = _build_context(cart=cart, using=using)
+    evaluations = evaluate_vouchers(
+        order_subtotal=subtotal,
+        shipping_fee=shipping_fee_base,
+        product_mids=product_mids,
+        category_slugs=category_slugs,
+        user_id=cart.user_id,
+        using=using,
+    )
+    payload = {"subtotal": str(subtotal), "shipping_fee": str(shipping_fee_base), "order_vouchers": [], "shipping_vouchers": []}
+    for evaluation in evaluations:
+        rule = evaluation.rule
+        bucket = "shipping_vouchers" if rule.scope == Voucher.SHIPPING_DISCOUNT else "order_vouchers"
+        payload[bucket].append(
+            {
+                "id": rule.id,
+                "code": rule.code,
+                "type": rule.type,
+                "value": str(rule.value),
+                "max_discount": None if rule.max_discount is None else str(rule.max_discount),
+                "min_order_value": str(rule.min_order_value),
+                "end_at": rule.end_at,
+                "description": rule.description,
+                "eligible": evaluation.eligible,
+                "reason": evaluation.reason,
+                "discount_amount": str(evaluation.discount_amount.quantize(Decimal("0.01"))),
+            }
+        )
+    return payload
+
+
 def set_cart_shipping_method(*, cart_id, shipping_method, expected_version, using="store"):
     """Atomically set shipping after version check; avoids applying shipping when optimistic lock fails."""
     with transaction.atomic(using=using):
@@ -462,6 +636,23 @@ def set_cart_shipping_method(*, cart_id, shipping_method, expected_version, usin
         return recalculate_cart(cart=cart, using=using, expected_version=cart.version)
 
 
+class _CheckoutStages:
+    """Per-stage wall time (ms) of one checkout, logged once the order is committed."""
+
+    def __init__(self):
+        self.ms: dict[str, float] = {}
+        self._started = self._last = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.ms[stage] = round((now - self._last) * 1000, 2)
+        self._last = now
+
+    @property
+    def total_ms(self):
+        return round((self._last - self._started) * 1000, 2)
+
+
 def checkout_cart(
     *,
     cart,
@@ -473,10 +664,20 @@ def checkout_cart(
     checkout_item_ids=None,
     campaign_id=None,
 ):
+    """
+    Cart → Order pipeline; the cart row lock is held only for the write stages:
+
+    lock_cart → load_lines (1 query + category prefetch) → stock_check (variant lock + 1 grouped query)
+    → vouchers → order → order_items (bulk_create) → deduct (deduct_stock_bulk) → consume (vouchers, holds,
+    paid lines) → commit; cache invalidation runs after the commit.
+    Timings land in the `storeApp.services.cart_service` log and on `order.checkout_stages`.
+    """
     from storeApp.models import Order, OrderItem
     from storeApp.services.campaign_service import resolve_attribution_campaign_id
 
+    stages = _CheckoutStages()
     attributed_campaign_id = resolve_attribution_campaign_id(campaign_id, using=using)
+    stages.mark("prepare")
 
     with transaction.atomic(using=using):
         locked_cart = (
@@ -490,14 +691,19 @@ def checkout_cart(
             raise CartServiceError("Cart is not active")
         if not locked_cart.shipping_method:
             raise CartServiceError("Shipping method is required before checkout")
+        stages.mark("lock_cart")
 
         items, subtotal, shipping_fee_base, product_mids, category_slugs = _build_context(
             cart=locked_cart, using=using, item_ids=checkout_item_ids
         )
         if not items:
             raise CartServiceError("Cart must have at least one item")
+        stages.mark("load_lines")
 
-        _assert_checkout_stock(items=items, using=using)
+        # Same lock as reserve_cart_stock: holds cannot be taken between this check and the deduction.
+        lock_variants([item.product_variant_id for item in items], using=using)
+        _assert_checkout_stock(items=items, using=using, cart_id=locked_cart.id)
+        stages.mark("stock_check")
 
         voucher_result = resolve_voucher_discounts(
             order_voucher_code=locked_cart.order_voucher.code if locked_cart.order_voucher else None,
@@ -510,6 +716,7 @@ def checkout_cart(
             using=using,
             lock_for_update=True,
         )
+        stages.mark("vouchers")
 
         order = Order.objects.using(using).create(
             user_id=locked_cart.user_id,
@@ -526,21 +733,38 @@ def checkout_cart(
             shipping_discount_amount=voucher_result["shipping_discount_amount"],
             campaign_id=attributed_campaign_id,
         )
+        stages.mark("order")
+
+        order_items = OrderItem.objects.using(using).bulk_create(
+            [
+                OrderItem(
+                    order=order,
+                    product_variant=item.product_variant,
+                    product_variant_unit=item.product_variant_unit,
+                    quantity=item.quantity,
+                    price=item.unit_price_snapshot,
+                )
+                for item in items
+            ]
+        )
+        stages.mark("order_items")
 
-        for item in items:
-            OrderItem.objects.using(using).create(
-                order=order,
-                product_variant=item.product_variant,
-                product_variant_unit=item.product_variant_unit,
-                quantity=item.quantity,
-                price=item.unit_price_snapshot,
+        try:
+            deduct_stock_bulk(
+                [
+                    (item.product_variant_id, _item_required_base_quantity(item), order_item.id)
+                    for item, order_item in zip(items, order_items)
+                ],
+                using=using,
             )
-            required_base_quantity = _item_required_base_quantity(item)
-            try:
-                deduct_stock(item.product_variant_id, required_base_quantity)
-            except ValueError as exc:
-                raise CartServiceError(str(exc)) from exc
+        except ValueError as exc:
+            raise CartServiceError(str(exc)) from exc
+        stages.mark("deduct")
 
+        # The cart's holds became the deduction above.
+        release_cart_reservations(
+            cart_id=locked_cart.id, variant_ids={item.product_variant_id for item in items}, using=using
+        )
         consume_vouchers(
             order=order,
             user_id=locked_cart.user_id,
@@ -553,7 +777,11 @@ def checkout_cart(
 
         paid_line_ids = [item.id for item in items]
         CartItem.objects.using(using).filter(cart_id=locked_cart.id, id__in=paid_line_ids).delete()
-        remaining_exists = CartItem.objects.using(using).filter(cart_id=locked_cart.id).exists()
+        # Whole-cart checkout (cart row locked): nothing can remain, skip the lookup.
+        remaining_exists = (
+            checkout_item_ids is not None
+            and CartItem.objects.using(using).filter(cart_id=locked_cart.id).exists()
+        )
 
         if remaining_exists:
             locked_cart.checkout_order = None
@@ -579,9 +807,23 @@ def checkout_cart(
                     "total",
                 ]
             )
-        _invalidate_cart_related_cache(
-            cart=locked_cart,
-            order_voucher_code=voucher_result["order_voucher"].code if voucher_result["order_voucher"] else None,
-            shipping_voucher_code=voucher_result["shipping_voucher"].code if voucher_result["shipping_voucher"] else None,
-        )
-        return order
+        stages.mark("consume")
+    stages.mark("commit")
+
+    _invalidate_cart_related_cache(
+        cart=locked_cart,
+        order_voucher_code=voucher_result["order_voucher"].code if voucher_result["order_voucher"] else None,
+        shipping_voucher_code=voucher_result["shipping_voucher"].code if voucher_result["shipping_voucher"] else None,
+    )
+    stages.mark("cache")
+
+    order.checkout_stages = stages.ms
+    logger.info(
+        "checkout cart=%s order=%s lines=%d total_ms=%.2f stages=%s",
+        locked_cart.id,
+        order.order_number,
+        len(items),
+        stages.total_ms,
+        stages.ms,
+    )
+    return order
@@ -0,0 +1,75 @@
+"""
+Full rebuild + consistency check for CategoryClosure (store DB).
+
+Incremental maintenance lives on the model (CategoryClosure.link_node / move_subtree, called
+from Category.save). This module recomputes the closure from the `parent` chain: used by the
+`rebuild_category_closure` command, migration-time backfill, and after bulk category writes
+that bypass save() (sync_mainapp_data).
+"""
+from __future__ import annotations
+
+import logging
+
+from django.db import transaction
+
+from storeApp.models import Category, CategoryClosure
+from storeApp.services.product_category_helpers import store_db_alias
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def expected_closure_rows(parent_by_id: dict[int, int | None]) -> set[tuple[int, int, int]]:
+    """(ancestor_id, descendant_id, depth) for every node, walking `parent` (cycle-safe)."""
+    rows: set[tuple[int, int, int]] = set()
+    for category_id in parent_by_id:
+        seen = set()
+        current, depth = category_id, 0
+        while current is not None and current not in seen and current in parent_by_id:
+            seen.add(current)
+            rows.add((current, category_id, depth))
+            current = parent_by_id[current]
+            depth += 1
+    return rows
+
+
+def _parent_map(db) -> dict[int, int | None]:
+    return dict(Category.objects.using(db).values_list("id", "parent_id"))
+
+
+def _stored_rows(db) -> set[tuple[int, int, int]]:
+    return set(CategoryClosure.objects.using(db).values_list("ancestor_id", "descendant_id", "depth"))
+
+
+def rebuild_category_closure(*, using=None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> dict:
+    """Replace every closure row in one transaction; returns {'categories', 'rows'}."""
+    db = store_db_alias(using)
+    parent_by_id = _parent_map(db)
+    rows = sorted(expected_closure_rows(parent_by_id))
+    with transaction.atomic(using=db):
+        CategoryClosure.objects.using(db).all().delete()
+        CategoryClosure.objects.using(db).bulk_create(
+            [CategoryClosure(ancestor_id=a, descendant_id=d, depth=depth) for a, d, depth in rows],
+            batch_size=chunk_size,
+        )
+    logger.info("category_closure_rebuilt categories=%s rows=%s", len(parent_by_id), len(rows))
+    return {"categories": len(parent_by_id), "rows": len(rows)}
+
+
+def check_category_closure(*, using=None) -> dict:
+    """
+    Compare stored closure rows with the `parent` chain.
+
+    Returns {'expected', 'stored', 'missing': [...], 'unexpected': [...]}; a wrong depth shows
+    up as one missing + one unexpected row for the same pair.
+    """
+    db = store_db_alias(using)
+    expected = expected_closure_rows(_parent_map(db))
+    stored = _stored_rows(db)
+    return {
+        "expected": len(expected),
+        "stored": len(stored),
+        "missing": sorted(expected - stored),
+        "unexpected": sorted(stored - expected),
+    }
@@ -0,0 +1,302 @@
+"""
+CategoryProductCount rollup: product counts per category for subcategory navigation.
+
+Counts are distinct product ids linked through ProductCategory (M2M) or the primary FK,
+rolled up over CategoryClosure (self + active descendants, plus the path_slug supplement of
+category_tree_ids), so a category page reads every child's count in the same query that loads
+the children.
+
+Refresh is set-based: one GROUP BY over the closure table computes every requested category,
+whatever the size of its subtree, so nothing per product is loaded into Python. Signals
+(signals/category_counts.py) queue the touched products / categories with
+`schedule_count_refresh`; the ancestors are refreshed once when the surrounding transaction
+commits. Bulk writers wrap their work in `defer_category_count_refresh()` so the refresh runs
+once on exit.
+"""
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+
+from django.db import connections, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from storeApp.models import (
+    Category,
+    CategoryClosure,
+    CategoryProductCount,
+    Product,
+    ProductCategory,
+    ProductVariant,
+)
+from storeApp.services.product_category_helpers import (
+    category_tree_ids,
+    count_distinct_products_in_category_ids,
+    store_db_alias,
+)
+
+UPSERT_BATCH_SIZE = 1000
+COMPUTE_CHUNK_SIZE = 500
+
+_deferred = threading.local()
+_scheduled = threading.local()
+
+# Subtree = the category itself (direct = 1) + active descendants via the closure table + active
+# categories under its path_slug (same set as category_tree_ids; duplicates collapse in COUNT
+# DISTINCT). Links are M2M rows and primary FKs of active products; published = has an active,
+# published variant.
+_COUNTS_SQL = f"""
+WITH paths (id, prefix) AS (
+    SELECT c.id, LOWER(COALESCE(NULLIF(c.path_slug, ''), c.slug)) || '/'
+    FROM {Category._meta.db_table} c
+    WHERE COALESCE(NULLIF(c.path_slug, ''), c.slug, '') <> '' AND {{category_scope}}
+),
+subtree (ancestor_id, descendant_id, direct) AS (
+    SELECT c.id, c.id, 1 FROM {Category._meta.db_table} c WHERE {{category_scope}}
+    UNION ALL
+    SELECT cc.ancestor_id, cc.descendant_id, 0
+    FROM {CategoryClosure._meta.db_table} cc
+    JOIN {Category._meta.db_table} d ON d.id = cc.descendant_id
+    WHERE cc.depth > 0 AND d.active AND {{closure_scope}}
+    UNION ALL
+    SELECT p.id, d.id, 0
+    FROM paths p
+    JOIN {Category._meta.db_table} d ON d.active AND LOWER(SUBSTR(d.path_slug, 1, LENGTH(p.prefix))) = p.prefix
+),
+links (category_id, product_id, published) AS (
+    SELECT pc.category_id, pc.product_id,
+        CASE WHEN EXISTS (
+            SELECT 1 FROM {ProductVariant._meta.db_table} v
+            WHERE v.product_id = pc.product_id AND v.active AND v.is_published
+        ) THEN 1 ELSE 0 END
+    FROM {ProductCategory._meta.db_table} pc
+    JOIN {Product._meta.db_table} p ON p.id = pc.product_id
+    WHERE p.active
+    UNION ALL
+    SELECT p.category_id, p.id,
+        CASE WHEN EXISTS (
+            SELECT 1 FROM {ProductVariant._meta.db_table} v
+            WHERE v.product_id = p.id AND v.active AND v.is_published
+        ) THEN 1 ELSE 0 END
+    FROM {Product._meta.db_table} p
+    WHERE p.active AND p.category_id IS NOT NULL
+)
+SELECT s.ancestor_id,
+    COUNT(DISTINCT CASE WHEN s.direct = 1 THEN l.product_id END),
+    COUNT(DISTINCT CASE WHEN s.direct = 1 AND l.published = 1 THEN l.product_id END),
+    COUNT(DISTINCT l.product_id),
+    COUNT(DISTINCT CASE WHEN l.published = 1 THEN l.product_id END)
+FROM subtree s
+LEFT JOIN links l ON l.category_id = s.descendant_id
+GROUP BY s.ancestor_id
+"""
+
+
+def ancestor_category_ids(category_ids, *, using=None) -> set[int]:
+    """category_ids plus every ancestor (their subtree counts include these categories)."""
+    db = store_db_alias(using)
+    ids = {cid for cid in category_ids if cid}
+    if not ids:
+        return set()
+    ids.update(
+        CategoryClosure.objects.using(db).filter(descendant_id__in=ids).values_list("ancestor_id", flat=True)
+    )
+    return ids
+
+
+def product_category_ids(product_ids, *, using=None) -> set[int]:
+    """Categories a product is listed under (M2M + primary FK)."""
+    db = store_db_alias(using)
+    ids = [pid for pid in product_ids if pid]
+    if not ids:
+        return set()
+    category_ids = set(
+        ProductCategory.objects.using(db).filter(product_id__in=ids).values_list("category_id", flat=True)
+    )
+    category_ids.update(
+        Product.objects.using(db)
+        .filter(id__in=ids, category_id__isnull=False)
+        .values_list("category_id", flat=True)
+    )
+    return category_ids
+
+
+def compute_category_counts(category_ids=None, *, using=None) -> dict[int, dict[str, int]]:
+    """
+    {category_id: {direct_count, direct_published_count, subtree_count, subtree_published_count}}.
+
+    One aggregate (GROUP BY ancestor, COUNT DISTINCT product) per COMPUTE_CHUNK_SIZE categories;
+    category_ids=None computes every category in one statement. Ids deleted meanwhile are dropped.
+    """
+    db = store_db_alias(using)
+    if category_ids is None:
+        chunks = [None]
+    else:
+        category_ids = sorted({cid for cid in category_ids if cid})
+        chunks = [category_ids[i : i + COMPUTE_CHUNK_SIZE] for i in range(0, len(category_ids), COMPUTE_CHUNK_SIZE)]
+
+    counts = {}
+    with connections[db].cursor() as cursor:
+        for chunk in chunks:
+            if chunk is None:
+                sql, params = _COUNTS_SQL.format(category_scope="1 = 1", closure_scope="1 = 1"), []
+            else:
+                placeholders = ", ".join(["%s"] * len(chunk))
+                sql = _COUNTS_SQL.format(
+                    category_scope=f"c.id IN ({placeholders})", closure_scope=f"cc.ancestor_id IN ({placeholders})"
+                )
+                params = [*chunk, *chunk, *chunk]
+            cursor.execute(sql, params)
+            for category_id, *values in cursor.fetchall():
+                counts[category_id] = dict(zip(CategoryProductCount.COUNT_FIELDS, map(int, values)))
+    return counts
+
+
+def refresh_category_counts(category_ids=None, *, using=None) -> int:
+    """Recompute and upsert rollup rows (all categories when category_ids is None)."""
+    if category_ids is not None:
+        category_ids = {cid for cid in category_ids if cid}
+        if not category_ids:
+            return 0
+        pending = getattr(_deferred, "pending", None)
+        if pending is not None:
+            pending["categories"].update(category_ids)
+            return 0
+
+    db = store_db_alias(using)
+    counts = compute_category_counts(category_ids, using=db)
+    now = timezone.now()
+    rows = [
+        CategoryProductCount(category_id=category_id, updated_at=now, **values)
+        for category_id, values in counts.items()
+    ]
+    CategoryProductCount.objects.using(db).bulk_create(
+        rows,
+        batch_size=UPSERT_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=["category"],
+        update_fields=[*CategoryProductCount.COUNT_FIELDS, "updated_at"],
+    )
+    return len(rows)
+
+
+def refresh_counts_for_categories(category_ids, *, using=None) -> int:
+    """Refresh categories whose own links changed, plus all their ancestors."""
+    pending = getattr(_deferred, "pending", None)
+    if pending is not None:
+        pending["categories"].update(cid for cid in category_ids if cid)
+        return 0
+    return refresh_category_counts(ancestor_category_ids(category_ids, using=using), using=using)
+
+
+def refresh_counts_for_products(product_ids, *, using=None) -> int:
+    pending = getattr(_deferred, "pending", None)
+    if pending is not None:
+        pending["products"].update(pid for pid in product_ids if pid)
+        return 0
+    return refresh_counts_for_categories(product_category_ids(product_ids, using=using), using=using)
+
+
+def schedule_count_refresh(*, category_ids=(), product_ids=(), using=None) -> None:
+    """
+    Signal entry point: queue ids and refresh once when the surrounding transaction commits.
+
+    Every call registers an on_commit callback, but the first one to run takes the whole queue
+    and the rest find it empty, so a transaction touching many products refreshes once. Outside
+    a transaction the callback runs immediately.
+    """
+    category_ids = {cid for cid in category_ids if cid}
+    product_ids = {pid for pid in product_ids if pid}
+    if not category_ids and not product_ids:
+        return
+    deferred = getattr(_deferred, "pending", None)
+    if deferred is not None:
+        deferred["categories"].update(category_ids)
+        deferred["products"].update(product_ids)
+        return
+    db = store_db_alias(using)
+    queues = getattr(_scheduled, "queues", None)
+    if queues is None:
+        queues = _scheduled.queues = {}
+    queue = queues.setdefault(db, {"categories": set(), "products": set()})
+    queue["categories"].update(category_ids)
+    queue["products"].update(product_ids)
+    transaction.on_commit(lambda: _run_scheduled_refresh(db), using=db)
+
+
+def _run_scheduled_refresh(db) -> None:
+    # Ids queued by a rolled-back transaction ride along with the next commit: an extra refresh
+    # only rewrites the true counts.
+    queue = getattr(_scheduled, "queues", {}).pop(db, None)
+    if not queue:
+        return
+    category_ids = queue["categories"] | product_category_ids(queue["products"], using=db)
+    refresh_counts_for_categories(category_ids, using=db)
+
+
+@contextmanager
+def defer_category_count_refresh(*, using=None):
+    """Collect refresh requests (e.g. during a CSV import) and apply them once on exit."""
+    if getattr(_deferred, "pending", None) is not None:
+        yield
+        return
+    _deferred.pending = {"categories": set(), "products": set()}
+    try:
+        yield
+    finally:
+        pending = _deferred.pending
+        _deferred.pending = None
+        category_ids = pending["categories"] | product_category_ids(pending["products"], using=using)
+        refresh_counts_for_categories(category_ids, using=using)
+
+
+def _count_all_products_in_category_ids(category_ids, *, using=None) -> int:
+    """Live 'all' count: distinct active products in category_ids (M2M + FK)."""
+    db = store_db_alias(using)
+    ids = list(category_ids)
+    in_m2m = Exists(ProductCategory.objects.using(db).filter(product_id=OuterRef("pk"), category_id__in=ids))
+    return Product.objects.using(db).filter(active=True).filter(Q(in_m2m) | Q(category_id__in=ids)).count()
+
+
+def live_category_counts(category: Category, *, using=None) -> dict[str, int]:
+    """Counts from the same live queries the listing pages used before the rollup."""
+    db = store_db_alias(using)
+    tree_ids = category_tree_ids(category, using=db)
+    return {
+        "direct_count": _count_all_products_in_category_ids([category.id], using=db),
+        "direct_published_count": count_distinct_products_in_category_ids([category.id], using=db),
+        "subtree_count": _count_all_products_in_category_ids(tree_ids, using=db),
+        "subtree_published_count": count_distinct_products_in_category_ids(tree_ids, using=db),
+    }
+
+
+def category_count_drift(*, using=None, category_ids=None) -> list[dict]:
+    """
+    Rollup rows that disagree with live queries (missing rows count as drift).
+
+    One set of live queries per category — a report tool, not for request paths.
+    """
+    db = store_db_alias(using)
+    categories = Category.objects.using(db).order_by("level", "id")
+    if category_ids is not None:
+        categories = categories.filter(id__in=category_ids)
+    stored = {
+        row.category_id: row
+        for row in CategoryProductCount.objects.using(db).filter(category__in=categories)
+    }
+    drift = []
+    for category in categories:
+        live = live_category_counts(category, using=db)
+        row = stored.get(category.id)
+        cached = {field: getattr(row, field) for field in CategoryProductCount.COUNT_FIELDS} if row else None
+        if cached != live:
+            drift.append(
+                {
+                    "category_id": category.id,
+                    "path_slug": category.path_slug,
+                    "stored": cached,
+                    "live": live,
+                }
+            )
+    return drift
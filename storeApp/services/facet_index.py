@@ -0,0 +1,604 @@
+"""
+In-memory facet postings for GET /api/store/search/ (SearchFacetsService).
+
+Every facet value keeps a posting set stored as a Python int bitmap (bit i = dense position):
+price range / stock over listed variants, brand / origin country / attribute option / category
+over products. Facet counts for a result set are popcounts of `posting & result`, so one
+`values_list("id", "product_id")` query replaces the five aggregate queries of the SQL path
+(none at all for the unfiltered listing).
+
+Freshness:
+- catalog signals (signals/facet_index.py) publish changed product ids to a shared change
+  log in the shared cache (services/cache_backend.py) on commit — reserve an entry number, write
+  the entry, then raise the published seq; each worker replays the log up to that seq and re-reads
+  only those products (`FacetIndex.refresh_products`, queries run outside the holder's lock)
+  before answering.
+- set-based in_stock / price writers (services/stock.py, services/in_stock_sync.py,
+  ProductVariant.sync_price_columns) bypass those signals and publish the variants they touched
+  through `variants_changed`.
+- label / taxonomy changes (brand, category, attribute definitions, bulk imports) bump a
+  shared generation token, which triggers a full rebuild (background thread when
+  SEARCH_FACET_INDEX_BACKGROUND_BUILD is on; SQL path answers meanwhile).
+- an index older than SEARCH_FACET_INDEX_MAX_AGE is rebuilt as well, bounding staleness from any
+  writer that publishes nothing (same bound as the SQL path's facet cache TTL).
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+
+from storeApp.models import (
+    CatalogAttributeOption,
+    Category,
+    Product,
+    ProductAttributeValue,
+    ProductCategory,
+    ProductVariant,
+)
+from storeApp.services.cache_backend import (
+    VersionedNamespace,
+    incr_counter,
+    publish_invalidation,
+    read_version,
+    shared_cache,
+    store_cache,
+)
+from storeApp.services.country_normalize import normalize_country_label
+from storeApp.services.product_category_helpers import store_db_alias
+
+logger = logging.getLogger("storeApp.search")
+
+CACHE_PREFIX = "store_facet_index"
+GENERATION_NAMESPACE = VersionedNamespace(f"{CACHE_PREFIX}:generation", token=True)
+GENERATION_KEY = GENERATION_NAMESPACE.version_key
+LOG_SEQ_KEY = f"{CACHE_PREFIX}:seq"  # highest published entry readers replay up to
+LOG_RESERVED_KEY = f"{CACHE_PREFIX}:reserved"  # entry numbers handed out to writers
+LOG_TTL = getattr(settings, "SEARCH_FACET_INDEX_LOG_TTL", 3600)
+MAX_LOG_REPLAY = getattr(settings, "SEARCH_FACET_INDEX_MAX_LOG_REPLAY", 500)
+INDEX_ENABLED = getattr(settings, "SEARCH_FACET_INDEX_ENABLED", True)
+BACKGROUND_BUILD = getattr(settings, "SEARCH_FACET_INDEX_BACKGROUND_BUILD", True)
+MAX_AGE = getattr(settings, "SEARCH_FACET_INDEX_MAX_AGE", 3600)
+# A published seq can pass an entry whose writer is still between reserve and write; readers wait
+# this long for it before treating the log as broken (evicted / failed write) and rebuilding.
+LOG_GAP_GRACE = getattr(settings, "SEARCH_FACET_INDEX_LOG_GAP_GRACE", 5)
+
+# Same buckets as search_facets_service.PRICE_RANGE_FILTER_Q (lower bound inclusive).
+PRICE_BUCKETS = (
+    ("under_100k", None, 100000),
+    ("100k_300k", 100000, 300000),
+    ("300k_500k", 300000, 500000),
+    ("over_500k", 500000, None),
+)
+FILTER_PARAMS = ("q", "category", "brand", "price_range", "in_stock", "origin_country", "attrs")
+
+
+def bitmap_from_positions(positions) -> int:
+    """Build an int bitmap from bit positions in O(n) (no repeated big-int shifts)."""
+    positions = list(positions)
+    if not positions:
+        return 0
+    buffer = bytearray((max(positions) >> 3) + 1)
+    for position in positions:
+        buffer[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def iter_positions(bitmap: int):
+    data = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+    for byte_index, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            yield (byte_index << 3) + low.bit_length() - 1
+            byte ^= low
+
+
+def result_rows(queryset, facet_params: dict) -> list[tuple[int, int]] | None:
+    """(variant id, product id) of the filtered result set; None for the unfiltered listing."""
+    if not any(facet_params.get(name) not in (None, "") for name in FILTER_PARAMS):
+        return None
+    return list(queryset.order_by().values_list("id", "product_id").distinct())
+
+
+def price_bucket(price) -> str | None:
+    if price is None:
+        return None
+    for key, low, high in PRICE_BUCKETS:
+        if (low is None or price >= low) and (high is None or price < high):
+            return key
+    return None
+
+
+class FacetIndex:
+    """Mutable postings for one catalog generation; guarded by the holder's lock."""
+
+    def __init__(self, generation: str, applied_seq: int):
+        self.generation = generation
+        self.applied_seq = applied_seq
+        self.variant_pos: dict[int, int] = {}
+        self.product_pos: dict[int, int] = {}
+        self.product_of_variant: list[int] = []  # variant position -> product position
+        self.product_variants: dict[int, set[int]] = defaultdict(set)  # product id -> variant positions
+        self.listed = 0
+        self.postings: dict[str, dict] = {
+            "price_ranges": {},
+            "in_stock": {},
+            "brand": {},
+            "origin_country": {},
+            "option": {},
+            "category": {},
+        }
+        self._variant_keys: dict[int, list[tuple[str, object]]] = {}
+        self._product_keys: dict[int, list[tuple[str, object]]] = {}
+        self._listed_products: int | None = None
+        self._pending: dict[tuple[str, object], list[int]] = defaultdict(list)
+        self.brand_names: dict[int, str] = {}
+        self.options: dict[int, dict] = {}
+        self.categories: dict[int, dict] = {}
+        self.built_at = time.time()
+        self.build_ms = 0.0
+        self.log_gap: tuple[int, float] | None = None  # (missing entry, first seen) while replaying
+
+    # --- loading ----------------------------------------------------------------------------
+
+    @classmethod
+    def build(cls, generation: str, applied_seq: int, *, using=None) -> "FacetIndex":
+        started = time.perf_counter()
+        index = cls(generation, applied_seq)
+        db = store_db_alias(using)
+        index.options = {
+            row["id"]: row
+            for row in CatalogAttributeOption.objects.using(db).values(
+                "id",
+                "slug",
+                "label",
+                code=F("attribute__code"),
+                attribute_label=F("attribute__label"),
+                facet_type=F("attribute__facet_type"),
+                attribute_sort_order=F("attribute__sort_order"),
+            )
+        }
+        index.categories = {
+            row["id"]: {"name": row["name"], "slug": row["path_slug"] or row["slug"]}
+            for row in Category.objects.using(db).values("id", "name", "path_slug", "slug")
+        }
+        index._load_products(None, using=db)
+        index.build_ms = (time.perf_counter() - started) * 1000
+        return index
+
+    def _load_products(self, product_ids, *, using) -> None:
+        """(Re)insert postings for `product_ids` (None = whole catalog)."""
+        self._apply_rows(self.fetch_products(product_ids, using=using))
+
+    def fetch_products(self, product_ids, *, using=None) -> tuple:
+        """Rows `_apply_rows` needs for `product_ids` (None = whole catalog); queries only, no mutation."""
+        db = store_db_alias(using)
+        variants = ProductVariant.objects.using(db).filter(
+            active=True, is_published=True, product__active=True
+        )
+        products = Product.objects.using(db).filter(active=True)
+        links = ProductCategory.objects.using(db)
+        values = ProductAttributeValue.objects.using(db).filter(
+            active=True,
+            option__active=True,
+            option__attribute__active=True,
+            option__attribute__is_filterable=True,
+        )
+        if product_ids is not None:
+            variants = variants.filter(product_id__in=product_ids)
+            products = products.filter(id__in=product_ids)
+            links = links.filter(product_id__in=product_ids)
+            values = values.filter(product_id__in=product_ids)
+        return (
+            list(products.values_list("id", "brand_id", "brand__name", "brand__country")),
+            list(links.values_list("product_id", "category_id")),
+            list(values.values_list("product_id", "option_id")),
+            list(variants.values_list("id", "product_id", "default_unit_price", "in_stock")),
+        )
+
+    def _apply_rows(self, rows) -> None:
+        products, links, values, variants = rows
+        product_rows = {row[0]: row for row in products}
+        for product_id, brand_id, brand_name, country in product_rows.values():
+            position = self._product_position(product_id)
+            if brand_id is not None:
+                self.brand_names[brand_id] = brand_name
+                self._add_product_key(position, "brand", brand_id)
+            canonical = normalize_country_label(country) if country else None
+            if canonical:
+                self._add_product_key(position, "origin_country", canonical)
+        for product_id, category_id in links:
+            if product_id in product_rows:
+                self._add_product_key(self.product_pos[product_id], "category", category_id)
+        for product_id, option_id in values:
+            if product_id in product_rows and option_id in self.options:
+                self._add_product_key(self.product_pos[product_id], "option", option_id)
+
+        for variant_id, product_id, price, in_stock in variants:
+            position = self._variant_position(variant_id, product_id)
+            self._pending[("listed", None)].append(position)
+            bucket = price_bucket(price)
+            if bucket:
+                self._add_variant_key(position, "price_ranges", bucket)
+            self._add_variant_key(position, "in_stock", in_stock > 0)
+        self._flush_pending()
+
+    def refresh_products(self, product_ids, *, using=None, rows=None) -> None:
+        """
+        Drop and re-read the postings of the given products (incremental rebuild). `rows` from
+        `fetch_products` lets the caller run the queries before taking the holder's lock.
+        """
+        product_ids = {int(pid) for pid in product_ids}
+        if rows is None:
+            rows = self.fetch_products(product_ids, using=using)
+        for product_id in product_ids:
+            for variant_position in self.product_variants.pop(product_id, set()):
+                self._clear_variant(variant_position)
+            position = self.product_pos.get(product_id)
+            if position is not None:
+                for facet, key in self._product_keys.pop(position, ()):
+                    self.postings[facet][key] &= ~(1 << position)
+        self._apply_rows(rows)
+
+    def _product_position(self, product_id: int) -> int:
+        position = self.product_pos.get(product_id)
+        if position is None:
+            position = self.product_pos[product_id] = len(self.product_pos)
+        return position
+
+    def _variant_position(self, variant_id: int, product_id: int) -> int:
+        position = self.variant_pos.get(variant_id)
+        product_position = self._product_position(product_id)
+        if position is None:
+            position = self.variant_pos[variant_id] = len(self.product_of_variant)
+            self.product_of_variant.append(product_position)
+        else:
+            self.product_of_variant[position] = product_position
+        self.product_variants[product_id].add(position)
+        return position
+
+    def _clear_variant(self, position: int) -> None:
+        bit = 1 << position
+        self.listed &= ~bit
+        for facet, key in self._variant_keys.pop(position, ()):
+            self.postings[facet][key] &= ~bit
+
+    def _add_variant_key(self, position: int, facet: str, key) -> None:
+        self._pending[(facet, key)].append(position)
+        self._variant_keys.setdefault(position, []).append((facet, key))
+
+    def _add_product_key(self, position: int, facet: str, key) -> None:
+        self._pending[(facet, key)].append(position)
+        self._product_keys.setdefault(position, []).append((facet, key))
+
+    def _flush_pending(self) -> None:
+        # One bitmap per posting per load: OR-ing bit by bit would copy the big int each time.
+        for (facet, key), positions in self._pending.items():
+            bitmap = bitmap_from_positions(positions)
+            if facet == "listed":
+                self.listed |= bitmap
+            else:
+                postings = self.postings[facet]
+                postings[key] = postings.get(key, 0) | bitmap
+        self._pending.clear()
+        self._listed_products = None
+
+    # --- counting ---------------------------------------------------------------------------
+
+    def products_of(self, variant_bitmap: int) -> int:
+        product_of_variant = self.product_of_variant
+        return bitmap_from_positions(product_of_variant[pos] for pos in iter_positions(variant_bitmap))
+
+    def is_expired(self, now=None) -> bool:
+        return MAX_AGE is not None and (now or time.time()) - self.built_at >= MAX_AGE
+
+    def result_bitmaps(self, rows) -> tuple[int, int]:
+        """(variant bitmap, product bitmap) of `result_rows(...)`."""
+        if rows is None:
+            if self._listed_products is None:
+                self._listed_products = self.products_of(self.listed)
+            return self.listed, self._listed_products
+        variant_pos = self.variant_pos
+        product_pos = self.product_pos
+        variant_positions, product_positions = [], []
+        for variant_id, product_id in rows:
+            position = variant_pos.get(variant_id)
+            if position is not None:
+                variant_positions.append(position)
+                product_positions.append(product_pos[product_id])
+        variants = bitmap_from_positions(variant_positions) & self.listed
+        return variants, bitmap_from_positions(product_positions)
+
+    def facets(self, rows, *, include_category: bool = True) -> dict:
+        """Same payload (keys, order, caps) as SearchFacetsService.build_facets; rows from result_rows()."""
+        from storeApp.services.search_facets_service import (
+            MAX_ATTRIBUTE_GROUPS,
+            MAX_OPTIONS_PER_ATTRIBUTE,
+        )
+
+        variants, products = self.result_bitmaps(rows)
+        postings = self.postings
+
+        def counts(facet, result):
+            return {
+                key: count
+                for key, posting in postings[facet].items()
+                if (count := (posting & result).bit_count())
+            }
+
+        price_counts = counts("price_ranges", variants)
+        stock_counts = counts("in_stock", variants)
+        brand_counts = counts("brand", products)
+        country_counts = counts("origin_country", products)
+        option_counts = counts("option", products)
+
+        grouped: dict[str, dict] = {}
+        option_rows = sorted(
+            ((self.options[option_id], count) for option_id, count in option_counts.items()),
+            key=lambda pair: (pair[0]["attribute_sort_order"], -pair[1], pair[0]["label"]),
+        )
+        for option, count in option_rows:
+            code = option["code"]
+            if not code or not option["slug"]:
+                continue
+            group = grouped.get(code)
+            if group is None:
+                group = grouped[code] = {
+                    "code": code,
+                    "label": option["attribute_label"],
+                    "type": option["facet_type"] or "multiple",
+                    "sort_order": option["attribute_sort_order"] or 100,
+                    "options": [],
+                }
+            if len(group["options"]) >= MAX_OPTIONS_PER_ATTRIBUTE:
+                continue
+            group["options"].append({"slug": option["slug"], "label": option["label"] or option["slug"], "count": count})
+        attribute_groups = sorted(grouped.values(), key=lambda g: (g["sort_order"], g["code"]))[:MAX_ATTRIBUTE_GROUPS]
+        for group in attribute_groups:
+            group.pop("sort_order", None)
+
+        result = {
+            "brand": [
+                {"id": brand_id, "name": self.brand_names.get(brand_id), "count": count}
+                for brand_id, count in sorted(
+                    brand_counts.items(), key=lambda pair: (-pair[1], self.brand_names.get(pair[0]) or "")
+                )
+            ],
+            "origin_country": [
+                {"key": country, "name": country, "count": count}
+                for country, count in sorted(country_counts.items(), key=lambda pair: (-pair[1], pair[0]))
+            ],
+            "attributes": attribute_groups,
+            "price_ranges": [{"key": key, "count": price_counts.get(key, 0)} for key, _low, _high in PRICE_BUCKETS],
+            "in_stock": [
+                {"key": True, "count": stock_counts.get(True, 0)},
+                {"key": False, "count": stock_counts.get(False, 0)},
+            ],
+        }
+        if not include_category:
+            result["category"] = []
+            return result
+
+        category_counts = counts("category", products)
+        result["category"] = [
+            {
+                "id": category_id,
+                "name": self.categories.get(category_id, {}).get("name"),
+                "slug": self.categories.get(category_id, {}).get("slug"),
+                "count": count,
+            }
+            for category_id, count in sorted(
+                category_counts.items(),
+                key=lambda pair: (-pair[1], self.categories.get(pair[0], {}).get("name") or ""),
+            )
+        ]
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "generation": self.generation,
+            "applied_seq": self.applied_seq,
+            "variants": self.listed.bit_count(),
+            "products": len(self.product_pos),
+            "postings": {facet: len(values) for facet, values in self.postings.items()},
+            "build_ms": round(self.build_ms, 2),
+            "age_seconds": round(time.time() - self.built_at, 1),
+        }
+
+
+class FacetIndexHolder:
+    """Process-wide facet index plus the shared change log / generation bookkeeping."""
+
+    def __init__(self):
+        self._index: FacetIndex | None = None
+        self._lock = threading.RLock()
+        self._build_state_lock = threading.Lock()
+        self._building = False
+        self.rebuilds = 0
+        self.incremental_refreshes = 0
+        self.last_error: str | None = None
+
+    # --- shared state -----------------------------------------------------------------------
+
+    @staticmethod
+    def generation() -> str:
+        return GENERATION_NAMESPACE.version()
+
+    @staticmethod
+    def log_seq() -> int:
+        return read_version(LOG_SEQ_KEY) or 0
+
+    def invalidate(self) -> None:
+        """Full rebuild on next use (labels / taxonomy / bulk import changed)."""
+        GENERATION_NAMESPACE.bump()
+
+    def publish_changes(self, product_ids) -> None:
+        ids = sorted({int(pid) for pid in product_ids if pid})
+        if not ids:
+            return
+        # Reserve the entry number, write the entry under it, then publish: the seq readers poll
+        # never moves past this entry before it exists.
+        backend = shared_cache()
+        # An evicted reservation counter restarts at the published seq, never below it.
+        backend.add(LOG_RESERVED_KEY, self.log_seq(), timeout=None)
+        seq = incr_counter(LOG_RESERVED_KEY)
+        try:
+            backend.set(f"{CACHE_PREFIX}:log:{seq}", ids, timeout=LOG_TTL)
+        except Exception:
+            # Unpublished gap: readers rebuild once LOG_GAP_GRACE has passed.
+            logger.exception("facet_index_log_write_failed seq=%s", seq)
+            return
+        # Monotonic max without a compare-and-set: a lower seq landing after a higher one only
+        # delays replay until the next publish; a missing entry below it is waited for.
+        if self.log_seq() < seq:
+            backend.set(LOG_SEQ_KEY, seq, timeout=None)
+            publish_invalidation(LOG_SEQ_KEY)
+
+    def products_changed(self, product_ids, *, using=None) -> None:
+        """Publish once the surrounding transaction commits (readers must see the new rows)."""
+        ids = [pid for pid in product_ids if pid]
+        if ids:
+            transaction.on_commit(lambda: self.publish_changes(ids), using=store_db_alias(using))
+
+    def variants_changed(self, variant_ids, *, using=None) -> None:
+        """products_changed for set-based in_stock / price writers that only know variant ids."""
+        ids = sorted({int(vid) for vid in variant_ids if vid})
+        if not ids:
+            return
+        db = store_db_alias(using)
+
+        def publish():
+            product_ids = ProductVariant.objects.using(db).filter(id__in=ids).values_list("product_id", flat=True)
+            self.publish_changes(product_ids.distinct())
+
+        transaction.on_commit(publish, using=db)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._index = None
+        store_cache().delete_many([GENERATION_KEY, LOG_SEQ_KEY, LOG_RESERVED_KEY])
+
+    # --- reading ----------------------------------------------------------------------------
+
+    def current(self) -> FacetIndex | None:
+        """Index caught up with the change log, or None while a full rebuild is pending."""
+        generation = self.generation()
+        index = self._index
+        if index is None or index.generation != generation or index.is_expired() or not self._catch_up(index):
+            if BACKGROUND_BUILD:
+                self.schedule_rebuild()
+                return None
+            index = self.rebuild(generation=generation)
+        return index
+
+    def _catch_up(self, index: FacetIndex) -> bool:
+        """
+        Replay the change log since `index.applied_seq`; False when a full rebuild is needed.
+        The delta is read from the DB before taking the lock; it is applied under the lock only
+        if no other thread advanced the index meanwhile (that thread's replay covers it).
+        """
+        start = index.applied_seq
+        seq = self.log_seq()
+        if seq <= start:
+            # A flushed cache restarts the counters below what this index applied.
+            return (read_version(LOG_RESERVED_KEY) or 0) >= start
+        if seq - start > MAX_LOG_REPLAY:
+            return False
+        keys = [f"{CACHE_PREFIX}:log:{n}" for n in range(start + 1, seq + 1)]
+        entries = store_cache().get_many(keys)
+        applied = start
+        product_ids = set()
+        for key in keys:
+            if key not in entries:
+                break
+            product_ids.update(entries[key])
+            applied += 1
+        if applied < seq:
+            missing = applied + 1
+            gap = index.log_gap
+            if gap is None or gap[0] != missing:
+                index.log_gap = (missing, time.time())
+            elif time.time() - gap[1] > LOG_GAP_GRACE:
+                return False
+        else:
+            index.log_gap = None
+        if applied == start:
+            return True
+        rows = index.fetch_products(product_ids)
+        with self._lock:
+            if index.applied_seq == start:
+                index.refresh_products(product_ids, rows=rows)
+                index.applied_seq = applied
+                self.incremental_refreshes += 1
+        return True
+
+    def rebuild(self, *, generation: str | None = None, using=None) -> FacetIndex:
+        # Read the shared state before querying: changes during the build are replayed later.
+        generation = generation or self.generation()
+        applied_seq = self.log_seq()
+        try:
+            index = FacetIndex.build(generation, applied_seq, using=using)
+        except Exception as exc:
+            self.last_error = str(exc)
+            raise
+        with self._lock:
+            self._index = index
+        self.rebuilds += 1
+        self.last_error = None
+        logger.info("facet_index_rebuilt %s", index.stats())
+        return index
+
+    def schedule_rebuild(self) -> None:
+        with self._build_state_lock:
+            if self._building:
+                return
+            self._building = True
+        threading.Thread(target=self._rebuild_in_thread, name="facet-index-rebuild", daemon=True).start()
+
+    def _rebuild_in_thread(self) -> None:
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception("facet_index_rebuild_failed")
+        finally:
+            close_old_connections()
+            with self._build_state_lock:
+                self._building = False
+
+    def facets(self, queryset, facet_params: dict, *, include_category: bool) -> dict | None:
+        """Facet payload from the index, or None when the caller should use the SQL path."""
+        if not INDEX_ENABLED:
+            return None
+        # Queries (result set, catch-up delta, inline rebuild) run before taking the lock other
+        # requests are waiting on.
+        rows = result_rows(queryset, facet_params)
+        index = self.current()
+        if index is None:
+            return None
+        with self._lock:
+            return index.facets(rows, include_category=include_category)
+
+    def stats(self) -> dict:
+        index = self._index
+        if index is None:
+            state = "cold"
+        elif index.generation != read_version(GENERATION_KEY) or index.is_expired():
+            state = "stale"
+        else:
+            state = "ready"
+        return {
+            "state": state,
+            "log_seq": self.log_seq(),
+            "rebuilds": self.rebuilds,
+            "incremental_refreshes": self.incremental_refreshes,
+            "last_error": self.last_error,
+            **(index.stats() if index is not None else {}),
+        }
+
+
+facet_index = FacetIndexHolder()
@@ -0,0 +1,133 @@
+"""
+Set-based ProductVariant.in_stock sync (store DB).
+
+- `batch_stock_totals`: one GROUP BY over MedicineBatch → (variant_id, stored in_stock, live batch sum).
+  Live = remaining_quantity of active, unexpired batches (same rule as services/stock.py).
+- `sync_in_stock_totals`: writes live sums back in chunks, one `UPDATE ... SET in_stock = (SELECT SUM ...)`
+  per chunk. The sum is recomputed inside the UPDATE (`live_stock_sum`), so a checkout deducting between
+  the aggregate and the write is not overwritten with the older total, and each chunk commits on its own
+  (no transaction spanning the run holds every variant row against checkout's lock_variants).
+  `only_drifted` writes drifted rows only, `dry_run` writes nothing. Returns counts + elapsed time.
+
+Callers: `sync_in_stock_cache` / `reconcile_in_stock` commands, `defer_in_stock_sync()` (imports),
+Celery `resync_in_stock_totals` (daily: expired batches leave the counter without a write).
+"""
+import time
+from dataclasses import dataclass, field
+
+from django.db import models
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from storeApp.models import MedicineBatch, ProductVariant
+from storeApp.services.facet_index import facet_index
+
+SYNC_CHUNK_SIZE = 1000
+
+
+@dataclass
+class InStockSyncResult:
+    checked: int = 0
+    drifted: int = 0
+    written: int = 0
+    elapsed_ms: float = 0.0
+    dry_run: bool = False
+    drift: list = field(default_factory=list)
+
+    @property
+    def rows_per_second(self) -> float:
+        return round(self.checked / (self.elapsed_ms / 1000), 1) if self.elapsed_ms else 0.0
+
+
+def batch_stock_totals(variant_ids=None, *, using="store") -> list[tuple[int, int, int]]:
+    """
+    (variant_id, stored, live) for every variant with batches, or for `variant_ids`.
+    Requested variants without any batch report live=0 (as sync_in_stock_cache does).
+    """
+    today = timezone.now().date()
+    live_filter = models.Q(active=True, remaining_quantity__gt=0, expiry_date__gte=today)
+    batches = MedicineBatch.objects.using(using).exclude(product_variant_id__isnull=True)
+    if variant_ids is not None:
+        variant_ids = set(variant_ids)
+        if not variant_ids:
+            return []
+        batches = batches.filter(product_variant_id__in=variant_ids)
+    rows = [
+        (variant_id, stored, live or 0)
+        for variant_id, stored, live in (
+            batches.order_by()
+            .values("product_variant_id")
+            .annotate(
+                stored=models.Max("product_variant__in_stock"),
+                live=models.Sum("remaining_quantity", filter=live_filter),
+            )
+            .values_list("product_variant_id", "stored", "live")
+        )
+    ]
+    if variant_ids is not None:
+        missing = variant_ids - {row[0] for row in rows}
+        if missing:
+            rows += [
+                (variant_id, stored, 0)
+                for variant_id, stored in ProductVariant.objects.using(using)
+                .filter(id__in=missing)
+                .values_list("id", "in_stock")
+            ]
+    return sorted(rows)
+
+
+def live_stock_sum(*, using="store"):
+    """Correlated live batch sum for the outer ProductVariant row (0 without live batches)."""
+    today = timezone.now().date()
+    batch_sum = (
+        MedicineBatch.objects.using(using)
+        .filter(
+            product_variant_id=models.OuterRef("pk"),
+            active=True,
+            remaining_quantity__gt=0,
+            expiry_date__gte=today,
+        )
+        .order_by()
+        .values("product_variant_id")
+        .annotate(total=models.Sum("remaining_quantity"))
+        .values("total")
+    )
+    return Coalesce(models.Subquery(batch_sum), 0)
+
+
+def _write_chunk(variant_ids, *, only_drifted, using) -> int:
+    live = live_stock_sum(using=using)
+    rows = ProductVariant.objects.using(using).filter(id__in=variant_ids)
+    if only_drifted:
+        # Re-checked in the UPDATE: a row that converged since the aggregate is left alone.
+        rows = rows.exclude(in_stock=live)
+    written = rows.update(in_stock=live)
+    facet_index.variants_changed(variant_ids, using=using)
+    return written
+
+
+def sync_in_stock_totals(
+    variant_ids=None, *, only_drifted=False, dry_run=False, chunk_size=SYNC_CHUNK_SIZE, using="store"
+) -> InStockSyncResult:
+    """Set in_stock = live batch sum for every variant with batches (or `variant_ids`)."""
+    started = time.perf_counter()
+    rows = batch_stock_totals(variant_ids, using=using)
+    drift = [(variant_id, stored, live) for variant_id, stored, live in rows if stored != live]
+    targets = [variant_id for variant_id, _stored, _live in (drift if only_drifted else rows)]
+    written = 0
+    if not dry_run:
+        for start in range(0, len(targets), chunk_size):
+            written += _write_chunk(targets[start : start + chunk_size], only_drifted=only_drifted, using=using)
+    return InStockSyncResult(
+        checked=len(rows),
+        drifted=len(drift),
+        written=written,
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 2),
+        dry_run=dry_run,
+        drift=[{"variant_id": variant_id, "stored": stored, "live": live} for variant_id, stored, live in drift],
+    )
+
+
+def in_stock_drift(*, using="store", variant_ids=None) -> list[dict]:
+    """Variants whose in_stock differs from the live batch sum (one aggregate query)."""
+    return sync_in_stock_totals(variant_ids, dry_run=True, using=using).drift
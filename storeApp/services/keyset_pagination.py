@@ -0,0 +1,132 @@
+"""
+Keyset (cursor) pagination for store listings: /search/, category pages, /products/.
+
+The cursor is the sort tuple of the last row on the page (e.g. relevance_score, search_rank,
+product_ranking, in_stock, id), signed with django.core.signing so clients cannot forge or
+edit it. The next page is `WHERE (sort tuple) after cursor ORDER BY ... LIMIT n + 1` instead of
+OFFSET, and no COUNT(*) runs unless the caller asks for it.
+"""
+from __future__ import annotations
+
+import datetime
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+from typing import NamedTuple, Sequence
+
+from django.core import signing
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+
+CURSOR_SALT = "storeApp.keyset_pagination"
+PAGINATION_QUERY_PARAM = "pagination"
+CURSOR_QUERY_PARAM = "cursor"
+INCLUDE_TOTAL_QUERY_PARAM = "include_total"
+CURSOR_MODE = "cursor"
+INVALID_CURSOR_MESSAGE = "Invalid cursor"
+
+
+class KeysetPage(NamedTuple):
+    items: list
+    next_cursor: str | None
+    has_more: bool
+
+
+def wants_cursor_pagination(request) -> bool:
+    params = request.query_params
+    return params.get(PAGINATION_QUERY_PARAM) == CURSOR_MODE or bool(params.get(CURSOR_QUERY_PARAM))
+
+
+def wants_total(request) -> bool:
+    return (request.query_params.get(INCLUDE_TOTAL_QUERY_PARAM) or "").strip().lower() in {"1", "true", "yes"}
+
+
+def with_unique_tiebreaker(ordering: Sequence[str]) -> list[str]:
+    """Keyset needs a total order: append id unless already the last key."""
+    ordering = list(ordering)
+    if not ordering or ordering[-1].lstrip("-") not in {"id", "pk"}:
+        ordering.append("id")
+    return ordering
+
+
+def _encode_value(value):
+    if isinstance(value, Decimal):
+        return {"d": str(value)}
+    if isinstance(value, datetime.datetime):
+        return {"t": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if "d" in value:
+            return Decimal(value["d"])
+        if "t" in value:
+            return parse_datetime(value["t"])
+    return value
+
+
+def encode_cursor(item, ordering: Sequence[str], *, scope: str) -> str:
+    values = [_encode_value(getattr(item, field.lstrip("-"))) for field in ordering]
+    return signing.dumps({"s": scope, "o": list(ordering), "v": values}, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(token: str, ordering: Sequence[str], *, scope: str) -> list:
+    """Values of the cursor row; NotFound when tampered or issued for another sort/listing."""
+    try:
+        payload = signing.loads(token, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        raise NotFound(INVALID_CURSOR_MESSAGE)
+    if payload.get("s") != scope or payload.get("o") != list(ordering):
+        raise NotFound(INVALID_CURSOR_MESSAGE)
+    values = payload.get("v") or []
+    if len(values) != len(ordering):
+        raise NotFound(INVALID_CURSOR_MESSAGE)
+    return [_decode_value(value) for value in values]
+
+
+def after_cursor_q(ordering: Sequence[str], values: Sequence) -> Q:
+    """(a, b, c) after (x, y, z) → a>x OR (a=x AND b>y) OR (a=x AND b=y AND c>z); `-` flips >."""
+    clauses = []
+    equal_prefix = {}
+    for field, value in zip(ordering, values):
+        name = field.lstrip("-")
+        lookup = "lt" if field.startswith("-") else "gt"
+        clauses.append(Q(**equal_prefix, **{f"{name}__{lookup}": value}))
+        equal_prefix[name] = value
+    return reduce(or_, clauses)
+
+
+def paginate_keyset(
+    queryset: QuerySet,
+    ordering: Sequence[str],
+    *,
+    cursor: str | None,
+    page_size: int,
+    scope: str,
+) -> KeysetPage:
+    """
+    One page of `queryset` ordered by `ordering` (must end with a unique key).
+
+    `queryset` must not be window-filtered: wrap `one_variant_per_product` results with
+    `keyset_source()` first so the cursor predicate runs after the dedupe.
+    """
+    ordering = list(ordering)
+    if cursor:
+        queryset = queryset.filter(after_cursor_q(ordering, decode_cursor(cursor, ordering, scope=scope)))
+    rows = list(queryset.order_by(*ordering)[: page_size + 1])
+    has_more = len(rows) > page_size
+    items = rows[:page_size]
+    next_cursor = encode_cursor(items[-1], ordering, scope=scope) if has_more and items else None
+    return KeysetPage(items=items, next_cursor=next_cursor, has_more=has_more)
+
+
+def keyset_source(annotated: QuerySet, deduped: QuerySet) -> QuerySet:
+    """
+    Rows of `annotated` that survive the one-variant-per-product window in `deduped`.
+
+    Filtering `deduped` directly would put the cursor predicate before ROW_NUMBER() and
+    let a product's second variant resurface on a later page.
+    """
+    return annotated.filter(id__in=deduped.values("id"))
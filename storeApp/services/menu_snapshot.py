@@ -0,0 +1,204 @@
+"""
+Mega-menu snapshot for GET /api/store/categories/.
+
+The whole menu (level 0 → level 1 → top-5 level 2 + top products) is rendered once to JSON
+bytes and stored in the store cache (services/cache_backend.py) under its content hash; a small
+pointer key names the current blob. Readers resolve pointer → blob, so a request serves either the previous or the
+new snapshot, never a half-built one. The hash doubles as the ETag for If-None-Match / 304.
+
+Catalog signals (signals/menu_snapshot.py) write a shared stale marker; the next reader in
+any process rebuilds — in a background thread when MENU_SNAPSHOT_BACKGROUND_BUILD is on
+(stale menu served meanwhile), inline otherwise.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Prefetch
+from rest_framework.renderers import JSONRenderer
+
+from storeApp.models import Category
+from storeApp.services.cache_backend import publish_invalidation, read_version, shared_cache, store_cache
+
+logger = logging.getLogger("storeApp.menu")
+
+CACHE_PREFIX = "store_menu_snapshot"
+POINTER_KEY = f"{CACHE_PREFIX}:current"
+STALE_KEY = f"{CACHE_PREFIX}:stale_at"
+SNAPSHOT_TTL = getattr(settings, "MENU_SNAPSHOT_TTL", 600)
+BLOB_TIMEOUT = getattr(settings, "MENU_SNAPSHOT_BLOB_TIMEOUT", 86400)
+BACKGROUND_BUILD = getattr(settings, "MENU_SNAPSHOT_BACKGROUND_BUILD", True)
+
+
+@dataclass(frozen=True)
+class MenuSnapshot:
+    etag: str
+    body: bytes
+    started_at: float
+    built_at: float
+    build_ms: float
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self.body)
+
+
+def _blob_key(etag: str) -> str:
+    digest = etag.strip('"')
+    return f"{CACHE_PREFIX}:blob:{digest}"
+
+
+def build_menu_payload():
+    """Serialized menu, same shape the category list endpoint always returned."""
+    from storeApp.serializers import CategoryLevel0Serializer
+
+    level1_prefetch = Prefetch(
+        "children",
+        queryset=Category.objects.filter(level=1, active=True).order_by("name"),
+    )
+    level0_categories = (
+        Category.objects.filter(level=0, active=True).prefetch_related(level1_prefetch).order_by("name")
+    )
+    return CategoryLevel0Serializer(level0_categories, many=True).data
+
+
+def build_menu_snapshot() -> MenuSnapshot:
+    started_at = time.time()
+    started = time.perf_counter()
+    body = JSONRenderer().render(build_menu_payload())
+    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+    return MenuSnapshot(
+        etag=etag,
+        body=body,
+        started_at=started_at,
+        built_at=time.time(),
+        build_ms=(time.perf_counter() - started) * 1000,
+    )
+
+
+class MenuSnapshotHolder:
+    """Process-local copy of the shared snapshot plus rebuild bookkeeping."""
+
+    def __init__(self):
+        self._snapshot: MenuSnapshot | None = None
+        self._build_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._building = False
+        self.rebuilds = 0
+        self.last_error: str | None = None
+
+    def mark_stale(self) -> None:
+        shared_cache().set(STALE_KEY, time.time(), timeout=None)
+        publish_invalidation(STALE_KEY)
+
+    def clear(self) -> None:
+        self._snapshot = None
+        store_cache().delete_many([POINTER_KEY, STALE_KEY])
+
+    def _load_shared(self) -> tuple[MenuSnapshot | None, float | None]:
+        # Pointer and stale marker change in place: read like versions (never a stale L1 copy).
+        pointer = read_version(POINTER_KEY)
+        stale_at = read_version(STALE_KEY)
+        snapshot = self._snapshot
+        if pointer and (snapshot is None or snapshot.etag != pointer["etag"]):
+            blob = store_cache().get(_blob_key(pointer["etag"]))
+            if blob is not None:
+                snapshot = self._snapshot = MenuSnapshot(**blob)
+        return snapshot, stale_at
+
+    def current(self) -> MenuSnapshot:
+        snapshot, stale_at = self._load_shared()
+        if snapshot is None:
+            return self.rebuild()
+        stale = (stale_at is not None and stale_at >= snapshot.started_at) or (
+            time.time() - snapshot.built_at > SNAPSHOT_TTL
+        )
+        if stale:
+            if not BACKGROUND_BUILD:
+                return self.rebuild()
+            self.schedule_rebuild()
+        return snapshot
+
+    def rebuild(self) -> MenuSnapshot:
+        with self._build_lock:
+            try:
+                snapshot = build_menu_snapshot()
+            except Exception as exc:
+                self.last_error = str(exc)
+                raise
+            # Blob first, then pointer: readers never resolve a pointer to a missing/partial blob.
+            store_cache().set(
+                _blob_key(snapshot.etag),
+                {
+                    "etag": snapshot.etag,
+                    "body": snapshot.body,
+                    "started_at": snapshot.started_at,
+                    "built_at": snapshot.built_at,
+                    "build_ms": snapshot.build_ms,
+                },
+                timeout=BLOB_TIMEOUT,
+            )
+            shared_cache().set(POINTER_KEY, {"etag": snapshot.etag, "built_at": snapshot.built_at}, timeout=BLOB_TIMEOUT)
+            publish_invalidation(POINTER_KEY)
+            self._snapshot = snapshot
+            self.rebuilds += 1
+            self.last_error = None
+        logger.info(
+            "menu_snapshot_rebuilt etag=%s size_bytes=%s build_ms=%.2f",
+            snapshot.etag,
+            snapshot.size_bytes,
+            snapshot.build_ms,
+        )
+        return snapshot
+
+    def schedule_rebuild(self) -> None:
+        with self._state_lock:
+            if self._building:
+                return
+            self._building = True
+        threading.Thread(target=self._rebuild_in_thread, name="menu-snapshot-rebuild", daemon=True).start()
+
+    def _rebuild_in_thread(self) -> None:
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception("menu_snapshot_rebuild_failed")
+        finally:
+            close_old_connections()
+            with self._state_lock:
+                self._building = False
+
+    def stats(self) -> dict:
+        snapshot, stale_at = self._load_shared()
+        if snapshot is None:
+            state = "cold"
+        elif stale_at is not None and stale_at >= snapshot.started_at:
+            state = "stale"
+        else:
+            state = "ready"
+        stats = {
+            "state": state,
+            "ttl_seconds": SNAPSHOT_TTL,
+            "rebuilds": self.rebuilds,
+            "last_error": self.last_error,
+        }
+        if snapshot is not None:
+            stats.update(
+                {
+                    "etag": snapshot.etag,
+                    "size_bytes": snapshot.size_bytes,
+                    "build_ms": round(snapshot.build_ms, 2),
+                    "built_at": snapshot.built_at,
+                    "age_seconds": round(time.time() - snapshot.built_at, 1),
+                }
+            )
+        return stats
+
+
+menu_snapshot = MenuSnapshotHolder()
@@ -0,0 +1,166 @@
+"""
+Order number allocation (store DB): `ORD{YYYYMMDD}{NNNN}`, unique, one round trip, no retry loop.
+
+- PostgreSQL: per-day sequence `store_order_number_YYYYMMDD` → `nextval()` (non-transactional, so
+  concurrent checkouts never wait on each other until commit).
+- Other vendors: counter row per day (`OrderNumberCounter`) bumped with
+  `INSERT ... ON CONFLICT DO UPDATE ... RETURNING` (SQLite >= 3.35).
+- Block pre-allocation: settings.STORE_ORDER_NUMBER_BLOCK > 1 lets each worker process take N numbers
+  per round trip and hand them out from memory. Numbers stay unique but are no longer strictly
+  increasing across workers, and an unused block tail is skipped on restart (gap-tolerant).
+- First allocation of the day per process seeds the sequence / counter from the highest existing
+  `ORD{date}` number, so switching over mid-day cannot collide with rows written by the old generator.
+  The day only counts as seeded once the seed is committed: PostgreSQL creates and seeds the
+  sequence on its own autocommit connection (losing the create race to another process is fine);
+  the counter row is written in the caller's transaction and marked seeded on commit, so a
+  rolled-back first checkout re-seeds instead of restarting at 0001. A counter block's unused tail
+  is likewise only kept once its transaction commits.
+"""
+import re
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.models.functions import Length
+from django.utils import timezone
+
+ORDER_NUMBER_PREFIX = "ORD"
+ORDER_NUMBER_BLOCK = max(1, int(getattr(settings, "STORE_ORDER_NUMBER_BLOCK", 1)))
+SEQUENCE_PREFIX = "store_order_number_"
+
+_COUNTER_UPSERT = (
+    "INSERT INTO store_order_number_counter (day, last_value) VALUES (%s, %s) "
+    "ON CONFLICT (day) DO UPDATE SET last_value = store_order_number_counter.last_value + %s "
+    "RETURNING last_value"
+)
+
+
+def format_order_number(day, value) -> str:
+    return f"{ORDER_NUMBER_PREFIX}{day:%Y%m%d}{value:04d}"
+
+
+def max_existing_number(day, *, using="store") -> int:
+    """Highest numeric suffix already stored for `day` (0 when none)."""
+    from storeApp.models import Order
+
+    prefix = f"{ORDER_NUMBER_PREFIX}{day:%Y%m%d}"
+    numbers = (
+        Order.objects.using(using)
+        .filter(order_number__startswith=prefix)
+        .order_by(Length("order_number").desc(), "-order_number")
+        .values_list("order_number", flat=True)[:20]
+    )
+    # Suffixes are zero-padded to 4 digits only, so length sorts before text; skip hand-entered numbers.
+    for number in numbers:
+        suffix = number[len(prefix):]
+        if re.fullmatch(r"\d+", suffix):
+            return int(suffix)
+    return 0
+
+
+class OrderNumberAllocator:
+    """Process-wide allocator; `allocate()` is thread-safe."""
+
+    def __init__(self, block_size=ORDER_NUMBER_BLOCK):
+        self.block_size = max(1, int(block_size))
+        self._lock = threading.Lock()
+        self._pending: dict[tuple, deque] = {}
+        self._seeded: set[tuple] = set()
+        self.allocations = 0
+        self.round_trips = 0
+        self.retries = 0
+
+    def allocate(self, *, using="store", day=None) -> str:
+        day = day or timezone.localtime(timezone.now()).date()
+        key = (using, day)
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending:
+                value = pending.popleft()
+            else:
+                # Blocks of past days are dropped; their tails are gaps.
+                self._pending = {k: v for k, v in self._pending.items() if k[1] == day}
+                value = self._reserve(using, day)
+            self.allocations += 1
+            return format_order_number(day, value)
+
+    def _reserve(self, using, day) -> int:
+        """Reserve a block and return its first value; the tail is queued once it is durable."""
+        connection = connections[using]
+        key = (using, day)
+        seed = None
+        if key not in self._seeded:
+            seed = max_existing_number(day, using=using)
+        if connection.vendor == "postgresql":
+            if seed is not None:
+                self.seed_sequence(day, seed, using=using)
+                self._seeded.add(key)
+            # nextval() is not transactional: a rollback only leaves gaps, so the block is durable now.
+            values = self._reserve_from_sequence(connection, day)
+            self._keep_tail(key, values[1:])
+        else:
+            values = self._reserve_from_counter(connection, day, seed)
+            # The seed and the block live in the caller's transaction; a rollback undoes both.
+            transaction.on_commit(lambda: self._committed(key, values[1:], seeded=seed is not None), using=using)
+        self.round_trips += 1
+        return values[0]
+
+    def _committed(self, key, tail, *, seeded):
+        if seeded:
+            self._seeded.add(key)
+        self._keep_tail(key, tail)
+
+    def _keep_tail(self, key, tail):
+        if tail:
+            self._pending.setdefault(key, deque()).extend(tail)
+
+    @staticmethod
+    def seed_sequence(day, seed, *, using="store"):
+        """Create the day's sequence (at least `seed`) on an autocommit connection."""
+        name = f"{SEQUENCE_PREFIX}{day:%Y%m%d}"
+        connection = connections[using]
+        # Inside a request transaction the DDL would roll back with it; seed on a side connection.
+        side = connections.create_connection(using) if connection.in_atomic_block else None
+        try:
+            with (side or connection).cursor() as cursor:
+                try:
+                    cursor.execute(f"CREATE SEQUENCE IF NOT EXISTS {name} START WITH {seed + 1}")
+                except DatabaseError:
+                    # Concurrent IF NOT EXISTS at day rollover (duplicate pg_type): the other one won.
+                    pass
+                # Another process may have created it from an older seed (or before a manual insert).
+                cursor.execute(f"SELECT setval('{name}', %s) WHERE (SELECT last_value FROM {name}) < %s", [seed, seed])
+        finally:
+            if side is not None:
+                side.close()
+
+    def _reserve_from_sequence(self, connection, day) -> list[int]:
+        name = f"{SEQUENCE_PREFIX}{day:%Y%m%d}"
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT nextval('{name}') FROM generate_series(1, %s)", [self.block_size])
+            return sorted(row[0] for row in cursor.fetchall())
+
+    def _reserve_from_counter(self, connection, day, seed) -> list[int]:
+        day_value = connection.ops.adapt_datefield_value(day)
+        with connection.cursor() as cursor:
+            if seed:
+                cursor.execute(
+                    "INSERT INTO store_order_number_counter (day, last_value) VALUES (%s, %s) "
+                    "ON CONFLICT (day) DO UPDATE SET last_value = MAX(store_order_number_counter.last_value, %s)",
+                    [day_value, seed, seed],
+                )
+            cursor.execute(_COUNTER_UPSERT, [day_value, self.block_size, self.block_size])
+            last = cursor.fetchone()[0]
+        return list(range(last - self.block_size + 1, last + 1))
+
+    def stats(self) -> dict:
+        return {
+            "block_size": self.block_size,
+            "allocations": self.allocations,
+            "round_trips": self.round_trips,
+            "retries": self.retries,
+        }
+
+
+order_number_allocator = OrderNumberAllocator()
@@ -4,9 +4,9 @@ from __future__ import annotations
 from django.conf import settings
 from django.db.models import Exists, OuterRef, Q
 
-from storeApp.models import Category, Product, ProductCategory, ProductVariant
+from storeApp.models import Category, CategoryClosure, Product, ProductCategory, ProductVariant
 
-# Cap BFS depth — store category tree is shallow (0→1→2).
+# Cap BFS depth (closure fallback) — store category tree is shallow (0→1→2).
 _MAX_CATEGORY_TREE_DEPTH = 8
 
 
@@ -56,22 +56,54 @@ def category_tree_ids(category: Category, *, using=None) -> list[int]:
     """
     Category id + all active descendants.
 
-    Uses parent_id BFS (reliable) with path_slug prefix as supplement when tree is sparse.
+    A descendant is included when it is active, whatever the state of the nodes between it and
+    `category` (an inactive intermediate hides only itself), plus active categories whose
+    path_slug sits under this category's path (supplement for rows whose parent_id is missing,
+    as the BFS always did). One query: CategoryClosure lookup UNION path prefix; falls back to
+    the parent_id BFS when the closure has no row for this category yet (not rebuilt after a
+    bulk sync).
     """
     db = store_db_alias(using)
+    ids = (
+        CategoryClosure.objects.using(db)
+        .filter(ancestor_id=category.id)
+        .filter(Q(depth=0) | Q(descendant__active=True))
+        .order_by()
+        .values_list("descendant_id", flat=True)
+    )
+    category_path_slug = (category.path_slug or category.slug or "").strip()
+    if category_path_slug:
+        ids = ids.union(
+            Category.objects.using(db)
+            .filter(active=True, path_slug__istartswith=f"{category_path_slug}/")
+            .order_by()
+            .values_list("id", flat=True)
+        )
+    ids = list(ids)
+    if category.id in ids:
+        return ids
+    return _category_tree_ids_bfs(category, using=db)
+
+
+def _category_tree_ids_bfs(category: Category, *, using=None) -> list[int]:
+    """Legacy walk: parent_id BFS with path_slug prefix as supplement when tree is sparse."""
+    db = store_db_alias(using)
     ids: set[int] = {category.id}
+    seen: set[int] = {category.id}
     frontier = [category.id]
 
     for _ in range(_MAX_CATEGORY_TREE_DEPTH):
-        child_ids = list(
+        children = list(
             Category.objects.using(db)
-            .filter(active=True, parent_id__in=frontier)
-            .values_list("id", flat=True)
+            .filter(parent_id__in=frontier)
+            .values_list("id", "active")
         )
-        new_ids = [cid for cid in child_ids if cid not in ids]
+        # Walk through inactive nodes (they only hide themselves), as the closure lookup does.
+        new_ids = [cid for cid, _active in children if cid not in seen]
         if not new_ids:
             break
-        ids.update(new_ids)
+        seen.update(new_ids)
+        ids.update(cid for cid, active in children if active)
         frontier = new_ids
 
     category_path_slug = (category.path_slug or category.slug or "").strip()
@@ -0,0 +1,278 @@
+"""
+ProductSearchDocument maintenance + query helpers for GET /api/store/search/ and /search/suggest/.
+
+Documents hold accent-folded copies of the searchable columns so the hot path filters one
+indexed table instead of Lower()-ing seven joined columns per request.
+"""
+from __future__ import annotations
+
+import threading
+import unicodedata
+from collections import defaultdict
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramSimilarity
+from django.db import connections
+from django.db.models import Case, DecimalField, IntegerField, Q, Value, When
+from django.db.models.functions import Cast
+
+from storeApp.models import Product, ProductCategory, ProductSearchDocument, ProductVariant
+from storeApp.services.product_category_helpers import store_db_alias
+
+DEFAULT_CHUNK_SIZE = 500
+TSVECTOR_CONFIG = "simple"
+FIELD_SEPARATOR = " | "
+
+DOCUMENT_TEXT_FIELDS = (
+    "sku_text",
+    "mid_text",
+    "name_text",
+    "web_name_text",
+    "category_text",
+    "brand_text",
+    "ingredients_text",
+    "search_text",
+)
+
+# Same ordering as the legacy Lower()/__contains tiers; tsvector weights follow the groups
+# (A: exact identifiers + name, B: web name, C: taxonomy, D: ingredients).
+RELEVANCE_TIERS = (
+    ("sku_text", "exact", 110),
+    ("mid_text", "exact", 108),
+    ("name_text", "exact", 100),
+    ("web_name_text", "exact", 95),
+    ("sku_text", "startswith", 88),
+    ("name_text", "startswith", 80),
+    ("web_name_text", "startswith", 75),
+    ("name_text", "contains", 60),
+    ("web_name_text", "contains", 55),
+    ("sku_text", "contains", 50),
+    ("mid_text", "contains", 48),
+    ("category_text", "contains", 35),
+    ("brand_text", "contains", 30),
+    ("ingredients_text", "contains", 20),
+)
+TAXONOMY_FIELDS = {"category_text", "brand_text"}
+
+_deferred = threading.local()
+
+
+def fold_search_text(value) -> str:
+    """Lower-case, strip Vietnamese diacritics (đ → d) and collapse whitespace."""
+    if not value:
+        return ""
+    text = unicodedata.normalize("NFKD", str(value))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = text.replace("đ", "d").replace("Đ", "D").casefold()
+    return " ".join(text.split())
+
+
+def _is_postgres(using) -> bool:
+    return connections[using].vendor == "postgresql"
+
+
+def _chunks(ids, size):
+    ids = sorted(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start : start + size]
+
+
+def _category_names_by_product(product_ids, using):
+    names = defaultdict(list)
+    links = (
+        ProductCategory.objects.using(using)
+        .filter(product_id__in=product_ids)
+        .order_by("product_id", "-is_primary", "sort_order", "category_id")
+        .values_list("product_id", "category__name")
+    )
+    for product_id, name in links:
+        if name:
+            names[product_id].append(name)
+    return names
+
+
+def build_search_documents(variant_ids, *, using=None) -> list[ProductSearchDocument]:
+    """Unsaved documents for the given variants (2 queries regardless of batch size)."""
+    db = store_db_alias(using)
+    rows = list(
+        ProductVariant.objects.using(db)
+        .filter(id__in=variant_ids)
+        .values_list(
+            "id",
+            "product_id",
+            "sku",
+            "product__mid",
+            "product__name",
+            "product__web_name",
+            "product__category__name",
+            "product__brand__name",
+            "product__ingredients",
+        )
+    )
+    if not rows:
+        return []
+    m2m_names = _category_names_by_product({row[1] for row in rows}, db)
+
+    documents = []
+    for variant_id, product_id, sku, mid, name, web_name, primary_category, brand, ingredients in rows:
+        category_names = []
+        for category_name in [primary_category, *m2m_names.get(product_id, [])]:
+            folded = fold_search_text(category_name)
+            if folded and folded not in category_names:
+                category_names.append(folded)
+        values = {
+            "sku_text": fold_search_text(sku),
+            "mid_text": fold_search_text(mid),
+            "name_text": fold_search_text(name),
+            "web_name_text": fold_search_text(web_name),
+            "category_text": FIELD_SEPARATOR.join(category_names),
+            "brand_text": fold_search_text(brand),
+            "ingredients_text": fold_search_text(ingredients),
+        }
+        values["search_text"] = FIELD_SEPARATOR.join(v for v in values.values() if v)
+        documents.append(ProductSearchDocument(variant_id=variant_id, product_id=product_id, **values))
+    return documents
+
+
+def _update_search_vectors(variant_ids, using) -> None:
+    vector = (
+        SearchVector("sku_text", "mid_text", "name_text", weight="A", config=TSVECTOR_CONFIG)
+        + SearchVector("web_name_text", weight="B", config=TSVECTOR_CONFIG)
+        + SearchVector("category_text", "brand_text", weight="C", config=TSVECTOR_CONFIG)
+        + SearchVector("ingredients_text", weight="D", config=TSVECTOR_CONFIG)
+    )
+    ProductSearchDocument.objects.using(using).filter(variant_id__in=variant_ids).update(search_vector=vector)
+
+
+def refresh_variant_documents(variant_ids, *, using=None, chunk_size=DEFAULT_CHUNK_SIZE) -> int:
+    """Upsert documents for the given variants. Returns number of rows written."""
+    variant_ids = {vid for vid in variant_ids if vid}
+    if not variant_ids:
+        return 0
+    pending = getattr(_deferred, "pending", None)
+    if pending is not None:
+        pending["variants"].update(variant_ids)
+        return 0
+
+    db = store_db_alias(using)
+    written = 0
+    for chunk in _chunks(variant_ids, chunk_size):
+        documents = build_search_documents(chunk, using=db)
+        if not documents:
+            continue
+        ProductSearchDocument.objects.using(db).bulk_create(
+            documents,
+            update_conflicts=True,
+            unique_fields=["variant"],
+            update_fields=["product", *DOCUMENT_TEXT_FIELDS, "updated_at"],
+        )
+        if _is_postgres(db):
+            _update_search_vectors(chunk, db)
+        written += len(documents)
+    return written
+
+
+def refresh_product_documents(product_ids, *, using=None, chunk_size=DEFAULT_CHUNK_SIZE) -> int:
+    """Refresh every variant document of the given products."""
+    product_ids = {pid for pid in product_ids if pid}
+    if not product_ids:
+        return 0
+    pending = getattr(_deferred, "pending", None)
+    if pending is not None:
+        pending["products"].update(product_ids)
+        return 0
+
+    db = store_db_alias(using)
+    variant_ids = ProductVariant.objects.using(db).filter(product_id__in=product_ids).values_list("id", flat=True)
+    return refresh_variant_documents(list(variant_ids), using=db, chunk_size=chunk_size)
+
+
+def product_ids_for_categories(category_ids, *, using=None) -> set[int]:
+    db = store_db_alias(using)
+    primary = Product.objects.using(db).filter(category_id__in=category_ids).values_list("id", flat=True)
+    linked = ProductCategory.objects.using(db).filter(category_id__in=category_ids).values_list(
+        "product_id", flat=True
+    )
+    return set(primary) | set(linked)
+
+
+def rebuild_search_documents(*, missing_only=False, using=None, chunk_size=DEFAULT_CHUNK_SIZE) -> dict:
+    """Full (or missing-only) rebuild. Orphans never exist: documents cascade with their variant."""
+    db = store_db_alias(using)
+    variants = ProductVariant.objects.using(db)
+    if missing_only:
+        variants = variants.filter(search_document__isnull=True)
+    variant_ids = list(variants.values_list("id", flat=True))
+    written = 0
+    for chunk in _chunks(variant_ids, chunk_size):
+        written += refresh_variant_documents(chunk, using=db, chunk_size=chunk_size)
+    return {"variants": len(variant_ids), "written": written}
+
+
+@contextmanager
+def defer_search_document_refresh(*, using=None):
+    """
+    Collect refresh requests (e.g. during a CSV import) and apply them once on exit.
+
+    Nested blocks join the outer one.
+    """
+    if getattr(_deferred, "pending", None) is not None:
+        yield
+        return
+    _deferred.pending = {"variants": set(), "products": set()}
+    try:
+        yield
+    finally:
+        pending = _deferred.pending
+        _deferred.pending = None
+        refresh_product_documents(pending["products"], using=using)
+        refresh_variant_documents(pending["variants"], using=using)
+
+
+def search_match_q(query: str, *, using=None, prefix="search_document__") -> Q:
+    """Variant filter: trigram-indexed substring on search_text, plus tsvector match on PostgreSQL."""
+    folded = fold_search_text(query)
+    condition = Q(**{f"{prefix}search_text__contains": folded})
+    if _is_postgres(store_db_alias(using)):
+        condition |= Q(**{f"{prefix}search_vector": SearchQuery(folded, config=TSVECTOR_CONFIG)})
+    return condition
+
+
+# Fixed-precision rank: floats recomputed per query do not compare stably against a cursor value.
+SEARCH_RANK_FIELD = DecimalField(max_digits=12, decimal_places=6)
+
+
+def annotate_search_relevance(
+    queryset,
+    query: str,
+    *,
+    using=None,
+    include_taxonomy=True,
+    score_field="relevance_score",
+    prefix="search_document__",
+):
+    """
+    Annotate the legacy tier score (`score_field`) and `search_rank`.
+
+    search_rank = ts_rank over the weighted vector + trigram similarity on name (PostgreSQL);
+    it only breaks ties inside a tier so ordering stays compatible with the old Case/When.
+    Both are `real`: the sum is cast to numeric(SEARCH_RANK_FIELD), so the value a keyset cursor
+    carries round-trips exactly and `=` / `<` against it match the ORDER BY.
+    """
+    folded = fold_search_text(query)
+    whens = [
+        When(**{f"{prefix}{field}__{lookup}": folded}, then=Value(score))
+        for field, lookup, score in RELEVANCE_TIERS
+        if include_taxonomy or field not in TAXONOMY_FIELDS
+    ]
+    annotations = {score_field: Case(*whens, default=Value(0), output_field=IntegerField())}
+    if _is_postgres(store_db_alias(using)):
+        annotations["search_rank"] = Cast(
+            SearchRank(f"{prefix}search_vector", SearchQuery(folded, config=TSVECTOR_CONFIG))
+            + TrigramSimilarity(f"{prefix}name_text", folded),
+            output_field=SEARCH_RANK_FIELD,
+        )
+    else:
+        annotations["search_rank"] = Value(Decimal("0"), output_field=SEARCH_RANK_FIELD)
+    return queryset.annotate(**annotations)
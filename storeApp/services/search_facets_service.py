@@ -9,14 +9,15 @@ import hashlib
 import json
 
 from django.conf import settings
-from django.core.cache import cache
 from django.db.models import Count, Q
 
+from storeApp.services.cache_backend import VersionedNamespace, store_cache
 from storeApp.services.country_normalize import normalize_country_label
 
 CACHE_PREFIX = "store_search_facets"
 CACHE_TIMEOUT = getattr(settings, "SEARCH_FACETS_CACHE_TTL", 3600)
 CACHE_VERSION_KEY = f"{CACHE_PREFIX}:version"
+FACETS_NAMESPACE = VersionedNamespace(CACHE_PREFIX)
 
 MAX_ATTRIBUTE_GROUPS = getattr(settings, "SEARCH_FACETS_MAX_ATTRIBUTE_GROUPS", 12)
 MAX_OPTIONS_PER_ATTRIBUTE = getattr(settings, "SEARCH_FACETS_MAX_OPTIONS_PER_ATTRIBUTE", 30)
@@ -36,19 +37,20 @@ class SearchFacetsService:
 
     @staticmethod
     def _cache_version() -> int:
-        return cache.get(CACHE_VERSION_KEY) or 1
+        return FACETS_NAMESPACE.version()
 
     @staticmethod
     def _cache_key(facet_params: dict) -> str:
         payload = json.dumps(facet_params, sort_keys=True, default=str)
         digest = hashlib.md5(payload.encode()).hexdigest()[:16]
-        version = SearchFacetsService._cache_version()
-        return f"{CACHE_PREFIX}:v{version}:{digest}"
+        return FACETS_NAMESPACE.key(digest)
 
     @staticmethod
     def invalidate_all_cache() -> None:
-        version = SearchFacetsService._cache_version()
-        cache.set(CACHE_VERSION_KEY, version + 1, timeout=None)
+        from storeApp.services.facet_index import facet_index
+
+        FACETS_NAMESPACE.bump()
+        facet_index.invalidate()
 
     @staticmethod
     def facet_params_from_request(
@@ -73,17 +75,27 @@ class SearchFacetsService:
 
     @staticmethod
     def get_facets(queryset, facet_params: dict, *, use_cache: bool = True) -> dict:
+        """
+        Facets from the in-memory postings (services/facet_index.py) when the index is ready —
+        kept current per product, so no result cache; otherwise the SQL aggregates + md5 cache.
+        """
+        from storeApp.services.facet_index import facet_index
+
+        include_category = not facet_params.get("category")
+        indexed = facet_index.facets(queryset, facet_params, include_category=include_category)
+        if indexed is not None:
+            return indexed
+
         if use_cache:
             cache_key = SearchFacetsService._cache_key(facet_params)
-            cached = cache.get(cache_key)
+            cached = store_cache().get(cache_key)
             if cached is not None:
                 return cached
 
-        include_category = not facet_params.get("category")
         facets = SearchFacetsService.build_facets(queryset, include_category=include_category)
 
         if use_cache:
-            cache.set(cache_key, facets, timeout=CACHE_TIMEOUT)
+            store_cache().set(cache_key, facets, timeout=CACHE_TIMEOUT)
         return facets
 
     @staticmethod
@@ -0,0 +1,211 @@
+"""
+Write-behind hit counters for SearchKeyword (POST /api/store/search-terms/).
+
+Known keywords are counted in a process-local buffer keyed by keyword_lookup and written back
+with one `INSERT ... ON CONFLICT (keyword_lookup) DO UPDATE SET hit_count = hit_count + excluded`
+per flush, so a popular keyword no longer takes a row lock on every search. First sightings
+still go through SearchKeyword.record_search so the response has a real id.
+
+Loss bounds (hits that a hard crash can drop, per process):
+- SEARCH_KEYWORD_BUFFER_MAX_HITS: flush inline once this many hits are pending.
+- SEARCH_KEYWORD_BUFFER_MAX_AGE: seconds before the oldest pending hit is flushed (timer).
+Graceful shutdown flushes via atexit; SIGKILL / OOM drops up to those bounds. There is no beat
+task or management command: the buffer lives in each web process, which no other process can
+flush. Lower the bounds, or set SEARCH_KEYWORD_BUFFER_ENABLED=False, to trade lock load for loss.
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.utils import timezone
+
+from storeApp.models import SearchKeyword
+from storeApp.services.product_category_helpers import store_db_alias
+
+logger = logging.getLogger("storeApp.search")
+
+BUFFER_ENABLED = getattr(settings, "SEARCH_KEYWORD_BUFFER_ENABLED", True)
+MAX_HITS = getattr(settings, "SEARCH_KEYWORD_BUFFER_MAX_HITS", 500)
+MAX_AGE = getattr(settings, "SEARCH_KEYWORD_BUFFER_MAX_AGE", 10)
+BACKGROUND_FLUSH = getattr(settings, "SEARCH_KEYWORD_BUFFER_BACKGROUND_FLUSH", True)
+UPSERT_CHUNK_SIZE = 200
+
+
+def upsert_keyword_hits(hits: dict, *, using=None) -> int:
+    """
+    hits: {keyword_lookup: (keyword, count, last_searched_at)}.
+
+    One statement per chunk; rows deleted meanwhile are re-created. Returns rows touched.
+    """
+    if not hits:
+        return 0
+    db = store_db_alias(using)
+    connection = connections[db]
+    qn = connection.ops.quote_name
+    table = qn(SearchKeyword._meta.db_table)
+    greatest = "GREATEST" if connection.vendor == "postgresql" else "MAX"
+    adapt = connection.ops.adapt_datetimefield_value
+    now = adapt(timezone.now())
+
+    items = sorted(hits.items())
+    with transaction.atomic(using=db), connection.cursor() as cursor:
+        for start in range(0, len(items), UPSERT_CHUNK_SIZE):
+            chunk = items[start : start + UPSERT_CHUNK_SIZE]
+            placeholders = ", ".join(["(%s, %s, %s, %s, %s, %s, %s)"] * len(chunk))
+            params = []
+            for lookup, (keyword, count, last_searched_at) in chunk:
+                params.extend([keyword, lookup, count, adapt(last_searched_at), now, now, True])
+            cursor.execute(
+                f"INSERT INTO {table} "
+                f"({qn('keyword')}, {qn('keyword_lookup')}, {qn('hit_count')}, {qn('last_searched_at')}, "
+                f"{qn('created_date')}, {qn('updated_date')}, {qn('active')}) "
+                f"VALUES {placeholders} "
+                f"ON CONFLICT ({qn('keyword_lookup')}) DO UPDATE SET "
+                f"{qn('hit_count')} = {table}.{qn('hit_count')} + excluded.{qn('hit_count')}, "
+                f"{qn('last_searched_at')} = {greatest}({table}.{qn('last_searched_at')}, excluded.{qn('last_searched_at')}), "
+                f"{qn('updated_date')} = excluded.{qn('updated_date')}",
+                params,
+            )
+    return len(items)
+
+
+class SearchKeywordHitBuffer:
+    """Thread-safe pending counters; `flush()` swaps the dict out before touching the DB."""
+
+    def __init__(self, *, max_hits=MAX_HITS, max_age=MAX_AGE, background_flush=BACKGROUND_FLUSH, using=None):
+        self.max_hits = max_hits
+        self.max_age = max_age
+        self.background_flush = background_flush
+        self.using = using
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: dict[str, list] = {}
+        self._pending_hits = 0
+        self._oldest_at: float | None = None
+        self._timer: threading.Timer | None = None
+        self.flushed_hits = 0
+
+    def add(self, keyword_lookup: str, keyword: str) -> int:
+        """Count one hit; returns hits pending for this keyword (before any inline flush)."""
+        now = timezone.now()
+        with self._lock:
+            entry = self._pending.get(keyword_lookup)
+            if entry is None:
+                entry = self._pending[keyword_lookup] = [keyword, 0, now]
+            entry[1] += 1
+            entry[2] = now
+            pending = entry[1]
+            self._pending_hits += 1
+            if self._oldest_at is None:
+                self._oldest_at = time.monotonic()
+                self._start_timer()
+            due = self._pending_hits >= self.max_hits or time.monotonic() - self._oldest_at >= self.max_age
+        if due:
+            try:
+                self.flush()
+            except Exception:
+                # Hits were put back; the timer or the next request retries.
+                logger.exception("search_keyword_buffer_flush_failed")
+        return pending
+
+    def pending_hits(self, keyword_lookup: str | None = None) -> int:
+        with self._lock:
+            if keyword_lookup is None:
+                return self._pending_hits
+            entry = self._pending.get(keyword_lookup)
+            return entry[1] if entry else 0
+
+    def _swap(self) -> dict:
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+            self._pending_hits = 0
+            self._oldest_at = None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        return pending
+
+    def _restore(self, pending: dict) -> None:
+        """Put back hits of a failed flush so they go out with the next one."""
+        with self._lock:
+            for lookup, (keyword, count, last_seen) in pending.items():
+                entry = self._pending.get(lookup)
+                if entry is None:
+                    self._pending[lookup] = [keyword, count, last_seen]
+                else:
+                    entry[1] += count
+                    entry[2] = max(entry[2], last_seen)
+                self._pending_hits += count
+            if pending and self._oldest_at is None:
+                self._oldest_at = time.monotonic()
+                self._start_timer()
+
+    def flush(self) -> int:
+        """Write all pending hits; returns the number of hits flushed."""
+        with self._flush_lock:
+            pending = self._swap()
+            if not pending:
+                return 0
+            try:
+                upsert_keyword_hits(
+                    {lookup: tuple(entry) for lookup, entry in pending.items()},
+                    using=self.using,
+                )
+            except Exception:
+                self._restore(pending)
+                raise
+            flushed = sum(entry[1] for entry in pending.values())
+            self.flushed_hits += flushed
+            return flushed
+
+    def clear(self) -> None:
+        self._swap()
+
+    def _start_timer(self) -> None:
+        # Caller holds self._lock.
+        if not self.background_flush or self._timer is not None:
+            return
+        self._timer = threading.Timer(self.max_age, self._flush_from_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_from_timer(self) -> None:
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("search_keyword_buffer_flush_failed")
+        finally:
+            close_old_connections()
+
+
+search_keyword_buffer = SearchKeywordHitBuffer()
+
+if BACKGROUND_FLUSH:
+    atexit.register(search_keyword_buffer._flush_from_timer)
+
+
+def record_search_hit(keyword: str) -> SearchKeyword:
+    """
+    Buffered SearchKeyword.record_search: one indexed read, no write for known keywords.
+
+    The returned instance shows hit_count including this process' pending hits.
+    """
+    display = SearchKeyword.normalize_keyword(keyword)
+    lookup = display.casefold()
+    if not BUFFER_ENABLED or not lookup:
+        return SearchKeyword.record_search(keyword)
+
+    obj = SearchKeyword.objects.filter(keyword_lookup=lookup).first()
+    if obj is None:
+        return SearchKeyword.record_search(keyword)
+
+    pending = search_keyword_buffer.add(lookup, display)
+    obj.hit_count += pending
+    obj.last_searched_at = timezone.now()
+    return obj
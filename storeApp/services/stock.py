@@ -2,27 +2,64 @@
 Stock service (store DB).
 Primary: MedicineBatch FIFO when batch inventory is available.
 Fallback: ProductVariant.in_stock cache when batches are empty or schema is legacy.
+
+Availability for many variants: `get_available_stock_bulk` (one grouped query), minus live
+StockReservation holds of other carts (services/stock_reservations.py). Inside `stock_memo()`
+results are remembered for the rest of the request; deduct/restore/sync drop the variant they touch.
+
+Deduction: `deduct_stock_bulk` locks every candidate batch of the order in one
+SELECT ... FOR UPDATE (FIFO order), allocates in memory, writes one bulk_update, records
+OrderItemBatchAllocation rows and resyncs in_stock in one UPDATE. `restore_order_stock`
+returns allocated quantities to exactly those batches.
+
+in_stock counter: batch saves/deletes (signals/medicine_batch.py) apply their remaining_quantity
+delta with one F() UPDATE via `apply_batch_stock_change`; bulk writers wrap their work in
+`defer_in_stock_sync()` so touched variants are re-aggregated once on exit. Batches expire without a
+write, so the counter drifts over time: services/in_stock_sync.py (`reconcile_in_stock`,
+`sync_in_stock_cache`) re-aggregates it set-based. Every in_stock writer publishes the variants it
+touched to the search facet index (`facet_index.variants_changed`), which the F()/bulk UPDATEs
+would otherwise bypass.
 """
 import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date
 
 from dateutil.relativedelta import relativedelta
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce, Greatest
 from django.db.utils import DatabaseError, ProgrammingError
 from django.utils import timezone
 
-from storeApp.models import MedicineBatch, ProductVariant
+from storeApp.models import MedicineBatch, OrderItemBatchAllocation, ProductVariant, StockReservation
+from storeApp.services.facet_index import facet_index
+from storeApp.services.in_stock_sync import live_stock_sum, sync_in_stock_totals
 
 logger = logging.getLogger(__name__)
 
+_stock_memo: ContextVar[dict | None] = ContextVar("stock_availability_memo", default=None)
+_deferred_in_stock: ContextVar[set | None] = ContextVar("deferred_in_stock_sync", default=None)
 
-def _get_cache_stock(product_variant_id: int) -> int:
-    value = (
-        ProductVariant.objects.using("store")
-        .filter(id=product_variant_id, active=True)
-        .values_list("in_stock", flat=True)
-        .first()
-    )
-    return int(value or 0)
+
+@contextmanager
+def stock_memo():
+    """Request-scoped memo for availability lookups (nested blocks share the outer memo)."""
+    if _stock_memo.get() is not None:
+        yield
+        return
+    token = _stock_memo.set({})
+    try:
+        yield
+    finally:
+        _stock_memo.reset(token)
+
+
+def _forget_stock(product_variant_id) -> None:
+    memo = _stock_memo.get()
+    if memo is not None:
+        variant_id = int(product_variant_id)
+        for key in [key for key in memo if key[0] == variant_id]:
+            del memo[key]
 
 
 def _sum_batch_stock(product_variant_id: int) -> int | None:
@@ -52,28 +89,6 @@ def _sum_batch_stock(product_variant_id: int) -> int | None:
     return int(total) if total is not None else 0
 
 
-def _list_deductible_batches(product_variant_id: int) -> list[MedicineBatch] | None:
-    today = timezone.now().date()
-    try:
-        return list(
-            MedicineBatch.objects.using("store")
-            .filter(
-                product_variant_id=product_variant_id,
-                active=True,
-                remaining_quantity__gt=0,
-                expiry_date__gte=today,
-            )
-            .order_by("expiry_date", "import_date")
-        )
-    except (ProgrammingError, DatabaseError) as exc:
-        logger.warning(
-            "MedicineBatch list failed for variant %s; using in_stock cache (%s)",
-            product_variant_id,
-            exc,
-        )
-        return None
-
-
 def _deduct_cache_stock(product_variant_id: int, quantity: int) -> None:
     if quantity <= 0:
         return
@@ -89,15 +104,177 @@ def _deduct_cache_stock(product_variant_id: int, quantity: int) -> None:
         )
 
 
-def get_available_stock(product_variant_id):
+def _live_reservations(*, exclude_cart_id=None):
+    holds = StockReservation.objects.using("store").filter(
+        product_variant_id=models.OuterRef("pk"),
+        expires_at__gt=timezone.now(),
+    )
+    if exclude_cart_id is not None:
+        holds = holds.exclude(cart_id=exclude_cart_id)
+    return Coalesce(
+        models.Subquery(
+            holds.order_by().values("product_variant_id").annotate(total=models.Sum("quantity")).values("total")
+        ),
+        0,
+    )
+
+
+def _query_available_stock(variant_ids: list[int], *, exclude_cart_id=None) -> dict[int, int]:
+    """Batch sums + in_stock fallback - live holds, for many variants in one grouped query."""
+    today = timezone.now().date()
+    try:
+        rows = (
+            ProductVariant.objects.using("store")
+            .filter(id__in=variant_ids)
+            .annotate(
+                batch_total=models.Sum(
+                    "batches__remaining_quantity",
+                    filter=models.Q(
+                        batches__active=True,
+                        batches__remaining_quantity__gt=0,
+                        batches__expiry_date__gte=today,
+                    ),
+                ),
+                reserved=_live_reservations(exclude_cart_id=exclude_cart_id),
+            )
+            .values_list("id", "active", "in_stock", "batch_total", "reserved")
+        )
+        rows = list(rows)
+    except (ProgrammingError, DatabaseError) as exc:
+        logger.warning("MedicineBatch bulk stock query failed; using in_stock cache (%s)", exc)
+        rows = [
+            (variant_id, True, in_stock, None, 0)
+            for variant_id, in_stock in ProductVariant.objects.using("store")
+            .filter(id__in=variant_ids, active=True)
+            .values_list("id", "in_stock")
+        ]
+
+    available = dict.fromkeys(variant_ids, 0)
+    for variant_id, active, in_stock, batch_total, reserved in rows:
+        if batch_total:
+            on_hand = int(batch_total)
+        elif active:
+            on_hand = int(in_stock or 0)
+        else:
+            continue
+        available[variant_id] = max(0, on_hand - int(reserved or 0))
+    return available
+
+
+def get_available_stock_bulk(variant_ids, *, exclude_cart_id=None, use_memo=True) -> dict[int, int]:
+    """
+    Available base units per variant id (same rules as get_available_stock).
+    Unknown variants map to 0. Holds of `exclude_cart_id` (the caller's own cart) still count
+    as available. Uses / fills the stock_memo() memo when one is open, unless use_memo=False
+    (reads under a lock must see the database).
+    """
+    ids = {int(variant_id) for variant_id in variant_ids if variant_id is not None}
+    memo = _stock_memo.get() if use_memo else None
+    if memo is None:
+        return _query_available_stock(sorted(ids), exclude_cart_id=exclude_cart_id) if ids else {}
+    missing = sorted(variant_id for variant_id in ids if (variant_id, exclude_cart_id) not in memo)
+    if missing:
+        for variant_id, value in _query_available_stock(missing, exclude_cart_id=exclude_cart_id).items():
+            memo[(variant_id, exclude_cart_id)] = value
+    return {variant_id: memo[(variant_id, exclude_cart_id)] for variant_id in ids}
+
+
+def get_available_stock(product_variant_id, *, exclude_cart_id=None):
     """
     Available base units for a variant.
     Prefer batch sum when batch inventory exists; otherwise use ProductVariant.in_stock cache.
+    Live reservations of other carts are subtracted.
     """
-    batch_total = _sum_batch_stock(product_variant_id)
-    if batch_total is not None and batch_total > 0:
-        return batch_total
-    return _get_cache_stock(product_variant_id)
+    return get_available_stock_bulk([product_variant_id], exclude_cart_id=exclude_cart_id).get(
+        int(product_variant_id), 0
+    )
+
+
+def _lock_deductible_batches(variant_ids, *, using="store") -> list[MedicineBatch] | None:
+    """All candidate batches of all variants, row-locked in FIFO order (one query)."""
+    today = timezone.now().date()
+    try:
+        return list(
+            MedicineBatch.objects.using(using)
+            .select_for_update()
+            .filter(
+                product_variant_id__in=variant_ids,
+                active=True,
+                remaining_quantity__gt=0,
+                expiry_date__gte=today,
+            )
+            .order_by("expiry_date", "import_date", "id")
+        )
+    except (ProgrammingError, DatabaseError) as exc:
+        logger.warning("MedicineBatch lock failed for variants %s; using in_stock cache (%s)", variant_ids, exc)
+        return None
+
+
+def sync_in_stock_bulk(variant_ids, *, using="store") -> None:
+    """in_stock = live batch sum for many variants in one UPDATE (sync_in_stock_cache, set-based)."""
+    if not variant_ids:
+        return
+    ProductVariant.objects.using(using).filter(id__in=variant_ids).update(in_stock=live_stock_sum(using=using))
+    facet_index.variants_changed(variant_ids, using=using)
+
+
+def deduct_stock_bulk(lines, *, using="store") -> list[OrderItemBatchAllocation]:
+    """
+    Deduct base units for many lines at once; must run inside transaction.atomic(using).
+
+    lines: iterable of (product_variant_id, quantity, order_item_id | None). Lines are served in
+    order, each FIFO over its variant's locked batches; variants without batch inventory fall back
+    to the in_stock cache. Raises ValueError when any line cannot be covered (caller rolls back).
+    Returns the allocation ledger rows created for lines with an order_item_id.
+    """
+    lines = [(int(variant_id), int(quantity), order_item_id) for variant_id, quantity, order_item_id in lines]
+    lines = [line for line in lines if line[1] > 0]
+    if not lines:
+        return []
+    variant_ids = sorted({variant_id for variant_id, _, _ in lines})
+    for variant_id in variant_ids:
+        _forget_stock(variant_id)
+
+    batches = _lock_deductible_batches(variant_ids, using=using)
+    batches_by_variant: dict[int, list[MedicineBatch]] = {}
+    for batch in batches or ():
+        batches_by_variant.setdefault(batch.product_variant_id, []).append(batch)
+
+    cache_totals: dict[int, int] = {}
+    touched: dict[int, MedicineBatch] = {}
+    allocations = []
+    for variant_id, quantity, order_item_id in lines:
+        variant_batches = batches_by_variant.get(variant_id)
+        if not variant_batches:
+            cache_totals[variant_id] = cache_totals.get(variant_id, 0) + quantity
+            continue
+        remaining = quantity
+        for batch in variant_batches:
+            if remaining <= 0:
+                break
+            take = min(batch.remaining_quantity, remaining)
+            if take <= 0:
+                continue
+            batch.remaining_quantity -= take
+            remaining -= take
+            touched[batch.id] = batch
+            if order_item_id is not None:
+                allocations.append(OrderItemBatchAllocation(order_item_id=order_item_id, batch=batch, quantity=take))
+        if remaining > 0:
+            raise ValueError(
+                f"Insufficient stock for product_variant_id {variant_id}. "
+                f"Could not deduct {remaining} of {quantity} base unit(s)."
+            )
+
+    if touched:
+        MedicineBatch.objects.using(using).bulk_update(list(touched.values()), ["remaining_quantity"])
+    for variant_id, quantity in cache_totals.items():
+        _deduct_cache_stock(variant_id, quantity)
+    facet_index.variants_changed(cache_totals, using=using)
+    if allocations:
+        allocations = OrderItemBatchAllocation.objects.using(using).bulk_create(allocations)
+    sync_in_stock_bulk(sorted({batch.product_variant_id for batch in touched.values()}), using=using)
+    return allocations
 
 
 def deduct_stock(product_variant_id, quantity):
@@ -106,35 +283,43 @@ def deduct_stock(product_variant_id, quantity):
     """
     if quantity <= 0:
         return
+    with transaction.atomic(using="store"):
+        deduct_stock_bulk([(product_variant_id, quantity, None)])
 
-    batches = _list_deductible_batches(product_variant_id)
-    if batches is None:
-        _deduct_cache_stock(product_variant_id, quantity)
-        return
 
-    if not batches:
-        _deduct_cache_stock(product_variant_id, quantity)
+def restore_order_stock(order_items, *, using="store") -> None:
+    """
+    Return stock of cancelled order lines: ledger rows go back to exactly their batches (one lock +
+    one bulk_update); lines deducted before the ledger existed use restore_stock.
+    """
+    order_items = list(order_items)
+    if not order_items:
         return
-
-    remaining = quantity
-    for batch in batches:
-        if remaining <= 0:
-            break
-        if batch.remaining_quantity >= remaining:
-            batch.remaining_quantity -= remaining
-            batch.save(update_fields=["remaining_quantity"])
-            remaining = 0
-        else:
-            remaining -= batch.remaining_quantity
-            batch.remaining_quantity = 0
-            batch.save(update_fields=["remaining_quantity"])
-
-    if remaining > 0:
-        raise ValueError(
-            f"Insufficient stock for product_variant_id {product_variant_id}. "
-            f"Could not deduct {remaining} of {quantity} base unit(s)."
+    allocations = list(
+        OrderItemBatchAllocation.objects.using(using).filter(order_item_id__in=[item.id for item in order_items])
+    )
+    allocated_item_ids = {allocation.order_item_id for allocation in allocations}
+    if allocations:
+        returned: dict[int, int] = {}
+        for allocation in allocations:
+            returned[allocation.batch_id] = returned.get(allocation.batch_id, 0) + allocation.quantity
+        batches = list(
+            MedicineBatch.objects.using(using).select_for_update().filter(id__in=returned).order_by("id")
         )
-    sync_in_stock_cache(product_variant_id)
+        for batch in batches:
+            batch.remaining_quantity += returned[batch.id]
+        MedicineBatch.objects.using(using).bulk_update(batches, ["remaining_quantity"])
+        OrderItemBatchAllocation.objects.using(using).filter(id__in=[allocation.id for allocation in allocations]).delete()
+        variant_ids = sorted({batch.product_variant_id for batch in batches})
+        for variant_id in variant_ids:
+            _forget_stock(variant_id)
+        sync_in_stock_bulk(variant_ids, using=using)
+
+    for item in order_items:
+        if item.id in allocated_item_ids:
+            continue
+        quantity_in_base = item.product_variant_unit.quantity_in_base if item.product_variant_unit else 1
+        restore_stock(item.product_variant_id, item.quantity * quantity_in_base)
 
 
 def restore_stock(product_variant_id, quantity):
@@ -143,6 +328,7 @@ def restore_stock(product_variant_id, quantity):
     """
     if quantity <= 0:
         return
+    _forget_stock(product_variant_id)
 
     today = timezone.now().date()
     try:
@@ -164,6 +350,7 @@ def restore_stock(product_variant_id, quantity):
         ProductVariant.objects.using("store").filter(id=product_variant_id).update(
             in_stock=models.F("in_stock") + quantity
         )
+        facet_index.variants_changed([product_variant_id], using="store")
         return
 
     if batches:
@@ -189,6 +376,7 @@ def restore_stock(product_variant_id, quantity):
             ProductVariant.objects.using("store").filter(id=product_variant_id).update(
                 in_stock=models.F("in_stock") + quantity
             )
+            facet_index.variants_changed([product_variant_id], using="store")
             return
 
     sync_in_stock_cache(product_variant_id)
@@ -196,7 +384,73 @@ def restore_stock(product_variant_id, quantity):
 
 def sync_in_stock_cache(product_variant_id):
     """Set ProductVariant.in_stock from batch sum when batches are available."""
+    _forget_stock(product_variant_id)
     batch_total = _sum_batch_stock(product_variant_id)
     if batch_total is None:
         return
     ProductVariant.objects.using("store").filter(id=product_variant_id).update(in_stock=batch_total)
+    facet_index.variants_changed([product_variant_id], using="store")
+
+
+def batch_stock_contribution(state, *, today=None) -> int:
+    """Units a batch adds to in_stock: remaining_quantity while active and not expired (MedicineBatch.stock_state)."""
+    _variant_id, active, remaining_quantity, expiry_date = state
+    if isinstance(expiry_date, str):
+        expiry_date = date.fromisoformat(expiry_date)
+    today = today or timezone.now().date()
+    if not active or not remaining_quantity or remaining_quantity < 0 or expiry_date < today:
+        return 0
+    return int(remaining_quantity)
+
+
+def apply_batch_stock_change(*, batch_id, old_state=None, new_state=None, using="store") -> None:
+    """
+    Move in_stock by the batch's contribution change (old_state None = created, new_state None = deleted).
+
+    One UPDATE per touched variant: in_stock + delta, or this batch's own contribution when it is the
+    variant's only batch (the first batch replaces a cache-only value, as sync_in_stock_cache did).
+    """
+    today = timezone.now().date()
+    changes: dict[int, list[int]] = {}  # variant_id -> [delta, own contribution]
+    if old_state is not None and old_state[0]:
+        changes[old_state[0]] = [-batch_stock_contribution(old_state, today=today), 0]
+    if new_state is not None and new_state[0]:
+        contribution = batch_stock_contribution(new_state, today=today)
+        change = changes.setdefault(new_state[0], [0, 0])
+        change[0] += contribution
+        change[1] = contribution
+    if old_state is not None and new_state is not None and old_state[0] == new_state[0] and not changes[new_state[0]][0]:
+        return
+
+    deferred = _deferred_in_stock.get()
+    if deferred is not None:
+        deferred.update(changes)
+        return
+    for variant_id, (delta, own) in changes.items():
+        _forget_stock(variant_id)
+        other_batches = MedicineBatch.objects.using(using).filter(product_variant_id=variant_id).exclude(pk=batch_id)
+        ProductVariant.objects.using(using).filter(id=variant_id).update(
+            in_stock=models.Case(
+                models.When(models.Exists(other_batches), then=Greatest(models.F("in_stock") + delta, 0)),
+                default=models.Value(own),
+            )
+        )
+    facet_index.variants_changed(changes, using=using)
+
+
+@contextmanager
+def defer_in_stock_sync(*, using="store"):
+    """Suspend per-batch in_stock deltas (imports, restocks); re-aggregate touched variants once on exit."""
+    if _deferred_in_stock.get() is not None:
+        yield
+        return
+    token = _deferred_in_stock.set(set())
+    try:
+        yield
+    finally:
+        variant_ids = _deferred_in_stock.get()
+        _deferred_in_stock.reset(token)
+        for variant_id in variant_ids:
+            _forget_stock(variant_id)
+        sync_in_stock_totals(variant_ids, only_drifted=True, using=using)
+
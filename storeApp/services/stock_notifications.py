@@ -0,0 +1,160 @@
+"""
+Expiry / low-stock notifications (store DB), set-based.
+
+One candidate query per stage, each anti-joined (NOT EXISTS) against notifications already written:
+
+- EXPIRED: live batches with expiry_date < today
+- EXPIRY_URGENT: today <= expiry_date <= today + urgent_days
+- EXPIRY_WARNING: today + urgent_days < expiry_date <= today + warning_days
+- LOW_STOCK: one GROUP BY over batches → variants whose live total <= threshold
+
+`threshold_date` is the de-duplication key for EXPIRY_* / EXPIRED: the batch's expiry_date, so
+one notification per batch and stage (migration 0029 keys rows written before the column existed).
+
+LOW_STOCK is keyed on a state change, not on the scan day: a variant is reported once per low-stock
+episode, and the episode ends only when a new batch arrives (a batch created after its latest
+LOW_STOCK notification). Stock that recovers without a new batch (e.g. `restore_order_stock` on a
+cancellation) and runs low again is still the same episode and is not reported again.
+`threshold_date` holds the day the episode was reported.
+
+Inserts use bulk_create(ignore_conflicts=True) over the unique constraints, so reruns and
+overlapping workers are no-ops.
+
+Runs: `python manage.py check_expiry_notifications`, Celery `check_expiry_notifications` (daily).
+"""
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from storeApp.models import MedicineBatch, Notification
+
+LOW_STOCK_THRESHOLD = getattr(settings, "STORE_LOW_STOCK_THRESHOLD", 10)
+INSERT_BATCH_SIZE = 1000
+
+
+@dataclass
+class NotificationRunResult:
+    created: dict = field(default_factory=dict)
+    elapsed_ms: float = 0.0
+    dry_run: bool = False
+
+    @property
+    def total(self) -> int:
+        return sum(self.created.values())
+
+    @property
+    def rows_per_second(self) -> float:
+        return round(self.total / (self.elapsed_ms / 1000), 1) if self.elapsed_ms else 0.0
+
+
+def _expiry_candidates(notification_type, *, window, using):
+    already = Notification.objects.using(using).filter(
+        notification_type=notification_type,
+        batch_id=models.OuterRef("pk"),
+        threshold_date=models.OuterRef("expiry_date"),
+    )
+    return (
+        MedicineBatch.objects.using(using)
+        .filter(window, active=True, remaining_quantity__gt=0)
+        .filter(~models.Exists(already))
+        .order_by("expiry_date", "id")
+        .values_list("id", "batch_number", "product_variant_id", "expiry_date", "remaining_quantity")
+    )
+
+
+def _expiry_notification(notification_type, row, *, today):
+    batch_id, batch_number, variant_id, expiry_date, remaining = row
+    days_left = (expiry_date - today).days
+    if notification_type == Notification.EXPIRED:
+        title = f"Thuốc đã hết hạn - Batch {batch_number}"
+        message = f"Batch {batch_number} đã hết hạn từ {-days_left} ngày trước. Số lượng còn lại: {remaining}"
+    else:
+        prefix = "Cảnh báo khẩn cấp" if notification_type == Notification.EXPIRY_URGENT else "Cảnh báo"
+        title = f"{prefix}: Thuốc sắp hết hạn - Batch {batch_number}"
+        message = f"Batch {batch_number} sẽ hết hạn trong {days_left} ngày. Số lượng còn lại: {remaining}"
+    return Notification(
+        notification_type=notification_type,
+        product_variant_id=variant_id,
+        batch_id=batch_id,
+        threshold_date=expiry_date,
+        title=title,
+        message=message,
+    )
+
+
+def _low_stock_candidates(*, threshold, today, using):
+    last_restock = (
+        MedicineBatch.objects.using(using)
+        .filter(product_variant_id=models.OuterRef("product_variant_id"))
+        .order_by("-created_date")
+        .values("created_date")[:1]
+    )
+    # Still the same episode: reported today, or reported since the variant's latest batch arrived.
+    already = Notification.objects.using(using).filter(
+        models.Q(threshold_date=today) | models.Q(created_date__gte=models.Subquery(last_restock)),
+        notification_type=Notification.LOW_STOCK,
+        product_variant_id=models.OuterRef("product_variant_id"),
+        batch__isnull=True,
+    )
+    live = models.Q(active=True, remaining_quantity__gt=0, expiry_date__gte=today)
+    return (
+        MedicineBatch.objects.using(using)
+        .filter(product_variant__active=True)
+        .filter(~models.Exists(already))
+        .order_by()
+        .values("product_variant_id", "product_variant__product__name", "product_variant__packing")
+        .annotate(live=Coalesce(models.Sum("remaining_quantity", filter=live), 0))
+        .filter(live__lte=threshold)
+        .order_by("product_variant_id")
+        .values_list("product_variant_id", "product_variant__product__name", "product_variant__packing", "live")
+    )
+
+
+def generate_stock_notifications(
+    *,
+    warning_days=30,
+    urgent_days=7,
+    low_stock_threshold=LOW_STOCK_THRESHOLD,
+    today=None,
+    dry_run=False,
+    using="store",
+) -> NotificationRunResult:
+    started = time.perf_counter()
+    today = today or timezone.now().date()
+    stages = [
+        (Notification.EXPIRED, models.Q(expiry_date__lt=today)),
+        (Notification.EXPIRY_URGENT, models.Q(expiry_date__range=(today, today + timedelta(days=urgent_days)))),
+        (
+            Notification.EXPIRY_WARNING,
+            models.Q(expiry_date__range=(today + timedelta(days=urgent_days + 1), today + timedelta(days=warning_days))),
+        ),
+    ]
+    result = NotificationRunResult(dry_run=dry_run)
+    pending = []
+    for notification_type, window in stages:
+        rows = list(_expiry_candidates(notification_type, window=window, using=using))
+        pending += [_expiry_notification(notification_type, row, today=today) for row in rows]
+        result.created[notification_type] = len(rows)
+
+    low_stock = list(_low_stock_candidates(threshold=low_stock_threshold, today=today, using=using))
+    pending += [
+        Notification(
+            notification_type=Notification.LOW_STOCK,
+            product_variant_id=variant_id,
+            threshold_date=today,
+            title=f"Tồn kho thấp - {name} ({packing})",
+            message=f"{name} ({packing}) còn {live} đơn vị cơ sở trong các lô còn hạn (ngưỡng {low_stock_threshold}).",
+        )
+        for variant_id, name, packing, live in low_stock
+    ]
+    result.created[Notification.LOW_STOCK] = len(low_stock)
+
+    if not dry_run and pending:
+        Notification.objects.using(using).bulk_create(pending, batch_size=INSERT_BATCH_SIZE, ignore_conflicts=True)
+    result.elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+    return result
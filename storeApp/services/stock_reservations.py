@@ -0,0 +1,118 @@
+"""
+Stock reservations (store DB): TTL holds taken when a cart starts checkout.
+
+- `reserve_cart_stock` locks the variant rows (serializes with other reservations and with
+  checkout), checks availability net of other carts' holds and upserts this cart's holds.
+- Availability reads (services/stock.py) subtract live holds inside the same grouped query.
+- `checkout_cart` locks the same variant rows, then `release_cart_reservations` drops the holds
+  it converted into the batch deduction.
+- `release_expired_reservations` deletes expired holds in id batches
+  (`python manage.py release_stock_reservations`, Celery `release_expired_stock_reservations`).
+
+TTL: settings.STORE_STOCK_RESERVATION_TTL_SECONDS (default 600).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from storeApp.models import CartItem, ProductVariant, StockReservation
+from storeApp.services.stock import get_available_stock_bulk
+
+RESERVATION_TTL_SECONDS = getattr(settings, "STORE_STOCK_RESERVATION_TTL_SECONDS", 600)
+RELEASE_BATCH_SIZE = 5000
+
+
+class InsufficientStockError(ValueError):
+    def __init__(self, shortages):
+        self.shortages = shortages
+        details = ", ".join(
+            f"product_variant_id={variant_id} available={available} requested={requested}"
+            for variant_id, available, requested in shortages
+        )
+        super().__init__(f"Insufficient stock in base unit to reserve: {details}")
+
+
+def lock_variants(variant_ids, *, using="store") -> None:
+    """Row-lock variants in id order; reservation and checkout both take this lock first."""
+    list(
+        ProductVariant.objects.using(using)
+        .select_for_update()
+        .filter(id__in=sorted(set(variant_ids)))
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+
+
+def required_base_quantities(cart_id, *, item_ids=None, using="store") -> dict[int, int]:
+    """Base units per variant for the cart lines (all lines, or `item_ids`)."""
+    items = CartItem.objects.using(using).filter(cart_id=cart_id).select_related("product_variant_unit")
+    if item_ids is not None:
+        items = items.filter(id__in=item_ids)
+    required: dict[int, int] = {}
+    for item in items:
+        quantity_in_base = item.product_variant_unit.quantity_in_base if item.product_variant_unit else 1
+        required[item.product_variant_id] = required.get(item.product_variant_id, 0) + item.quantity * quantity_in_base
+    return required
+
+
+def reserve_cart_stock(*, cart, item_ids=None, using="store", now=None, ttl_seconds=None):
+    """
+    Hold stock for the cart lines until now + TTL (re-reserving refreshes quantities and expiry).
+    Raises InsufficientStockError without touching existing holds when any variant is short; an
+    empty selection (no matching lines) leaves existing holds alone too.
+    Returns (expires_at, {variant_id: quantity}).
+    """
+    now = now or timezone.now()
+    expires_at = now + timedelta(seconds=RESERVATION_TTL_SECONDS if ttl_seconds is None else ttl_seconds)
+    required = required_base_quantities(cart.id, item_ids=item_ids, using=using)
+    if not required:
+        return expires_at, required
+    with transaction.atomic(using=using):
+        lock_variants(required, using=using)
+        available = get_available_stock_bulk(required, exclude_cart_id=cart.id, use_memo=False)
+        shortages = [
+            (variant_id, available[variant_id], quantity)
+            for variant_id, quantity in sorted(required.items())
+            if available[variant_id] < quantity
+        ]
+        if shortages:
+            raise InsufficientStockError(shortages)
+
+        StockReservation.objects.using(using).filter(cart_id=cart.id).exclude(product_variant_id__in=required).delete()
+        StockReservation.objects.using(using).bulk_create(
+            [
+                StockReservation(cart_id=cart.id, product_variant_id=variant_id, quantity=quantity, expires_at=expires_at)
+                for variant_id, quantity in required.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["cart", "product_variant"],
+            update_fields=["quantity", "expires_at"],
+        )
+    return expires_at, required
+
+
+def release_cart_reservations(*, cart_id, variant_ids=None, using="store") -> int:
+    holds = StockReservation.objects.using(using).filter(cart_id=cart_id)
+    if variant_ids is not None:
+        holds = holds.filter(product_variant_id__in=variant_ids)
+    deleted, _ = holds.delete()
+    return deleted
+
+
+def release_expired_reservations(*, now=None, batch_size=RELEASE_BATCH_SIZE, using="store") -> int:
+    """Delete expired holds in id batches (short transactions under load); returns rows released."""
+    now = now or timezone.now()
+    released = 0
+    while True:
+        ids = list(
+            StockReservation.objects.using(using)
+            .filter(expires_at__lte=now)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return released
+        deleted, _ = StockReservation.objects.using(using).filter(id__in=ids).delete()
+        released += deleted
@@ -3,11 +3,9 @@ Resolve a store URL path to category listing or product detail (single source of
 """
 from __future__ import annotations
 
-from django.db import models
-from django.db.models import Q
-
-from storeApp.models import Category, Product, ProductVariant
-from storeApp.services.product_category_helpers import category_tree_ids, product_in_categories_q
+from storeApp.models import ProductVariant
+from storeApp.services.product_category_helpers import product_in_categories_q
+from storeApp.services.store_path_routes import store_path_router
 
 
 def resolve_store_path(path_slug: str, *, using: str = "store") -> dict:
@@ -19,64 +17,44 @@ def resolve_store_path(path_slug: str, *, using: str = "store") -> dict:
         product_id: int | None
         default_variant_id: int | None
         category_id: int | None (when page is category/product with category context)
+
+    Slugs resolve through the in-memory routing table (services/store_path_routes.py); only
+    the "is a variant listed here" check for product pages queries the DB.
     """
     normalized = (path_slug or "").strip().strip("/")
     if not normalized:
         return {"page": "not_found"}
 
-    if "/" in normalized:
-        parts = normalized.split("/")
-        medicine_slug = parts[-1]
-        cat_path_slug = "/".join(parts[:-1])
-
-        product = (
-            Product.objects.using(using)
-            .filter(active=True, slug__iexact=medicine_slug)
+    route = store_path_router.route(normalized, using=using)
+    if route and route["kind"] == "product":
+        variant = (
+            ProductVariant.objects.using(using)
+            .filter(active=True, is_published=True, product_id=route["product_id"])
+            .filter(product_in_categories_q(route["descendant_ids"], using=using))
+            .order_by("-product_ranking", "id")
+            .values_list("id", flat=True)
             .first()
         )
-        if product and cat_path_slug:
-            category = (
-                Category.objects.using(using)
-                .filter(active=True)
-                .filter(
-                    Q(path_slug__iexact=cat_path_slug) | Q(slug__iexact=cat_path_slug)
-                )
-                .first()
-            )
-            if category:
-                category_ids = category_tree_ids(category, using=using)
-                variant = (
-                    ProductVariant.objects.using(using)
-                    .filter(active=True, is_published=True, product=product)
-                    .filter(product_in_categories_q(category_ids, using=using))
-                    .order_by("-product_ranking", "id")
-                    .first()
-                )
-                if variant:
-                    listed = category.path_slug or category.slug
-                    return {
-                        "page": "product",
-                        "category_path": listed,
-                        "product_slug": medicine_slug,
-                        "product_id": product.id,
-                        "default_variant_id": variant.id,
-                        "category_id": category.id,
-                    }
-
-    category = (
-        Category.objects.using(using)
-        .filter(active=True)
-        .filter(Q(path_slug__iexact=normalized) | Q(slug__iexact=normalized))
-        .first()
-    )
-    if category:
+        if variant:
+            return {
+                "page": "product",
+                "category_path": route["category_path"],
+                "product_slug": normalized.rsplit("/", 1)[-1],
+                "product_id": route["product_id"],
+                "default_variant_id": variant,
+                "category_id": route["category_id"],
+            }
+        # No listed variant under that category: the whole path may still be a category.
+        route = store_path_router.route(normalized, using=using, categories_only=True)
+
+    if route:
         return {
             "page": "category",
-            "category_path": category.path_slug or category.slug,
+            "category_path": route["category_path"],
             "product_slug": None,
             "product_id": None,
             "default_variant_id": None,
-            "category_id": category.id,
+            "category_id": route["category_id"],
         }
 
-    return {"page": "not_found"}
\ No newline at end of file
+    return {"page": "not_found"}
@@ -0,0 +1,370 @@
+"""
+Routing table for store URL paths (resolve_store_path, products_by_category_slug).
+
+Each worker keeps one immutable `RoutingTable`: lowercased category `path_slug` / `slug` →
+`CategoryRoute` (id + active subtree ids) and lowercased product slug → product id, so
+resolving a category URL is a dict lookup. The table is tagged with a version token kept in
+the shared cache (services/cache_backend.py); Category saves and Product slug/active changes (signals/store_path_routes.py)
+bump the token, which retires every worker's table at once.
+
+While the table is cold or being rebuilt, and for keys the table does not know (a row committed
+after the table was built, a bump that has not reached this worker yet), lookups fall back to
+the DB through the `lower(path_slug)` / `lower(slug)` functional indexes; fallback 404s are
+negatively cached per version (crawler paths stop hitting the DB until the catalog changes).
+"""
+from __future__ import annotations
+
+import bisect
+import hashlib
+import logging
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from storeApp.models import Category, Product
+from storeApp.services.cache_backend import VersionedNamespace, read_version, store_cache
+from storeApp.services.product_category_helpers import category_tree_ids, store_db_alias
+
+logger = logging.getLogger("storeApp.routing")
+
+CACHE_PREFIX = "store_path_routes"
+ROUTES_NAMESPACE = VersionedNamespace(CACHE_PREFIX, token=True)
+VERSION_KEY = ROUTES_NAMESPACE.version_key
+ROUTES_TTL = getattr(settings, "STORE_PATH_ROUTES_TTL", 600)
+BACKGROUND_BUILD = getattr(settings, "STORE_PATH_ROUTES_BACKGROUND_BUILD", True)
+SHARED_TABLE = getattr(settings, "STORE_PATH_ROUTES_SHARED_TABLE", False)
+NEGATIVE_TTL = getattr(settings, "STORE_PATH_ROUTES_NEGATIVE_TTL", 300)
+
+
+def normalize_store_path(path: str | None) -> str:
+    return (path or "").strip().strip("/").lower()
+
+
+@dataclass(frozen=True)
+class CategoryRoute:
+    category_id: int
+    category_path: str
+    descendant_ids: tuple[int, ...]
+
+
+@dataclass(frozen=True)
+class RoutingTable:
+    version: str
+    categories: dict[str, CategoryRoute]
+    products: dict[str, int]
+    product_slugs: dict[int, str] = field(repr=False)
+    built_at: float
+    build_ms: float
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "categories": len({route.category_id for route in self.categories.values()}),
+            "category_keys": len(self.categories),
+            "products": len(self.products),
+            "build_ms": round(self.build_ms, 2),
+            "age_seconds": round(time.time() - self.built_at, 1),
+        }
+
+
+def build_routing_table(version: str, *, using=None) -> RoutingTable:
+    """Two queries: every category (tree walk in memory) and every active product slug."""
+    db = store_db_alias(using)
+    started = time.perf_counter()
+
+    rows = list(
+        Category.objects.using(db)
+        .order_by("level", "name", "id")
+        .values_list("id", "parent_id", "slug", "path_slug", "active")
+    )
+    children: dict[int | None, list[int]] = defaultdict(list)
+    active_ids = set()
+    active_paths = []
+    for category_id, parent_id, _slug, path_slug, active in rows:
+        children[parent_id].append(category_id)
+        if active:
+            active_ids.add(category_id)
+            if path_slug:
+                active_paths.append((path_slug.lower(), category_id))
+    active_paths.sort()
+
+    def subtree(root_id: int, root_path: str) -> tuple[int, ...]:
+        # Same set as category_tree_ids(): itself + active descendants (through any parent)
+        # + active categories under its path_slug.
+        ids = {root_id: None}
+        stack = list(children.get(root_id, ()))
+        while stack:
+            node = stack.pop()
+            if node in active_ids:
+                ids[node] = None
+            stack.extend(children.get(node, ()))
+        if root_path:
+            prefix = f"{root_path.lower()}/"
+            for path, category_id in active_paths[bisect.bisect_left(active_paths, (prefix,)) :]:
+                if not path.startswith(prefix):
+                    break
+                ids.setdefault(category_id)
+        return tuple(ids)
+
+    categories: dict[str, CategoryRoute] = {}
+    # Rows come in Category.Meta.ordering, so setdefault keeps the row `.first()` returned
+    # for `Q(path_slug__iexact=…) | Q(slug__iexact=…)`.
+    for category_id, _parent_id, slug, path_slug, active in rows:
+        if not active:
+            continue
+        route = CategoryRoute(
+            category_id=category_id,
+            category_path=path_slug or slug or "",
+            descendant_ids=subtree(category_id, (path_slug or slug or "").strip()),
+        )
+        for key in (path_slug, slug):
+            if key:
+                categories.setdefault(key.lower(), route)
+
+    products: dict[str, int] = {}
+    product_slugs: dict[int, str] = {}
+    for slug, product_id in (
+        Product.objects.using(db)
+        .filter(active=True)
+        .exclude(slug__isnull=True)
+        .exclude(slug="")
+        .order_by("id")
+        .values_list("slug", "id")
+    ):
+        key = slug.lower()
+        if products.setdefault(key, product_id) == product_id:
+            product_slugs[product_id] = key
+
+    return RoutingTable(
+        version=version,
+        categories=categories,
+        products=products,
+        product_slugs=product_slugs,
+        built_at=time.time(),
+        build_ms=(time.perf_counter() - started) * 1000,
+    )
+
+
+class StorePathRouter:
+    """Process-wide routing table plus DB fallback, negative cache and rebuild bookkeeping."""
+
+    def __init__(self):
+        self._table: RoutingTable | None = None
+        self._lock = threading.Lock()
+        self._building = False
+        self.rebuilds = 0
+        self.fallback_lookups = 0
+        self.negative_hits = 0
+        self.last_error: str | None = None
+
+    # --- versioning -------------------------------------------------------------------------
+
+    def version(self) -> str:
+        # Token, not a counter: a flushed cache starts a new token, so no old table is trusted.
+        return ROUTES_NAMESPACE.version()
+
+    def bump(self) -> None:
+        ROUTES_NAMESPACE.bump()
+
+    def clear(self) -> None:
+        self._table = None
+        store_cache().delete(VERSION_KEY)
+
+    def table(self) -> RoutingTable | None:
+        """Table matching the shared version, or None while it is (re)built in the background."""
+        version = self.version()
+        table = self._table
+        if table is not None and table.version == version:
+            if time.time() - table.built_at > ROUTES_TTL:
+                self.schedule_rebuild()
+            return table
+        if BACKGROUND_BUILD:
+            self.schedule_rebuild()
+            return None
+        return self.rebuild(version=version)
+
+    def rebuild(self, *, version: str | None = None, using=None) -> RoutingTable:
+        # Read the token before querying: a bump during the build leaves this table stale.
+        version = version or self.version()
+        table = store_cache().get(f"{CACHE_PREFIX}:table:{version}") if SHARED_TABLE else None
+        if table is None:
+            try:
+                table = build_routing_table(version, using=using)
+            except Exception as exc:
+                self.last_error = str(exc)
+                raise
+            if SHARED_TABLE:
+                store_cache().set(f"{CACHE_PREFIX}:table:{version}", table, timeout=ROUTES_TTL)
+            self.rebuilds += 1
+            logger.info("store_path_routes_rebuilt %s", table.stats())
+        self._table = table
+        self.last_error = None
+        return table
+
+    def schedule_rebuild(self) -> None:
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+        threading.Thread(target=self._rebuild_in_thread, name="store-path-routes-rebuild", daemon=True).start()
+
+    def _rebuild_in_thread(self) -> None:
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception("store_path_routes_rebuild_failed")
+        finally:
+            close_old_connections()
+            with self._lock:
+                self._building = False
+
+    # --- lookups ----------------------------------------------------------------------------
+
+    def category_route(self, path: str, *, using=None) -> CategoryRoute | None:
+        return self._category(normalize_store_path(path), self.table(), using=using, fallback=True)
+
+    def product_id(self, slug: str, *, using=None) -> int | None:
+        return self._product(normalize_store_path(slug), self.table(), using=using, fallback=True)
+
+    def route(self, path: str, *, using=None, categories_only: bool = False) -> dict | None:
+        """
+        `{kind, category_id, category_path, descendant_ids, product_id}` for a store path:
+        `<category path>/<product slug>` → kind "product", else the whole path as a category.
+        The table is tried first, so paths it knows never reach the DB fallback.
+        """
+        key = normalize_store_path(path)
+        table = self.table()
+        if table is not None:
+            found = self._resolve(key, table, using=using, categories_only=categories_only, fallback=False)
+            if found is not None:
+                return found
+        return self._resolve(key, table, using=using, categories_only=categories_only, fallback=True)
+
+    def _resolve(self, key, table, *, using, categories_only, fallback) -> dict | None:
+        if "/" in key and not categories_only:
+            category_key, product_key = key.rsplit("/", 1)
+            product_id = self._product(product_key, table, using=using, fallback=fallback)
+            if product_id is not None:
+                category = self._category(category_key, table, using=using, fallback=fallback)
+                if category is not None:
+                    return self._route_dict("product", category, product_id)
+        category = self._category(key, table, using=using, fallback=fallback)
+        if category is not None:
+            return self._route_dict("category", category, None)
+        return None
+
+    def _category(self, key, table, *, using, fallback) -> CategoryRoute | None:
+        if not key:
+            return None
+        route = table.categories.get(key) if table is not None else None
+        if route is not None or not fallback:
+            return route
+        # Not in the table: cold table, or a row committed after it was built.
+        return self._fallback("category", key, lambda: self._db_category_route(key, using=using))
+
+    def _product(self, key, table, *, using, fallback) -> int | None:
+        if not key:
+            return None
+        product_id = table.products.get(key) if table is not None else None
+        if product_id is not None or not fallback:
+            return product_id
+        return self._fallback("product", key, lambda: self._db_product_id(key, using=using))
+
+    @staticmethod
+    def _route_dict(kind: str, category: CategoryRoute, product_id: int | None) -> dict:
+        return {
+            "kind": kind,
+            "category_id": category.category_id,
+            "category_path": category.category_path,
+            "descendant_ids": list(category.descendant_ids),
+            "product_id": product_id,
+        }
+
+    def _fallback(self, kind: str, key: str, lookup):
+        miss_key = self._miss_key(kind, key)
+        if store_cache().get(miss_key):
+            self.negative_hits += 1
+            return None
+        self.fallback_lookups += 1
+        found = lookup()
+        if found is None:
+            store_cache().set(miss_key, True, timeout=NEGATIVE_TTL)
+        return found
+
+    def _miss_key(self, kind: str, key: str) -> str:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return f"{CACHE_PREFIX}:miss:{self.version()}:{kind}:{digest}"
+
+    @staticmethod
+    def _db_category_route(key: str, *, using=None) -> CategoryRoute | None:
+        db = store_db_alias(using)
+        category = (
+            Category.objects.using(db)
+            .filter(active=True)
+            .alias(path_slug_lower=Lower("path_slug"), slug_lower=Lower("slug"))
+            .filter(Q(path_slug_lower=key) | Q(slug_lower=key))
+            .first()
+        )
+        if category is None:
+            return None
+        return CategoryRoute(
+            category_id=category.id,
+            category_path=category.path_slug or category.slug or "",
+            descendant_ids=tuple(category_tree_ids(category, using=db)),
+        )
+
+    @staticmethod
+    def _db_product_id(key: str, *, using=None) -> int | None:
+        return (
+            Product.objects.using(store_db_alias(using))
+            .filter(active=True)
+            .alias(slug_lower=Lower("slug"))
+            .filter(slug_lower=key)
+            .order_by("id")
+            .values_list("id", flat=True)
+            .first()
+        )
+
+    # --- invalidation helpers ---------------------------------------------------------------
+
+    def product_changed(self, product, *, deleted: bool = False) -> None:
+        """Bump the version unless the current table already routes `product` correctly."""
+        table = self._table
+        if table is None or table.version != read_version(VERSION_KEY):
+            self.bump()
+            return
+        slug = (product.slug or "").lower()
+        routed = table.product_slugs.get(product.pk)
+        if deleted or not product.active or not slug:
+            consistent = routed is None
+        else:
+            consistent = routed == slug and table.products.get(slug) == product.pk
+        if not consistent:
+            self.bump()
+
+    def stats(self) -> dict:
+        table = self._table
+        if table is None:
+            state = "cold"
+        elif table.version != read_version(VERSION_KEY):
+            state = "stale"
+        else:
+            state = "ready"
+        return {
+            "state": state,
+            "ttl_seconds": ROUTES_TTL,
+            "rebuilds": self.rebuilds,
+            "fallback_lookups": self.fallback_lookups,
+            "negative_hits": self.negative_hits,
+            "last_error": self.last_error,
+            **(table.stats() if table is not None else {}),
+        }
+
+
+store_path_router = StorePathRouter()
@@ -0,0 +1,363 @@
+"""
+In-process substring index for GET /api/store/search/suggest/.
+
+Each worker keeps one immutable `SuggestIndex` (keywords, categories, variants) built from the
+store DB. Each group has an n-gram posting map (1- to 3-grams → entry positions in rank order), so a
+keystroke reads one posting list, confirms the candidates and costs no query. Matching is the SQL path's
+`__contains` exactly, mid-word and SKU substrings included, with the same folding per group:
+keywords on `keyword_lookup` (casefold), categories on lower-cased name / path, variants on
+`fold_search_text` fields (as search_text). The index is rebuilt in a background thread when it
+is older than SEARCH_SUGGEST_INDEX_TTL or after a catalog signal marked it stale; while cold, the
+viewset keeps using the SQL path.
+"""
+from __future__ import annotations
+
+import heapq
+import logging
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Count
+
+from storeApp.models import Category, ProductVariant, ProductVariantUnit, SearchKeyword
+from storeApp.services.product_category_helpers import store_db_alias
+from storeApp.services.search_documents import RELEVANCE_TIERS, TAXONOMY_FIELDS, fold_search_text
+
+logger = logging.getLogger("storeApp.search")
+
+INDEX_TTL = getattr(settings, "SEARCH_SUGGEST_INDEX_TTL", 300)
+BACKGROUND_BUILD = getattr(settings, "SEARCH_SUGGEST_INDEX_BACKGROUND_BUILD", True)
+MAX_KEYWORDS = getattr(settings, "SEARCH_SUGGEST_INDEX_MAX_KEYWORDS", 50000)
+# Joins an entry's fields; queries never contain it, so a match cannot span two fields.
+FIELD_SEPARATOR = "\x00"
+# Longest indexed gram: shorter needles are a single posting read, longer ones intersect via the rarest gram.
+NGRAM = 3
+
+# (entry attribute, lookup, score) — same tiers as the SQL match_score, minus category/brand.
+_VARIANT_TIERS = tuple(
+    (field.removesuffix("_text"), lookup, score)
+    for field, lookup, score in RELEVANCE_TIERS
+    if field not in TAXONOMY_FIELDS
+)
+
+
+@dataclass(frozen=True)
+class KeywordEntry:
+    keyword: str
+    hit_count: int
+    last_searched_at: object
+    text: str
+
+
+@dataclass(frozen=True)
+class CategoryEntry:
+    id: int
+    name: str
+    slug: str
+    path: str
+    product_count: int
+    text: str
+
+
+@dataclass(frozen=True)
+class VariantEntry:
+    id: int
+    product_id: int
+    product_name: str
+    packing: str
+    image: object
+    images: list
+    price_display: str | None
+    sku: str
+    mid: str
+    name: str
+    web_name: str
+    ingredients: str
+    text: str
+
+    def match_score(self, folded_query: str) -> int:
+        for attr, lookup, score in _VARIANT_TIERS:
+            value = getattr(self, attr)
+            if not value:
+                continue
+            if lookup == "exact" and value == folded_query:
+                return score
+            if lookup == "startswith" and value.startswith(folded_query):
+                return score
+            if lookup == "contains" and folded_query in value:
+                return score
+        return 0
+
+
+class _NgramIndex:
+    """
+    n-gram posting map over entry texts: every 1-, 2- and 3-gram of a field → ascending entry positions.
+
+    `find` reads the rarest posting of the needle's n-grams (the needle itself when shorter than
+    NGRAM) and confirms each candidate with `in`, so a lookup touches only candidate entries.
+    """
+
+    def __init__(self, texts):
+        self.texts = list(texts)
+        postings: dict[str, list[int]] = {}
+        for position, text in enumerate(self.texts):
+            grams = set()
+            for value in text.split(FIELD_SEPARATOR):
+                for size in range(1, NGRAM + 1):
+                    grams.update(value[i : i + size] for i in range(len(value) - size + 1))
+            for gram in grams:
+                postings.setdefault(gram, []).append(position)
+        self.postings = {gram: array("I", positions) for gram, positions in postings.items()}
+
+    def __len__(self):
+        return sum(map(len, self.texts))
+
+    def find(self, needle: str):
+        if not needle or FIELD_SEPARATOR in needle:
+            return
+        if len(needle) <= NGRAM:
+            yield from self.postings.get(needle, ())
+            return
+        grams = {needle[i : i + NGRAM] for i in range(len(needle) - NGRAM + 1)}
+        candidates = min((self.postings.get(gram, ()) for gram in grams), key=len)
+        texts = self.texts
+        for position in candidates:
+            if needle in texts[position]:
+                yield position
+
+
+class SuggestIndex:
+    """Immutable snapshot; entries are stored in popularity order so position == rank."""
+
+    def __init__(self, keywords, categories, variants, *, build_ms: float):
+        self.keywords = keywords
+        self.keyword_recency = sorted(
+            range(len(keywords)), key=lambda i: keywords[i].last_searched_at, reverse=True
+        )
+        self._recency_rank = {position: rank for rank, position in enumerate(self.keyword_recency)}
+        self.categories = categories
+        self.variants = variants
+        self._keyword_text = _NgramIndex(entry.text for entry in keywords)
+        self._category_text = _NgramIndex(entry.text for entry in categories)
+        self._variant_text = _NgramIndex(entry.text for entry in variants)
+        self.build_ms = build_ms
+        self.built_at = time.time()
+
+    def suggest(self, lookup_query: str, *, keyword_limit=5, category_limit=5, product_limit=5) -> dict:
+        """`lookup_query`: the casefolded query the SQL path filters keywords / categories with."""
+        folded = fold_search_text(lookup_query)
+        if not folded:
+            return {"history_search": [], "hot_search": [], "categories": [], "top_products": []}
+
+        keyword_hits = list(self._keyword_text.find(lookup_query))
+        hot = keyword_hits[:keyword_limit]  # positions are popularity ranks, found in order
+        history = heapq.nsmallest(keyword_limit, keyword_hits, key=self._recency_rank.__getitem__)
+
+        category_hits = []
+        for position in self._category_text.find(lookup_query):
+            category_hits.append(position)
+            if len(category_hits) >= category_limit:
+                break
+
+        best_per_product: dict[int, tuple[int, int, VariantEntry]] = {}
+        for position in self._variant_text.find(folded):
+            entry = self.variants[position]
+            score = entry.match_score(folded)
+            if score <= 0:
+                continue
+            current = best_per_product.get(entry.product_id)
+            if current is None or (-score, position) < (-current[0], current[1]):
+                best_per_product[entry.product_id] = (score, position, entry)
+        top = heapq.nsmallest(product_limit, best_per_product.values(), key=lambda hit: (-hit[0], hit[1]))
+
+        return {
+            "history_search": [self.keywords[position] for position in history],
+            "hot_search": [self.keywords[position] for position in hot],
+            "categories": [self.categories[position] for position in category_hits],
+            "top_products": [(entry, score) for score, _, entry in top],
+        }
+
+    def stats(self) -> dict:
+        return {
+            "keywords": len(self.keywords),
+            "categories": len(self.categories),
+            "variants": len(self.variants),
+            "indexed_chars": len(self._keyword_text) + len(self._category_text) + len(self._variant_text),
+            "build_ms": round(self.build_ms, 2),
+            "built_at": self.built_at,
+            "age_seconds": round(time.time() - self.built_at, 1),
+        }
+
+
+def _default_price_displays(using):
+    """First published unit per listed variant (default unit first), as suggest shows it."""
+    prices: dict[int, str | None] = {}
+    units = (
+        ProductVariantUnit.objects.using(using)
+        .filter(is_published=True, variant__is_published=True, variant__product__active=True)
+        .order_by("variant_id", "-is_default", "unit_order", "id")
+        .values_list("variant_id", "price_display", "price_value")
+    )
+    for variant_id, price_display, price_value in units:
+        if variant_id in prices:
+            continue
+        if price_display:
+            prices[variant_id] = price_display
+        else:
+            prices[variant_id] = str(price_value) if price_value is not None else None
+    return prices
+
+
+def build_suggest_index(*, using=None) -> SuggestIndex:
+    """Four queries over the store DB; entries pre-sorted by popularity."""
+    db = store_db_alias(using)
+    started = time.perf_counter()
+
+    keywords = [
+        KeywordEntry(
+            keyword=keyword,
+            hit_count=hit_count,
+            last_searched_at=last_searched_at,
+            text=keyword_lookup or keyword.casefold(),
+        )
+        for keyword, keyword_lookup, hit_count, last_searched_at in SearchKeyword.objects.using(db)
+        .order_by("-hit_count", "-last_searched_at", "id")
+        .values_list("keyword", "keyword_lookup", "hit_count", "last_searched_at")[:MAX_KEYWORDS]
+    ]
+
+    categories = [
+        CategoryEntry(
+            id=row["id"],
+            name=row["name"],
+            slug=row["slug"],
+            path=row["path"],
+            product_count=row["product_count"],
+            # Lower("name") / Lower("path") as in the SQL path.
+            text=FIELD_SEPARATOR.join(value.lower() for value in (row["name"], row["path"]) if value),
+        )
+        for row in Category.objects.using(db)
+        .filter(active=True)
+        .annotate(product_count=Count("products", distinct=True))
+        .order_by("-product_count", "name")
+        .values("id", "name", "slug", "path", "product_count")
+    ]
+
+    variant_rows = list(
+        ProductVariant.objects.using(db)
+        .filter(is_published=True, product__active=True)
+        .order_by("-product_ranking", "-in_stock", "id")
+        .values(
+            "id",
+            "product_id",
+            "packing",
+            "image",
+            "images",
+            "sku",
+            "product__mid",
+            "product__name",
+            "product__web_name",
+            "product__ingredients",
+        )
+    )
+    prices = _default_price_displays(db)
+    variants = []
+    for row in variant_rows:
+        folded = {
+            "sku": fold_search_text(row["sku"]),
+            "mid": fold_search_text(row["product__mid"]),
+            "name": fold_search_text(row["product__name"]),
+            "web_name": fold_search_text(row["product__web_name"]),
+            "ingredients": fold_search_text(row["product__ingredients"]),
+        }
+        variants.append(
+            VariantEntry(
+                id=row["id"],
+                product_id=row["product_id"],
+                product_name=row["product__web_name"] or row["product__name"],
+                packing=row["packing"],
+                image=row["image"],
+                images=row["images"],
+                price_display=prices.get(row["id"]),
+                text=FIELD_SEPARATOR.join(value for value in folded.values() if value),
+                **folded,
+            )
+        )
+
+    build_ms = (time.perf_counter() - started) * 1000
+    return SuggestIndex(keywords, categories, variants, build_ms=build_ms)
+
+
+class SuggestIndexHolder:
+    """Process-wide slot for the current index plus rebuild bookkeeping."""
+
+    def __init__(self):
+        self._index: SuggestIndex | None = None
+        self._stale = False
+        self._lock = threading.Lock()
+        self._building = False
+        self.rebuilds = 0
+        self.last_error: str | None = None
+
+    def current(self) -> SuggestIndex | None:
+        """Index to answer from (possibly stale); schedules a refresh when needed."""
+        index = self._index
+        if index is None or self._stale or time.time() - index.built_at > INDEX_TTL:
+            self.schedule_rebuild()
+        return index
+
+    def mark_stale(self) -> None:
+        self._stale = True
+
+    def clear(self) -> None:
+        self._index = None
+        self._stale = False
+
+    def rebuild(self, *, using=None) -> SuggestIndex:
+        self._stale = False
+        try:
+            index = build_suggest_index(using=using)
+        except Exception as exc:
+            self._stale = True
+            self.last_error = str(exc)
+            raise
+        self._index = index
+        self.rebuilds += 1
+        self.last_error = None
+        logger.info("suggest_index_rebuilt %s", index.stats())
+        return index
+
+    def schedule_rebuild(self) -> None:
+        if not BACKGROUND_BUILD:
+            return
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+        threading.Thread(target=self._rebuild_in_thread, name="suggest-index-rebuild", daemon=True).start()
+
+    def _rebuild_in_thread(self) -> None:
+        try:
+            self.rebuild()
+        except Exception:
+            logger.exception("suggest_index_rebuild_failed")
+        finally:
+            close_old_connections()
+            with self._lock:
+                self._building = False
+
+    def stats(self) -> dict:
+        index = self._index
+        return {
+            "state": "cold" if index is None else ("stale" if self._stale else "ready"),
+            "ttl_seconds": INDEX_TTL,
+            "rebuilds": self.rebuilds,
+            "last_error": self.last_error,
+            **(index.stats() if index is not None else {}),
+        }
+
+
+suggest_index = SuggestIndexHolder()
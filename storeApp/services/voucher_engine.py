@@ -1,9 +1,15 @@
 from decimal import Decimal
 
-from django.db import transaction
-from django.db.models import Count, F
+from django.db import connections, transaction
+from django.db.models import F
 
-from storeApp.models import Voucher, VoucherRedemption
+from storeApp.models import Voucher, VoucherRedemption, VoucherUserRedemptionCount
+
+_REDEEM_COUNT_UPSERT = (
+    "INSERT INTO store_voucher_user_redemption_count (voucher_id, user_id, redeem_count) VALUES {values} "
+    "ON CONFLICT (voucher_id, user_id) DO UPDATE "
+    "SET redeem_count = store_voucher_user_redemption_count.redeem_count + 1"
+)
 
 
 class VoucherEngineError(Exception):
@@ -31,17 +37,21 @@ def _reason_to_message(reason_code):
     return mapping.get(reason_code, "Voucher is not applicable")
 
 
-def _get_redeem_count_map(user_id, vouchers, using):
-    voucher_ids = [voucher.id for voucher in vouchers if voucher]
+def get_redeem_count_map(user_id, voucher_ids, using="store"):
+    """Per-user redemption counts from the rollup table: one indexed lookup, no COUNT over redemptions."""
+    voucher_ids = [voucher_id for voucher_id in voucher_ids if voucher_id]
     if not user_id or not voucher_ids:
         return {}
-    rows = (
-        VoucherRedemption.objects.using(using)
+    return dict(
+        VoucherUserRedemptionCount.objects.using(using)
         .filter(user_id=user_id, voucher_id__in=voucher_ids)
-        .values("voucher_id")
-        .annotate(total=Count("id"))
+        .values_list("voucher_id", "redeem_count")
     )
-    return {row["voucher_id"]: row["total"] for row in rows}
+
+
+def _get_redeem_count_map(user_id, vouchers, using):
+    # Only vouchers with a per-user cap need the count.
+    return get_redeem_count_map(user_id, [voucher.id for voucher in vouchers if voucher and voucher.per_user_limit], using)
 
 
 def resolve_voucher_discounts(
@@ -59,7 +69,10 @@ def resolve_voucher_discounts(
     requested_codes = [code for code in [order_voucher_code, shipping_voucher_code] if code]
     voucher_by_code = {}
     if requested_codes:
-        vouchers = Voucher.objects.using(using).filter(code__in=requested_codes)
+        vouchers = Voucher.objects.using(using).filter(code__in=requested_codes).order_by("id")
+        if lock_for_update:
+            # Lock while reading by code: one statement instead of a lookup followed by a locked re-read.
+            vouchers = vouchers.select_for_update()
         voucher_by_code = {voucher.code: voucher for voucher in vouchers}
         missing_codes = [code for code in requested_codes if code not in voucher_by_code]
         if missing_codes:
@@ -72,15 +85,8 @@ def resolve_voucher_discounts(
     if pre_shipping_voucher and pre_shipping_voucher.scope != Voucher.SHIPPING_DISCOUNT:
         raise VoucherEngineError("shipping_voucher_code", "shipping_voucher_code must be SHIPPING_DISCOUNT voucher")
 
-    voucher_ids = sorted([voucher.id for voucher in [pre_order_voucher, pre_shipping_voucher] if voucher])
-    voucher_qs = Voucher.objects.using(using).filter(id__in=voucher_ids).order_by("id")
-    if lock_for_update:
-        voucher_qs = voucher_qs.select_for_update()
-    locked_vouchers = voucher_qs
-    locked_by_id = {voucher.id: voucher for voucher in locked_vouchers}
-
-    order_voucher = locked_by_id.get(pre_order_voucher.id) if pre_order_voucher else None
-    shipping_voucher = locked_by_id.get(pre_shipping_voucher.id) if pre_shipping_voucher else None
+    order_voucher = pre_order_voucher
+    shipping_voucher = pre_shipping_voucher
 
     redeem_count_map = _get_redeem_count_map(user_id, [order_voucher, shipping_voucher], using)
 
@@ -131,19 +137,42 @@ def resolve_voucher_discounts(
 
 
 def consume_vouchers(*, order, user_id, order_voucher, shipping_voucher, order_discount_amount, shipping_discount_amount, using="store"):
-    with transaction.atomic(using=using):
-        voucher_updates = [
+    """
+    One UPDATE for used_count, one INSERT for the redemptions and one upsert for the per-user rollup
+    (the two slots never share a voucher).
+    """
+    voucher_updates = [
+        (voucher_obj, discount_amount)
+        for voucher_obj, discount_amount in (
             (order_voucher, order_discount_amount),
             (shipping_voucher, shipping_discount_amount),
-        ]
-        for voucher_obj, discount_amount in voucher_updates:
-            if not voucher_obj:
-                continue
-            Voucher.objects.using(using).filter(pk=voucher_obj.pk).update(used_count=F("used_count") + 1)
-            VoucherRedemption.objects.using(using).create(
-                voucher=voucher_obj,
-                order=order,
-                user_id=user_id,
-                scope=voucher_obj.scope,
-                discount_amount=discount_amount,
-            )
+        )
+        if voucher_obj
+    ]
+    if not voucher_updates:
+        return
+    with transaction.atomic(using=using):
+        Voucher.objects.using(using).filter(pk__in=[voucher_obj.pk for voucher_obj, _ in voucher_updates]).update(
+            used_count=F("used_count") + 1
+        )
+        VoucherRedemption.objects.using(using).bulk_create(
+            [
+                VoucherRedemption(
+                    voucher=voucher_obj,
+                    order=order,
+                    user_id=user_id,
+                    scope=voucher_obj.scope,
+                    discount_amount=discount_amount,
+                )
+                for voucher_obj, discount_amount in voucher_updates
+            ]
+        )
+        if user_id:
+            _increment_redeem_counts(user_id, [voucher_obj.pk for voucher_obj, _ in voucher_updates], using)
+
+
+def _increment_redeem_counts(user_id, voucher_ids, using):
+    sql = _REDEEM_COUNT_UPSERT.format(values=", ".join(["(%s, %s, 1)"] * len(voucher_ids)))
+    params = [value for voucher_id in voucher_ids for value in (voucher_id, user_id)]
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, params)
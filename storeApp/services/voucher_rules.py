@@ -0,0 +1,244 @@
+"""
+Compiled voucher rules: "which vouchers can this cart use" in one in-memory pass.
+
+`VoucherRuleIndex` is built from every active, not-yet-ended voucher in one query:
+
+- `by_product`: product mid → voucher ids restricted to that product
+- `by_category`: category slug → voucher ids restricted to that category
+- `unrestricted`: vouchers with neither restriction
+
+Each `VoucherRule` keeps its time window, min order value and caps, so evaluation only needs the
+live counters the index cannot hold: `used_count` for candidates with a usage_limit and the
+per-user rollup (`VoucherUserRedemptionCount`) for candidates with a per_user_limit — at most two
+queries whatever the number of vouchers, none for a guest cart without capped candidates.
+
+The index is cached per version (shared cache + one copy per worker). Voucher saves/deletes
+(signals/voucher_rules.py) bump the version; `used_count`-only writes do not, counters are read live.
+Reason codes match `Voucher.validate_for_context`; checkout still validates the locked rows.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from storeApp.models import Voucher
+from storeApp.services.cache_backend import VersionedNamespace
+from storeApp.services.voucher_engine import get_redeem_count_map
+
+CACHE_PREFIX = "store_voucher_rules"
+RULES_NAMESPACE = VersionedNamespace(CACHE_PREFIX, token=True)
+RULES_TTL = getattr(settings, "STORE_VOUCHER_RULES_TTL", 600)
+
+
+@dataclass(frozen=True)
+class VoucherRule:
+    id: int
+    code: str
+    scope: str
+    type: str
+    value: Decimal
+    max_discount: Decimal | None
+    min_order_value: Decimal
+    start_at: object
+    end_at: object
+    usage_limit: int | None
+    per_user_limit: int | None
+    products: frozenset
+    categories: frozenset
+    description: str | None
+
+    def discount_for(self, order_subtotal, shipping_fee):
+        amount = shipping_fee if self.scope == Voucher.SHIPPING_DISCOUNT else order_subtotal
+        amount = Voucher._to_decimal(amount)
+        if amount <= Decimal("0"):
+            return Decimal("0")
+        if self.type == "PERCENT":
+            discount = amount * (self.value / Decimal("100"))
+            if self.max_discount is not None:
+                discount = min(discount, self.max_discount)
+            return max(Decimal("0"), discount)
+        return max(Decimal("0"), min(self.value, amount))
+
+
+@dataclass(frozen=True)
+class VoucherRuleIndex:
+    version: str
+    rules: dict
+    by_product: dict
+    by_category: dict
+    unrestricted: tuple
+    built_at: float
+    build_ms: float
+
+    def candidates(self, product_mids, category_slugs) -> list[VoucherRule]:
+        """Unrestricted vouchers plus those whose product / category restriction the cart satisfies."""
+        ids = set(self.unrestricted)
+        for mid in product_mids or ():
+            ids.update(self.by_product.get(str(mid), ()))
+        for slug in category_slugs or ():
+            ids.update(self.by_category.get(str(slug), ()))
+        rules = [self.rules[voucher_id] for voucher_id in ids]
+        # A voucher restricted on both axes must match both (as validate_for_context does).
+        mids = {str(mid) for mid in product_mids or ()}
+        slugs = {str(slug) for slug in category_slugs or ()}
+        return [
+            rule
+            for rule in rules
+            if (not rule.products or rule.products & mids) and (not rule.categories or rule.categories & slugs)
+        ]
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "vouchers": len(self.rules),
+            "products": len(self.by_product),
+            "categories": len(self.by_category),
+            "unrestricted": len(self.unrestricted),
+            "build_ms": round(self.build_ms, 2),
+        }
+
+
+def build_voucher_rule_index(version: str, *, using="store") -> VoucherRuleIndex:
+    started = time.perf_counter()
+    now = timezone.now()
+    rules = {}
+    by_product: dict[str, list[int]] = {}
+    by_category: dict[str, list[int]] = {}
+    unrestricted = []
+    vouchers = (
+        Voucher.objects.using(using)
+        .filter(is_active=True)
+        .filter(Q(end_at__isnull=True) | Q(end_at__gte=now))
+        .order_by("id")
+    )
+    for voucher in vouchers:
+        rule = VoucherRule(
+            id=voucher.id,
+            code=voucher.code,
+            scope=voucher.scope,
+            type=voucher.type,
+            value=Voucher._to_decimal(voucher.value),
+            max_discount=None if voucher.max_discount is None else Voucher._to_decimal(voucher.max_discount),
+            min_order_value=Voucher._to_decimal(voucher.min_order_value),
+            start_at=voucher.start_at,
+            end_at=voucher.end_at,
+            usage_limit=voucher.usage_limit or None,
+            per_user_limit=voucher.per_user_limit or None,
+            products=frozenset(str(mid) for mid in voucher.applicable_products or ()),
+            categories=frozenset(str(slug) for slug in voucher.applicable_categories or ()),
+            description=voucher.description,
+        )
+        rules[rule.id] = rule
+        for mid in rule.products:
+            by_product.setdefault(mid, []).append(rule.id)
+        for slug in rule.categories:
+            by_category.setdefault(slug, []).append(rule.id)
+        if not rule.products and not rule.categories:
+            unrestricted.append(rule.id)
+    return VoucherRuleIndex(
+        version=version,
+        rules=rules,
+        by_product={key: tuple(ids) for key, ids in by_product.items()},
+        by_category={key: tuple(ids) for key, ids in by_category.items()},
+        unrestricted=tuple(unrestricted),
+        built_at=time.time(),
+        build_ms=(time.perf_counter() - started) * 1000,
+    )
+
+
+class VoucherRuleCache:
+    """Per-worker copy of the current index; falls back to the shared cache, then to a rebuild."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index: VoucherRuleIndex | None = None
+        self.builds = 0
+
+    def get(self, *, using="store") -> VoucherRuleIndex:
+        version = RULES_NAMESPACE.version()
+        index = self._index
+        if index is not None and index.version == version:
+            return index
+        index = RULES_NAMESPACE.get("index")
+        if index is None or index.version != version:
+            index = build_voucher_rule_index(version, using=using)
+            self.builds += 1
+            RULES_NAMESPACE.set("index", index, timeout=RULES_TTL)
+        with self._lock:
+            self._index = index
+        return index
+
+    def bump(self):
+        with self._lock:
+            self._index = None
+        return RULES_NAMESPACE.bump()
+
+
+voucher_rule_cache = VoucherRuleCache()
+
+
+@dataclass(frozen=True)
+class VoucherEvaluation:
+    rule: VoucherRule
+    eligible: bool
+    reason: str
+    discount_amount: Decimal
+
+
+def _rule_reason(rule, *, now, order_subtotal, used_count, redeem_count):
+    if rule.start_at and now < rule.start_at:
+        return Voucher.VALIDATION_NOT_STARTED
+    if rule.end_at and now > rule.end_at:
+        return Voucher.VALIDATION_EXPIRED
+    if rule.usage_limit and used_count >= rule.usage_limit:
+        return Voucher.VALIDATION_USAGE_LIMIT_REACHED
+    if order_subtotal is None:
+        return Voucher.VALIDATION_MISSING_ORDER_SUBTOTAL
+    if rule.min_order_value and Voucher._to_decimal(order_subtotal) < rule.min_order_value:
+        return Voucher.VALIDATION_MIN_ORDER_NOT_MET
+    if rule.per_user_limit and redeem_count >= rule.per_user_limit:
+        return Voucher.VALIDATION_PER_USER_LIMIT_REACHED
+    return Voucher.VALIDATION_OK
+
+
+def evaluate_vouchers(
+    *,
+    order_subtotal,
+    shipping_fee,
+    product_mids,
+    category_slugs,
+    user_id=None,
+    using="store",
+    index=None,
+) -> list[VoucherEvaluation]:
+    """Every candidate voucher for a cart context, best discount first within each scope."""
+    index = index or voucher_rule_cache.get(using=using)
+    rules = index.candidates(product_mids, category_slugs)
+    capped = [rule.id for rule in rules if rule.usage_limit]
+    used_counts = (
+        dict(Voucher.objects.using(using).filter(id__in=capped).values_list("id", "used_count")) if capped else {}
+    )
+    redeem_counts = get_redeem_count_map(user_id, [rule.id for rule in rules if rule.per_user_limit], using)
+    now = timezone.now()
+    results = []
+    for rule in rules:
+        reason = _rule_reason(
+            rule,
+            now=now,
+            order_subtotal=order_subtotal,
+            used_count=used_counts.get(rule.id, 0),
+            redeem_count=redeem_counts.get(rule.id, 0),
+        )
+        eligible = reason == Voucher.VALIDATION_OK
+        discount = rule.discount_for(order_subtotal, shipping_fee) if eligible else Decimal("0")
+        if eligible and rule.scope == Voucher.SHIPPING_DISCOUNT:
+            discount = min(discount, Voucher._to_decimal(shipping_fee))
+        results.append(VoucherEvaluation(rule=rule, eligible=eligible, reason=reason, discount_amount=discount))
+    results.sort(key=lambda item: (item.rule.scope, not item.eligible, -item.discount_amount, item.rule.code))
+    return results
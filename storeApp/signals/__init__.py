@@ -1 +1,10 @@
-from . import medicine_batch
\ No newline at end of file
+from . import category_counts
+from . import category_tree
+from . import facet_index
+from . import medicine_batch
+from . import menu_snapshot
+from . import search_document
+from . import store_path_routes
+from . import suggest_index
+from . import variant_prices
+from . import voucher_rules
@@ -0,0 +1,88 @@
+"""
+Signals for storeApp: keep CategoryProductCount in sync with listing / publish changes.
+
+Receivers only queue ids (services/category_counts.py `schedule_count_refresh`); the rollup
+is recomputed once per transaction, on commit.
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from storeApp.models import Category, Product, ProductCategory, ProductVariant
+from storeApp.services.category_counts import schedule_count_refresh
+
+VARIANT_COUNT_FIELDS = {"active", "is_published", "product", "product_id"}
+PRODUCT_COUNT_FIELDS = {"active", "category", "category_id"}
+
+
+def _touches(update_fields, fields):
+    return update_fields is None or bool(set(update_fields) & fields)
+
+
+@receiver(post_save, sender=ProductVariant)
+def product_variant_counts_saved(sender, instance, created, update_fields=None, using=None, **kwargs):
+    if created or _touches(update_fields, VARIANT_COUNT_FIELDS):
+        schedule_count_refresh(product_ids=[instance.product_id], using=using)
+
+
+@receiver(post_delete, sender=ProductVariant)
+def product_variant_counts_deleted(sender, instance, using=None, **kwargs):
+    schedule_count_refresh(product_ids=[instance.product_id], using=using)
+
+
+@receiver(pre_save, sender=Product)
+def product_remember_category(sender, instance, update_fields=None, **kwargs):
+    """Primary FK may move: the old category must be refreshed too."""
+    instance._count_previous_category_id = None
+    if instance.pk and not instance._state.adding and _touches(update_fields, PRODUCT_COUNT_FIELDS):
+        instance._count_previous_category_id = (
+            Product.objects.using(kwargs.get("using")).filter(pk=instance.pk).values_list("category_id", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Product)
+def product_counts_changed(sender, instance, created, update_fields=None, using=None, **kwargs):
+    if created or _touches(update_fields, PRODUCT_COUNT_FIELDS):
+        previous = getattr(instance, "_count_previous_category_id", None)
+        schedule_count_refresh(
+            product_ids=[instance.pk],
+            category_ids=[previous] if previous and previous != instance.category_id else (),
+            using=using,
+        )
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted_counts(sender, instance, using=None, **kwargs):
+    schedule_count_refresh(category_ids=[instance.category_id], using=using)
+
+
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductCategory)
+def product_category_counts_changed(sender, instance, using=None, **kwargs):
+    schedule_count_refresh(category_ids=[instance.category_id], using=using)
+
+
+@receiver(pre_save, sender=Category)
+def category_remember_parent(sender, instance, update_fields=None, **kwargs):
+    """A moved subtree leaves its old ancestors: refresh them from the old parent up."""
+    instance._count_previous_parent_id = None
+    if instance.pk and not instance._state.adding and _touches(update_fields, {"parent", "parent_id"}):
+        instance._count_previous_parent_id = (
+            Category.objects.using(kwargs.get("using")).filter(pk=instance.pk).values_list("parent_id", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Category)
+def category_counts_changed(sender, instance, created, update_fields=None, using=None, **kwargs):
+    # active toggles change which descendants roll up into ancestors; moves change the ancestors.
+    previous_parent = getattr(instance, "_count_previous_parent_id", None)
+    moved = previous_parent is not None and previous_parent != instance.parent_id
+    if created or moved or _touches(update_fields, {"active"}):
+        schedule_count_refresh(
+            category_ids=[instance.pk, previous_parent] if moved else [instance.pk], using=using
+        )
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted_counts(sender, instance, using=None, **kwargs):
+    # Closure rows of the deleted subtree are gone; refresh from the surviving parent up.
+    schedule_count_refresh(category_ids=[instance.parent_id], using=using)
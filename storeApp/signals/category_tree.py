@@ -0,0 +1,20 @@
+"""
+Signals for storeApp: one event per category subtree rewrite.
+
+Category.save() rewrites descendant paths with a single queryset UPDATE (no per-row
+post_save), then sends `category_tree_changed` once. Receivers here drop caches that embed
+category paths.
+"""
+from django.dispatch import Signal, receiver
+
+from storeApp.services.search_facets_service import SearchFacetsService
+from storeApp.services.suggest_index import suggest_index
+
+# kwargs: category, old_path_slug, descendants (rows rewritten), using
+category_tree_changed = Signal()
+
+
+@receiver(category_tree_changed, dispatch_uid="category_tree_changed_invalidate_caches")
+def invalidate_category_path_caches(sender, **kwargs):
+    SearchFacetsService.invalidate_all_cache()
+    suggest_index.mark_stale()
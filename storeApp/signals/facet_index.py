@@ -0,0 +1,48 @@
+"""
+Signals for storeApp: keep the in-memory facet postings current.
+
+Product-level edits publish the product id to the shared change log (replayed incrementally
+by every worker); brand / category / attribute definition edits change labels used across
+many products and trigger a full rebuild instead. Unit price edits are published by
+ProductVariant.sync_price_columns, which every unit save/delete runs.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from storeApp.models import (
+    Brand,
+    CatalogAttribute,
+    CatalogAttributeOption,
+    Category,
+    Product,
+    ProductAttributeValue,
+    ProductCategory,
+    ProductVariant,
+)
+from storeApp.services.facet_index import facet_index
+
+
+@receiver(post_save, sender=Product, dispatch_uid="facet_index_product_save")
+@receiver(post_delete, sender=Product, dispatch_uid="facet_index_product_delete")
+def product_changed(sender, instance, using=None, **kwargs):
+    facet_index.products_changed([instance.pk], using=using)
+
+
+@receiver(post_save, sender=ProductVariant, dispatch_uid="facet_index_variant_save")
+@receiver(post_delete, sender=ProductVariant, dispatch_uid="facet_index_variant_delete")
+@receiver(post_save, sender=ProductCategory, dispatch_uid="facet_index_product_category_save")
+@receiver(post_delete, sender=ProductCategory, dispatch_uid="facet_index_product_category_delete")
+@receiver(post_save, sender=ProductAttributeValue, dispatch_uid="facet_index_attribute_value_save")
+@receiver(post_delete, sender=ProductAttributeValue, dispatch_uid="facet_index_attribute_value_delete")
+def product_child_changed(sender, instance, using=None, **kwargs):
+    facet_index.products_changed([instance.product_id], using=using)
+
+
+def invalidate_facet_index(sender, created=False, **kwargs):
+    if not created:
+        facet_index.invalidate()
+
+
+for _model in (Brand, Category, CatalogAttribute, CatalogAttributeOption):
+    post_save.connect(invalidate_facet_index, sender=_model, dispatch_uid=f"facet_index_save_{_model.__name__}")
+    post_delete.connect(invalidate_facet_index, sender=_model, dispatch_uid=f"facet_index_delete_{_model.__name__}")
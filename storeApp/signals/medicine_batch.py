@@ -1,38 +1,57 @@
 """
-Signals for storeApp: sync MedicineUnit.in_stock cache when MedicineBatch changes.
+Signals for storeApp: keep ProductVariant.in_stock in step with MedicineBatch changes.
+
+Each save/delete applies its remaining_quantity delta (services/stock.py `apply_batch_stock_change`),
+diffing against the stock fields loaded with the instance (`MedicineBatch.from_db`). Bulk writers wrap
+their work in `defer_in_stock_sync()`.
 """
 from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 
 from storeApp.models import MedicineBatch
-from storeApp.services.stock import sync_in_stock_cache
+from storeApp.services.stock import apply_batch_stock_change
 
 
 @receiver(pre_save, sender=MedicineBatch)
-def medicine_batch_pre_save(sender, instance, **kwargs):
-    """Store old product_variant_id on update so we can sync both variants in post_save."""
-    if instance.pk:
-        try:
-            old = MedicineBatch.objects.using('store').get(pk=instance.pk)
-            instance._old_product_variant_id = old.product_variant_id
-        except MedicineBatch.DoesNotExist:
-            pass
+def medicine_batch_pre_save(sender, instance, update_fields=None, using=None, **kwargs):
+    """Saves that touch no stock field skip the counter; rows not loaded from the DB are read once."""
+    if update_fields is not None and not {
+        MedicineBatch._meta.get_field(name).attname for name in update_fields
+    }.intersection(MedicineBatch.STOCK_FIELDS):
+        instance._skip_stock_delta = True
+        return
+    instance._skip_stock_delta = False
+    if instance.pk and not instance._state.adding and not hasattr(instance, '_loaded_stock'):
+        old = (
+            MedicineBatch.objects.using(using or 'store')
+            .filter(pk=instance.pk)
+            .values_list(*MedicineBatch.STOCK_FIELDS)
+            .first()
+        )
+        if old is not None:
+            instance._loaded_stock = old
 
 
 @receiver(post_save, sender=MedicineBatch)
-def medicine_batch_post_save(sender, instance, created, **kwargs):
-    """Sync cache for the variant linked to this batch. On update, sync old variant if product_variant_id changed."""
-    if instance.product_variant_id:
-        sync_in_stock_cache(instance.product_variant_id)
-    
-    old_variant_id = getattr(instance, '_old_product_variant_id', None)
-    if not created and old_variant_id is not None:
-        if old_variant_id != instance.product_variant_id:
-            sync_in_stock_cache(old_variant_id)
+def medicine_batch_post_save(sender, instance, created, using=None, **kwargs):
+    """Apply the delta for this batch's variant (both variants when product_variant_id changed)."""
+    if getattr(instance, '_skip_stock_delta', False):
+        return
+    new_state = instance.stock_state()
+    apply_batch_stock_change(
+        batch_id=instance.pk,
+        old_state=None if created else getattr(instance, '_loaded_stock', None),
+        new_state=new_state,
+        using=using or 'store',
+    )
+    instance._loaded_stock = new_state
 
 
 @receiver(post_delete, sender=MedicineBatch)
-def medicine_batch_post_delete(sender, instance, **kwargs):
-    """Sync cache for the variant that had this batch."""
-    if instance.product_variant_id:
-        sync_in_stock_cache(instance.product_variant_id)
+def medicine_batch_post_delete(sender, instance, using=None, **kwargs):
+    """Remove this batch's contribution from its variant."""
+    apply_batch_stock_change(
+        batch_id=instance.pk,
+        old_state=getattr(instance, '_loaded_stock', None) or instance.stock_state(),
+        using=using or 'store',
+    )
@@ -0,0 +1,24 @@
+"""
+Signals for storeApp: mark the mega-menu snapshot stale when menu inputs change.
+
+Categories, product listing links and the variant fields shown in top products
+(ranking, hot flag, publish state, price / stock caches) all feed the menu.
+The marker is set on commit: set earlier, a rebuild in the gap would snapshot pre-commit rows
+under a fresh ETag and nothing would mark it stale again.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from storeApp.models import Category, Product, ProductCategory, ProductVariant, ProductVariantUnit
+from storeApp.services.menu_snapshot import menu_snapshot
+from storeApp.signals.category_tree import category_tree_changed
+
+
+def mark_menu_snapshot_stale(sender, using=None, **kwargs):
+    transaction.on_commit(menu_snapshot.mark_stale, using=using)
+
+
+for _model in (Category, Product, ProductCategory, ProductVariant, ProductVariantUnit):
+    post_save.connect(mark_menu_snapshot_stale, sender=_model, dispatch_uid=f"menu_snapshot_save_{_model.__name__}")
+    post_delete.connect(mark_menu_snapshot_stale, sender=_model, dispatch_uid=f"menu_snapshot_delete_{_model.__name__}")
+category_tree_changed.connect(mark_menu_snapshot_stale, dispatch_uid="menu_snapshot_category_tree")
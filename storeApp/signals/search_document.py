@@ -0,0 +1,60 @@
+"""
+Signals for storeApp: keep ProductSearchDocument in sync with catalog edits.
+"""
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from storeApp.models import Brand, Category, Product, ProductCategory, ProductVariant
+from storeApp.services.search_documents import (
+    product_ids_for_categories,
+    refresh_product_documents,
+    refresh_variant_documents,
+)
+
+VARIANT_SEARCH_FIELDS = {"sku", "product", "product_id"}
+PRODUCT_SEARCH_FIELDS = {"name", "mid", "web_name", "ingredients", "brand", "brand_id", "category", "category_id"}
+
+
+def _touches(update_fields, searchable):
+    """save(update_fields=[...]) that misses every searchable column needs no refresh."""
+    return update_fields is None or bool(set(update_fields) & searchable)
+
+
+@receiver(post_save, sender=ProductVariant)
+def product_variant_post_save(sender, instance, created, update_fields=None, **kwargs):
+    if created or _touches(update_fields, VARIANT_SEARCH_FIELDS):
+        refresh_variant_documents([instance.pk])
+
+
+@receiver(post_save, sender=Product)
+def product_post_save(sender, instance, created, update_fields=None, **kwargs):
+    if not created and _touches(update_fields, PRODUCT_SEARCH_FIELDS):
+        refresh_product_documents([instance.pk])
+
+
+def _deleting_products(origin) -> bool:
+    """post_delete fired by a Product delete cascade: its documents are going away too."""
+    if isinstance(origin, Product):
+        return True
+    return isinstance(origin, QuerySet) and issubclass(origin.model, Product)
+
+
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductCategory)
+def product_category_changed(sender, instance, origin=None, **kwargs):
+    if _deleting_products(origin):
+        return
+    refresh_product_documents([instance.product_id])
+
+
+@receiver(post_save, sender=Brand)
+def brand_post_save(sender, instance, created, update_fields=None, **kwargs):
+    if not created and _touches(update_fields, {"name"}):
+        refresh_product_documents(Product.objects.filter(brand_id=instance.pk).values_list("id", flat=True))
+
+
+@receiver(post_save, sender=Category)
+def category_post_save(sender, instance, created, update_fields=None, **kwargs):
+    if not created and _touches(update_fields, {"name"}):
+        refresh_product_documents(product_ids_for_categories([instance.pk]))
@@ -0,0 +1,35 @@
+"""
+Signals for storeApp: retire the store path routing table when routes change.
+
+Any Category save/delete bumps the version (slugs, parents and active flags all feed the
+table); Product saves only bump when the slug / active flag no longer matches the table.
+Bumps run on commit, so a rebuild racing the write cannot tag pre-commit rows with the new version.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from storeApp.models import Category, Product
+from storeApp.services.store_path_routes import store_path_router
+
+ROUTED_PRODUCT_FIELDS = {"slug", "active"}
+
+
+def bump_store_path_routes(sender, using=None, **kwargs):
+    transaction.on_commit(store_path_router.bump, using=using)
+
+
+post_save.connect(bump_store_path_routes, sender=Category, dispatch_uid="store_path_routes_category_save")
+post_delete.connect(bump_store_path_routes, sender=Category, dispatch_uid="store_path_routes_category_delete")
+
+
+@receiver(post_save, sender=Product, dispatch_uid="store_path_routes_product_save")
+def product_saved(sender, instance, update_fields=None, using=None, **kwargs):
+    if update_fields is not None and not ROUTED_PRODUCT_FIELDS.intersection(update_fields):
+        return
+    transaction.on_commit(lambda: store_path_router.product_changed(instance), using=using)
+
+
+@receiver(post_delete, sender=Product, dispatch_uid="store_path_routes_product_delete")
+def product_deleted(sender, instance, using=None, **kwargs):
+    transaction.on_commit(lambda: store_path_router.product_changed(instance, deleted=True), using=using)
@@ -0,0 +1,18 @@
+"""
+Signals for storeApp: mark the in-process suggest index stale when catalog rows change.
+
+Rebuild happens in the background on the next suggest request (keywords refresh on TTL only).
+"""
+from django.db.models.signals import post_delete, post_save
+
+from storeApp.models import Category, Product, ProductVariant, ProductVariantUnit
+from storeApp.services.suggest_index import suggest_index
+
+
+def mark_suggest_index_stale(sender, **kwargs):
+    suggest_index.mark_stale()
+
+
+for _model in (Category, Product, ProductVariant, ProductVariantUnit):
+    post_save.connect(mark_suggest_index_stale, sender=_model, dispatch_uid=f"suggest_index_save_{_model.__name__}")
+    post_delete.connect(mark_suggest_index_stale, sender=_model, dispatch_uid=f"suggest_index_delete_{_model.__name__}")
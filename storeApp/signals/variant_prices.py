@@ -0,0 +1,17 @@
+"""
+Signals for storeApp: keep the ProductVariant price cache columns in step with its units.
+
+post_save / post_delete also fire for QuerySet.delete() and cascades (model delete() overrides do
+not). Queryset `update()` on units sends nothing: bulk writers call `sync_price_columns` themselves.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from storeApp.models import ProductVariant, ProductVariantUnit
+
+
+@receiver(post_save, sender=ProductVariantUnit, dispatch_uid="variant_prices_unit_save")
+@receiver(post_delete, sender=ProductVariantUnit, dispatch_uid="variant_prices_unit_delete")
+def unit_changed(sender, instance, using=None, **kwargs):
+    if instance.variant_id:
+        ProductVariant.sync_price_columns([instance.variant_id], using=using)
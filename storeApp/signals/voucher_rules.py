@@ -0,0 +1,24 @@
+"""
+Signals for storeApp: retire the compiled voucher rule index (services/voucher_rules.py) on voucher changes.
+
+`used_count`-only saves (Voucher.increment_used_count) keep the index: counters are read live.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from storeApp.models import Voucher
+from storeApp.services.voucher_rules import voucher_rule_cache
+
+LIVE_COUNTER_FIELDS = {"used_count"}
+
+
+@receiver(post_save, sender=Voucher, dispatch_uid="voucher_rules_voucher_save")
+def voucher_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= LIVE_COUNTER_FIELDS:
+        return
+    voucher_rule_cache.bump()
+
+
+@receiver(post_delete, sender=Voucher, dispatch_uid="voucher_rules_voucher_delete")
+def voucher_deleted(sender, instance, **kwargs):
+    voucher_rule_cache.bump()
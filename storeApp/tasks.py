@@ -0,0 +1,53 @@
+"""
+Celery tasks for storeApp. Schedules live in django_celery_beat (DatabaseScheduler):
+Django admin → Periodic tasks.
+
+Run worker: celery -A OUPharmacyManagementApp.celery worker --pool=solo --loglevel=info
+"""
+from celery import shared_task
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from storeApp.services.campaign_service import run_campaign_scheduler
+from storeApp.services.campaign_snapshot import get_placement_snapshot
+from storeApp.services.in_stock_sync import sync_in_stock_totals
+from storeApp.services.stock_notifications import generate_stock_notifications
+from storeApp.services.stock_reservations import release_expired_reservations
+
+
+@shared_task
+def release_expired_stock_reservations():
+    """Sweep expired StockReservation holds (suggested: every minute)."""
+    return release_expired_reservations()
+
+
+@shared_task
+def resync_in_stock_totals():
+    """Rewrite drifted in_stock counters; batches expire without a write (suggested: daily after midnight)."""
+    result = sync_in_stock_totals(only_drifted=True)
+    return {"checked": result.checked, "written": result.written, "elapsed_ms": result.elapsed_ms}
+
+
+@shared_task
+def check_expiry_notifications():
+    """EXPIRY_* / EXPIRED / LOW_STOCK notifications (suggested: daily); reruns insert nothing new."""
+    result = generate_stock_notifications()
+    return {**result.created, "elapsed_ms": result.elapsed_ms}
+
+
+@shared_task
+def run_campaign_scheduler_tick():
+    """Campaign scheduled→active / →ended in one set-based tick (suggested: every minute); overlapping ticks skip."""
+    return run_campaign_scheduler(source="celery")
+
+
+@shared_task
+def recompile_campaign_snapshot(boundary=None):
+    """Queued by the campaign snapshot compiler with ETA = next campaign start/end (no beat schedule)."""
+    now = timezone.now()
+    boundary_at = parse_datetime(boundary) if boundary else None
+    if boundary_at and boundary_at > now:
+        now = boundary_at  # ETA fired a little early: compile for the boundary itself
+    stats = run_campaign_scheduler(now=now, source="boundary")
+    snapshot = get_placement_snapshot(now=now)
+    return {**stats, "version": snapshot.version, "next_boundary": snapshot.meta(now)["next_boundary"]}
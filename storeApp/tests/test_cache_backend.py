@@ -0,0 +1,111 @@
+"""Shared cache facade: two-tier reads, versioned namespaces, invalidation across processes."""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from storeApp.services.cache_backend import TwoTierCache, VersionedNamespace, incr_counter, store_cache
+
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+CHILD_SCRIPT = """
+import json, sys
+import django
+django.setup()
+from storeApp.services.cache_backend import VersionedNamespace
+namespace = VersionedNamespace("test_cache_backend")
+for _ in sys.stdin:
+    print(json.dumps({"version": namespace.version(), "value": namespace.get("menu")}), flush=True)
+"""
+
+
+def _file_caches(location):
+    return {
+        "default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": location},
+        "local": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "store-l1-tests"},
+    }
+
+
+class TwoTierCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.l1 = caches["local"]
+        self.l2 = caches["default"]
+        self.l1.clear()
+        self.l2.clear()
+        self.cache = TwoTierCache(self.l1, self.l2, l1_ttl=5)
+
+    def test_reads_fill_l1_and_writes_go_to_both_tiers(self):
+        self.l2.set("k", "shared")
+        self.assertEqual(self.cache.get("k"), "shared")
+        self.assertEqual(self.l1.get("k"), "shared")
+
+        self.cache.set("k", "new")
+        self.assertEqual((self.l1.get("k"), self.l2.get("k")), ("new", "new"))
+        self.cache.delete("k")
+        self.assertIsNone(self.cache.get("k"))
+
+    def test_get_many_only_asks_l2_for_misses(self):
+        self.l1.set("a", 1)
+        self.l2.set_many({"a": 99, "b": 2})
+        self.assertEqual(self.cache.get_many(["a", "b", "c"]), {"a": 1, "b": 2})
+        self.assertEqual(self.l1.get("b"), 2)
+
+    def test_namespace_bump_retires_keys(self):
+        namespace = VersionedNamespace("test_ns")
+        namespace.set("x", "old")
+        self.assertEqual(namespace.bump(), 2)
+        self.assertIsNone(namespace.get("x"))
+
+        tokens = VersionedNamespace("test_tokens", token=True)
+        first = tokens.version()
+        self.assertEqual(tokens.version(), first)
+        self.assertNotEqual(tokens.bump(), first)
+
+    def test_incr_counter_starts_from_zero(self):
+        self.assertEqual(incr_counter("test_counter"), 1)
+        self.assertEqual(incr_counter("test_counter"), 2)
+
+
+class CrossProcessInvalidationTests(SimpleTestCase):
+    def test_bump_in_one_process_is_seen_by_another(self):
+        with tempfile.TemporaryDirectory() as location, override_settings(
+            CACHES=_file_caches(location), STORE_CACHE_TWO_TIER=True
+        ):
+            namespace = VersionedNamespace("test_cache_backend")
+            namespace.set("menu", "v1-menu")
+            self.assertIsInstance(store_cache(), TwoTierCache)
+
+            env = {
+                **os.environ,
+                "DJANGO_SETTINGS_MODULE": "OUPharmacyManagementApp.settings_test",
+                "CACHE_FILE_DIR": location,
+                "STORE_CACHE_TWO_TIER": "True",
+            }
+            child = subprocess.Popen(
+                [sys.executable, "-c", CHILD_SCRIPT],
+                cwd=BASE_DIR,
+                env=env,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                text=True,
+            )
+            try:
+                # Warm the child's L1 with the current version.
+                child.stdin.write("read\n")
+                child.stdin.flush()
+                self.assertEqual(json.loads(child.stdout.readline()), {"version": 1, "value": "v1-menu"})
+
+                namespace.bump()
+                namespace.set("menu", "v2-menu")
+
+                child.stdin.write("read\n")
+                child.stdin.flush()
+                self.assertEqual(json.loads(child.stdout.readline()), {"version": 2, "value": "v2-menu"})
+            finally:
+                child.stdin.close()
+                child.wait(timeout=30)
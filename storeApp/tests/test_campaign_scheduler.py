@@ -4,13 +4,17 @@ from datetime import timedelta
 
 from django.core.cache import cache
 from django.core.management import call_command
+from django.db import connections
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from io import StringIO
 
-from storeApp.models import Campaign
+from storeApp.models import Campaign, CampaignSchedulerRun
+from storeApp.services.cache_backend import shared_cache
+from storeApp.services.campaign_cache import cache_version
 from storeApp.services.campaign_public import public_visible_queryset
-from storeApp.services.campaign_service import run_campaign_scheduler
+from storeApp.services.campaign_service import SCHEDULER_LOCK_KEY, _guarded_transition, run_campaign_scheduler
 
 
 class CampaignSchedulerTests(TestCase):
@@ -102,3 +106,54 @@ class CampaignSchedulerTests(TestCase):
         call_command("run_campaign_scheduler", now=now.isoformat(), stdout=out)
         self.assertIn("activated=1", out.getvalue())
         self.assertEqual(Campaign.objects.get(slug="cmd-activate").status, Campaign.STATUS_ACTIVE)
+
+    def test_tick_is_set_based_and_audited(self):
+        now = timezone.now()
+        counts = []
+        for size in (3, 30):
+            with self.subTest(size=size):
+                for index in range(size):
+                    self._campaign(
+                        slug=f"bulk-{size}-start-{index}",
+                        status=Campaign.STATUS_SCHEDULED,
+                        start_at=now - timedelta(minutes=1),
+                        end_at=now + timedelta(hours=1),
+                    )
+                    self._campaign(
+                        slug=f"bulk-{size}-end-{index}",
+                        status=Campaign.STATUS_ACTIVE,
+                        start_at=now - timedelta(hours=2),
+                        end_at=now - timedelta(minutes=1),
+                    )
+                version_before = cache_version()
+                with CaptureQueriesContext(connections["store"]) as queries:
+                    stats = run_campaign_scheduler(now=now, source="celery")
+                counts.append(len(queries.captured_queries))
+                self.assertEqual((stats["activated"], stats["ended"], stats["conflicts"]), (size, size, 0))
+                self.assertEqual(cache_version(), version_before + 1)  # one invalidation per tick
+                run = CampaignSchedulerRun.objects.get(id=stats["run_id"])
+                self.assertEqual((run.activated, run.ended, run.source, run.tick_at), (size, size, "celery", now))
+                self.assertEqual(
+                    set(Campaign.objects.filter(slug__startswith=f"bulk-{size}-").values_list("version", flat=True)), {2}
+                )
+        # 2 scans, savepoint, 2 guarded updates, release, audit insert — whatever the number of campaigns.
+        self.assertEqual(counts, [7, 7])
+
+    def test_version_guard_and_overlapping_ticks(self):
+        now = timezone.now()
+        camp = self._campaign(
+            slug="guarded",
+            status=Campaign.STATUS_SCHEDULED,
+            start_at=now - timedelta(minutes=1),
+            end_at=now + timedelta(hours=1),
+        )
+        stale_scan = [(camp.id, Campaign.STATUS_SCHEDULED, camp.version - 1)]
+        self.assertEqual(_guarded_transition(stale_scan, to_status=Campaign.STATUS_ACTIVE, now=now, using="store"), [])
+        camp.refresh_from_db()
+        self.assertEqual(camp.status, Campaign.STATUS_SCHEDULED)
+
+        shared_cache().add(SCHEDULER_LOCK_KEY, "other-worker", timeout=60)
+        self.assertTrue(run_campaign_scheduler(now=now).get("skipped"))
+        self.assertFalse(CampaignSchedulerRun.objects.exists())
+        shared_cache().delete(SCHEDULER_LOCK_KEY)
+        self.assertEqual(run_campaign_scheduler(now=now)["activated"], 1)
@@ -0,0 +1,92 @@
+"""Compiled campaign placement snapshot: ranking, boundary-timed validity, recompile scheduling."""
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from storeApp.models import Campaign, CampaignPlacement
+from storeApp.services import campaign_snapshot
+from storeApp.services.campaign_cache import invalidate_public_campaign_cache
+from storeApp.services.campaign_snapshot import get_placement_snapshot
+
+
+class CampaignSnapshotTests(APITestCase):
+    databases = {"default", "store"}
+    base = "/api/store/campaigns/"
+
+    def setUp(self):
+        cache.clear()
+        self.now = timezone.now().replace(microsecond=0)
+        self.current = self._campaign("snap-current", priority=5, start=-timedelta(hours=1), end=timedelta(hours=1))
+        self.backup = self._campaign("snap-backup", priority=1, start=-timedelta(hours=2), end=timedelta(days=1))
+        self.upcoming = self._campaign("snap-upcoming", priority=9, start=timedelta(hours=2), end=timedelta(days=2))
+
+    def _campaign(self, slug, *, priority, start, end, status=Campaign.STATUS_ACTIVE):
+        campaign = Campaign.objects.create(
+            name=slug,
+            slug=slug,
+            title=slug,
+            status=status,
+            priority=priority,
+            start_at=self.now + start,
+            end_at=self.now + end,
+        )
+        CampaignPlacement.objects.create(
+            campaign=campaign, slot=CampaignPlacement.SLOT_HOME_HERO, title=f"{slug} hero", is_enabled=True
+        )
+        return campaign
+
+    def _hero(self, snapshot):
+        return snapshot.placements[CampaignPlacement.SLOT_HOME_HERO][0]["campaign_slug"]
+
+    def test_snapshot_ranks_once_and_serves_without_queries(self):
+        snapshot = get_placement_snapshot(now=self.now)
+        self.assertEqual(snapshot.ranking[CampaignPlacement.SLOT_HOME_HERO], (self.current.id, self.backup.id))
+        self.assertEqual(self._hero(snapshot), "snap-current")
+        self.assertEqual(snapshot.next_boundary, self.current.end_at)
+        self.assertEqual([row["slug"] for row in snapshot.campaigns], ["snap-current", "snap-backup"])
+        with self.assertNumQueries(0, using="store"):
+            self.assertEqual(get_placement_snapshot(now=self.now + timedelta(minutes=59)).compiled_at, self.now)
+
+    def test_recompiles_exactly_at_each_boundary(self):
+        get_placement_snapshot(now=self.now)
+        after_end = get_placement_snapshot(now=self.current.end_at)
+        self.assertEqual(after_end.compiled_at, self.current.end_at)
+        self.assertEqual(self._hero(after_end), "snap-backup")
+        self.assertEqual(after_end.next_boundary, self.upcoming.start_at)
+
+        after_start = get_placement_snapshot(now=self.upcoming.start_at)
+        self.assertEqual(self._hero(after_start), "snap-upcoming")
+        self.assertEqual(after_start.next_boundary, self.backup.end_at)
+
+    def test_invalidation_retires_the_snapshot(self):
+        first = get_placement_snapshot(now=self.now)
+        Campaign.objects.filter(id=self.current.id).update(priority=0)
+        self.assertEqual(self._hero(get_placement_snapshot(now=self.now)), "snap-current")
+        invalidate_public_campaign_cache()
+        fresh = get_placement_snapshot(now=self.now)
+        self.assertGreater(fresh.version, first.version)
+        self.assertEqual(self._hero(fresh), "snap-backup")
+
+    def test_recompile_is_queued_once_per_boundary(self):
+        with mock.patch.object(campaign_snapshot, "SCHEDULE_RECOMPILE", True), mock.patch(
+            "storeApp.tasks.recompile_campaign_snapshot.apply_async"
+        ) as apply_async:
+            get_placement_snapshot(now=self.now)
+            invalidate_public_campaign_cache()
+            get_placement_snapshot(now=self.now)
+        apply_async.assert_called_once()
+        self.assertEqual(apply_async.call_args.kwargs["eta"], self.current.end_at)
+
+    def test_endpoints_report_snapshot_age(self):
+        listing = self.client.get(self.base)
+        self.assertEqual([row["slug"] for row in listing.data], ["snap-current", "snap-backup"])
+        self.assertIn("X-Campaign-Snapshot-Age", listing)
+
+        response = self.client.get(f"{self.base}placements/", {"slots": "HOME_HERO"})
+        self.assertEqual(list(response.data["placements"]), ["HOME_HERO"])
+        meta = response.data["snapshot"]
+        self.assertEqual(meta["next_boundary"], self.current.end_at.isoformat().replace("+00:00", "Z"))
+        self.assertGreaterEqual(meta["age_seconds"], 0)
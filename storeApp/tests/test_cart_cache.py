@@ -0,0 +1,105 @@
+"""Cart payload cache: version-checked hits, write-through after mutations, local/shared variants."""
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from storeApp.models import Cart, MedicineBatch, Product, ProductVariant, ProductVariantUnit, ShippingMethod
+from storeApp.services import cart_cache
+from storeApp.services.cart_cache import CacheCartCacheGateway, build_cart_cache_gateway
+
+
+class CartCacheGatewayTests(APITestCase):
+    databases = {"default", "store"}
+
+    def setUp(self):
+        caches["default"].clear()
+        self.gateway = CacheCartCacheGateway()
+        patcher = mock.patch.object(cart_cache, "_gateway", self.gateway)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.user = get_user_model().objects.create_user(email="cart-cache@example.com", password="test-pass-123")
+        self.client.force_authenticate(user=self.user)
+        self.shipping_method = ShippingMethod.objects.create(name="Standard", price=30000, estimated_days=2, active=True)
+        product = Product.objects.create(name="Siro ho", mid="MID-CART-CACHE", slug="siro-ho")
+        self.variant = ProductVariant.objects.create(product=product, packing="Chai", in_stock=50, is_published=True)
+        self.unit = ProductVariantUnit.objects.create(
+            variant=self.variant, quantity_in_base=1, unit_name="Chai", price_value=50000, is_default=True, is_published=True
+        )
+        MedicineBatch.objects.create(
+            batch_number="BATCH-CART-CACHE",
+            product_variant=self.variant,
+            import_date=timezone.now().date() - timedelta(days=5),
+            expiry_date=timezone.now().date() + timedelta(days=365),
+            quantity=50,
+            remaining_quantity=50,
+        )
+
+    def _current(self):
+        response = self.client.get("/api/store/carts/current/")
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def _add_item(self, version, quantity=1):
+        response = self.client.post(
+            "/api/store/carts/items/",
+            {"expected_version": version, "product_variant_id": self.variant.id, "quantity": quantity},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_hit_needs_at_most_one_query(self):
+        cart = self._current()
+        self.assertEqual(self.gateway.misses, 1)
+        with self.assertNumQueries(1, using="store"):
+            cached = self._current()
+        self.assertEqual(cached, cart)
+        self.assertEqual(self.gateway.stats()["hits"], 1)
+
+    def test_mutations_write_through_and_stale_versions_are_not_served(self):
+        cart = self._current()
+        added = self._add_item(cart["version"], quantity=2)
+        with self.assertNumQueries(1, using="store"):
+            self.assertEqual(self._current(), added)
+
+        response = self.client.post(
+            "/api/store/carts/select-shipping/",
+            {"expected_version": added["version"], "shipping_method_id": self.shipping_method.id},
+            format="json",
+        )
+        self.assertEqual(self._current()["shipping_method"]["id"], self.shipping_method.id)
+        self.assertEqual(self._current(), response.data)
+
+        # A version bump from elsewhere (another worker, admin edit) retires the entry.
+        Cart.objects.using("store").filter(id=cart["id"]).update(version=response.data["version"] + 5)
+        stale = self.gateway.stale
+        self.assertEqual(self._current()["version"], response.data["version"] + 5)
+        self.assertEqual(self.gateway.stale, stale + 1)
+        # The stale entry was replaced by the read path: the next request is a hit again.
+        with self.assertNumQueries(1, using="store"):
+            self.assertEqual(self._current()["version"], response.data["version"] + 5)
+        self.assertEqual(self.gateway.stale, stale + 1)
+
+    def test_read_path_does_not_replace_a_write_through(self):
+        cart = self._current()
+        self.gateway.set_cart_summary(cart_id=cart["id"], summary={**cart, "total": "1.00"}, overwrite=False)
+        self.assertEqual(self._current()["total"], cart["total"])
+
+    def test_gateway_variants(self):
+        self.assertEqual(build_cart_cache_gateway("none").get_cart_summary(cart_id=1), None)
+        local = build_cart_cache_gateway("local")
+        self.assertIs(local.backend, caches["local"])
+        local.set_cart_summary(cart_id=1, summary={"id": 1, "version": 3})
+        self.assertEqual(local.get_cart_summary(cart_id=1, version=3), {"id": 1, "version": 3})
+        self.assertIsNone(local.get_cart_summary(cart_id=1, version=2))
+        self.assertEqual(local.get_cart_summary(cart_id=1), {"id": 1, "version": 3})  # newer entry kept
+        self.assertIsNone(local.get_cart_summary(cart_id=1, version=4))
+        self.assertIsNone(local.get_cart_summary(cart_id=1))  # older entry dropped
+        local.set_cart_summary(cart_id=1, summary={"id": 1, "version": 4})
+        local.invalidate_cart_summary(cart_id=1)
+        self.assertIsNone(local.get_cart_summary(cart_id=1))
@@ -0,0 +1,89 @@
+"""CategoryClosure maintenance, category_tree_ids lookup and the rebuild/check command."""
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from storeApp.models import Category, CategoryClosure, Product
+from storeApp.services.category_closure import check_category_closure
+from storeApp.services.category_counts import compute_category_counts
+from storeApp.services.product_category_helpers import category_tree_ids
+from storeApp.services.store_path_routes import build_routing_table
+
+
+class CategoryClosureTests(TestCase):
+    databases = {"default", "store"}
+
+    def setUp(self):
+        self.root = Category.objects.create(name="Thuốc", slug="thuoc")
+        self.child = Category.objects.create(name="Tim mạch", slug="tim-mach", parent=self.root)
+        self.leaf = Category.objects.create(name="Huyết áp", slug="huyet-ap", parent=self.child)
+        self.other = Category.objects.create(name="Mỹ phẩm", slug="my-pham")
+
+    def _links(self, category):
+        return set(
+            CategoryClosure.objects.filter(descendant=category).values_list("ancestor_id", "depth")
+        )
+
+    def test_create_links_every_ancestor(self):
+        self.assertEqual(self._links(self.leaf), {(self.leaf.id, 0), (self.child.id, 1), (self.root.id, 2)})
+        self.assertEqual(check_category_closure()["missing"], [])
+
+    def test_tree_ids_is_single_query_and_skips_inactive_descendants(self):
+        Category.objects.filter(pk=self.leaf.pk).update(active=False)
+        with self.assertNumQueries(1, using="store"):
+            ids = category_tree_ids(self.root)
+        self.assertEqual(set(ids), {self.root.id, self.child.id})
+
+    def test_inactive_intermediate_hides_only_itself_and_path_rows_are_kept(self):
+        Category.objects.filter(pk=self.child.pk).update(active=False)
+        # Sparse row: no parent_id (no closure link), only its path_slug places it under root.
+        orphan = Category.objects.create(name="Hô hấp", slug="ho-hap")
+        Category.objects.filter(pk=orphan.pk).update(path_slug="thuoc/ho-hap")
+        expected = {self.root.id, self.leaf.id, orphan.id}
+
+        with self.assertNumQueries(1, using="store"):
+            self.assertEqual(set(category_tree_ids(self.root)), expected)
+        for category in (self.child, self.leaf, orphan):
+            Product.objects.create(name=category.name, slug=f"sp-{category.slug}", category=category)
+        for scope in ([self.root.id], None):
+            self.assertEqual(compute_category_counts(scope, using="store")[self.root.id]["subtree_count"], 2)
+        CategoryClosure.objects.filter(ancestor=self.root).delete()  # closure not rebuilt yet: BFS
+        self.assertEqual(set(category_tree_ids(self.root)), expected)
+
+        route = build_routing_table("t", using="store").categories["thuoc"]
+        self.assertEqual(set(route.descendant_ids), expected)
+
+    def test_reparent_moves_whole_subtree(self):
+        self.child.parent = self.other
+        self.child.save()
+
+        self.assertEqual(self._links(self.leaf), {(self.leaf.id, 0), (self.child.id, 1), (self.other.id, 2)})
+        self.assertEqual(set(category_tree_ids(self.root)), {self.root.id})
+        self.assertEqual(set(category_tree_ids(self.other)), {self.other.id, self.child.id, self.leaf.id})
+        report = check_category_closure()
+        self.assertEqual((report["missing"], report["unexpected"]), ([], []))
+
+    def test_cannot_move_under_own_descendant(self):
+        self.root.parent = self.leaf
+        with self.assertRaises(ValueError):
+            self.root.save()
+        self.assertIsNone(Category.objects.get(pk=self.root.pk).parent_id)
+
+    def test_delete_cascades_closure_rows(self):
+        self.child.delete()
+        self.assertFalse(CategoryClosure.objects.filter(descendant_id__in=[self.child.id, self.leaf.id]).exists())
+        self.assertEqual(set(category_tree_ids(self.root)), {self.root.id})
+
+    def test_check_reports_drift_and_rebuild_repairs_it(self):
+        # Bulk writes bypass save(): closure now disagrees with the parent chain.
+        Category.objects.filter(pk=self.child.pk).update(parent=self.other)
+        with self.assertRaises(CommandError):
+            call_command("rebuild_category_closure", "--check", stdout=StringIO())
+
+        out = StringIO()
+        call_command("rebuild_category_closure", stdout=out)
+        self.assertIn("row(s)", out.getvalue())
+        call_command("rebuild_category_closure", "--check", stdout=StringIO())
+        self.assertEqual(set(category_tree_ids(self.other)), {self.other.id, self.child.id, self.leaf.id})
@@ -0,0 +1,104 @@
+"""Set-based descendant path rewrite in Category.save()."""
+from django.db import connections
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from storeApp.models import Category
+from storeApp.services.category_closure import rebuild_category_closure
+from storeApp.signals.category_tree import category_tree_changed
+
+# 1 + 10 + 100 + 1000 + 8889 = 10_000 nodes over 5 levels.
+LEVEL_FANOUT = (10, 10, 10)
+LEAF_COUNT = 8889
+
+
+def build_tree(root_slug, *, fanout=LEVEL_FANOUT, leaves=LEAF_COUNT):
+    """Bulk-insert a synthetic tree under a saved root; returns (root, deepest leaf)."""
+    root = Category.objects.create(name=root_slug.title(), slug=root_slug)
+    parents = [root]
+    for level, width in enumerate(fanout, start=1):
+        rows = [
+            Category(
+                name=f"N{level}-{p_index}-{i}",
+                slug=f"n{level}-{i}",
+                parent=parent,
+                level=level,
+                path=f"{parent.path} > N{level}-{p_index}-{i}",
+                path_slug=f"{parent.path_slug}/n{level}-{i}",
+            )
+            for p_index, parent in enumerate(parents)
+            for i in range(width)
+        ]
+        parents = Category.objects.bulk_create(rows, batch_size=500)
+    leaf_rows = [
+        Category(
+            name=f"Leaf-{i}",
+            slug=f"leaf-{i}",
+            parent=parents[i % len(parents)],
+            level=len(fanout) + 1,
+            path=f"{parents[i % len(parents)].path} > Leaf-{i}",
+            path_slug=f"{parents[i % len(parents)].path_slug}/leaf-{i}",
+        )
+        for i in range(leaves)
+    ]
+    leaf_rows = Category.objects.bulk_create(leaf_rows, batch_size=500)
+    rebuild_category_closure()
+    return root, leaf_rows[-1]
+
+
+class CategoryPathRewriteTests(TestCase):
+    databases = {"default", "store"}
+
+    def _rename_queries(self, root):
+        root.name = f"{root.name} Renamed"
+        root.slug = f"{root.slug}-renamed"
+        with CaptureQueriesContext(connections["store"]) as captured:
+            root.save()
+        return len(captured)
+
+    def test_rename_root_of_10k_tree_uses_constant_statements(self):
+        small_root, _ = build_tree("small", fanout=(2, 2, 2), leaves=3)
+        big_root, deep_leaf = build_tree("big")
+        self.assertEqual(Category.objects.filter(path_slug__startswith="big/").count(), 9999)
+
+        received = []
+        category_tree_changed.connect(lambda **kw: received.append(kw["descendants"]), weak=False, dispatch_uid="t")
+        try:
+            small_count = self._rename_queries(small_root)
+            big_count = self._rename_queries(big_root)
+        finally:
+            category_tree_changed.disconnect(dispatch_uid="t")
+
+        self.assertEqual(big_count, small_count)
+        self.assertEqual(received, [17, 9999])
+
+        deep_leaf.refresh_from_db()
+        self.assertTrue(deep_leaf.path_slug.startswith("big-renamed/n1-"))
+        self.assertTrue(deep_leaf.path.startswith("Big Renamed > N1-"))
+        self.assertEqual(deep_leaf.level, 4)
+        self.assertFalse(Category.objects.filter(path_slug__startswith="big/").exists())
+
+    def test_move_subtree_updates_path_and_level(self):
+        root = Category.objects.create(name="Root", slug="root")
+        other = Category.objects.create(name="Other", slug="other")
+        mid = Category.objects.create(name="Mid", slug="mid", parent=root)
+        leaf = Category.objects.create(name="Leaf", slug="leaf", parent=mid)
+
+        mid.parent = other
+        mid.save()
+        leaf.refresh_from_db()
+        self.assertEqual((leaf.path, leaf.path_slug, leaf.level), ("Other > Mid > Leaf", "other/mid/leaf", 2))
+
+        # Moving to root level shifts every descendant up.
+        mid.parent = None
+        mid.save()
+        leaf.refresh_from_db()
+        self.assertEqual((leaf.path, leaf.path_slug, leaf.level), ("Mid > Leaf", "mid/leaf", 1))
+
+    def test_rename_without_slug_change_rewrites_display_path(self):
+        root = Category.objects.create(name="Root", slug="root")
+        child = Category.objects.create(name="Child", slug="child", parent=root)
+        root.name = "Gốc"
+        root.save()
+        child.refresh_from_db()
+        self.assertEqual((child.path, child.path_slug), ("Gốc > Child", "root/child"))
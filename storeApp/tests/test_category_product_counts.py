@@ -0,0 +1,114 @@
+"""CategoryProductCount rollup: signal refresh, subcategory listing, drift report."""
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from storeApp.models import Category, CategoryProductCount, Product, ProductVariant
+from storeApp.services.category_counts import defer_category_count_refresh, live_category_counts
+from storeApp.services.filter_helpers import FilterHelpers
+
+
+class CategoryProductCountTests(TestCase):
+    databases = {"default", "store"}
+
+    def setUp(self):
+        with self._committed():
+            self.root = Category.objects.create(name="Thực phẩm chức năng", slug="tpcn")
+            self.vitamin = Category.objects.create(name="Vitamin", slug="vitamin", parent=self.root)
+            self.mineral = Category.objects.create(name="Khoáng chất", slug="khoang-chat", parent=self.root)
+            self.vitamin_c = Category.objects.create(name="Vitamin C", slug="vitamin-c", parent=self.vitamin)
+            self.products = {
+                "c500": self._product("C 500", self.vitamin_c),
+                "multi": self._product("Multi", self.vitamin),
+                "zinc": self._product("Zinc", self.mineral),
+            }
+            # Same product listed under two branches: counted once at the root.
+            self.products["multi"].assign_category(self.mineral, set_primary_if_none=False)
+
+    def _committed(self):
+        # Signal refreshes run when the surrounding transaction commits.
+        return self.captureOnCommitCallbacks(using="store", execute=True)
+
+    def _product(self, name, category, *, published=True):
+        product = Product.objects.create(name=name, slug=name.lower().replace(" ", "-"))
+        product.assign_category(category)
+        ProductVariant.objects.create(product=product, packing="Hộp", is_published=published)
+        return product
+
+    def _counts(self, category):
+        row = CategoryProductCount.objects.get(category=category)
+        return tuple(getattr(row, field) for field in CategoryProductCount.COUNT_FIELDS)
+
+    def test_signals_keep_direct_and_subtree_counts(self):
+        # (direct, direct_published, subtree, subtree_published)
+        self.assertEqual(self._counts(self.root), (0, 0, 3, 3))
+        self.assertEqual(self._counts(self.vitamin), (1, 1, 2, 2))
+        self.assertEqual(self._counts(self.mineral), (2, 2, 2, 2))
+
+        variant = self.products["c500"].variants.get()
+        variant.is_published = False
+        with self._committed():
+            variant.save()
+        self.assertEqual(self._counts(self.vitamin), (1, 1, 2, 1))
+        self.assertEqual(self._counts(self.root), (0, 0, 3, 2))
+
+        with self._committed():
+            self.products["zinc"].delete()
+        self.assertEqual(self._counts(self.mineral), (1, 1, 1, 1))
+        for category in (self.root, self.vitamin, self.mineral, self.vitamin_c):
+            self.assertEqual(self._counts(category), tuple(live_category_counts(category).values()))
+
+    def test_refresh_is_deferred_to_commit_and_runs_once(self):
+        with self._committed() as callbacks:
+            for index in range(5):
+                self._product(f"E {index}", self.vitamin_c)
+            self.assertEqual(self._counts(self.vitamin_c), (1, 1, 1, 1))
+        self.assertEqual(self._counts(self.vitamin_c), (6, 6, 6, 6))
+        self.assertEqual(self._counts(self.root)[2], 8)
+        with self.assertNumQueries(0, using="store"):
+            for callback in callbacks[1:]:
+                callback()  # later callbacks of the same commit find the queue empty
+
+    def test_moving_a_subtree_refreshes_old_and_new_ancestors(self):
+        with self._committed():
+            self.vitamin_c.parent = self.mineral
+            self.vitamin_c.save()
+        self.assertEqual(self._counts(self.vitamin), (1, 1, 1, 1))
+        self.assertEqual(self._counts(self.mineral), (2, 2, 3, 3))
+        self.assertEqual(self._counts(self.root), (0, 0, 3, 3))
+        for category in (self.root, self.vitamin, self.mineral, self.vitamin_c):
+            self.assertEqual(self._counts(category), tuple(live_category_counts(category).values()))
+
+    def test_immediate_subcategories_is_one_query(self):
+        with self.assertNumQueries(1, using="store"):
+            subcategories = FilterHelpers.get_immediate_subcategories(self.root)
+        self.assertEqual(
+            [(row["slug"], row["productCount"]) for row in subcategories],
+            [("tpcn/khoang-chat", 2), ("tpcn/vitamin", 2)],
+        )
+
+    def test_missing_row_falls_back_to_live_count(self):
+        CategoryProductCount.objects.filter(category=self.vitamin).delete()
+        subcategories = FilterHelpers.get_immediate_subcategories(self.root)
+        self.assertIn(("tpcn/vitamin", 2), [(row["slug"], row["productCount"]) for row in subcategories])
+
+    def test_deferred_refresh_runs_once_on_exit(self):
+        with defer_category_count_refresh():
+            self._product("D3", self.vitamin)
+            self.assertEqual(self._counts(self.vitamin), (1, 1, 2, 2))
+        self.assertEqual(self._counts(self.vitamin), (2, 2, 3, 3))
+        self.assertEqual(self._counts(self.root)[3], 4)
+
+    def test_check_reports_drift_and_fix_repairs_it(self):
+        # Queryset updates bypass the signals.
+        ProductVariant.objects.filter(product=self.products["zinc"]).update(is_published=False)
+        with self.assertRaises(CommandError):
+            call_command("rebuild_category_product_counts", "--check", stdout=StringIO())
+
+        out = StringIO()
+        call_command("rebuild_category_product_counts", "--check", "--fix", stdout=out)
+        self.assertIn("Drifted categories: 2", out.getvalue())
+        self.assertEqual(self._counts(self.mineral), (2, 1, 2, 1))
+        call_command("rebuild_category_product_counts", "--check", stdout=StringIO())
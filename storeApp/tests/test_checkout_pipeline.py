@@ -0,0 +1,112 @@
+"""Checkout pipeline: constant statement count per checkout, set-based voucher consumption, stage timings."""
+import uuid
+from datetime import timedelta
+
+from django.db import connections
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from storeApp.models import (
+    Cart,
+    CartItem,
+    Category,
+    MedicineBatch,
+    OrderItemBatchAllocation,
+    PaymentMethod,
+    Product,
+    ProductCategory,
+    ProductVariant,
+    ProductVariantUnit,
+    ShippingMethod,
+    Voucher,
+    VoucherRedemption,
+)
+from storeApp.services.cart_service import checkout_cart
+from storeApp.services.order_numbers import order_number_allocator
+
+# savepoint, lock cart, lines, category prefetch, lock variants, stock, vouchers (locked), redemption counts,
+# order number, order, order items, batch lock, batch update, ledger, in_stock sync, holds,
+# savepoint, used_count, redemptions, release, paid lines, cart update, release
+CHECKOUT_STORE_QUERIES = 23
+
+
+class CheckoutPipelineTests(TestCase):
+    databases = {"default", "store"}
+
+    def setUp(self):
+        self.today = timezone.now().date()
+        self.category = Category.objects.create(name="Pipeline", slug="pipeline")
+        self.shipping = ShippingMethod.objects.create(name="Standard", price=30000, estimated_days=2, active=True)
+        self.payment = PaymentMethod.objects.create(name="COD", code="COD", active=True)
+        self.order_voucher = Voucher.objects.create(code="PIPE10", type="PERCENT", value="10.00")
+        self.shipping_voucher = Voucher.objects.create(
+            code="PIPESHIP", type="FIXED", value="10000.00", scope=Voucher.SHIPPING_DISCOUNT
+        )
+
+    def _cart(self, lines, user_id):
+        cart = Cart.objects.create(
+            user_id=user_id,
+            status=Cart.ACTIVE,
+            shipping_method=self.shipping,
+            order_voucher=self.order_voucher,
+            shipping_voucher=self.shipping_voucher,
+        )
+        for _ in range(lines):
+            suffix = uuid.uuid4().hex[:8]
+            product = Product.objects.create(name=f"Pipeline {suffix}", slug=f"pipeline-{suffix}", category=self.category)
+            ProductCategory.objects.create(product=product, category=self.category, is_primary=True)
+            variant = ProductVariant.objects.create(product=product, packing="Hộp", is_published=True)
+            unit = ProductVariantUnit.objects.create(
+                variant=variant, quantity_in_base=1, unit_name="Hộp", price_value=20000, is_default=True, is_published=True
+            )
+            for index in range(2):
+                MedicineBatch.objects.create(
+                    batch_number=f"{suffix}-{index}",
+                    product_variant=variant,
+                    import_date=self.today - timedelta(days=5),
+                    expiry_date=self.today + timedelta(days=60 * (index + 1)),
+                    quantity=2,
+                    remaining_quantity=2,
+                )
+            CartItem.objects.create(
+                cart=cart, product_variant=variant, product_variant_unit=unit, quantity=3, unit_price_snapshot=20000
+            )
+        return cart
+
+    def _checkout(self, cart):
+        return checkout_cart(
+            cart=cart, payment_method=self.payment, shipping_address="HCM", using="store", expected_version=cart.version
+        )
+
+    def test_statement_count_does_not_grow_with_cart_size(self):
+        with self.captureOnCommitCallbacks(using="store", execute=True):
+            order_number_allocator.allocate()  # first-of-day seeding happens once per process
+        for lines in (1, 20):
+            with self.subTest(lines=lines):
+                cart = self._cart(lines, user_id=500 + lines)
+                with CaptureQueriesContext(connections["store"]) as queries:
+                    order = self._checkout(cart)
+                self.assertEqual(len(queries.captured_queries), CHECKOUT_STORE_QUERIES)
+                self.assertEqual(order.items.count(), lines)
+                self.assertEqual(OrderItemBatchAllocation.objects.filter(order_item__order=order).count(), 2 * lines)
+
+    def test_vouchers_consumed_once_each(self):
+        order = self._checkout(self._cart(2, user_id=42))
+        self.assertEqual(
+            sorted(VoucherRedemption.objects.filter(order=order).values_list("voucher__code", "user_id")),
+            [("PIPE10", 42), ("PIPESHIP", 42)],
+        )
+        self.assertEqual(
+            sorted(Voucher.objects.values_list("code", "used_count")), [("PIPE10", 1), ("PIPESHIP", 1)]
+        )
+
+    def test_stage_timings_are_logged(self):
+        with self.assertLogs("storeApp.services.cart_service", level="INFO") as logs:
+            order = self._checkout(self._cart(1, user_id=7))
+        self.assertEqual(
+            list(order.checkout_stages),
+            ["prepare", "lock_cart", "load_lines", "stock_check", "vouchers", "order", "order_items", "deduct", "consume", "commit", "cache"],
+        )
+        self.assertIn(f"order={order.order_number}", logs.output[0])
+        self.assertIn("total_ms=", logs.output[0])
@@ -0,0 +1,198 @@
+"""In-memory facet postings: parity with the SQL aggregates, incremental refresh, rebuilds."""
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from storeApp.models import (
+    Brand,
+    CatalogAttribute,
+    CatalogAttributeOption,
+    Category,
+    MedicineBatch,
+    Product,
+    ProductAttributeValue,
+    ProductVariant,
+    ProductVariantUnit,
+)
+from storeApp.services import facet_index as facet_index_module
+from storeApp.services.facet_index import bitmap_from_positions, facet_index, iter_positions
+from storeApp.services.search_facets_service import SearchFacetsService
+from storeApp.services.stock import deduct_stock_bulk
+from storeApp.viewsets.product import annotate_variant_unit_price
+
+SEARCH_QUERIES = (
+    {},
+    {"q": "siro"},
+    {"price_range": "under_100k"},
+    {"in_stock": "true"},
+    {"origin_country": "Pháp"},
+    {"attrs": "doi_tuong:tre-em"},
+)
+
+
+class FacetIndexTests(APITestCase):
+    databases = {"default", "store"}
+
+    def setUp(self):
+        cache.clear()
+        facet_index.clear()
+        enabled = mock.patch.object(facet_index_module, "INDEX_ENABLED", True)
+        enabled.start()
+        self.addCleanup(enabled.stop)
+        self.addCleanup(facet_index.clear)
+
+        self.cough = Category.objects.create(name="Ho", slug="ho")
+        self.fever = Category.objects.create(name="Sốt", slug="sot")
+        self.vn = Brand.objects.create(name="Dược Hậu Giang", country="Việt Nam")
+        self.fr = Brand.objects.create(name="Sanofi", country="Pháp")
+        attribute = CatalogAttribute.objects.create(code="doi_tuong", label="Đối tượng")
+        self.kids = CatalogAttributeOption.objects.create(attribute=attribute, slug="tre-em", label="Trẻ em")
+        self.adults = CatalogAttributeOption.objects.create(attribute=attribute, slug="nguoi-lon", label="Người lớn")
+
+        self.siro = self._product("Siro ho trẻ em", self.vn, self.cough, [(45000, 3), (90000, 0)], self.kids)
+        self._product("Siro ho người lớn", self.fr, self.cough, [(150000, 8)], self.adults)
+        self._product("Hạ sốt Efferalgan", self.fr, self.fever, [(320000, 2), (600000, 1)], self.kids)
+        hidden = self._product("Ẩn", self.vn, self.fever, [(10000, 1)], None)
+        hidden.variants.update(is_published=False)
+
+    def _product(self, name, brand, category, variants, option):
+        product = Product.objects.create(name=name, slug=name.lower().replace(" ", "-"), brand=brand)
+        product.assign_category(category)
+        for packing_index, (price, in_stock) in enumerate(variants):
+            variant = ProductVariant.objects.create(product=product, packing=f"Hộp {packing_index}", in_stock=in_stock)
+            ProductVariantUnit.objects.create(
+                variant=variant, unit_name="Hộp", price_value=price, is_default=True, is_published=True
+            )
+        if option is not None:
+            ProductAttributeValue.objects.create(product=product, option=option)
+        return product
+
+    def _facets(self, params, *, indexed):
+        with mock.patch.object(facet_index_module, "INDEX_ENABLED", indexed):
+            response = self.client.get("/api/store/search/", {**params, "use_facet_cache": "false"})
+        self.assertEqual(response.status_code, 200)
+        return response.json()["facets"]
+
+    def test_bitmap_helpers_round_trip(self):
+        positions = [0, 7, 8, 63, 64, 1000]
+        self.assertEqual(list(iter_positions(bitmap_from_positions(positions))), positions)
+
+    def test_index_matches_sql_facets(self):
+        for params in SEARCH_QUERIES + ({"category": self.cough.id},):
+            with self.subTest(params=params):
+                self.assertEqual(self._facets(params, indexed=True), self._facets(params, indexed=False))
+        self.assertEqual(facet_index.stats()["state"], "ready")
+
+    def test_unfiltered_facets_need_no_query_once_warm(self):
+        queryset = annotate_variant_unit_price(ProductVariant.objects.using("store").all())
+        params = SearchFacetsService.facet_params_from_request(
+            query_normalized="", category=None, brand=None, price_range=None, in_stock=None
+        )
+        SearchFacetsService.get_facets(queryset, params, use_cache=False)
+        with self.assertNumQueries(0, using="store"):
+            facets = SearchFacetsService.get_facets(queryset, params, use_cache=False)
+        self.assertEqual(sum(item["count"] for item in facets["in_stock"]), 5)
+
+    def test_product_changes_refresh_incrementally(self):
+        self._facets({}, indexed=True)
+        rebuilds = facet_index.rebuilds
+
+        variant = self.siro.variants.get(packing="Hộp 1")
+        with self.captureOnCommitCallbacks(using="store", execute=True):
+            variant.units.update(price_value=700000)
+            ProductVariant.sync_price_columns([variant.id], using="store")
+            variant.in_stock = 4
+            variant.save()
+            self._product("Siro ho Pháp", self.fr, self.cough, [(20000, 1)], self.adults)
+
+        self.assertEqual(self._facets({}, indexed=True), self._facets({}, indexed=False))
+        self.assertEqual(facet_index.rebuilds, rebuilds)
+        self.assertGreaterEqual(facet_index.incremental_refreshes, 1)
+
+    def test_label_changes_and_missing_log_entries_rebuild(self):
+        self._facets({}, indexed=True)
+        rebuilds = facet_index.rebuilds
+
+        self.fr.name = "Sanofi Aventis"
+        self.fr.save()
+        facets = self._facets({}, indexed=True)
+        self.assertIn("Sanofi Aventis", [brand["name"] for brand in facets["brand"]])
+        self.assertEqual(facet_index.rebuilds, rebuilds + 1)
+
+        # A gap in the shared change log (evicted entry) cannot be replayed once the grace is over.
+        facet_index.publish_changes([self.siro.id])
+        cache.delete(f"{facet_index_module.CACHE_PREFIX}:log:{facet_index.log_seq()}")
+        self._facets({}, indexed=True)
+        self.assertEqual(facet_index.rebuilds, rebuilds + 1)  # may still be in flight
+        with mock.patch.object(facet_index_module, "LOG_GAP_GRACE", -1):
+            self._facets({}, indexed=True)
+        self.assertEqual(facet_index.rebuilds, rebuilds + 2)
+
+    def test_published_seq_never_outruns_its_entry(self):
+        self._facets({}, indexed=True)
+        rebuilds = facet_index.rebuilds
+        seen = []
+        real_set = facet_index_module.shared_cache().set
+
+        def record(key, value, *args, **kwargs):
+            if key.startswith(f"{facet_index_module.CACHE_PREFIX}:log:"):
+                seen.append(("entry", facet_index.log_seq()))
+            real_set(key, value, *args, **kwargs)
+
+        with mock.patch.object(facet_index_module.shared_cache(), "set", side_effect=record):
+            facet_index.publish_changes([self.siro.id])
+        self.assertEqual(seen, [("entry", 0)])
+        self.assertEqual(facet_index.log_seq(), 1)
+
+        # A writer between reserve and write: a later entry is published past it. Readers replay
+        # up to the gap and wait for it instead of rebuilding.
+        with mock.patch.object(facet_index_module.shared_cache(), "set"):
+            facet_index.publish_changes([self.siro.id])
+        facet_index.publish_changes([self.siro.id])
+        self.assertEqual(facet_index.log_seq(), 3)
+        self.assertEqual(self._facets({}, indexed=True), self._facets({}, indexed=False))
+        self.assertEqual(facet_index._index.applied_seq, 1)
+        cache.set(f"{facet_index_module.CACHE_PREFIX}:log:2", [self.siro.id])
+        self._facets({}, indexed=True)
+        self.assertEqual((facet_index._index.applied_seq, facet_index.rebuilds), (3, rebuilds))
+
+    def test_set_based_stock_writers_refresh_incrementally(self):
+        variant = self.siro.variants.get(packing="Hộp 0")
+        MedicineBatch.objects.create(
+            batch_number="FACET-1",
+            product_variant=variant,
+            import_date=timezone.now().date(),
+            expiry_date=timezone.now().date() + timedelta(days=90),
+            quantity=3,
+            remaining_quantity=3,
+        )
+        self._facets({}, indexed=True)
+        rebuilds = facet_index.rebuilds
+
+        with self.captureOnCommitCallbacks(using="store", execute=True):
+            with transaction.atomic(using="store"):
+                deduct_stock_bulk([(variant.id, 3, None)])
+        self.assertEqual(ProductVariant.objects.get(id=variant.id).in_stock, 0)
+
+        facets = self._facets({}, indexed=True)
+        self.assertEqual(facets, self._facets({}, indexed=False))
+        self.assertEqual({item["key"]: item["count"] for item in facets["in_stock"]}, {True: 3, False: 2})
+        self.assertEqual(facet_index.rebuilds, rebuilds)
+
+    def test_index_past_max_age_is_rebuilt(self):
+        self._facets({}, indexed=True)
+        rebuilds = facet_index.rebuilds
+        # A writer that publishes nothing: only the age bound brings the index back in line.
+        ProductVariant.objects.filter(product=self.siro).update(in_stock=0)
+        self._facets({}, indexed=True)
+        self.assertEqual(facet_index.rebuilds, rebuilds)
+
+        with mock.patch.object(facet_index_module, "MAX_AGE", 0):
+            self.assertEqual(facet_index.stats()["state"], "stale")
+            facets = self._facets({}, indexed=True)
+        self.assertEqual(facet_index.rebuilds, rebuilds + 1)
+        self.assertEqual(facets, self._facets({}, indexed=False))
@@ -0,0 +1,131 @@
+"""Guest → user cart merge: constant statement count, summed quantities, clamp / drop report."""
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from storeApp.models import (
+    Cart,
+    CartItem,
+    MedicineBatch,
+    Product,
+    ProductVariant,
+    ProductVariantUnit,
+    StockReservation,
+)
+from storeApp.services.cart_service import merge_guest_cart_into_user
+
+# savepoint, lock both carts, both line sets, release guest holds, stock, bulk insert, bulk update,
+# delete guest lines, retire guest cart, recalculation (lines, category prefetch, cart update, refresh), release
+MERGE_STORE_QUERIES = 14
+
+
+class GuestCartMergeTests(TestCase):
+    databases = {"default", "store"}
+
+    def setUp(self):
+        self.today = timezone.now().date()
+        self.user = get_user_model().objects.create_user(email=f"merge-{uuid.uuid4().hex[:6]}@example.com", password="x")
+
+    def _variant(self, stock=20, *, quantity_in_base=1):
+        suffix = uuid.uuid4().hex[:8]
+        product = Product.objects.create(name=f"Merge {suffix}", slug=f"merge-{suffix}")
+        variant = ProductVariant.objects.create(product=product, packing="Hộp", is_published=True)
+        ProductVariantUnit.objects.create(
+            variant=variant,
+            quantity_in_base=quantity_in_base,
+            unit_name="Hộp",
+            price_value=1000,
+            is_default=True,
+            is_published=True,
+        )
+        if stock:
+            MedicineBatch.objects.create(
+                batch_number=f"M-{suffix}",
+                product_variant=variant,
+                import_date=self.today - timedelta(days=3),
+                expiry_date=self.today + timedelta(days=200),
+                quantity=stock,
+                remaining_quantity=stock,
+            )
+        return variant
+
+    def _line(self, cart, variant, quantity):
+        return CartItem.objects.create(
+            cart=cart,
+            product_variant=variant,
+            product_variant_unit=variant.units.first(),
+            quantity=quantity,
+            unit_price_snapshot=1000,
+        )
+
+    def _quantities(self, cart):
+        return dict(cart.items.values_list("product_variant_id", "quantity"))
+
+    def test_statement_count_does_not_grow_with_guest_cart_size(self):
+        counts = []
+        for lines in (5, 50):
+            with self.subTest(lines=lines):
+                user = get_user_model().objects.create_user(email=f"merge-{lines}@example.com", password="x")
+                user_cart = Cart.objects.create(user_id=user.id, status=Cart.ACTIVE)
+                guest_id = uuid.uuid4()
+                guest_cart = Cart.objects.create(guest_session_id=guest_id, status=Cart.ACTIVE)
+                variants = [self._variant() for _ in range(lines)]
+                for index, variant in enumerate(variants):
+                    self._line(guest_cart, variant, 2)
+                    if index % 2:
+                        self._line(user_cart, variant, 1)
+                with CaptureQueriesContext(connections["store"]) as queries:
+                    cart = merge_guest_cart_into_user(guest_session_id=str(guest_id), user_id=user.id)
+                counts.append(len(queries.captured_queries))
+                self.assertEqual(cart.id, user_cart.id)
+                self.assertEqual(
+                    self._quantities(cart), {variant.id: 3 if index % 2 else 2 for index, variant in enumerate(variants)}
+                )
+                self.assertEqual((cart.merge_report.created, cart.merge_report.updated), (lines - lines // 2, lines // 2))
+                guest_cart.refresh_from_db()
+                self.assertEqual(guest_cart.status, Cart.ABANDONED)
+                self.assertFalse(guest_cart.items.exists())
+        self.assertEqual(counts, [MERGE_STORE_QUERIES, MERGE_STORE_QUERIES])
+
+    def test_clamps_to_stock_and_reports(self):
+        guest_id = uuid.uuid4()
+        guest_cart = Cart.objects.create(guest_session_id=guest_id, status=Cart.ACTIVE)
+        user_cart = Cart.objects.create(user_id=self.user.id, status=Cart.ACTIVE)
+        shared = self._variant(stock=10)
+        boxes = self._variant(stock=25, quantity_in_base=10)
+        sold_out = self._variant(stock=0)
+        retired = self._variant()
+        self._line(user_cart, shared, 8)
+        self._line(guest_cart, shared, 5)
+        self._line(guest_cart, boxes, 3)
+        self._line(guest_cart, sold_out, 1)
+        self._line(guest_cart, retired, 1)
+        ProductVariant.objects.filter(id=retired.id).update(active=False)
+        # The guest's own hold must not shrink what the user cart can take.
+        StockReservation.objects.create(
+            cart=guest_cart, product_variant=boxes, quantity=30, expires_at=timezone.now() + timedelta(minutes=10)
+        )
+
+        cart = merge_guest_cart_into_user(guest_session_id=str(guest_id), user_id=self.user.id)
+        self.assertEqual(self._quantities(cart), {shared.id: 10, boxes.id: 2})
+        report = cart.merge_report.as_dict()
+        self.assertEqual(report["guest_lines"], 4)
+        self.assertEqual(
+            [(row["product_variant_id"], row["requested"], row["merged"], row["available"]) for row in report["clamped"]],
+            [(shared.id, 5, 2, 10), (boxes.id, 3, 2, 25)],
+        )
+        self.assertEqual(
+            [(row["product_variant_id"], row["reason"]) for row in report["dropped"]],
+            [(sold_out.id, "out_of_stock"), (retired.id, "unavailable")],
+        )
+        self.assertFalse(StockReservation.objects.filter(cart=guest_cart).exists())
+
+    def test_missing_guest_cart_returns_user_cart(self):
+        cart = merge_guest_cart_into_user(guest_session_id=str(uuid.uuid4()), user_id=self.user.id)
+        self.assertEqual(cart.user_id, self.user.id)
+        self.assertEqual(cart.merge_report.guest_lines, 0)
@@ -0,0 +1,95 @@
+"""in_stock counter: per-batch deltas, deferred bulk sync, drift reconciliation."""
+import uuid
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connections
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from storeApp.models import MedicineBatch, Product, ProductVariant
+from storeApp.services.in_stock_sync import in_stock_drift
+from storeApp.services.stock import defer_in_stock_sync
+
+
+class InStockCounterTests(TestCase):
+    databases = {"default", "store"}
+
+    def setUp(self):
+        self.today = timezone.now().date()
+
+    def _variant(self, in_stock=0):
+        suffix = uuid.uuid4().hex[:8]
+        product = Product.objects.create(name=f"Counter {suffix}", slug=f"counter-{suffix}")
+        return ProductVariant.objects.create(product=product, packing="Hộp", in_stock=in_stock)
+
+    def _batch(self, variant, quantity, *, expires_in=90):
+        return MedicineBatch.objects.create(
+            batch_number=f"CNT-{uuid.uuid4().hex[:10]}",
+            product_variant=variant,
+            import_date=self.today - timedelta(days=1),
+            expiry_date=self.today + timedelta(days=expires_in),
+            quantity=quantity,
+            remaining_quantity=quantity,
+        )
+
+    def _in_stock(self, variant):
+        return ProductVariant.objects.values_list("in_stock", flat=True).get(id=variant.id)
+
+    def test_batch_writes_apply_deltas_without_aggregating(self):
+        variant = self._variant(in_stock=7)
+        first = self._batch(variant, 10)
+        self.assertEqual(self._in_stock(variant), 10)  # first batch replaces the cache-only value
+
+        with CaptureQueriesContext(connections["store"]) as queries:
+            second = self._batch(variant, 5)
+            second.remaining_quantity = 2
+            second.save(update_fields=["remaining_quantity"])
+            second.import_price_per_base_unit = 100
+            second.save(update_fields=["import_price_per_base_unit"])
+        self.assertFalse([q for q in queries.captured_queries if "SUM(" in q["sql"]])
+        self.assertEqual(self._in_stock(variant), 12)
+
+        loaded = MedicineBatch.objects.get(id=first.id)
+        with self.assertNumQueries(2, using="store"):  # row update + counter update, no re-read
+            loaded.active = False
+            loaded.save()
+        self.assertEqual(self._in_stock(variant), 2)
+
+        other = self._variant()
+        second.product_variant = other
+        second.save()
+        second.delete()
+        self.assertEqual((self._in_stock(variant), self._in_stock(other)), (0, 0))
+
+    def test_deferred_bulk_writes_sync_once(self):
+        variants = [self._variant() for _ in range(3)]
+        with CaptureQueriesContext(connections["store"]) as queries:
+            with defer_in_stock_sync():
+                for variant in variants:
+                    for quantity in (4, 6):
+                        self._batch(variant, quantity)
+                self._batch(variants[0], 50, expires_in=-1)
+        counter_updates = [
+            q for q in queries.captured_queries if q["sql"].replace('"', "").startswith("UPDATE store_product_variant ")
+        ]
+        self.assertEqual(len(counter_updates), 1)
+        self.assertEqual([self._in_stock(variant) for variant in variants], [10, 10, 10])
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        variant = self._variant()
+        self._batch(variant, 8)
+        expiring = self._batch(variant, 3)
+        MedicineBatch.objects.filter(id=expiring.id).update(expiry_date=self.today - timedelta(days=1))
+        self.assertEqual(in_stock_drift(), [{"variant_id": variant.id, "stored": 11, "live": 8}])
+
+        with self.assertRaises(CommandError):
+            call_command("reconcile_in_stock", stdout=StringIO())
+        out = StringIO()
+        call_command("reconcile_in_stock", "--fix", stdout=out)
+        self.assertIn("Re-aggregated in_stock for 1 variant(s)", out.getvalue())
+        self.assertEqual(self._in_stock(variant), 8)
+        self.assertEqual(in_stock_drift(), [])
@@ -0,0 +1,95 @@
+"""Set-based in_stock sync engine and the sync_in_stock_cache command."""
+import uuid
+from datetime import timedelta
+from io import StringIO
+
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from storeApp.models import MedicineBatch, Product, ProductVariant
+from storeApp.services import in_stock_sync
+from storeApp.services.in_stock_sync import sync_in_stock_totals
+
+
+class InStockSyncTests(TestCase):
+    databases = {"default", "store"}
+
+    def setUp(self):
+        today = timezone.now().date()
+        suffix = uuid.uuid4().hex[:8]
+        product = Product.objects.create(name=f"Sync {suffix}", slug=f"sync-{suffix}")
+        self.variants = []
+        for index in range(5):
+            variant = ProductVariant.objects.create(product=product, packing=f"Hộp {index}")
+            for days in (90, -1):  # one live batch, one expired batch
+                MedicineBatch.objects.create(
+                    batch_number=f"SYNC-{variant.id}-{days}",
+                    product_variant=variant,
+                    import_date=today - timedelta(days=200),
+                    expiry_date=today + timedelta(days=days),
+                    quantity=10 + index,
+                    remaining_quantity=10 + index,
+                )
+            self.variants.append(variant)
+        self.cache_only = ProductVariant.objects.create(product=product, packing="Chai", in_stock=4)
+        # Drift: the counter was written behind the engine's back.
+        ProductVariant.objects.filter(id__in=[self.variants[1].id, self.variants[3].id]).update(in_stock=999)
+
+    def _stock(self):
+        return list(
+            ProductVariant.objects.filter(id__in=[v.id for v in self.variants] + [self.cache_only.id])
+            .order_by("id")
+            .values_list("in_stock", flat=True)
+        )
+
+    def test_one_aggregate_and_one_update_per_chunk(self):
+        with self.assertNumQueries(1 + 3, using="store"):  # aggregate + one self-committing UPDATE per chunk
+            result = sync_in_stock_totals(chunk_size=2)
+        self.assertEqual((result.checked, result.drifted, result.written), (5, 2, 5))
+        self.assertEqual(self._stock(), [10, 11, 12, 13, 14, 4])
+        self.assertGreater(result.rows_per_second, 0)
+
+    def test_dry_run_and_only_drifted(self):
+        dry = sync_in_stock_totals(dry_run=True)
+        self.assertEqual([row["variant_id"] for row in dry.drift], [self.variants[1].id, self.variants[3].id])
+        self.assertEqual(dry.written, 0)
+        self.assertEqual(self._stock()[1], 999)
+
+        result = sync_in_stock_totals(only_drifted=True)
+        self.assertEqual(result.written, 2)
+        self.assertEqual(self._stock(), [10, 11, 12, 13, 14, 4])
+
+    def test_write_uses_the_live_sum_not_the_aggregate(self):
+        totals = in_stock_sync.batch_stock_totals
+
+        def deduct_after_read(*args, **kwargs):
+            rows = totals(*args, **kwargs)
+            # A checkout deducts between the aggregate and the chunk write.
+            MedicineBatch.objects.filter(product_variant=self.variants[1], expiry_date__gt=timezone.now().date()).update(
+                remaining_quantity=5
+            )
+            return rows
+
+        with mock.patch.object(in_stock_sync, "batch_stock_totals", side_effect=deduct_after_read):
+            result = sync_in_stock_totals(only_drifted=True)
+        self.assertEqual(result.written, 2)
+        self.assertEqual(self._stock()[1], 5)
+
+    def test_requested_variant_without_batches_is_zeroed(self):
+        result = sync_in_stock_totals([self.cache_only.id, self.variants[1].id])
+        self.assertEqual(result.checked, 2)
+        self.assertEqual(self._stock()[1], 11)
+        self.assertEqual(self._stock()[-1], 0)
+
+    def test_command_reports_rate(self):
+        out = StringIO()
+        call_command("sync_in_stock_cache", "--only-drifted", stdout=out)
+        self.assertIn("checked=5 drifted=2 written=2", out.getvalue())
+        self.assertIn("rows/s", out.getvalue())
+        out = StringIO()
+        call_command("sync_in_stock_cache", "--dry-run", stdout=out)
+        self.assertIn("[DRY-RUN]", out.getvalue())
+        self.assertIn("drifted=0 written=0", out.getvalue())
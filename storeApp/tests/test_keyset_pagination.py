@@ -0,0 +1,113 @@
+"""Keyset (cursor) pagination: /search/, category pages and /products/."""
+from django.core import signing
+from rest_framework.test import APITestCase
+
+from storeApp.models import Category, Product, ProductVariant, ProductVariantUnit
+from storeApp.services.keyset_pagination import CURSOR_SALT
+
+
+class KeysetPaginationTests(APITestCase):
+    databases = {"default", "store"}
+
+    def setUp(self):
+        self.category = Category.objects.create(name="Keyset Cat", slug="keyset-cat")
+        for idx in range(7):
+            product = Product.objects.create(name=f"Keyset product {idx}", slug=f"keyset-product-{idx}")
+            product.assign_category(self.category, using="store", set_primary_if_none=True)
+            # Two variants per product; ranking interleaves so a product's second variant
+            # would sort between other products' representatives.
+            for offset in (0, 10):
+                variant = ProductVariant.objects.create(
+                    product=product,
+                    packing=f"Hộp {offset}",
+                    in_stock=5,
+                    product_ranking=100 - idx - offset,
+                )
+                ProductVariantUnit.objects.create(
+                    variant=variant,
+                    unit_name="Hộp",
+                    quantity_in_base=1,
+                    price_value=1000 * (idx + 1) + offset,
+                    is_default=True,
+                    is_published=True,
+                )
+
+    def _walk(self, url, params, *, items_key, cursor_getter):
+        seen, cursor, pages = [], None, 0
+        while True:
+            query = {**params, "pagination": "cursor", **({"cursor": cursor} if cursor else {})}
+            response = self.client.get(url, query)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(item["id"] for item in response.data[items_key])
+            pages += 1
+            cursor = cursor_getter(response.data)
+            if not cursor:
+                return seen, pages
+
+    def test_search_cursor_matches_offset_order_without_duplicates(self):
+        params = {"q": "", "sort": "popular", "page_size": 3, "include_facets": "false"}
+        offset_ids = []
+        for page in (1, 2, 3):
+            offset_ids.extend(
+                item["id"] for item in self.client.get("/api/store/search/", {**params, "page": page}).data["items"]
+            )
+
+        cursor_ids, pages = self._walk(
+            "/api/store/search/",
+            params,
+            items_key="items",
+            cursor_getter=lambda data: data["meta"]["next_cursor"],
+        )
+        self.assertEqual(pages, 3)
+        self.assertEqual(cursor_ids, offset_ids)
+        self.assertEqual(len(set(cursor_ids)), 7)
+
+    def test_relevance_cursor_carries_an_exact_rank(self):
+        params = {"q": "keyset product", "page_size": 3, "include_facets": "false"}
+        first = self.client.get("/api/store/search/", {**params, "pagination": "cursor"})
+        payload = signing.loads(first.data["meta"]["next_cursor"], salt=CURSOR_SALT)
+        rank = payload["v"][payload["o"].index("-search_rank")]
+        self.assertIsInstance(rank, dict)  # numeric, encoded as a Decimal string, never a float
+        self.assertIn("d", rank)
+
+        cursor_ids, _pages = self._walk(
+            "/api/store/search/", params, items_key="items", cursor_getter=lambda data: data["meta"]["next_cursor"]
+        )
+        self.assertEqual(len(cursor_ids), 7)
+        self.assertEqual(len(set(cursor_ids)), 7)
+
+    def test_search_cursor_skips_count_unless_requested(self):
+        base = {"pagination": "cursor", "page_size": 3, "include_facets": "false"}
+        self.assertIsNone(self.client.get("/api/store/search/", base).data["meta"]["total"])
+        with_total = self.client.get("/api/store/search/", {**base, "include_total": "true"})
+        self.assertEqual(with_total.data["meta"]["total"], 7)
+
+    def test_tampered_or_foreign_cursor_is_rejected(self):
+        first = self.client.get(
+            "/api/store/search/", {"pagination": "cursor", "page_size": 2, "sort": "price_asc", "include_facets": "false"}
+        )
+        cursor = first.data["meta"]["next_cursor"]
+        self.assertEqual(self.client.get("/api/store/search/", {"cursor": cursor + "x"}).status_code, 404)
+        # Cursor issued for price_asc cannot be replayed with another sort.
+        self.assertEqual(
+            self.client.get("/api/store/search/", {"cursor": cursor, "sort": "price_desc"}).status_code, 404
+        )
+
+    def test_category_page_cursor_walks_each_product_once(self):
+        ids, _ = self._walk(
+            "/api/store/keyset-cat/",
+            {"page_size": 2, "ordering": "price_value"},
+            items_key="results",
+            cursor_getter=lambda data: data["next_cursor"],
+        )
+        self.assertEqual(len(ids), 7)
+        self.assertEqual(len(set(ids)), 7)
+
+    def test_products_viewset_cursor_walks_all_variants(self):
+        ids, _ = self._walk(
+            "/api/store/products/",
+            {"page_size": 5},
+            items_key="results",
+            cursor_getter=lambda data: data["next_cursor"],
+        )
+        self.assertEqual(sorted(ids), sorted(ProductVariant.objects.values_list("id", flat=True)))
@@ -0,0 +1,73 @@
+"""Mega-menu snapshot: GET /api/store/categories/ served from a prebuilt, ETag'd blob."""
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from storeApp.models import Category, Product, ProductVariant
+from storeApp.services.menu_snapshot import POINTER_KEY, build_menu_payload, menu_snapshot
+
+URL = "/api/store/categories/"
+
+
+class MenuSnapshotTests(APITestCase):
+    databases = {"default", "store"}
+
+    def setUp(self):
+        menu_snapshot.clear()
+        self.root = Category.objects.create(name="Dược phẩm", slug="duoc-pham")
+        self.level1 = Category.objects.create(name="Giảm đau", slug="giam-dau", parent=self.root)
+        self.level2 = Category.objects.create(name="Hạ sốt", slug="ha-sot", parent=self.level1)
+        product = Product.objects.create(name="Panadol", slug="panadol")
+        product.assign_category(self.level2)
+        self.variant = ProductVariant.objects.create(product=product, packing="Hộp", product_ranking=90)
+
+    def tearDown(self):
+        menu_snapshot.clear()
+
+    def test_menu_matches_serializer_and_second_read_hits_no_db(self):
+        first = self.client.get(URL)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(json.loads(first.content), json.loads(JSONRenderer().render(build_menu_payload())))
+        menu = json.loads(first.content)
+        self.assertEqual(menu[0]["level1"][0]["top_products"][0]["id"], self.variant.id)
+
+        with self.assertNumQueries(0, using="store"):
+            second = self.client.get(URL)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_if_none_match_returns_304_until_catalog_changes(self):
+        etag = self.client.get(URL)["ETag"]
+        not_modified = self.client.get(URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b"")
+
+        self.level2.name = "Hạ sốt trẻ em"
+        with self.captureOnCommitCallbacks(using="store", execute=True):
+            self.level2.save()
+            # Uncommitted: a rebuild now would snapshot pre-commit rows, so the marker waits.
+            self.assertEqual(self.client.get(URL, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        changed = self.client.get(URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], etag)
+        self.assertIn("Hạ sốt trẻ em", changed.content.decode())
+
+    def test_readers_follow_shared_pointer_only_to_complete_blobs(self):
+        built = menu_snapshot.rebuild()
+        # A pointer naming a blob that is not (yet) in the cache is ignored.
+        cache.set(POINTER_KEY, {"etag": '"not-written"', "built_at": built.built_at})
+        self.assertEqual(menu_snapshot.current().etag, built.etag)
+
+    def test_menu_stats_exposes_metrics_for_admin_only(self):
+        self.client.get(URL)
+        self.assertIn(self.client.get(f"{URL}menu-stats/").status_code, (401, 403))
+
+        admin = get_user_model().objects.create_superuser(email="menu-admin@example.com", password="x")
+        self.client.force_authenticate(admin)
+        stats = self.client.get(f"{URL}menu-stats/").data
+        self.assertEqual(stats["state"], "ready")
+        self.assertGreater(stats["size_bytes"], 0)
+        self.assertGreaterEqual(stats["build_ms"], 0)
@@ -0,0 +1,114 @@
+"""Order number allocator: format, upgrade-day seeding, rollback safety, worker blocks, parallel orders."""
+import threading
+import uuid
+
+from django.db import connections, transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from storeApp.models import Order, OrderNumberCounter, PaymentMethod, ShippingMethod
+from storeApp.services.order_numbers import OrderNumberAllocator, format_order_number, order_number_allocator
+
+
+def _order_fields():
+    return {
+        "shipping_address": "HCM",
+        "shipping_method": ShippingMethod.objects.create(name="Standard", price=0, estimated_days=2),
+        "payment_method": PaymentMethod.objects.create(name="COD", code=f"COD-{uuid.uuid4().hex[:6]}"),
+        "subtotal": 0,
+        "total": 0,
+    }
+
+
+class OrderNumberAllocatorTests(TestCase):
+    databases = {"default", "store"}
+
+    def setUp(self):
+        self.today = timezone.localtime(timezone.now()).date()
+
+    def _allocate(self, allocator):
+        # Seeding and block tails only count once the allocating transaction commits.
+        with self.captureOnCommitCallbacks(using="store", execute=True):
+            return allocator.allocate()
+
+    def test_numbers_are_sequential_one_statement_each(self):
+        allocator = OrderNumberAllocator()
+        self._allocate(allocator)  # first call of the day also seeds from existing orders
+        with self.assertNumQueries(1, using="store"):
+            second = self._allocate(allocator)
+        third = self._allocate(allocator)
+        self.assertEqual((second, third), (format_order_number(self.today, 2), format_order_number(self.today, 3)))
+        self.assertEqual(OrderNumberCounter.objects.get(day=self.today).last_value, 3)
+        self.assertEqual(allocator.stats()["round_trips"], 3)
+
+    def test_seeds_past_numbers_written_before_the_counter_existed(self):
+        fields = _order_fields()
+        Order.objects.create(order_number=format_order_number(self.today, 41), **fields)
+        Order.objects.create(order_number=f"ORD{self.today:%Y%m%d}MANUAL", **fields)
+        self.assertEqual(OrderNumberAllocator().allocate(), format_order_number(self.today, 42))
+
+    def test_rolled_back_first_allocation_reseeds(self):
+        fields = _order_fields()
+        for number in range(1, 8):
+            Order.objects.create(order_number=format_order_number(self.today, number), **fields)
+        allocator = OrderNumberAllocator(block_size=3)
+        with self.assertRaises(RuntimeError), transaction.atomic(using="store"):
+            self.assertEqual(allocator.allocate(), format_order_number(self.today, 8))
+            raise RuntimeError("checkout failed")
+
+        self.assertFalse(OrderNumberCounter.objects.filter(day=self.today).exists())
+        # Neither the seed nor the rolled-back block's tail (9, 10) may be reused from memory.
+        self.assertEqual(self._allocate(allocator), format_order_number(self.today, 8))
+        self.assertEqual(self._allocate(allocator), format_order_number(self.today, 9))
+        self.assertEqual(OrderNumberCounter.objects.get(day=self.today).last_value, 10)
+
+    def test_worker_blocks_hand_out_numbers_from_memory(self):
+        first, second = OrderNumberAllocator(block_size=5), OrderNumberAllocator(block_size=5)
+        numbers = [self._allocate(first) for _ in range(3)] + [self._allocate(second) for _ in range(6)]
+        with self.assertNumQueries(0, using="store"):
+            numbers += [self._allocate(first), self._allocate(first)]
+
+        self.assertEqual(len(set(numbers)), len(numbers))
+        self.assertEqual(numbers[:3], [format_order_number(self.today, n) for n in (1, 2, 3)])
+        self.assertEqual(numbers[3], format_order_number(self.today, 6))
+        self.assertEqual(numbers[-1], format_order_number(self.today, 5))
+        self.assertEqual((first.round_trips, second.round_trips), (1, 2))
+
+    def test_order_save_uses_the_allocator(self):
+        order = Order.objects.create(**_order_fields())
+        self.assertRegex(order.order_number, rf"^ORD{self.today:%Y%m%d}\d{{4,}}$")
+
+
+class ParallelOrderNumberTests(TransactionTestCase):
+    databases = {"default", "store"}
+
+    WORKERS = 8
+    ORDERS_PER_WORKER = 15
+
+    def test_parallel_orders_get_unique_numbers_without_retries(self):
+        fields = _order_fields()
+        retries_before = order_number_allocator.retries
+        start = threading.Barrier(self.WORKERS)
+        errors = []
+
+        def run():
+            try:
+                start.wait()
+                for _ in range(self.ORDERS_PER_WORKER):
+                    Order.objects.create(**fields)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=run) for _ in range(self.WORKERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=60)
+
+        numbers = list(Order.objects.values_list("order_number", flat=True))
+        self.assertEqual(errors, [])
+        self.assertEqual(len(numbers), self.WORKERS * self.ORDERS_PER_WORKER)
+        self.assertEqual(len(set(numbers)), len(numbers))
+        self.assertEqual(order_number_allocator.retries, retries_before)
@@ -0,0 +1,100 @@
+"""ProductSearchDocument maintenance (signals, rebuild command) and document-backed search."""
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from rest_framework.test import APITestCase
+
+from storeApp.models import Brand, Category, Product, ProductSearchDocument, ProductVariant
+from storeApp.services.search_documents import defer_search_document_refresh, fold_search_text
+
+
+class ProductSearchDocumentSyncTests(TestCase):
+    databases = {"default", "store"}
+
+    def setUp(self):
+        self.brand = Brand.objects.create(name="Dược Hậu Giang")
+        self.category = Category.objects.create(name="Giảm đau", slug="giam-dau")
+        self.product = Product.objects.create(
+            name="Hapacol Đau Nhức",
+            web_name="Viên sủi Hapacol",
+            mid="HAPA-01",
+            ingredients="Paracetamol",
+            brand=self.brand,
+            category=self.category,
+        )
+        self.variant = ProductVariant.objects.create(product=self.product, sku="HP-500")
+
+    def test_fold_search_text_strips_accents_and_case(self):
+        self.assertEqual(fold_search_text("  Đau   Nhức "), "dau nhuc")
+
+    def test_document_created_with_folded_columns(self):
+        doc = ProductSearchDocument.objects.get(variant=self.variant)
+        self.assertEqual(doc.product_id, self.product.id)
+        self.assertEqual(doc.sku_text, "hp-500")
+        self.assertEqual(doc.name_text, "hapacol dau nhuc")
+        self.assertEqual(doc.brand_text, "duoc hau giang")
+        self.assertIn("giam dau", doc.category_text)
+        self.assertIn("paracetamol", doc.search_text)
+
+    def test_brand_and_product_edits_refresh_document(self):
+        self.brand.name = "DHG Pharma"
+        self.brand.save()
+        self.product.name = "Hapacol Extra"
+        self.product.save()
+
+        doc = ProductSearchDocument.objects.get(variant=self.variant)
+        self.assertEqual(doc.brand_text, "dhg pharma")
+        self.assertEqual(doc.name_text, "hapacol extra")
+
+    def test_deferred_refresh_applies_on_exit(self):
+        with defer_search_document_refresh():
+            self.product.name = "Hapacol Deferred"
+            self.product.save()
+            self.assertEqual(
+                ProductSearchDocument.objects.get(variant=self.variant).name_text, "hapacol dau nhuc"
+            )
+        self.assertEqual(
+            ProductSearchDocument.objects.get(variant=self.variant).name_text, "hapacol deferred"
+        )
+
+    def test_product_delete_does_not_recreate_documents(self):
+        # ProductCategory rows are deleted in the same cascade; their signal must not re-insert docs.
+        self.product.assign_category(self.category)
+        self.product.delete()
+        self.assertFalse(ProductSearchDocument.objects.exists())
+
+    def test_rebuild_command_restores_missing_documents(self):
+        ProductSearchDocument.objects.all().delete()
+        out = StringIO()
+        call_command("rebuild_search_documents", "--missing-only", stdout=out)
+        self.assertEqual(ProductSearchDocument.objects.count(), 1)
+
+        call_command("rebuild_search_documents", "--missing-only", stdout=out)
+        self.assertEqual(ProductSearchDocument.objects.count(), 1)
+
+
+class DocumentBackedSearchApiTests(APITestCase):
+    databases = {"default", "store"}
+
+    def setUp(self):
+        category = Category.objects.create(name="Vitamin", slug="vitamin")
+        exact = Product.objects.create(name="Đau Đầu", slug="dau-dau", category=category)
+        contains = Product.objects.create(name="Viên trị đau đầu", slug="vien-tri-dau-dau", category=category)
+        ingredient = Product.objects.create(
+            name="Panadol", slug="panadol", category=category, ingredients="Hỗ trợ đau đầu"
+        )
+        self.exact = ProductVariant.objects.create(product=exact, sku="DD-1")
+        self.contains = ProductVariant.objects.create(product=contains, sku="DD-2", product_ranking=99)
+        self.ingredient = ProductVariant.objects.create(product=ingredient, sku="DD-3", product_ranking=100)
+
+    def test_unaccented_query_matches_and_keeps_tier_order(self):
+        response = self.client.get("/api/store/search/?q=dau dau&include_facets=false")
+        self.assertEqual(response.status_code, 200)
+        ids = [item["id"] for item in response.data["items"]]
+        self.assertEqual(ids, [self.exact.id, self.contains.id, self.ingredient.id])
+
+    def test_suggest_uses_documents_without_taxonomy_tiers(self):
+        response = self.client.get("/api/store/search/suggest/?q=vitamin")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["suggestions"]["top_products"], [])
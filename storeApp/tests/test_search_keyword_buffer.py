@@ -0,0 +1,79 @@
+"""Write-behind SearchKeyword hit counters: buffering, upsert flush, no lost increments."""
+import threading
+
+from rest_framework.test import APITestCase
+
+from storeApp.models import SearchKeyword
+from storeApp.services.search_keyword_buffer import (
+    SearchKeywordHitBuffer,
+    search_keyword_buffer,
+    upsert_keyword_hits,
+)
+
+
+class SearchKeywordBufferTests(APITestCase):
+    databases = {"default", "store"}
+
+    def setUp(self):
+        search_keyword_buffer.clear()
+        self.addCleanup(search_keyword_buffer.clear)
+
+    def test_known_keyword_hits_are_buffered_until_flush(self):
+        counts = [
+            self.client.post("/api/store/search-terms/", {"keyword": "Omega 3"}, format="json").data["hit_count"]
+            for _ in range(3)
+        ]
+        self.assertEqual(counts, [1, 2, 3])
+        self.assertEqual(SearchKeyword.objects.get(keyword_lookup="omega 3").hit_count, 1)
+        self.assertEqual(search_keyword_buffer.pending_hits("omega 3"), 2)
+
+        self.assertEqual(search_keyword_buffer.flush(), 2)
+        self.assertEqual(SearchKeyword.objects.get(keyword_lookup="omega 3").hit_count, 3)
+        self.assertEqual(search_keyword_buffer.pending_hits(), 0)
+
+    def test_upsert_adds_to_existing_rows_and_recreates_missing(self):
+        existing = SearchKeyword.objects.create(keyword="Vitamin C")
+        latest = existing.last_searched_at
+        upsert_keyword_hits(
+            {
+                "vitamin c": ("Vitamin C", 4, latest),
+                "kẽm": ("Kẽm", 2, latest),
+            }
+        )
+        existing.refresh_from_db()
+        self.assertEqual(existing.hit_count, 5)
+        self.assertEqual(SearchKeyword.objects.get(keyword_lookup="kẽm").hit_count, 2)
+
+    def test_max_hits_bound_flushes_inline(self):
+        SearchKeyword.objects.create(keyword="canxi")
+        buffer = SearchKeywordHitBuffer(max_hits=3, max_age=3600, background_flush=False)
+        for _ in range(3):
+            buffer.add("canxi", "canxi")
+        self.assertEqual(buffer.pending_hits(), 0)
+        self.assertEqual(SearchKeyword.objects.get(keyword_lookup="canxi").hit_count, 4)
+
+    def test_concurrent_increments_are_not_lost(self):
+        SearchKeyword.objects.create(keyword="paracetamol")
+        buffer = SearchKeywordHitBuffer(max_hits=10**9, max_age=3600, background_flush=False)
+        threads_count, hits_per_thread = 8, 250
+        start = threading.Barrier(threads_count + 1)
+
+        def worker():
+            start.wait()
+            for _ in range(hits_per_thread):
+                buffer.add("paracetamol", "paracetamol")
+
+        threads = [threading.Thread(target=worker) for _ in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        # Flush (DB work stays on this thread) while workers keep adding.
+        while any(thread.is_alive() for thread in threads):
+            buffer.flush()
+        for thread in threads:
+            thread.join()
+        buffer.flush()
+
+        expected = 1 + threads_count * hits_per_thread
+        self.assertEqual(buffer.flushed_hits, threads_count * hits_per_thread)
+        self.assertEqual(SearchKeyword.objects.get(keyword_lookup="paracetamol").hit_count, expected)
@@ -0,0 +1,114 @@
+"""Bulk stock availability: one grouped query per cart, request memo, in_stock fallback."""
+import uuid
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from storeApp.models import Cart, CartItem, MedicineBatch, Product, ProductVariant, ProductVariantUnit
+from storeApp.services.cart_service import _assert_checkout_stock, _build_context, merge_guest_cart_into_user
+from storeApp.services.stock import (
+    deduct_stock,
+    get_available_stock,
+    get_available_stock_bulk,
+    stock_memo,
+)
+
+
+class StockBulkTests(TestCase):
+    databases = {"default", "store"}
+
+    def setUp(self):
+        self.today = timezone.now().date()
+
+    def _variants(self, count, *, batch_quantity=20, in_stock=0):
+        suffix = uuid.uuid4().hex[:8]
+        product = Product.objects.create(name=f"Bulk {suffix}", slug=f"bulk-{suffix}")
+        variants = []
+        for index in range(count):
+            variant = ProductVariant.objects.create(product=product, packing=f"Hộp {index}", in_stock=in_stock)
+            ProductVariantUnit.objects.create(
+                variant=variant, quantity_in_base=1, unit_name="Hộp", price_value=1000, is_default=True, is_published=True
+            )
+            if batch_quantity:
+                MedicineBatch.objects.create(
+                    batch_number=f"B-{variant.id}",
+                    product_variant=variant,
+                    import_date=self.today - timedelta(days=3),
+                    expiry_date=self.today + timedelta(days=200),
+                    quantity=batch_quantity,
+                    remaining_quantity=batch_quantity,
+                )
+            variants.append(variant)
+        return variants
+
+    def _cart(self, variants, **cart_fields):
+        cart = Cart.objects.create(status=Cart.ACTIVE, **cart_fields)
+        for variant in variants:
+            CartItem.objects.create(
+                cart=cart,
+                product_variant=variant,
+                product_variant_unit=variant.units.first(),
+                quantity=2,
+                unit_price_snapshot=1000,
+            )
+        return cart
+
+    def test_checkout_stock_check_is_one_query_for_any_cart_size(self):
+        for lines in (1, 10, 50):
+            with self.subTest(lines=lines):
+                cart = self._cart(self._variants(lines), user_id=1000 + lines)
+                items = _build_context(cart=cart, using="store")[0]
+                with self.assertNumQueries(1, using="store"):
+                    _assert_checkout_stock(items=items, using="store")
+
+    def test_bulk_matches_single_lookups_and_falls_back_to_in_stock(self):
+        with_batches = self._variants(2)
+        cache_only = self._variants(1, batch_quantity=0, in_stock=7)[0]
+        expired = self._variants(1, batch_quantity=0, in_stock=3)[0]
+        MedicineBatch.objects.create(
+            batch_number="B-EXPIRED",
+            product_variant=expired,
+            import_date=self.today - timedelta(days=400),
+            expiry_date=self.today - timedelta(days=1),
+            quantity=50,
+            remaining_quantity=50,
+        )
+        ProductVariant.objects.filter(id=expired.id).update(in_stock=3)  # the batch signal synced it to 0
+        inactive = self._variants(1, batch_quantity=0, in_stock=9)[0]
+        inactive.active = False
+        inactive.save()
+
+        ids = [variant.id for variant in with_batches] + [cache_only.id, expired.id, inactive.id, 999999]
+        bulk = get_available_stock_bulk(ids)
+        self.assertEqual(bulk, {variant_id: get_available_stock(variant_id) for variant_id in ids})
+        self.assertEqual(
+            [bulk[variant_id] for variant_id in ids],
+            [20, 20, 7, 3, 0, 0],
+        )
+
+    def test_memo_serves_repeat_lookups_and_forgets_deducted_variants(self):
+        variants = self._variants(3)
+        with stock_memo():
+            get_available_stock_bulk([variant.id for variant in variants])
+            with self.assertNumQueries(0, using="store"):
+                self.assertEqual(get_available_stock(variants[0].id), 20)
+            deduct_stock(variants[0].id, 5)
+            self.assertEqual(get_available_stock(variants[0].id), 15)
+        with self.assertNumQueries(1, using="store"):
+            get_available_stock(variants[1].id)
+
+    def test_merge_guest_cart_checks_stock_once(self):
+        user = get_user_model().objects.create_user(email="stock-bulk@example.com", password="test-pass-123")
+        for lines in (1, 10):
+            with self.subTest(lines=lines):
+                guest_id = uuid.uuid4()
+                self._cart(self._variants(lines), guest_session_id=guest_id)
+                with CaptureQueriesContext(connections["store"]) as queries:
+                    cart = merge_guest_cart_into_user(guest_session_id=str(guest_id), user_id=user.id, using="store")
+                batch_queries = [q for q in queries.captured_queries if "store_medicine_batch" in q["sql"]]
+                self.assertEqual(len(batch_queries), 1)
+                self.assertGreaterEqual(cart.items.count(), lines)
@@ -0,0 +1,200 @@
+"""Bulk FIFO deduction: one lock per order, allocation ledger, exact restore, parallel checkouts."""
+import logging
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from django.db import connections, transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from storeApp.models import (
+    Cart,
+    CartItem,
+    MedicineBatch,
+    Order,
+    OrderItem,
+    OrderItemBatchAllocation,
+    PaymentMethod,
+    Product,
+    ProductVariant,
+    ProductVariantUnit,
+    ShippingMethod,
+)
+from storeApp.services.cart_service import CartServiceError, checkout_cart
+from storeApp.services.stock import deduct_stock, deduct_stock_bulk, restore_order_stock
+
+logger = logging.getLogger(__name__)
+
+
+def _variant_with_batches(quantities, *, name=None):
+    today = timezone.now().date()
+    suffix = uuid.uuid4().hex[:8]
+    product = Product.objects.create(name=name or f"FIFO {suffix}", slug=f"fifo-{suffix}")
+    variant = ProductVariant.objects.create(product=product, packing="Hộp", is_published=True)
+    ProductVariantUnit.objects.create(
+        variant=variant, quantity_in_base=1, unit_name="Hộp", price_value=10000, is_default=True, is_published=True
+    )
+    batches = [
+        MedicineBatch.objects.create(
+            batch_number=f"{suffix}-{index}",
+            product_variant=variant,
+            import_date=today - timedelta(days=10),
+            expiry_date=today + timedelta(days=30 * (index + 1)),
+            quantity=quantity,
+            remaining_quantity=quantity,
+        )
+        for index, quantity in enumerate(quantities)
+    ]
+    return variant, batches
+
+
+class BulkDeductionTests(TestCase):
+    databases = {"default", "store"}
+
+    def _order_items(self, lines):
+        order = Order.objects.create(
+            shipping_address="HCM",
+            shipping_method=ShippingMethod.objects.create(name="Standard", price=0, estimated_days=2),
+            payment_method=PaymentMethod.objects.create(name="COD", code=f"COD-{uuid.uuid4().hex[:6]}"),
+            subtotal=0,
+            total=0,
+        )
+        return [
+            OrderItem.objects.create(order=order, product_variant=variant, quantity=quantity, price=10000)
+            for variant, quantity in lines
+        ]
+
+    def test_fifo_allocation_with_ledger_in_constant_queries(self):
+        first, first_batches = _variant_with_batches([5, 10])
+        second, second_batches = _variant_with_batches([4])
+        items = self._order_items([(first, 7), (second, 3), (first, 2)])
+
+        with self.assertNumQueries(6, using="store"):
+            # savepoint, lock, bulk_update, ledger insert, in_stock sync, release
+            with transaction.atomic(using="store"):
+                deduct_stock_bulk([(item.product_variant_id, item.quantity, item.id) for item in items])
+
+        for batch, remaining in zip(first_batches + second_batches, (0, 6, 1)):
+            batch.refresh_from_db()
+            self.assertEqual(batch.remaining_quantity, remaining)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.in_stock, second.in_stock), (6, 1))
+        ledger = list(
+            OrderItemBatchAllocation.objects.order_by("id").values_list("order_item_id", "batch_id", "quantity")
+        )
+        self.assertEqual(
+            ledger,
+            [
+                (items[0].id, first_batches[0].id, 5),
+                (items[0].id, first_batches[1].id, 2),
+                (items[1].id, second_batches[0].id, 3),
+                (items[2].id, first_batches[1].id, 2),
+            ],
+        )
+
+    def test_shortfall_raises_and_cache_only_variants_use_in_stock(self):
+        variant, batches = _variant_with_batches([3])
+        with self.assertRaises(ValueError), transaction.atomic(using="store"):
+            deduct_stock_bulk([(variant.id, 4, None)])
+        batches[0].refresh_from_db()
+        self.assertEqual(batches[0].remaining_quantity, 3)
+
+        product = Product.objects.create(name="Cache only", slug="cache-only")
+        cache_only = ProductVariant.objects.create(product=product, packing="Chai", in_stock=5)
+        deduct_stock(cache_only.id, 2)
+        cache_only.refresh_from_db()
+        self.assertEqual(cache_only.in_stock, 3)
+
+    def test_restore_returns_quantities_to_allocated_batches(self):
+        variant, batches = _variant_with_batches([2, 10])
+        items = self._order_items([(variant, 6)])
+        with transaction.atomic(using="store"):
+            deduct_stock_bulk([(variant.id, 6, items[0].id)])
+        # A fresher batch arrives after the sale; restore must not land there.
+        MedicineBatch.objects.create(
+            batch_number=f"LATE-{variant.id}",
+            product_variant=variant,
+            import_date=timezone.now().date(),
+            expiry_date=timezone.now().date() + timedelta(days=5),
+            quantity=1,
+            remaining_quantity=1,
+        )
+
+        restore_order_stock(OrderItem.objects.filter(id=items[0].id))
+
+        self.assertEqual([MedicineBatch.objects.get(id=batch.id).remaining_quantity for batch in batches], [2, 10])
+        self.assertFalse(OrderItemBatchAllocation.objects.exists())
+        variant.refresh_from_db()
+        self.assertEqual(variant.in_stock, 13)
+
+
+class ParallelCheckoutTests(TransactionTestCase):
+    databases = {"default", "store"}
+
+    WORKERS = 10
+    QUANTITY = 3
+
+    def setUp(self):
+        self.variant, self.batches = _variant_with_batches([12, 8], name="Parallel checkout")
+        self.shipping = ShippingMethod.objects.create(name="Standard", price=0, estimated_days=2, active=True)
+        self.payment = PaymentMethod.objects.create(name="COD", code="COD", active=True)
+        unit = self.variant.units.get()
+        self.carts = []
+        for _ in range(self.WORKERS):
+            cart = Cart.objects.create(
+                guest_session_id=uuid.uuid4(), status=Cart.ACTIVE, shipping_method=self.shipping
+            )
+            CartItem.objects.create(
+                cart=cart,
+                product_variant=self.variant,
+                product_variant_unit=unit,
+                quantity=self.QUANTITY,
+                unit_price_snapshot=10000,
+            )
+            self.carts.append(cart)
+
+    def test_parallel_checkouts_never_oversell(self):
+        start = threading.Barrier(self.WORKERS)
+        outcomes = []
+
+        def run(cart):
+            try:
+                start.wait()
+                checkout_cart(
+                    cart=cart,
+                    payment_method=self.payment,
+                    shipping_address="HCM",
+                    using="store",
+                    expected_version=cart.version,
+                )
+                outcomes.append("ok")
+            except CartServiceError:
+                outcomes.append("rejected")
+            except Exception as exc:  # SQLite: "database is locked" under write contention
+                outcomes.append(type(exc).__name__)
+            finally:
+                connections.close_all()
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=run, args=(cart,)) for cart in self.carts]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=60)
+        elapsed = time.perf_counter() - started
+        logger.info("parallel checkouts: %s in %.3fs (%.1f/s)", outcomes, elapsed, len(outcomes) / elapsed)
+
+        sold = outcomes.count("ok")
+        stock = sum(batch.quantity for batch in self.batches)
+        remaining = sum(MedicineBatch.objects.filter(product_variant=self.variant).values_list("remaining_quantity", flat=True))
+        self.assertEqual(len(outcomes), self.WORKERS)
+        self.assertGreater(sold, 0)
+        self.assertLessEqual(sold * self.QUANTITY, stock)
+        self.assertEqual(remaining, stock - sold * self.QUANTITY)
+        self.assertEqual(Order.objects.count(), sold)
+        self.assertEqual(
+            sum(OrderItemBatchAllocation.objects.values_list("quantity", flat=True)), sold * self.QUANTITY
+        )
@@ -0,0 +1,124 @@
+"""Set-based expiry / low-stock notifications: stages, anti-join de-duplication, constant queries."""
+import uuid
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from storeApp.models import MedicineBatch, Notification, Product, ProductVariant
+from storeApp.services.stock_notifications import generate_stock_notifications
+
+
+class StockNotificationTests(TestCase):
+    databases = {"default", "store"}
+
+    def setUp(self):
+        self.today = timezone.now().date()
+        suffix = uuid.uuid4().hex[:8]
+        self.product = Product.objects.create(name=f"Notify {suffix}", slug=f"notify-{suffix}")
+
+    def _variant_with_batches(self, *batches):
+        variant = ProductVariant.objects.create(product=self.product, packing=f"Hộp {uuid.uuid4().hex[:4]}")
+        for days, quantity in batches:
+            MedicineBatch.objects.create(
+                batch_number=f"N-{uuid.uuid4().hex[:10]}",
+                product_variant=variant,
+                import_date=self.today - timedelta(days=300),
+                expiry_date=self.today + timedelta(days=days),
+                quantity=quantity,
+                remaining_quantity=quantity,
+            )
+        return variant
+
+    def test_stages_and_low_stock_in_constant_queries(self):
+        for _ in range(4):
+            self._variant_with_batches((-3, 5), (3, 5), (20, 5), (200, 100))
+        low = self._variant_with_batches((200, 4))
+
+        with self.assertNumQueries(3 + 1 + 1, using="store"):  # 3 expiry stages, low stock, bulk insert
+            result = generate_stock_notifications(low_stock_threshold=10)
+        self.assertEqual(
+            result.created,
+            {Notification.EXPIRED: 4, Notification.EXPIRY_URGENT: 4, Notification.EXPIRY_WARNING: 4, Notification.LOW_STOCK: 1},
+        )
+        low_stock = Notification.objects.get(notification_type=Notification.LOW_STOCK)
+        self.assertEqual((low_stock.product_variant_id, low_stock.batch_id, low_stock.threshold_date), (low.id, None, self.today))
+        urgent = Notification.objects.filter(notification_type=Notification.EXPIRY_URGENT).first()
+        self.assertEqual(urgent.threshold_date, urgent.batch.expiry_date)
+        self.assertEqual(urgent.product_variant_id, urgent.batch.product_variant_id)
+
+    def test_reruns_are_deduplicated(self):
+        self._variant_with_batches((-1, 5), (5, 2))
+        first = generate_stock_notifications()
+        self.assertEqual(first.total, 3)
+        self.assertEqual(generate_stock_notifications().total, 0)
+        # Neither repeats on the next scan day.
+        self.assertEqual(generate_stock_notifications(today=self.today + timedelta(days=1)).total, 0)
+        self.assertEqual(Notification.objects.count(), 3)
+
+        existing = Notification.objects.filter(notification_type=Notification.EXPIRED).first()
+        with self.assertRaises(IntegrityError), transaction.atomic(using="store"):
+            Notification.objects.create(
+                notification_type=Notification.EXPIRED,
+                batch=existing.batch,
+                threshold_date=existing.threshold_date,
+                title="dup",
+                message="dup",
+            )
+
+    def test_low_stock_reports_once_per_episode(self):
+        variant = self._variant_with_batches((200, 4))
+        self.assertEqual(generate_stock_notifications().created[Notification.LOW_STOCK], 1)
+        later = self.today + timedelta(days=3)
+        self.assertEqual(generate_stock_notifications(today=later).created[Notification.LOW_STOCK], 0)
+
+        # Restocked, sold down again: a new episode.
+        restock = MedicineBatch.objects.create(
+            batch_number=f"N-{uuid.uuid4().hex[:10]}",
+            product_variant=variant,
+            import_date=later,
+            expiry_date=self.today + timedelta(days=300),
+            quantity=50,
+            remaining_quantity=50,
+        )
+        self.assertEqual(generate_stock_notifications(today=later).created[Notification.LOW_STOCK], 0)
+        MedicineBatch.objects.filter(id=restock.id).update(remaining_quantity=1)
+        self.assertEqual(generate_stock_notifications(today=later).created[Notification.LOW_STOCK], 1)
+        low_stock = Notification.objects.filter(notification_type=Notification.LOW_STOCK).order_by("threshold_date")
+        self.assertEqual(list(low_stock.values_list("threshold_date", flat=True)), [self.today, later])
+
+    def test_legacy_rows_are_backfilled(self):
+        from importlib import import_module
+
+        from django.apps import apps
+        from django.db import connections
+
+        variant = self._variant_with_batches((5, 2))
+        batch = variant.batches.get()
+        for _ in range(2):
+            Notification.objects.create(
+                notification_type=Notification.EXPIRY_URGENT, product_variant=variant, batch=batch, title="old", message="old"
+            )
+        migration = import_module("storeApp.migrations.0029_backfill_notification_threshold_date")
+        migration.backfill_threshold_dates(apps, connections["store"].schema_editor())
+        # The newest legacy row per (type, batch) takes the key; older duplicates stay NULL.
+        self.assertEqual(
+            list(Notification.objects.order_by("id").values_list("threshold_date", flat=True)), [None, batch.expiry_date]
+        )
+        self.assertEqual(generate_stock_notifications(low_stock_threshold=0).created[Notification.EXPIRY_URGENT], 0)
+
+    def test_command_prints_throughput(self):
+        self._variant_with_batches((2, 50))
+        out = StringIO()
+        call_command("check_expiry_notifications", "--dry-run", stdout=out)
+        self.assertIn("[DRY-RUN]", out.getvalue())
+        self.assertIn("1 urgent", out.getvalue())
+        self.assertFalse(Notification.objects.exists())
+
+        out = StringIO()
+        call_command("check_expiry_notifications", stdout=out)
+        self.assertIn("0 warnings, 1 urgent, 0 expired, 0 low stock", out.getvalue())
+        self.assertIn("rows/s", out.getvalue())
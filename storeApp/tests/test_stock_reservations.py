@@ -0,0 +1,144 @@
+"""Stock reservations: TTL holds in availability, checkout conversion, sweeper, flash-sale load."""
+import uuid
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from storeApp.models import (
+    Cart,
+    CartItem,
+    MedicineBatch,
+    PaymentMethod,
+    Product,
+    ProductVariant,
+    ProductVariantUnit,
+    ShippingMethod,
+    StockReservation,
+)
+from storeApp.services.cart_service import CartServiceError, checkout_cart
+from storeApp.services.stock import get_available_stock, get_available_stock_bulk
+from storeApp.services.stock_reservations import InsufficientStockError, reserve_cart_stock
+
+
+class StockReservationTests(APITestCase):
+    databases = {"default", "store"}
+
+    def setUp(self):
+        today = timezone.now().date()
+        product = Product.objects.create(name="Khẩu trang flash sale", slug="khau-trang-flash-sale")
+        self.variant = ProductVariant.objects.create(product=product, packing="Hộp", is_published=True)
+        self.unit = ProductVariantUnit.objects.create(
+            variant=self.variant, quantity_in_base=1, unit_name="Hộp", price_value=20000, is_default=True, is_published=True
+        )
+        MedicineBatch.objects.create(
+            batch_number="FLASH-1",
+            product_variant=self.variant,
+            import_date=today - timedelta(days=1),
+            expiry_date=today + timedelta(days=90),
+            quantity=10,
+            remaining_quantity=10,
+        )
+        self.shipping = ShippingMethod.objects.create(name="Standard", price=0, estimated_days=2, active=True)
+        self.payment = PaymentMethod.objects.create(name="COD", code="COD", active=True)
+
+    def _cart(self, quantity, guest_id=None):
+        cart = Cart.objects.create(
+            guest_session_id=guest_id or uuid.uuid4(), status=Cart.ACTIVE, shipping_method=self.shipping
+        )
+        CartItem.objects.create(
+            cart=cart, product_variant=self.variant, product_variant_unit=self.unit, quantity=quantity, unit_price_snapshot=20000
+        )
+        return cart
+
+    def _checkout(self, cart):
+        cart.refresh_from_db()
+        return checkout_cart(
+            cart=cart, payment_method=self.payment, shipping_address="HCM", using="store", expected_version=cart.version
+        )
+
+    def test_holds_reduce_availability_for_other_carts_in_one_query(self):
+        holder = self._cart(4)
+        reserve_cart_stock(cart=holder)
+        with self.assertNumQueries(1, using="store"):
+            others = get_available_stock_bulk([self.variant.id])
+        self.assertEqual(others[self.variant.id], 6)
+        self.assertEqual(get_available_stock(self.variant.id, exclude_cart_id=holder.id), 10)
+
+        with self.assertRaises(InsufficientStockError):
+            reserve_cart_stock(cart=self._cart(7))
+        self.assertEqual(StockReservation.objects.count(), 1)
+
+    def test_empty_selection_keeps_existing_holds(self):
+        holder = self._cart(4)
+        reserve_cart_stock(cart=holder)
+        with self.assertNumQueries(1, using="store"):  # line lookup only, no write transaction
+            _expires_at, reserved = reserve_cart_stock(cart=holder, item_ids=[0])
+        self.assertEqual(reserved, {})
+        self.assertEqual(list(StockReservation.objects.values_list("cart_id", "quantity")), [(holder.id, 4)])
+
+    def test_checkout_converts_holds_into_the_deduction(self):
+        holder = self._cart(4)
+        reserve_cart_stock(cart=holder)
+        self._checkout(holder)
+        self.assertFalse(StockReservation.objects.exists())
+        self.assertEqual(get_available_stock(self.variant.id), 6)
+
+        # A cart without a hold cannot take units another cart holds.
+        reserve_cart_stock(cart=self._cart(5))
+        with self.assertRaises(CartServiceError):
+            self._checkout(self._cart(2))
+
+    def test_expired_holds_are_ignored_and_swept(self):
+        holder = self._cart(8)
+        reserve_cart_stock(cart=holder, ttl_seconds=-1)
+        reserve_cart_stock(cart=self._cart(1))
+        self.assertEqual(get_available_stock(self.variant.id), 9)
+
+        out = StringIO()
+        call_command("release_stock_reservations", stdout=out)
+        self.assertIn("released=1", out.getvalue())
+        self.assertEqual(StockReservation.objects.count(), 1)
+
+    def test_checkout_start_endpoint(self):
+        guest_id = uuid.uuid4()
+        self._cart(3, guest_id=guest_id)
+        response = self.client.post("/api/store/carts/checkout-start/", {}, format="json", HTTP_X_GUEST_SESSION=str(guest_id))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["reservations"], [{"product_variant_id": self.variant.id, "quantity": 3}])
+
+        other = uuid.uuid4()
+        self._cart(8, guest_id=other)
+        response = self.client.post("/api/store/carts/checkout-start/", {}, format="json", HTTP_X_GUEST_SESSION=str(other))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data["details"][0]["available"], 7)
+
+    def test_flash_sale_failures_move_before_checkout_work(self):
+        """8 shoppers x 2 units against 10 units: everyone passes the add-to-cart check."""
+
+        def run(reserve):
+            StockReservation.objects.all().delete()
+            MedicineBatch.objects.filter(batch_number="FLASH-1").update(remaining_quantity=10)
+            carts = [self._cart(2) for _ in range(8)]
+            failed_early, failed_after_work = 0, 0
+            started = []
+            for cart in carts:
+                if reserve:
+                    try:
+                        reserve_cart_stock(cart=cart)
+                    except InsufficientStockError:
+                        failed_early += 1
+                        continue
+                started.append(cart)
+            # Voucher / address / payment work happens here, then every started shopper submits.
+            for cart in started:
+                try:
+                    self._checkout(cart)
+                except CartServiceError:
+                    failed_after_work += 1
+            return failed_early, failed_after_work
+
+        self.assertEqual(run(reserve=False), (0, 3))
+        self.assertEqual(run(reserve=True), (3, 0))
@@ -0,0 +1,106 @@
+"""Store path routing table: dict lookups, version bumps, DB fallback + negative cache."""
+from unittest import mock
+
+from django.test import TestCase
+
+from storeApp.models import Category, Product, ProductVariant
+from storeApp.services import store_path_routes
+from storeApp.services.store_path_resolver import resolve_store_path
+from storeApp.services.store_path_routes import store_path_router
+
+
+class StorePathRoutesTests(TestCase):
+    databases = {"default", "store"}
+
+    def setUp(self):
+        store_path_router.clear()
+        self.root = Category.objects.create(name="Chăm sóc cá nhân", slug="cham-soc-ca-nhan")
+        self.child = Category.objects.create(name="Răng miệng", slug="rang-mieng", parent=self.root)
+        self.product = Product.objects.create(name="Kem đánh răng", slug="kem-danh-rang")
+        self.product.assign_category(self.child)
+        self.variant = ProductVariant.objects.create(product=self.product, packing="Tuýp")
+
+    def tearDown(self):
+        store_path_router.clear()
+
+    def test_warm_table_resolves_categories_without_queries(self):
+        store_path_router.table()
+        with self.assertNumQueries(0, using="store"):
+            resolved = resolve_store_path("Cham-Soc-Ca-Nhan/RANG-MIENG/", using="store")
+            route = store_path_router.route("cham-soc-ca-nhan", using="store")
+        self.assertEqual((resolved["page"], resolved["category_id"]), ("category", self.child.id))
+        self.assertEqual(resolved["category_path"], "cham-soc-ca-nhan/rang-mieng")
+        self.assertEqual(sorted(route["descendant_ids"]), sorted([self.root.id, self.child.id]))
+
+        with self.assertNumQueries(1, using="store"):
+            product = resolve_store_path("cham-soc-ca-nhan/kem-danh-rang", using="store")
+        self.assertEqual(product["page"], "product")
+        self.assertEqual(product["default_variant_id"], self.variant.id)
+
+    def _committed(self):
+        return self.captureOnCommitCallbacks(using="store", execute=True)
+
+    def test_slug_changes_bump_version(self):
+        table = store_path_router.table()
+        self.child.slug = "nha-khoa"
+        with self._committed():
+            self.child.save()
+            self.assertIs(store_path_router.table(), table)  # bumped on commit, not before
+        self.assertIsNot(store_path_router.table(), table)
+        self.assertEqual(resolve_store_path("cham-soc-ca-nhan/rang-mieng", using="store")["page"], "not_found")
+        self.assertEqual(resolve_store_path("cham-soc-ca-nhan/nha-khoa", using="store")["page"], "category")
+
+        table = store_path_router.table()
+        self.product.web_name = "Kem đánh răng bạc hà"
+        with self._committed():
+            self.product.save()
+        self.assertIs(store_path_router.table(), table)
+
+        self.product.slug = "kem-bac-ha"
+        with self._committed():
+            self.product.save()
+        resolved = resolve_store_path("cham-soc-ca-nhan/kem-bac-ha", using="store")
+        self.assertEqual(resolved["product_id"], self.product.id)
+
+    def test_cold_table_falls_back_to_db_and_caches_404s(self):
+        with mock.patch.object(store_path_routes, "BACKGROUND_BUILD", True), mock.patch.object(
+            store_path_router, "schedule_rebuild"
+        ) as schedule:
+            route = store_path_router.route("CHAM-SOC-CA-NHAN/rang-mieng", using="store")
+            self.assertEqual(route["category_id"], self.child.id)
+            self.assertIsNone(store_path_router.route("wp-admin/setup-config.php", using="store"))
+            with self.assertNumQueries(0, using="store"):
+                self.assertIsNone(store_path_router.route("wp-admin/setup-config.php", using="store"))
+            schedule.assert_called()
+        self.assertGreater(store_path_router.stats()["negative_hits"], 0)
+
+        # A catalog change starts a new version, so cached misses no longer apply.
+        with self._committed():
+            Category.objects.create(name="WP Admin", slug="wp-admin")
+        with mock.patch.object(store_path_routes, "BACKGROUND_BUILD", True), mock.patch.object(
+            store_path_router, "schedule_rebuild"
+        ):
+            self.assertEqual(store_path_router.route("wp-admin", using="store")["kind"], "category")
+
+    def test_category_listing_endpoint_uses_route(self):
+        store_path_router.table()
+        response = self.client.get("/api/store/cham-soc-ca-nhan/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["categorySlug"], "cham-soc-ca-nhan")
+        self.assertEqual(self.client.get("/api/store/khong-ton-tai/").status_code, 404)
+        self.assertEqual(self.client.get("/api/store/khong-ton-tai/kem-danh-rang/").status_code, 404)
+
+    def test_rows_missing_from_a_warm_table_fall_back_to_the_db(self):
+        table = store_path_router.table()
+        # Written where the bump does not reach this worker (another process, local cache).
+        with mock.patch.object(store_path_router, "bump"):
+            with self._committed():
+                Category.objects.create(name="Vitamin", slug="vitamin")
+                Product.objects.create(name="Vitamin C", slug="vitamin-c")
+        self.assertIs(store_path_router.table(), table)
+        self.assertEqual(store_path_router.route("vitamin", using="store")["kind"], "category")
+        self.assertEqual(store_path_router.route("vitamin/vitamin-c", using="store")["kind"], "product")
+
+        self.assertIsNone(store_path_router.route("khong-ton-tai", using="store"))
+        with self.assertNumQueries(0, using="store"):
+            self.assertIsNone(store_path_router.route("khong-ton-tai", using="store"))
@@ -0,0 +1,120 @@
+"""In-process suggest index: parity with the SQL path, staleness, metrics."""
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from storeApp.models import Category, Product, ProductVariant, ProductVariantUnit, SearchKeyword
+from storeApp.services.suggest_index import FIELD_SEPARATOR, _NgramIndex, suggest_index
+
+
+class SuggestIndexTests(APITestCase):
+    databases = {"default", "store"}
+
+    def setUp(self):
+        suggest_index.clear()
+        self.addCleanup(suggest_index.clear)
+        category = Category.objects.create(name="Thuốc cảm cúm", slug="thuoc-cam-cum")
+        Category.objects.create(name="Vitamin", slug="vitamin")
+        for idx in range(7):
+            product = Product.objects.create(
+                name=f"Sản phẩm cảm cúm {idx}",
+                web_name=f"Thuốc trị cảm cúm {idx}",
+                slug=f"san-pham-cam-cum-{idx}",
+                category=category,
+            )
+            for packing in ("Hộp", "Vỉ"):
+                variant = ProductVariant.objects.create(
+                    product=product,
+                    packing=packing,
+                    sku=f"CC-{idx}-{packing}",
+                    in_stock=100 - idx,
+                    product_ranking=90 - idx,
+                )
+                ProductVariantUnit.objects.create(
+                    variant=variant,
+                    unit_name=packing,
+                    quantity_in_base=1,
+                    price_value=10000 + idx,
+                    is_default=True,
+                    is_published=True,
+                )
+        now = timezone.now()
+        for keyword, hits, minutes_ago in (("cảm cúm", 10, 5), ("cảm cúm trẻ em", 3, 1), ("vitamin c", 50, 0)):
+            kw = SearchKeyword.objects.create(keyword=keyword)
+            SearchKeyword.objects.filter(pk=kw.pk).update(
+                hit_count=hits, last_searched_at=now - timezone.timedelta(minutes=minutes_ago)
+            )
+
+    def _suggest(self, q="cảm cúm"):
+        response = self.client.get("/api/store/search/suggest/", {"q": q})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_cold_index_falls_back_to_store(self):
+        data = self._suggest()
+        self.assertEqual(data["meta"]["source"], "store")
+        self.assertIsInstance(data["meta"]["took_ms"], float)
+
+    def test_memory_results_match_store_results(self):
+        from_store = self._suggest()["suggestions"]
+        suggest_index.rebuild()
+        data = self._suggest()
+        self.assertEqual(data["meta"]["source"], "memory")
+
+        from_memory = data["suggestions"]
+        for group in ("history_search", "hot_search", "categories", "top_products"):
+            self.assertEqual(from_memory[group], from_store[group], group)
+        self.assertEqual(len(from_memory["top_products"]), 5)
+        self.assertEqual([kw["keyword"] for kw in from_memory["hot_search"]], ["cảm cúm", "cảm cúm trẻ em"])
+
+    def test_substring_and_folding_match_store_path(self):
+        product = Product.objects.create(name="Hapacol", web_name="Hapacol 500", slug="hapacol")
+        variant = ProductVariant.objects.create(product=product, packing="Hộp", sku="hp-500", product_ranking=99)
+        ProductVariantUnit.objects.create(
+            variant=variant, unit_name="Hộp", quantity_in_base=1, price_value=5000, is_default=True, is_published=True
+        )
+        queries = ("pacol", "500", "p-5", "cam cum", "CÚM", "ẢM C", "-1-h")
+        from_store = {q: self._suggest(q)["suggestions"] for q in queries}
+        suggest_index.rebuild()
+        for q in queries:
+            with self.subTest(q=q):
+                data = self._suggest(q)
+                self.assertEqual(data["meta"]["source"], "memory")
+                self.assertEqual(data["suggestions"], from_store[q])
+        self.assertEqual(from_store["pacol"]["top_products"][0]["variant_id"], variant.id)
+        self.assertEqual(from_store["p-5"]["top_products"][0]["variant_id"], variant.id)
+        # Keywords / categories keep the SQL casefold semantics: no accent folding there.
+        self.assertEqual(from_store["cam cum"]["hot_search"], [])
+        self.assertEqual(len(from_store["cam cum"]["top_products"]), 5)
+
+    def test_catalog_change_marks_index_stale(self):
+        suggest_index.rebuild()
+        self.assertEqual(suggest_index.stats()["state"], "ready")
+
+        Product.objects.filter(slug="san-pham-cam-cum-0").first().save()
+        self.assertEqual(suggest_index.stats()["state"], "stale")
+        # Stale index keeps answering until the background rebuild swaps it.
+        self.assertEqual(self._suggest()["meta"]["source"], "memory")
+
+    def test_stats_report_size_and_build_time(self):
+        suggest_index.rebuild()
+        stats = suggest_index.stats()
+        self.assertEqual(stats["keywords"], 3)
+        self.assertEqual(stats["categories"], 2)
+        self.assertEqual(stats["variants"], 14)
+        self.assertGreater(stats["indexed_chars"], 0)
+        self.assertGreaterEqual(stats["build_ms"], 0)
+
+        response = self.client.get("/api/store/search/suggest/index-stats/")
+        self.assertIn(response.status_code, (401, 403))
+
+    def test_ngram_lookup_matches_a_substring_scan(self):
+        texts = ["hapacol 500\x00acetaminophen", "panadol", "hp-500\x00pana", "a", ""]
+        index = _NgramIndex(texts)
+        for needle in ("a", "pa", "pan", "pacol", "500", "-5", "ol", "l\x00a", "colp", "zz", "hapacol 500"):
+            with self.subTest(needle=needle):
+                expected = [
+                    position
+                    for position, text in enumerate(texts)
+                    if FIELD_SEPARATOR not in needle and any(needle in field for field in text.split(FIELD_SEPARATOR))
+                ]
+                self.assertEqual(list(index.find(needle)), expected)
@@ -0,0 +1,106 @@
+"""ProductVariant price cache columns (default_unit_price / min_unit_price) and their consumers."""
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from storeApp.management.commands.backfill.backfill_variant_prices import (
+    Command as VariantPricesCommand,
+    drifted_variant_ids,
+)
+from storeApp.models import Product, ProductVariant, ProductVariantUnit
+
+
+class VariantPriceColumnsTests(APITestCase):
+    databases = {"default", "store"}
+
+    def setUp(self):
+        self.product = Product.objects.create(name="Price cache product", slug="price-cache-product")
+        self.variant = ProductVariant.objects.create(product=self.product, packing="Hộp 10 vỉ", in_stock=5)
+
+    def _unit(self, name, price, **extra):
+        return ProductVariantUnit.objects.create(
+            variant=self.variant,
+            unit_name=name,
+            quantity_in_base=extra.pop("quantity_in_base", 1),
+            price_value=price,
+            is_published=extra.pop("is_published", True),
+            **extra,
+        )
+
+    def _prices(self):
+        self.variant.refresh_from_db()
+        return self.variant.default_unit_price, self.variant.default_compare_at_price, self.variant.min_unit_price
+
+    def test_unit_save_and_delete_keep_columns_in_sync(self):
+        self.assertEqual(self._prices(), (Decimal("0"), None, None))
+
+        box = self._unit("Hộp", 120000, is_default=True, compare_at_price=150000, quantity_in_base=10)
+        strip = self._unit("Vỉ", 13000)
+        self.assertEqual(self._prices(), (Decimal("120000"), Decimal("150000"), Decimal("13000")))
+
+        strip.price_value = 11000
+        strip.save()
+        self.assertEqual(self._prices()[2], Decimal("11000"))
+
+        # Unpublished units never count.
+        self._unit("Viên", 500, is_published=False)
+        self.assertEqual(self._prices()[2], Decimal("11000"))
+
+        box.delete()
+        # Falls back to the first published unit.
+        self.assertEqual(self._prices(), (Decimal("11000"), None, Decimal("11000")))
+
+        # QuerySet.delete() skips model delete() but not the post_delete receiver.
+        ProductVariantUnit.objects.filter(pk=strip.pk).delete()
+        self.assertEqual(self._prices(), (Decimal("0"), None, None))
+
+    def test_full_variant_save_keeps_prices_without_an_extra_update(self):
+        self._unit("Hộp", 120000, is_default=True)
+        stale = ProductVariant.objects.get(pk=self.variant.pk)
+        self._unit("Vỉ", 13000)  # after `stale` was loaded
+        stale.packing = "Hộp 5 vỉ"
+        with CaptureQueriesContext(connections["store"]) as captured:
+            stale.save()
+        updates = [q["sql"] for q in captured if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn("min_unit_price", updates[0])
+        self.assertEqual(self._prices(), (Decimal("120000"), None, Decimal("13000")))
+
+    def test_queryset_update_drift_is_repaired_by_backfill(self):
+        self._unit("Hộp", 90000, is_default=True)
+        ProductVariantUnit.objects.filter(variant=self.variant).update(price_value=70000)
+        self.assertEqual(drifted_variant_ids("store"), [self.variant.id])
+
+        out = StringIO()
+        call_command(VariantPricesCommand(), "--dry-run", stdout=out)
+        self.assertIn("Drifted variants on 'store': 1", out.getvalue())
+        self.assertEqual(self._prices()[0], Decimal("90000"))
+
+        call_command(VariantPricesCommand(), stdout=StringIO())
+        self.assertEqual(self._prices(), (Decimal("70000"), None, Decimal("70000")))
+        self.assertEqual(drifted_variant_ids("store"), [])
+
+    def test_search_price_sort_reads_column_without_unit_subquery(self):
+        self._unit("Hộp", 50000, is_default=True)
+        cheap = ProductVariant.objects.create(
+            product=Product.objects.create(name="Cheap product", slug="cheap-product"), packing="Lọ", in_stock=5
+        )
+        ProductVariantUnit.objects.create(
+            variant=cheap, unit_name="Lọ", quantity_in_base=1, price_value=20000, is_default=True, is_published=True
+        )
+
+        connection = connections["store"]
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(
+                "/api/store/search/", {"sort": "price_asc", "price_range": "under_100k", "include_facets": "false"}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["id"] for item in response.data["items"]], [cheap.id, self.variant.id])
+        unit_table = ProductVariantUnit._meta.db_table
+        listing_sql = [q["sql"] for q in captured if "ORDER BY" in q["sql"] and "default_unit_price" in q["sql"]]
+        self.assertTrue(listing_sql)
+        self.assertFalse(any(unit_table in sql for sql in listing_sql))
@@ -0,0 +1,140 @@
+"""Compiled voucher rule index, per-user redemption rollup, available-vouchers endpoint."""
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from storeApp.models import (
+    Cart,
+    CartItem,
+    Category,
+    Order,
+    PaymentMethod,
+    Product,
+    ProductCategory,
+    ProductVariant,
+    ProductVariantUnit,
+    ShippingMethod,
+    Voucher,
+    VoucherUserRedemptionCount,
+)
+from storeApp.services.voucher_engine import consume_vouchers
+from storeApp.services.voucher_rules import evaluate_vouchers, voucher_rule_cache
+
+
+class VoucherRuleTests(APITestCase):
+    databases = {"default", "store"}
+
+    def setUp(self):
+        suffix = uuid.uuid4().hex[:8]
+        self.category = Category.objects.create(name=f"Rules {suffix}", slug=f"rules-{suffix}")
+        self.product = Product.objects.create(
+            name=f"Rules {suffix}", slug=f"rules-{suffix}", mid=f"MID-{suffix}", category=self.category
+        )
+        ProductCategory.objects.create(product=self.product, category=self.category, is_primary=True)
+        now = timezone.now()
+        self.vouchers = {
+            "ALL10": Voucher.objects.create(code="ALL10", value="10.00"),
+            "MID20": Voucher.objects.create(code="MID20", value="20.00", applicable_products=[self.product.mid]),
+            "CAT5K": Voucher.objects.create(
+                code="CAT5K", type="FIXED", value="5000.00", applicable_categories=[self.category.slug]
+            ),
+            "OTHERMID": Voucher.objects.create(code="OTHERMID", value="50.00", applicable_products=["NOPE"]),
+            "BIGORDER": Voucher.objects.create(code="BIGORDER", value="30.00", min_order_value="1000000.00"),
+            "SOLDOUT": Voucher.objects.create(code="SOLDOUT", value="40.00", usage_limit=1, used_count=1),
+            "ONCE": Voucher.objects.create(code="ONCE", value="15.00", per_user_limit=1),
+            "LATER": Voucher.objects.create(code="LATER", value="60.00", start_at=now + timedelta(days=1)),
+            "OFF": Voucher.objects.create(code="OFF", value="70.00", is_active=False),
+            "SHIP": Voucher.objects.create(
+                code="SHIP", type="FIXED", value="50000.00", scope=Voucher.SHIPPING_DISCOUNT
+            ),
+        }
+        VoucherUserRedemptionCount.objects.create(voucher=self.vouchers["ONCE"], user_id=77, redeem_count=1)
+        self.shipping = ShippingMethod.objects.create(name="Standard", price=30000, estimated_days=2, active=True)
+        self.payment = PaymentMethod.objects.create(name="COD", code="COD", active=True)
+
+    def _evaluate(self, **overrides):
+        context = {
+            "order_subtotal": Decimal("100000.00"),
+            "shipping_fee": Decimal("30000"),
+            "product_mids": {self.product.mid},
+            "category_slugs": {self.category.slug},
+            "user_id": 77,
+        }
+        context.update(overrides)
+        return {item.rule.code: item for item in evaluate_vouchers(**context)}
+
+    def test_one_pass_with_constant_queries(self):
+        voucher_rule_cache.get()  # warm
+        with self.assertNumQueries(2, using="store"):  # live used_count for capped + per-user rollup
+            results = self._evaluate()
+        self.assertEqual(
+            set(results), {"ALL10", "MID20", "CAT5K", "BIGORDER", "SOLDOUT", "ONCE", "LATER", "SHIP"}
+        )
+        eligible = {code: item.discount_amount for code, item in results.items() if item.eligible}
+        self.assertEqual(
+            eligible,
+            {"ALL10": Decimal("10000"), "MID20": Decimal("20000"), "CAT5K": Decimal("5000"), "SHIP": Decimal("30000")},
+        )
+        self.assertEqual(results["BIGORDER"].reason, Voucher.VALIDATION_MIN_ORDER_NOT_MET)
+        self.assertEqual(results["SOLDOUT"].reason, Voucher.VALIDATION_USAGE_LIMIT_REACHED)
+        self.assertEqual(results["ONCE"].reason, Voucher.VALIDATION_PER_USER_LIMIT_REACHED)
+        self.assertEqual(results["LATER"].reason, Voucher.VALIDATION_NOT_STARTED)
+
+        with self.assertNumQueries(1, using="store"):  # guest: no per-user lookup
+            guest = self._evaluate(user_id=None, product_mids=set(), category_slugs=set())
+        self.assertNotIn("MID20", guest)
+        self.assertTrue(guest["ONCE"].eligible)
+
+    def test_voucher_changes_retire_the_index(self):
+        first = voucher_rule_cache.get()
+        voucher = self.vouchers["ALL10"]
+        voucher.used_count = 3
+        voucher.save(update_fields=["used_count"])
+        self.assertIs(voucher_rule_cache.get(), first)
+
+        voucher.is_active = False
+        voucher.save()
+        rebuilt = voucher_rule_cache.get()
+        self.assertNotEqual(rebuilt.version, first.version)
+        self.assertNotIn(voucher.id, rebuilt.rules)
+        self.assertIn(self.vouchers["MID20"].id, rebuilt.by_product[self.product.mid])
+
+    def test_consume_maintains_the_rollup(self):
+        order = Order.objects.create(
+            user_id=77, shipping_address="HCM", shipping_method=self.shipping, payment_method=self.payment, total=100000
+        )
+        for _ in range(2):
+            consume_vouchers(
+                order=order,
+                user_id=77,
+                order_voucher=self.vouchers["ALL10"],
+                shipping_voucher=self.vouchers["SHIP"],
+                order_discount_amount=Decimal("10000"),
+                shipping_discount_amount=Decimal("30000"),
+            )
+        self.assertEqual(
+            dict(VoucherUserRedemptionCount.objects.filter(user_id=77).values_list("voucher__code", "redeem_count")),
+            {"ALL10": 2, "SHIP": 2, "ONCE": 1},
+        )
+        self.assertFalse(self.vouchers["ONCE"].can_user_redeem(77))
+
+    def test_available_vouchers_endpoint(self):
+        variant = ProductVariant.objects.create(product=self.product, packing="Hộp", is_published=True)
+        unit = ProductVariantUnit.objects.create(
+            variant=variant, quantity_in_base=1, unit_name="Hộp", price_value=50000, is_default=True, is_published=True
+        )
+        guest_id = uuid.uuid4()
+        cart = Cart.objects.create(guest_session_id=guest_id, status=Cart.ACTIVE, shipping_method=self.shipping)
+        CartItem.objects.create(cart=cart, product_variant=variant, product_variant_unit=unit, quantity=2, unit_price_snapshot=50000)
+
+        response = self.client.get("/api/store/carts/available-vouchers/", HTTP_X_GUEST_SESSION=str(guest_id))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["subtotal"], "100000.00")
+        order_codes = [row["code"] for row in response.data["order_vouchers"]]
+        self.assertEqual(order_codes[:4], ["MID20", "ONCE", "ALL10", "CAT5K"])
+        self.assertEqual(response.data["order_vouchers"][0]["discount_amount"], "20000.00")
+        self.assertEqual([row["code"] for row in response.data["shipping_vouchers"]], ["SHIP"])
+        self.assertFalse(response.data["order_vouchers"][-1]["eligible"])
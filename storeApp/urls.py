@@ -45,6 +45,11 @@ urlpatterns = [
     path('search/', search_products, name='search-products'),
     path('resolve-path/<path:path_slug>/', resolve_store_path_view, name='resolve-store-path'),
     path('search/suggest/', SearchSuggestViewSet.as_view({'get': 'list'}), name='search-suggest'),
+    path(
+        'search/suggest/index-stats/',
+        SearchSuggestViewSet.as_view({'get': 'index_stats'}),
+        name='search-suggest-index-stats',
+    ),
     path('contact/', contact_support_request, name='contact-support-request'),
     # Custom route cho category slug (đặt sau router để chỉ match khi không phải API endpoint)
     # Hỗ trợ nested paths như: thuc-pham-chuc-nang/vitamin-khoang-chat
@@ -3,16 +3,13 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 from django.conf import settings
-from django.db import models
-from django.db.models import Case, Count, Exists, F, IntegerField, OuterRef, Q, Value, When
+from django.db.models import Count, Exists, F, IntegerField, OuterRef, Q, Value
 from django.db.models import Prefetch
-from django.db.models.functions import Lower
 from django.utils import timezone
-from storeApp.models import ProductVariant, ProductVariantUnit, Category, Product, ProductCategory, Brand
+from storeApp.models import ProductVariant, ProductVariantUnit, Category, ProductCategory, Brand
 from storeApp.serializers import ProductVariantPickerSerializer, ProductVariantSerializer
 from storeApp.services.product_category_helpers import (
     filter_variants_by_category_id,
-    category_tree_ids,
     product_in_categories_q,
     variant_keyword_q,
 )
@@ -32,8 +29,17 @@ from storeApp.services.country_normalize import (
     parse_csv_ints,
     parse_csv_strings,
 )
+from storeApp.services.keyset_pagination import (
+    keyset_source,
+    paginate_keyset,
+    wants_cursor_pagination,
+    wants_total,
+    with_unique_tiebreaker,
+)
+from storeApp.services.search_documents import annotate_search_relevance, fold_search_text, search_match_q
 from storeApp.services.search_facets_service import SearchFacetsService
 from storeApp.services.store_path_resolver import resolve_store_path
+from storeApp.services.store_path_routes import store_path_router
 from storeApp.models import Notification
 from storeApp.serializers import ContactSupportRequestSerializer
 
@@ -222,44 +228,13 @@ def search_products(request):
     )
 
     query_normalized = " ".join(raw_query.split())
-    query_lookup = query_normalized.casefold()
-    if query_lookup:
-        queryset = queryset.annotate(
-            product_name_lookup=Lower("product__name"),
-            web_name_lookup=Lower("product__web_name"),
-            category_name_lookup=Lower("product__category__name"),
-            brand_name_lookup=Lower("product__brand__name"),
-            sku_lookup=Lower("sku"),
-            mid_lookup=Lower("product__mid"),
-            ingredients_lookup=Lower("product__ingredients"),
-            relevance_score=Case(
-                When(sku_lookup=query_lookup, then=Value(110)),
-                When(mid_lookup=query_lookup, then=Value(108)),
-                When(product_name_lookup=query_lookup, then=Value(100)),
-                When(web_name_lookup=query_lookup, then=Value(95)),
-                When(sku_lookup__startswith=query_lookup, then=Value(88)),
-                When(product_name_lookup__startswith=query_lookup, then=Value(80)),
-                When(web_name_lookup__startswith=query_lookup, then=Value(75)),
-                When(product_name_lookup__contains=query_lookup, then=Value(60)),
-                When(web_name_lookup__contains=query_lookup, then=Value(55)),
-                When(sku_lookup__contains=query_lookup, then=Value(50)),
-                When(mid_lookup__contains=query_lookup, then=Value(48)),
-                When(category_name_lookup__contains=query_lookup, then=Value(35)),
-                When(brand_name_lookup__contains=query_lookup, then=Value(30)),
-                When(ingredients_lookup__contains=query_lookup, then=Value(20)),
-                default=Value(0),
-                output_field=IntegerField(),
-            ),
-        ).filter(
-            Q(product_name_lookup__contains=query_lookup)
-            | Q(web_name_lookup__contains=query_lookup)
-            | Q(category_name_lookup__contains=query_lookup)
-            | Q(brand_name_lookup__contains=query_lookup)
-            | Q(sku_lookup__contains=query_lookup)
-            | Q(mid_lookup__contains=query_lookup)
-            | Q(ingredients_lookup__contains=query_lookup)
-            | Q(product__product_categories__category__name__icontains=query_normalized)
-        ).distinct()
+    has_query = bool(fold_search_text(query_normalized))
+    if has_query:
+        queryset = annotate_search_relevance(
+            queryset.filter(search_match_q(query_normalized, using=STORE_DB_ALIAS)),
+            query_normalized,
+            using=STORE_DB_ALIAS,
+        )
     else:
         queryset = queryset.annotate(relevance_score=Value(0, output_field=IntegerField()))
 
@@ -310,13 +285,15 @@ def search_products(request):
         facets = {}
 
     if sort == "price_asc":
-        queryset = queryset.order_by("price_value", "-in_stock", "id")
+        ordering = ["price_value", "-in_stock", "id"]
     elif sort == "price_desc":
-        queryset = queryset.order_by("-price_value", "-in_stock", "id")
+        ordering = ["-price_value", "-in_stock", "id"]
     elif sort == "popular":
-        queryset = queryset.order_by("-product_ranking", "-in_stock", "id")
+        ordering = ["-product_ranking", "-in_stock", "id"]
     else:
-        queryset = queryset.order_by("-relevance_score", "-product_ranking", "-in_stock", "id")
+        rank_order = ["-search_rank"] if has_query else []
+        ordering = ["-relevance_score", *rank_order, "-product_ranking", "-in_stock", "id"]
+    queryset = queryset.order_by(*ordering)
 
     queryset = queryset.prefetch_related(
         _prefetch_variant_product_categories(),
@@ -351,20 +328,36 @@ def search_products(request):
         dedupe_order = [
             F("product_id").asc(),
             F("relevance_score").desc(),
+            *([F("search_rank").desc()] if has_query else []),
             F("product_ranking").desc(),
             F("price_value").asc(),
             F("id").asc(),
         ]
 
-    deduped = annotate_variant_count(one_variant_per_product(queryset, partition_order=dedupe_order))
-    total = count_distinct_products(queryset)
-    start = (page - 1) * page_size
-    end = start + page_size
-    items = list(deduped[start:end])
+    deduped = one_variant_per_product(queryset, partition_order=dedupe_order)
+    if wants_cursor_pagination(request):
+        # Keyset mode: no OFFSET, COUNT only when include_total=true.
+        keyset_page = paginate_keyset(
+            annotate_variant_count(keyset_source(queryset, deduped)),
+            ordering,
+            cursor=request.query_params.get("cursor"),
+            page_size=page_size,
+            scope="search",
+        )
+        items = keyset_page.items
+        total = count_distinct_products(queryset) if wants_total(request) else None
+        has_more = keyset_page.has_more
+        pagination_meta = {"page": None, "next_cursor": keyset_page.next_cursor}
+    else:
+        total = count_distinct_products(queryset)
+        start = (page - 1) * page_size
+        end = start + page_size
+        items = list(annotate_variant_count(deduped)[start:end])
+        has_more = end < total
+        pagination_meta = {"page": page}
     serializer = ProductVariantSerializer(items, many=True)
 
     took_ms = int((timezone.now() - started_at).total_seconds() * 1000)
-    has_more = end < total
 
     return Response(
         {
@@ -372,7 +365,7 @@ def search_products(request):
             "facets": facets,
             "meta": {
                 "total": total,
-                "page": page,
+                **pagination_meta,
                 "page_size": page_size,
                 "has_more": has_more,
                 "took_ms": took_ms,
@@ -392,84 +385,75 @@ def products_by_category_slug(request, category_slug):
     3. {category_slug}/{subcategory_slug}/.../{medicine_slug} - Lấy chi tiết sản phẩm theo medicine slug
     """
     category_slug = category_slug.rstrip('/')
-    
+    route = store_path_router.route(category_slug, using=STORE_DB_ALIAS)
+
     if '/' in category_slug:
         parts = category_slug.split('/')
         medicine_slug = parts[-1]
         cat_path_slug = '/'.join(parts[:-1])
-        
-        product = Product.objects.using(STORE_DB_ALIAS).filter(active=True).filter(
-            slug__iexact=medicine_slug
-        ).first()
-        
-        if product:
-            category = Category.objects.using(STORE_DB_ALIAS).filter(active=True).filter(
-                models.Q(path_slug__iexact=cat_path_slug) | 
-                models.Q(slug__iexact=cat_path_slug)
-            ).first()
-            
-            if category:
-                category_ids = category_tree_ids(category, using=STORE_DB_ALIAS)
-                variant_qs = (
-                    ProductVariant.objects.using(STORE_DB_ALIAS)
-                    .filter(active=True, product=product)
-                    .filter(product_in_categories_q(category_ids, using=STORE_DB_ALIAS))
-                    .select_related("product", "product__category")
-                    .prefetch_related(_prefetch_variant_product_categories())
+
+        if route and route["kind"] == "product":
+            variant_qs = (
+                ProductVariant.objects.using(STORE_DB_ALIAS)
+                .filter(active=True, product_id=route["product_id"])
+                .filter(product_in_categories_q(route["descendant_ids"], using=STORE_DB_ALIAS))
+                .select_related("product", "product__category")
+                .prefetch_related(_prefetch_variant_product_categories())
+            )
+            variant_id_param = request.query_params.get("variant_id") or request.query_params.get("v")
+            if variant_id_param:
+                try:
+                    variant_qs = variant_qs.filter(id=int(variant_id_param))
+                except (TypeError, ValueError):
+                    pass
+            product_variant = variant_qs.order_by("-product_ranking", "id").first()
+
+            if product_variant:
+                listed_slug = route["category_path"]
+                serializer = ProductVariantSerializer(
+                    product_variant,
+                    context={"listed_under_slug": listed_slug},
                 )
-                variant_id_param = request.query_params.get("variant_id") or request.query_params.get("v")
-                if variant_id_param:
-                    try:
-                        variant_qs = variant_qs.filter(id=int(variant_id_param))
-                    except (TypeError, ValueError):
-                        pass
-                product_variant = variant_qs.order_by("-product_ranking", "id").first()
-
-                if product_variant:
-                    listed_slug = category.path_slug or category.slug
-                    serializer = ProductVariantSerializer(
-                        product_variant,
-                        context={"listed_under_slug": listed_slug},
-                    )
-                    payload = serializer.data
-                    sibling_qs = (
-                        ProductVariant.objects.using(STORE_DB_ALIAS)
-                        .filter(
-                            active=True,
-                            is_published=True,
-                            product_id=product_variant.product_id,
-                        )
-                        .prefetch_related(
-                            Prefetch(
-                                "units",
-                                queryset=ProductVariantUnit.objects.using(STORE_DB_ALIAS)
-                                .filter(is_published=True)
-                                .order_by("unit_order", "id"),
-                                to_attr="prefetched_units",
-                            ),
-                        )
-                        .order_by("packing", "id")
+                payload = serializer.data
+                sibling_qs = (
+                    ProductVariant.objects.using(STORE_DB_ALIAS)
+                    .filter(
+                        active=True,
+                        is_published=True,
+                        product_id=product_variant.product_id,
                     )
-                    payload["variants"] = ProductVariantPickerSerializer(
-                        sibling_qs, many=True
-                    ).data
-                    return Response(payload)
-                else:
-                    return Response(
-                        {'detail': f'Không tìm thấy sản phẩm với category: {cat_path_slug} và medicine: {medicine_slug}'},
-                        status=status.HTTP_404_NOT_FOUND
+                    .prefetch_related(
+                        Prefetch(
+                            "units",
+                            queryset=ProductVariantUnit.objects.using(STORE_DB_ALIAS)
+                            .filter(is_published=True)
+                            .order_by("unit_order", "id"),
+                            to_attr="prefetched_units",
+                        ),
                     )
+                    .order_by("packing", "id")
+                )
+                payload["variants"] = ProductVariantPickerSerializer(
+                    sibling_qs, many=True
+                ).data
+                return Response(payload)
             else:
                 return Response(
-                    {'detail': f'Không tìm thấy danh mục với path: {cat_path_slug} cho medicine: {medicine_slug}'},
+                    {'detail': f'Không tìm thấy sản phẩm với category: {cat_path_slug} và medicine: {medicine_slug}'},
                     status=status.HTTP_404_NOT_FOUND
                 )
+        elif store_path_router.product_id(medicine_slug, using=STORE_DB_ALIAS) is not None:
+            return Response(
+                {'detail': f'Không tìm thấy danh mục với path: {cat_path_slug} cho medicine: {medicine_slug}'},
+                status=status.HTTP_404_NOT_FOUND
+            )
     
     try:
-        category = Category.objects.using(STORE_DB_ALIAS).filter(active=True).filter(
-            models.Q(path_slug__iexact=category_slug) | 
-            models.Q(slug__iexact=category_slug)
-        ).first()
+        category = (
+            Category.objects.using(STORE_DB_ALIAS).filter(pk=route["category_id"]).first()
+            if route
+            else None
+        )
         
         if not category:
             return Response(
@@ -485,7 +469,8 @@ def products_by_category_slug(request, category_slug):
             product__active=True,
         )
         queryset = annotate_variant_unit_price(
-            filter_variants_by_category_id(base_qs, category.id, using=STORE_DB_ALIAS)
+            base_qs.filter(product_in_categories_q(route["descendant_ids"], using=STORE_DB_ALIAS))
+            .distinct()
             .select_related("product", "product__category", "product__brand")
             .prefetch_related(
                 _prefetch_variant_product_categories(),
@@ -546,9 +531,10 @@ def products_by_category_slug(request, category_slug):
             normalized = field[1:] if field.startswith('-') else field
             if normalized in allowed_ordering_fields:
                 sanitized_ordering.append(field)
-        queryset = queryset.order_by(*(sanitized_ordering or ['-created_date', '-id']))
+        ordering = sanitized_ordering or ['-created_date', '-id']
     else:
-        queryset = queryset.order_by('-created_date', '-id')
+        ordering = ['-created_date', '-id']
+    queryset = queryset.order_by(*ordering)
 
     dedupe_order = [
         F("product_id").asc(),
@@ -556,15 +542,37 @@ def products_by_category_slug(request, category_slug):
         F("created_date").desc(),
         F("id").asc(),
     ]
-    queryset = annotate_variant_count(
-        one_variant_per_product(queryset, partition_order=dedupe_order)
-    )
-    # After dedupe: one row per product (matches DRF pagination `count`)
-    listing_product_count = queryset.count()
+    deduped = one_variant_per_product(queryset, partition_order=dedupe_order)
+    list_ctx = {"listed_under_slug": category_path_slug}
+
+    if wants_cursor_pagination(request):
+        keyset_page = paginate_keyset(
+            annotate_variant_count(keyset_source(queryset, deduped)),
+            with_unique_tiebreaker(ordering),
+            cursor=request.query_params.get('cursor'),
+            page_size=ProductPagination().get_page_size(request),
+            scope=f"category:{category.id}",
+        )
+        listing_total = deduped.count() if wants_total(request) else None
+        serializer = ProductVariantSerializer(keyset_page.items, many=True, context=list_ctx)
+        return Response({
+            'count': listing_total,
+            'next_cursor': keyset_page.next_cursor,
+            'has_more': keyset_page.has_more,
+            'results': serializer.data,
+            'hasSubcategories': has_subcategories,
+            'subcategories': immediate_subcategories,
+            'categorySlug': category_path_slug,
+            'categoryName': category.path or category.name,
+            # Category-wide total when the filtered count was not requested
+            'productCount': listing_total if listing_total is not None else product_count,
+            'overLimit': False,
+        })
+
+    queryset = annotate_variant_count(deduped)
 
     paginator = ProductPagination()
     page = paginator.paginate_queryset(queryset, request)
-    list_ctx = {"listed_under_slug": category_path_slug}
     if page is not None:
         serializer = ProductVariantSerializer(page, many=True, context=list_ctx)
         response = paginator.get_paginated_response(serializer.data)
@@ -582,7 +590,8 @@ def products_by_category_slug(request, category_slug):
     return Response({
         'categorySlug': category_path_slug,
         'categoryName': category.path or category.name,
-        'productCount': listing_product_count,
+        # After dedupe: one row per product (matches DRF pagination `count`)
+        'productCount': queryset.count(),
         'hasSubcategories': has_subcategories,
         'subcategories': immediate_subcategories,  # Always include subcategories
         'products': serializer.data,
@@ -604,11 +613,9 @@ def resolve_store_path_view(request, path_slug):
         return Response(resolved, status=status.HTTP_404_NOT_FOUND)
 
     if resolved.get("page") == "category":
-        category_path = (resolved.get("category_path") or "").strip()
         category = (
             Category.objects.using(STORE_DB_ALIAS)
-            .filter(active=True)
-            .filter(models.Q(path_slug__iexact=category_path) | models.Q(slug__iexact=category_path))
+            .filter(active=True, pk=resolved.get("category_id"))
             .first()
         )
         if category:
@@ -8,10 +8,7 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 
 from storeApp.models import Campaign, CampaignPlacement, CampaignVoucher
-from storeApp.serializers_campaign import (
-    PublicCampaignDetailSerializer,
-    PublicCampaignListSerializer,
-)
+from storeApp.serializers_campaign import PublicCampaignDetailSerializer
 from storeApp.services.campaign_cache import (
     get_cached,
     record_public_slug_404,
@@ -22,15 +19,16 @@ from storeApp.services.campaign_public import (
     PUBLIC_SLOT_KEYS,
     get_public_campaign_by_slug,
     normalize_placement_slot,
-    public_visible_queryset,
-    select_placement_winners,
 )
+from storeApp.services.campaign_snapshot import get_placement_snapshot
+
+SNAPSHOT_AGE_HEADER = "X-Campaign-Snapshot-Age"
 
 
 class CampaignPublicViewSet(viewsets.ViewSet):
     """
-    GET /api/store/campaigns/
-    GET /api/store/campaigns/placements/
+    GET /api/store/campaigns/             (compiled snapshot, services/campaign_snapshot.py)
+    GET /api/store/campaigns/placements/  (compiled snapshot)
     GET /api/store/campaigns/{slug}/
     """
 
@@ -39,13 +37,8 @@ class CampaignPublicViewSet(viewsets.ViewSet):
     lookup_url_kwarg = "slug"
 
     def list(self, request):
-        cached = get_cached("list")
-        if cached is not None:
-            return Response(cached)
-        qs = public_visible_queryset().order_by("-priority", "start_at", "id")
-        data = PublicCampaignListSerializer(qs, many=True).data
-        set_cached("list", data)
-        return Response(data)
+        snapshot = get_placement_snapshot()
+        return Response(snapshot.campaigns, headers={SNAPSHOT_AGE_HEADER: str(snapshot.age_seconds())})
 
     def _not_found(self, slug):
         # Identical 404 for missing / draft / bad preview (D-06 / D-19).
@@ -129,15 +122,13 @@ class CampaignPublicViewSet(viewsets.ViewSet):
                     {"detail": f"Unknown slots: {', '.join(unknown)}"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-        extra = tuple(slots) if slots else None
-        # P9 shape bump — avoid serving pre-D-22 cached objects as arrays.
-        winners = get_cached("placements_p9", extra=extra)
-        if winners is None:
-            winners = select_placement_winners(slots=slots)
-            set_cached("placements_p9", winners, extra=extra)
+        now = timezone.now()
+        snapshot = get_placement_snapshot(now=now)
         return Response(
             {
-                "generated_at": timezone.now().isoformat().replace("+00:00", "Z"),
-                "placements": winners,
-            }
+                "generated_at": now.isoformat().replace("+00:00", "Z"),
+                "placements": snapshot.placements_for(slots),
+                "snapshot": snapshot.meta(now),
+            },
+            headers={SNAPSHOT_AGE_HEADER: str(snapshot.age_seconds(now))},
         )
@@ -15,6 +15,7 @@ from storeApp.services.cart_service import (
     add_or_update_item,
     checkout_cart,
     get_or_create_active_cart,
+    list_available_vouchers,
     merge_guest_cart_into_user,
     recalculate_cart,
     remove_item,
@@ -23,6 +24,7 @@ from storeApp.services.cart_service import (
 )
 from storeApp.services.checkout_delivery import resolve_checkout_shipping_address
 from storeApp.services.guest_session import guest_session_id_from_request, new_guest_session_id
+from storeApp.services.stock_reservations import InsufficientStockError, reserve_cart_stock
 from storeApp.services.voucher_engine import VoucherEngineError
 
 
@@ -58,7 +60,7 @@ class CartViewSet(viewsets.ViewSet):
             )
         except CartServiceError as exc:
             return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
-        return Response(CartSerializer(cart).data)
+        return self._cart_response(cart, extra={"merge_report": cart.merge_report.as_dict()})
 
     def _reload_cart_for_response(self, cart):
         return (
@@ -72,6 +74,21 @@ class CartViewSet(viewsets.ViewSet):
             .get(pk=cart.pk)
         )
 
+    def _cart_response(self, cart, extra=None):
+        """Serialize after a mutation and write the payload through to the cart cache (`extra` is response-only)."""
+        data = CartSerializer(cart).data
+        if cart.status == Cart.ACTIVE:
+            try:
+                get_cart_cache_gateway().set_cart_summary(
+                    cart_id=cart.id,
+                    summary=data,
+                    version=data["version"],
+                    ttl_seconds=self.CURRENT_CART_CACHE_TTL_SECONDS,
+                )
+            except Exception:
+                pass
+        return Response({**data, **extra} if extra else data)
+
     def _finalize_cart_response(self, cart, *, check_version=False):
         cart = self._reload_cart_for_response(cart)
         cart = recalculate_cart(
@@ -123,7 +140,7 @@ class CartViewSet(viewsets.ViewSet):
 
         cache_gateway = get_cart_cache_gateway()
         try:
-            cached_summary = cache_gateway.get_cart_summary(cart_id=cart.id)
+            cached_summary = cache_gateway.get_cart_summary(cart_id=cart.id, version=cart.version)
             if cached_summary is not None:
                 return Response(cached_summary)
         except Exception:
@@ -145,7 +162,9 @@ class CartViewSet(viewsets.ViewSet):
             cache_gateway.set_cart_summary(
                 cart_id=cart.id,
                 summary=response_data,
+                version=response_data["version"],
                 ttl_seconds=self.CURRENT_CART_CACHE_TTL_SECONDS,
+                overwrite=False,
             )
         except Exception:
             pass
@@ -187,7 +206,7 @@ class CartViewSet(viewsets.ViewSet):
             return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         except VoucherEngineError as exc:
             return Response({"error": "Validation failed", "details": exc.to_detail()}, status=status.HTTP_400_BAD_REQUEST)
-        return Response(CartSerializer(cart).data, status=status.HTTP_200_OK)
+        return self._cart_response(cart)
 
     @action(methods=["patch", "delete"], detail=False, url_path="items/(?P<item_id>[^/.]+)")
     def item_detail(self, request, item_id=None):
@@ -235,7 +254,7 @@ class CartViewSet(viewsets.ViewSet):
             return Response({"error": str(exc)}, status=status_code)
         except VoucherEngineError as exc:
             return Response({"error": "Validation failed", "details": exc.to_detail()}, status=status.HTTP_400_BAD_REQUEST)
-        return Response(CartSerializer(cart).data)
+        return self._cart_response(cart)
 
     @action(methods=["post"], detail=False, url_path="select-shipping")
     def select_shipping(self, request):
@@ -269,7 +288,7 @@ class CartViewSet(viewsets.ViewSet):
             )
         except VoucherEngineError as exc:
             return Response({"error": "Validation failed", "details": exc.to_detail()}, status=status.HTTP_400_BAD_REQUEST)
-        return Response(CartSerializer(cart).data)
+        return self._cart_response(cart)
 
     @action(methods=["post"], detail=False, url_path="apply-voucher")
     def apply_voucher(self, request):
@@ -304,7 +323,16 @@ class CartViewSet(viewsets.ViewSet):
             )
         except VoucherEngineError as exc:
             return Response({"error": "Validation failed", "details": exc.to_detail()}, status=status.HTTP_400_BAD_REQUEST)
-        return Response(CartSerializer(cart).data)
+        return self._cart_response(cart)
+
+    @action(methods=["get"], detail=False, url_path="available-vouchers")
+    def available_vouchers(self, request):
+        """Voucher khả dụng cho giỏ hiện tại (eligible trước, giảm nhiều nhất trước; kèm reason nếu chưa đủ điều kiện)."""
+        try:
+            cart = self._active_cart(request)
+        except CartServiceError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(list_available_vouchers(cart=cart, using="store"))
 
     @action(methods=["post"], detail=False, url_path="remove-voucher")
     def remove_voucher(self, request):
@@ -320,7 +348,7 @@ class CartViewSet(viewsets.ViewSet):
             cart.shipping_voucher = None
         cart.save(update_fields=["order_voucher", "shipping_voucher"])
         cart = recalculate_cart(cart=cart, using="store", expected_version=expected_version)
-        return Response(CartSerializer(cart).data)
+        return self._cart_response(cart)
 
     @action(methods=["post"], detail=False, url_path="recalculate")
     def recalculate(self, request):
@@ -344,7 +372,48 @@ class CartViewSet(viewsets.ViewSet):
             )
         except VoucherEngineError as exc:
             return Response({"error": "Validation failed", "details": exc.to_detail()}, status=status.HTTP_400_BAD_REQUEST)
-        return Response(CartSerializer(cart).data)
+        return self._cart_response(cart)
+
+    @action(methods=["post"], detail=False, url_path="checkout-start")
+    def checkout_start(self, request):
+        """Giữ tồn kho cho các dòng sắp checkout (TTL) trước khi FE làm bước voucher / địa chỉ / thanh toán."""
+        try:
+            cart = self._active_cart(request)
+        except CartServiceError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        raw_line_ids = request.data.get("cart_item_ids")
+        item_ids = None
+        if raw_line_ids is not None:
+            if not isinstance(raw_line_ids, list) or not raw_line_ids:
+                return Response({"error": "cart_item_ids must be a non-empty list or null"}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                item_ids = [int(x) for x in raw_line_ids]
+            except (TypeError, ValueError):
+                return Response({"error": "cart_item_ids must be a list of integers"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            expires_at, reserved = reserve_cart_stock(cart=cart, item_ids=item_ids, using="store")
+        except InsufficientStockError as exc:
+            return Response(
+                {
+                    "error": str(exc),
+                    "details": [
+                        {"product_variant_id": variant_id, "available": available, "requested": requested}
+                        for variant_id, available, requested in exc.shortages
+                    ],
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not reserved:
+            return Response({"error": "Cart must have at least one item"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            {
+                "expires_at": expires_at,
+                "reservations": [
+                    {"product_variant_id": variant_id, "quantity": quantity}
+                    for variant_id, quantity in sorted(reserved.items())
+                ],
+            }
+        )
 
     @action(methods=["post"], detail=False, url_path="checkout")
     def checkout(self, request):
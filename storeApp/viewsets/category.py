@@ -1,10 +1,19 @@
+from django.http import HttpResponse, HttpResponseNotModified
 from rest_framework import viewsets, generics
+from rest_framework.decorators import action
 from rest_framework.parsers import JSONParser
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
-from django.db.models import Prefetch
+from mainApp.permissions import IsBusinessAdmin
 from storeApp.models import Category
-from storeApp.serializers import CategoryLevel0Serializer
+from storeApp.services.menu_snapshot import menu_snapshot
+
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
 
 
 class CategoryViewSet(viewsets.ViewSet, generics.ListAPIView, generics.RetrieveAPIView):
@@ -15,24 +24,33 @@ class CategoryViewSet(viewsets.ViewSet, generics.ListAPIView, generics.RetrieveA
     serializer_class = CategorySerializer
     parser_classes = [JSONParser]
     permission_classes = [AllowAny]
-    
+
+    def get_permissions(self):
+        """
+        - menu_stats: IsBusinessAdmin
+        - còn lại: AllowAny (public)
+        """
+        if self.action == "menu_stats":
+            return [IsBusinessAdmin()]
+        return [permission() for permission in self.permission_classes]
+
     def list(self, request, *args, **kwargs):
         """
         GET /api/store/categories/
         Trả về categories theo cấu trúc nested: level0 -> level1 -> level2 (top 5)
+
+        Served from the prebuilt menu snapshot (services/menu_snapshot.py); honours If-None-Match.
         """
-        level1_prefetch = Prefetch(
-            'children',
-            queryset=Category.objects.filter(
-                level=1,
-                active=True
-            ).order_by('name')
-        )
-        
-        level0_categories = Category.objects.filter(
-            level=0,
-            active=True
-        ).prefetch_related(level1_prefetch).order_by('name')
-        
-        serializer = CategoryLevel0Serializer(level0_categories, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        snapshot = menu_snapshot.current()
+        if _etag_matches(request.headers.get("If-None-Match"), snapshot.etag):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(snapshot.body, content_type="application/json")
+        response["ETag"] = snapshot.etag
+        response["Cache-Control"] = "no-cache"
+        return response
+
+    @action(detail=False, methods=["get"], url_path="menu-stats")
+    def menu_stats(self, request):
+        """Menu snapshot size / build time / age for this worker process."""
+        return Response(menu_snapshot.stats())
@@ -20,7 +20,13 @@ from storeApp.models import (
     ProductVariantUnit,
 )
 from storeApp.serializers import OrderSerializer
-from storeApp.services.stock import get_available_stock, deduct_stock, restore_stock
+from storeApp.services.stock import (
+    deduct_stock_bulk,
+    get_available_stock,
+    get_available_stock_bulk,
+    restore_order_stock,
+    stock_memo,
+)
 from storeApp.services.voucher_engine import (
     VoucherEngineError,
     consume_vouchers,
@@ -85,6 +91,17 @@ class OrderViewSet(viewsets.ViewSet, generics.ListAPIView, generics.RetrieveAPIV
             return get_object_or_404(queryset, id=int(pk))
         return get_object_or_404(queryset, order_number=pk)
 
+    @staticmethod
+    def _item_variant_ids(items_data):
+        variant_ids = []
+        for item_data in items_data:
+            raw = item_data.get('product_variant') or item_data.get('product_variant_id')
+            try:
+                variant_ids.append(int(raw))
+            except (TypeError, ValueError):
+                continue
+        return variant_ids
+
     def _validate_order_item(self, item_data, idx):
         """Validate một order item"""
         product_variant_id = item_data.get('product_variant') or item_data.get('product_variant_id')
@@ -180,15 +197,13 @@ class OrderViewSet(viewsets.ViewSet, generics.ListAPIView, generics.RetrieveAPIV
             'required_base_quantity': required_base_quantity,
         }
     
-    def _deduct_stock(self, product_variant_id, quantity):
-        """Trừ tồn kho qua stock service (FIFO trên batches + sync cache)."""
-        deduct_stock(product_variant_id, quantity)
+    def _deduct_stock(self, lines):
+        """Trừ tồn kho qua stock service (khóa lô FIFO cho cả đơn + sổ phân bổ + sync cache)."""
+        deduct_stock_bulk(lines, using='store')
 
     def _restore_stock(self, order):
-        """Hoàn tồn kho khi đơn bị hủy: gọi restore_stock cho từng item (LIFO/ADJ + sync cache)."""
-        for item in order.items.all():
-            quantity_in_base = item.product_variant_unit.quantity_in_base if item.product_variant_unit else 1
-            restore_stock(item.product_variant_id, item.quantity * quantity_in_base)
+        """Hoàn tồn kho khi đơn bị hủy: trả đúng về lô đã phân bổ; đơn cũ (không có sổ) dùng restore_stock."""
+        restore_order_stock(order.items.select_related('product_variant_unit'), using='store')
 
     def create(self, request, *args, **kwargs):
         data = request.data.copy() if hasattr(request.data, 'copy') else dict(request.data)
@@ -295,12 +310,15 @@ class OrderViewSet(viewsets.ViewSet, generics.ListAPIView, generics.RetrieveAPIV
         # Validate tất cả items
         validation_errors = []
         normalized_items = []
-        for idx, item_data in enumerate(items_data):
-            result = self._validate_order_item(item_data, idx)
-            if result and result.get('error'):
-                validation_errors.append(result)
-            else:
-                normalized_items.append(result)
+        with stock_memo():
+            # Tồn kho mọi dòng trong 1 query; _validate_order_item đọc lại từ memo.
+            get_available_stock_bulk(self._item_variant_ids(items_data))
+            for idx, item_data in enumerate(items_data):
+                result = self._validate_order_item(item_data, idx)
+                if result and result.get('error'):
+                    validation_errors.append(result)
+                else:
+                    normalized_items.append(result)
 
         if validation_errors:
             return Response(
@@ -385,19 +403,21 @@ class OrderViewSet(viewsets.ViewSet, generics.ListAPIView, generics.RetrieveAPIV
                 }
                 serializer.is_valid(raise_exception=True)
                 order = serializer.save()
-                # Create order items and deduct stock
-                for item_data in normalized_items:
-                    OrderItem.objects.create(
+                # Create order items and deduct stock (một lần khóa lô cho cả đơn)
+                order_items = OrderItem.objects.using('store').bulk_create([
+                    OrderItem(
                         order=order,
                         product_variant=item_data['product_variant'],
                         product_variant_unit=item_data['product_variant_unit'],
                         quantity=item_data['quantity'],
                         price=item_data['price'],
                     )
-                    self._deduct_stock(
-                        item_data['product_variant'].id,
-                        item_data['required_base_quantity'],
-                    )
+                    for item_data in normalized_items
+                ])
+                self._deduct_stock([
+                    (item_data['product_variant'].id, item_data['required_base_quantity'], order_item.id)
+                    for item_data, order_item in zip(normalized_items, order_items)
+                ])
                 consume_vouchers(
                     order=order,
                     user_id=user_id,
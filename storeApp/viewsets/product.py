@@ -7,41 +7,27 @@ from storeApp.models import ProductVariant
 from storeApp.serializers import ProductVariantSerializer
 from storeApp.filters import ProductFilter
 from rest_framework.pagination import PageNumberPagination
-from django.db.models import OuterRef, Subquery, DecimalField, Value
-from django.db.models.functions import Coalesce
+from django.db.models import F
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from storeApp.models import ProductVariantUnit, Product, ProductCategory
 from django.db.models import Prefetch
+from storeApp.services.keyset_pagination import (
+    paginate_keyset,
+    wants_cursor_pagination,
+    wants_total,
+    with_unique_tiebreaker,
+)
 
 
 def annotate_variant_unit_price(queryset, db_alias=None):
     """
-    Annotate ProductVariant queryset with price_value from default/first published unit.
-    Required for ProductFilter (min/max price) and ordering by price_value.
+    Expose ProductVariant.default_unit_price as price_value.
+
+    Required for ProductFilter (min/max price) and ordering by price_value. Reads the indexed
+    cache column (ProductVariant.sync_price_columns) instead of per-row unit subqueries.
     """
-    alias = db_alias or "default"
-    default_unit_price = ProductVariantUnit.objects.using(alias).filter(
-        variant_id=OuterRef("pk"),
-        is_default=True,
-        is_published=True,
-    ).values("price_value")[:1]
-    fallback_unit_price = (
-        ProductVariantUnit.objects.using(alias).filter(
-            variant_id=OuterRef("pk"),
-            is_published=True,
-        )
-        .order_by("unit_order", "id")
-        .values("price_value")[:1]
-    )
-    return queryset.annotate(
-        price_value=Coalesce(
-            Subquery(default_unit_price, output_field=DecimalField(max_digits=12, decimal_places=2)),
-            Subquery(fallback_unit_price, output_field=DecimalField(max_digits=12, decimal_places=2)),
-            Value(0),
-            output_field=DecimalField(max_digits=12, decimal_places=2),
-        )
-    )
+    return queryset.annotate(price_value=F("default_unit_price"))
 
 
 class ProductPagination(PageNumberPagination):
@@ -51,6 +37,34 @@ class ProductPagination(PageNumberPagination):
     max_page_size = 100
 
 
+class ProductKeysetPagination(ProductPagination):
+    """
+    Cursor mode (?pagination=cursor or ?cursor=...): keyset on the queryset ordering + id.
+
+    `count` is only computed with ?include_total=true.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = with_unique_tiebreaker(queryset.query.order_by or ['-created_date'])
+        self.keyset_page = paginate_keyset(
+            queryset,
+            ordering,
+            cursor=request.query_params.get('cursor'),
+            page_size=self.get_page_size(request),
+            scope='products',
+        )
+        self.count = queryset.count() if wants_total(request) else None
+        return self.keyset_page.items
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'next_cursor': self.keyset_page.next_cursor,
+            'has_more': self.keyset_page.has_more,
+            'results': data,
+        })
+
+
 class ProductViewSet(viewsets.ViewSet, generics.ListAPIView, generics.RetrieveAPIView):
     serializer_class = ProductVariantSerializer
     pagination_class = ProductPagination
@@ -62,6 +76,15 @@ class ProductViewSet(viewsets.ViewSet, generics.ListAPIView, generics.RetrieveAP
     ordering_fields = ['price_value', 'created_date', 'in_stock', 'product_ranking']
     ordering = ['-created_date']
 
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if wants_cursor_pagination(self.request):
+                self._paginator = ProductKeysetPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
     def get_queryset(self):
         store_db_alias = "store" if "store" in settings.DATABASES else "default"
         queryset = annotate_variant_unit_price(
@@ -1,10 +1,16 @@
-from django.db.models import Case, Count, F, IntegerField, Prefetch, Q, Value, When
+import time
+
+from django.db.models import Count, F, Prefetch, Q
 from django.db.models.functions import Lower
 from rest_framework import status, viewsets
+from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 
+from mainApp.permissions import IsBusinessAdmin
 from storeApp.models import Category, ProductVariant, ProductVariantUnit, SearchKeyword
+from storeApp.services.search_documents import annotate_search_relevance, search_match_q
+from storeApp.services.suggest_index import suggest_index
 from storeApp.services.variant_listing import one_variant_per_product
 
 DEFAULT_KEYWORD_LIMIT = 5
@@ -50,122 +56,169 @@ def _get_variant_image_url(variant):
     return None
 
 
+def _empty_suggestions():
+    return {
+        "history_search": [],
+        "hot_search": [],
+        "categories": [],
+        "top_products": [],
+    }
+
+
+def _suggestions_from_index(index, lookup_query):
+    """Serialize SuggestIndex hits into the same shape as the SQL path."""
+    hits = index.suggest(
+        lookup_query,
+        keyword_limit=DEFAULT_KEYWORD_LIMIT,
+        category_limit=DEFAULT_CATEGORY_LIMIT,
+        product_limit=DEFAULT_PRODUCT_LIMIT,
+    )
+    return {
+        "history_search": [
+            {"keyword": kw.keyword, "last_searched_at": kw.last_searched_at} for kw in hits["history_search"]
+        ],
+        "hot_search": [{"keyword": kw.keyword, "hit_count": kw.hit_count} for kw in hits["hot_search"]],
+        "categories": [
+            {
+                "id": cat.id,
+                "name": cat.name,
+                "slug": cat.slug,
+                "path": cat.path,
+                "product_count": cat.product_count,
+            }
+            for cat in hits["categories"]
+        ],
+        "top_products": [
+            {
+                "variant_id": entry.id,
+                "product_name": entry.product_name,
+                "packing": entry.packing,
+                "image": _get_variant_image_url(entry),
+                "price_display": entry.price_display,
+                "match_score": score,
+            }
+            for entry, score in hits["top_products"]
+        ],
+    }
+
+
+def _suggestions_from_store(lookup_query):
+    """Cold-index fallback: four queries against the store DB."""
+    keyword_qs = SearchKeyword.objects.filter(keyword_lookup__contains=lookup_query)
+
+    history_qs = keyword_qs.order_by("-last_searched_at")[:DEFAULT_KEYWORD_LIMIT]
+    hot_qs = keyword_qs.order_by("-hit_count", "-last_searched_at")[:DEFAULT_KEYWORD_LIMIT]
+
+    category_qs = (
+        Category.objects.filter(active=True)
+        .annotate(name_lookup=Lower("name"), path_lookup=Lower("path"))
+        .filter(Q(name_lookup__contains=lookup_query) | Q(path_lookup__contains=lookup_query))
+        .annotate(product_count=Count("products", distinct=True))
+        .order_by("-product_count", "name")[:DEFAULT_CATEGORY_LIMIT]
+    )
+
+    variants_qs = (
+        ProductVariant.objects.filter(is_published=True, product__active=True)
+        .select_related("product")
+        .prefetch_related(
+            Prefetch("units", queryset=ProductVariantUnit.objects.filter(is_published=True), to_attr="prefetched_units")
+        )
+    )
+    variants_qs = annotate_search_relevance(
+        variants_qs.filter(search_match_q(lookup_query)),
+        lookup_query,
+        include_taxonomy=False,
+        score_field="match_score",
+    ).filter(match_score__gt=0)
+    dedupe_order = [
+        F("product_id").asc(),
+        F("match_score").desc(),
+        F("search_rank").desc(),
+        F("product_ranking").desc(),
+        F("in_stock").desc(),
+        F("id").asc(),
+    ]
+    variants_qs = one_variant_per_product(variants_qs, partition_order=dedupe_order).order_by(
+        "-match_score", "-search_rank", "-product_ranking", "-in_stock", "id"
+    )[:DEFAULT_PRODUCT_LIMIT]
+
+    top_products = []
+    for variant in variants_qs:
+        default_unit = _get_default_unit(variant)
+        top_products.append(
+            {
+                "variant_id": variant.id,
+                "product_name": variant.product.web_name or variant.product.name,
+                "packing": variant.packing,
+                "image": _get_variant_image_url(variant),
+                "price_display": (
+                    default_unit.price_display
+                    if default_unit and default_unit.price_display
+                    else (str(default_unit.price_value) if default_unit and default_unit.price_value is not None else None)
+                ),
+                "match_score": variant.match_score,
+            }
+        )
+
+    return {
+        "history_search": [
+            {"keyword": kw.keyword, "last_searched_at": kw.last_searched_at} for kw in history_qs
+        ],
+        "hot_search": [{"keyword": kw.keyword, "hit_count": kw.hit_count} for kw in hot_qs],
+        "categories": [
+            {
+                "id": cat.id,
+                "name": cat.name,
+                "slug": cat.slug,
+                "path": cat.path,
+                "product_count": cat.product_count,
+            }
+            for cat in category_qs
+        ],
+        "top_products": top_products,
+    }
+
+
 class SearchSuggestViewSet(viewsets.ViewSet):
-    permission_classes = [AllowAny]
+    def get_permissions(self):
+        """
+        - list: AllowAny (public)
+        - index_stats: IsBusinessAdmin
+        """
+        if self.action == "index_stats":
+            permission_classes = [IsBusinessAdmin]
+        else:
+            permission_classes = [AllowAny]
+        return [permission() for permission in permission_classes]
 
     def list(self, request):
+        started_at = time.perf_counter()
         query = request.query_params.get("q", "")
         display_query = SearchKeyword.normalize_keyword(query)
         lookup_query = display_query.casefold()
-        if not lookup_query:
-            return Response(
-                {
-                    "query": display_query,
-                    "suggestions": {
-                        "history_search": [],
-                        "hot_search": [],
-                        "categories": [],
-                        "top_products": [],
-                    },
-                    "meta": {"has_more": False, "source": "store", "took_ms": 0},
-                },
-                status=status.HTTP_200_OK,
-            )
-
-        keyword_qs = SearchKeyword.objects.filter(keyword_lookup__contains=lookup_query)
-
-        history_qs = keyword_qs.order_by("-last_searched_at")[:DEFAULT_KEYWORD_LIMIT]
-        hot_qs = keyword_qs.order_by("-hit_count", "-last_searched_at")[:DEFAULT_KEYWORD_LIMIT]
-
-        category_qs = (
-            Category.objects.filter(active=True)
-            .annotate(name_lookup=Lower("name"), path_lookup=Lower("path"))
-            .filter(Q(name_lookup__contains=lookup_query) | Q(path_lookup__contains=lookup_query))
-            .annotate(product_count=Count("products", distinct=True))
-            .order_by("-product_count", "name")[:DEFAULT_CATEGORY_LIMIT]
-        )
-
-        variants_qs = (
-            ProductVariant.objects.filter(is_published=True, product__active=True)
-            .select_related("product")
-            .prefetch_related(
-                Prefetch("units", queryset=ProductVariantUnit.objects.filter(is_published=True), to_attr="prefetched_units")
-            )
-            .annotate(
-                product_name_lookup=Lower("product__name"),
-                web_name_lookup=Lower("product__web_name"),
-                sku_lookup=Lower("sku"),
-                mid_lookup=Lower("product__mid"),
-                ingredients_lookup=Lower("product__ingredients"),
-                match_score=Case(
-                    When(sku_lookup=lookup_query, then=Value(110)),
-                    When(mid_lookup=lookup_query, then=Value(108)),
-                    When(product_name_lookup=lookup_query, then=Value(100)),
-                    When(web_name_lookup=lookup_query, then=Value(95)),
-                    When(sku_lookup__startswith=lookup_query, then=Value(88)),
-                    When(product_name_lookup__startswith=lookup_query, then=Value(80)),
-                    When(web_name_lookup__startswith=lookup_query, then=Value(75)),
-                    When(product_name_lookup__contains=lookup_query, then=Value(60)),
-                    When(web_name_lookup__contains=lookup_query, then=Value(55)),
-                    When(sku_lookup__contains=lookup_query, then=Value(50)),
-                    When(mid_lookup__contains=lookup_query, then=Value(48)),
-                    When(ingredients_lookup__contains=lookup_query, then=Value(20)),
-                    default=Value(0),
-                    output_field=IntegerField(),
-                ),
-            )
-            .filter(match_score__gt=0)
-        )
-        dedupe_order = [
-            F("product_id").asc(),
-            F("match_score").desc(),
-            F("product_ranking").desc(),
-            F("in_stock").desc(),
-            F("id").asc(),
-        ]
-        variants_qs = one_variant_per_product(variants_qs, partition_order=dedupe_order).order_by(
-            "-match_score", "-product_ranking", "-in_stock", "id"
-        )[:DEFAULT_PRODUCT_LIMIT]
-
-        top_products = []
-        for variant in variants_qs:
-            default_unit = _get_default_unit(variant)
-            top_products.append(
-                {
-                    "variant_id": variant.id,
-                    "product_name": variant.product.web_name or variant.product.name,
-                    "packing": variant.packing,
-                    "image": _get_variant_image_url(variant),
-                    "price_display": (
-                        default_unit.price_display
-                        if default_unit and default_unit.price_display
-                        else (str(default_unit.price_value) if default_unit and default_unit.price_value is not None else None)
-                    ),
-                    "match_score": variant.match_score,
-                }
-            )
 
+        source = "store"
+        if not lookup_query:
+            suggestions = _empty_suggestions()
+        else:
+            index = suggest_index.current()
+            if index is not None:
+                source = "memory"
+                suggestions = _suggestions_from_index(index, lookup_query)
+            else:
+                suggestions = _suggestions_from_store(lookup_query)
+
+        took_ms = round((time.perf_counter() - started_at) * 1000, 2)
         return Response(
             {
                 "query": display_query,
-                "suggestions": {
-                    "history_search": [
-                        {"keyword": kw.keyword, "last_searched_at": kw.last_searched_at} for kw in history_qs
-                    ],
-                    "hot_search": [{"keyword": kw.keyword, "hit_count": kw.hit_count} for kw in hot_qs],
-                    "categories": [
-                        {
-                            "id": cat.id,
-                            "name": cat.name,
-                            "slug": cat.slug,
-                            "path": cat.path,
-                            "product_count": cat.product_count,
-                        }
-                        for cat in category_qs
-                    ],
-                    "top_products": top_products,
-                },
-                "meta": {"has_more": False, "source": "store", "took_ms": 0},
+                "suggestions": suggestions,
+                "meta": {"has_more": False, "source": source, "took_ms": took_ms},
             },
             status=status.HTTP_200_OK,
         )
+
+    @action(detail=False, methods=["get"], url_path="index-stats")
+    def index_stats(self, request):
+        """Suggest index size / build time for this worker process."""
+        return Response(suggest_index.stats(), status=status.HTTP_200_OK)
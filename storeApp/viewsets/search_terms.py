@@ -6,14 +6,15 @@ from rest_framework.parsers import JSONParser
 
 from storeApp.models import SearchKeyword
 from storeApp.serializers import SearchKeywordSerializer, RecordSearchSerializer
+from storeApp.services.search_keyword_buffer import record_search_hit
 
 DEFAULT_LIMIT = 20
 MAX_LIMIT = 50
 
 
 def _record_search(keyword: str) -> SearchKeyword:
-    """Chuẩn hóa keyword rồi tăng hit_count, hoặc tạo mới nếu chưa có."""
-    return SearchKeyword.record_search(keyword)
+    """Chuẩn hóa keyword rồi tăng hit_count (buffer, flush theo lô), hoặc tạo mới nếu chưa có."""
+    return record_search_hit(keyword)
 
 
 def _is_table_missing(exc: Exception) -> bool: